@@ -0,0 +1,155 @@
+"""Benchmark reading a safetensors checkpoint with the sequential and the
+parallel weight iterators, and optionally the startup time of the engine.
+
+The checkpoint is generated locally with random weights from the config of
+`--model`, so nothing but the config has to be downloaded. With `--cold`,
+the checkpoint files are evicted from the page cache before every run, so
+the numbers include the disk reads.
+"""
+import argparse
+import glob
+import multiprocessing
+import os
+import tempfile
+import time
+from typing import List
+
+import torch
+from transformers import AutoConfig, AutoModelForCausalLM, AutoTokenizer
+
+from vllm.model_executor.model_loader.weight_utils import (
+    parallel_safetensors_weights_iterator, safetensors_weights_iterator)
+from vllm.utils import FlexibleArgumentParser
+
+
+def generate_checkpoint(args: argparse.Namespace, path: str) -> None:
+    config = AutoConfig.from_pretrained(args.model)
+    if args.num_hidden_layers is not None:
+        config.num_hidden_layers = args.num_hidden_layers
+    model = AutoModelForCausalLM.from_config(config,
+                                             torch_dtype=getattr(
+                                                 torch, args.dtype))
+    model.save_pretrained(path,
+                          max_shard_size=args.max_shard_size,
+                          safe_serialization=True)
+    AutoTokenizer.from_pretrained(args.model).save_pretrained(path)
+
+
+def evict_page_cache(files: List[str]) -> None:
+    for file in files:
+        fd = os.open(file, os.O_RDONLY)
+        try:
+            os.fsync(fd)
+            os.posix_fadvise(fd, 0, 0, os.POSIX_FADV_DONTNEED)
+        finally:
+            os.close(fd)
+
+
+def time_iterator(files: List[str], num_threads: int) -> float:
+    if num_threads > 0:
+        iterator = parallel_safetensors_weights_iterator(files, num_threads)
+    else:
+        iterator = safetensors_weights_iterator(files)
+    start = time.perf_counter()
+    for _ in iterator:
+        pass
+    return time.perf_counter() - start
+
+
+def engine_startup(path: str, num_threads: int, args: argparse.Namespace,
+                   queue: multiprocessing.Queue) -> None:
+    os.environ["VLLM_SAFETENSORS_LOAD_THREADS"] = str(num_threads)
+    from vllm import LLM
+    start = time.perf_counter()
+    LLM(model=path,
+        dtype=args.dtype,
+        load_format="safetensors",
+        tensor_parallel_size=args.tensor_parallel_size,
+        enforce_eager=True)
+    queue.put(time.perf_counter() - start)
+
+
+def time_engine_startup(path: str, num_threads: int,
+                        args: argparse.Namespace) -> float:
+    # Each engine starts in a fresh process, so it does not reuse the memory
+    # and the imports of the previous one.
+    ctx = multiprocessing.get_context("spawn")
+    queue = ctx.Queue()
+    process = ctx.Process(target=engine_startup,
+                          args=(path, num_threads, args, queue))
+    process.start()
+    elapsed = queue.get()
+    process.join()
+    return elapsed
+
+
+def main(args: argparse.Namespace):
+    print(args)
+    with tempfile.TemporaryDirectory(dir=args.checkpoint_dir) as path:
+        generate_checkpoint(args, path)
+        files = sorted(glob.glob(os.path.join(path, "*.safetensors")))
+        total_gib = sum(os.path.getsize(f) for f in files) / 2**30
+        print(f"Checkpoint: {len(files)} files, {total_gib:.2f} GiB")
+
+        for num_threads in args.threads:
+            iterator_times = []
+            startup_times = []
+            for _ in range(args.num_iters):
+                if args.cold:
+                    evict_page_cache(files)
+                iterator_times.append(time_iterator(files, num_threads))
+                if args.engine:
+                    if args.cold:
+                        evict_page_cache(files)
+                    startup_times.append(
+                        time_engine_startup(path, num_threads, args))
+            iterator_time = sum(iterator_times) / len(iterator_times)
+            line = (f"threads {num_threads}: read {iterator_time:.2f}s "
+                    f"({total_gib / iterator_time:.2f} GiB/s)")
+            if startup_times:
+                startup_time = sum(startup_times) / len(startup_times)
+                line += f", engine startup {startup_time:.2f}s"
+            print(line)
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark reading a locally generated safetensors '
+        'checkpoint with different numbers of loader threads.')
+    parser.add_argument('--model',
+                        type=str,
+                        default='facebook/opt-1.3b',
+                        help='Model whose config is used to generate the '
+                        'checkpoint.')
+    parser.add_argument('--num-hidden-layers',
+                        type=int,
+                        default=None,
+                        help='Override the number of layers of the model, '
+                        'to scale the checkpoint size.')
+    parser.add_argument('--dtype',
+                        type=str,
+                        default='float16',
+                        choices=['float16', 'bfloat16', 'float32'])
+    parser.add_argument('--max-shard-size', type=str, default='1GB')
+    parser.add_argument('--checkpoint-dir',
+                        type=str,
+                        default=None,
+                        help='Directory in which the checkpoint is '
+                        'generated. Defaults to the system temp directory.')
+    parser.add_argument('--threads',
+                        type=int,
+                        nargs='+',
+                        default=[0, 2, 4, 8],
+                        help='Loader thread counts to compare. 0 is the '
+                        'sequential iterator.')
+    parser.add_argument('--num-iters', type=int, default=3)
+    parser.add_argument('--cold',
+                        action='store_true',
+                        help='Evict the checkpoint from the page cache '
+                        'before every run.')
+    parser.add_argument('--engine',
+                        action='store_true',
+                        help='Also measure the end to end engine startup.')
+    parser.add_argument('--tensor-parallel-size', '-tp', type=int, default=1)
+    args = parser.parse_args()
+    main(args)
@@ -0,0 +1,158 @@
+import random
+import time
+from typing import List
+
+import torch
+
+from vllm.attention.backends.torch_sdpa import (TorchSDPABackend,
+                                                TorchSDPABackendImpl)
+from vllm.attention.ops.int8_paged_attn import Int8PagedAttention
+from vllm.utils import STR_DTYPE_TO_TORCH_DTYPE, FlexibleArgumentParser
+
+NUM_BLOCKS = 1024
+
+
+@torch.inference_mode()
+def main(
+    num_prefills: int,
+    chunk_len: int,
+    context_len: int,
+    num_decodes: int,
+    seq_len: int,
+    num_query_heads: int,
+    num_kv_heads: int,
+    head_size: int,
+    block_size: int,
+    dtype: torch.dtype,
+    kv_cache_dtype: str,
+    seed: int,
+    num_iters: int,
+) -> None:
+    """Benchmark the CPU attention of a batch of prefill chunks, which
+    attend to `context_len` cached tokens, followed by decodes."""
+    random.seed(seed)
+    torch.random.manual_seed(seed)
+
+    scale = float(1.0 / (head_size**0.5))
+    impl = TorchSDPABackendImpl(num_query_heads, head_size, scale,
+                                num_kv_heads, None, None, kv_cache_dtype)
+
+    # The prefill chunks come first, then the decodes.
+    query_lens = [chunk_len] * num_prefills + [1] * num_decodes
+    seq_lens = ([context_len + chunk_len] * num_prefills +
+                [seq_len] * num_decodes)
+    num_tokens = sum(query_lens)
+    num_prefill_tokens = chunk_len * num_prefills
+
+    max_num_blocks_per_seq = (max(seq_lens) + block_size - 1) // block_size
+    assert max_num_blocks_per_seq * len(seq_lens) <= NUM_BLOCKS, (
+        "Not enough blocks for the batch.")
+    block_ids = random.sample(range(NUM_BLOCKS), NUM_BLOCKS)
+    block_tables_lst: List[List[int]] = []
+    slot_mapping_lst: List[int] = []
+    for i, (query_len, seq_len_) in enumerate(zip(query_lens, seq_lens)):
+        block_table = block_ids[i * max_num_blocks_per_seq:(i + 1) *
+                                max_num_blocks_per_seq]
+        block_tables_lst.append(block_table)
+        for position in range(seq_len_ - query_len, seq_len_):
+            slot_mapping_lst.append(block_table[position // block_size] *
+                                    block_size + position % block_size)
+
+    if kv_cache_dtype == "int8":
+        kv_cache_shape = Int8PagedAttention.get_kv_cache_shape(
+            NUM_BLOCKS, block_size, num_kv_heads, head_size)
+        kv_cache = torch.randint(-127, 128, kv_cache_shape, dtype=torch.int8)
+        # Finite scales.
+        for scales in Int8PagedAttention.split_kv_cache_scales(
+                kv_cache, num_kv_heads, head_size):
+            scales.fill_(scale / 127)
+    else:
+        kv_cache_shape = TorchSDPABackend.get_kv_cache_shape(
+            NUM_BLOCKS, block_size, num_kv_heads, head_size)
+        kv_cache = torch.empty(kv_cache_shape, dtype=dtype)
+        kv_cache.uniform_(-scale, scale)
+
+    query = torch.empty(num_tokens, num_query_heads * head_size, dtype=dtype)
+    key = torch.empty(num_tokens, num_kv_heads * head_size, dtype=dtype)
+    value = torch.empty_like(key)
+    for tensor in (query, key, value):
+        tensor.uniform_(-scale, scale)
+
+    def make_attn_metadata():
+        return TorchSDPABackend.make_metadata(
+            is_prompt=num_decodes == 0,
+            seq_lens=seq_lens,
+            seq_lens_tensor=torch.tensor(seq_lens, dtype=torch.int),
+            max_decode_seq_len=seq_len if num_decodes > 0 else 0,
+            num_prefills=num_prefills,
+            num_prefill_tokens=num_prefill_tokens,
+            num_decode_tokens=num_decodes,
+            block_tables=torch.tensor(block_tables_lst, dtype=torch.int),
+            slot_mapping=torch.tensor(slot_mapping_lst, dtype=torch.long),
+            context_lens=[context_len] * num_prefills,
+        )
+
+    def run_benchmark(num_iters: int) -> float:
+        start_time = time.perf_counter()
+        for _ in range(num_iters):
+            # A fresh metadata per step, as the masks are built once per
+            # step and shared by the layers.
+            impl.forward(query, key, value, kv_cache, make_attn_metadata())
+        end_time = time.perf_counter()
+        return (end_time - start_time) / num_iters
+
+    # Warmup.
+    print("Warming up...")
+    run_benchmark(num_iters=3)
+
+    # Benchmark.
+    latency = run_benchmark(num_iters=num_iters)
+    print(f"Attention running time: {latency * 1000000:.3f} us")
+
+
+if __name__ == '__main__':
+    parser = FlexibleArgumentParser(
+        description="Benchmark the CPU attention backend on a batch of "
+        "prefill chunks and decodes.")
+    parser.add_argument("--num-prefills", type=int, default=2)
+    parser.add_argument("--chunk-len", type=int, default=256)
+    parser.add_argument("--context-len", type=int, default=512)
+    parser.add_argument("--num-decodes", type=int, default=16)
+    parser.add_argument("--seq-len", type=int, default=1024)
+    parser.add_argument("--num-query-heads", type=int, default=32)
+    parser.add_argument("--num-kv-heads", type=int, default=8)
+    parser.add_argument("--head-size",
+                        type=int,
+                        choices=[64, 80, 96, 112, 128, 256],
+                        default=128)
+    parser.add_argument("--block-size", type=int, choices=[16, 32], default=16)
+    parser.add_argument("--dtype",
+                        type=str,
+                        choices=["bfloat16", "float"],
+                        default="bfloat16")
+    parser.add_argument("--kv-cache-dtype",
+                        type=str,
+                        choices=["auto", "int8"],
+                        default="auto")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--num-iters", type=int, default=20)
+    args = parser.parse_args()
+    print(args)
+
+    if args.num_query_heads % args.num_kv_heads != 0:
+        raise ValueError("num_query_heads must be divisible by num_kv_heads")
+    main(
+        num_prefills=args.num_prefills,
+        chunk_len=args.chunk_len,
+        context_len=args.context_len,
+        num_decodes=args.num_decodes,
+        seq_len=args.seq_len,
+        num_query_heads=args.num_query_heads,
+        num_kv_heads=args.num_kv_heads,
+        head_size=args.head_size,
+        block_size=args.block_size,
+        dtype=STR_DTYPE_TO_TORCH_DTYPE[args.dtype],
+        kv_cache_dtype=args.kv_cache_dtype,
+        seed=args.seed,
+        num_iters=args.num_iters,
+    )
@@ -0,0 +1,72 @@
+"""Benchmark pickling ExecuteModelRequest, as sent from the engine to the
+workers, for decode batches of growing size."""
+import pickle
+import time
+from typing import Callable, List
+
+from vllm import SamplingParams
+from vllm.sequence import (ExecuteModelRequest, SequenceData,
+                           SequenceGroupMetadata)
+from vllm.utils import FlexibleArgumentParser
+
+
+def make_request(batch_size: int, prompt_len: int, output_len: int,
+                 block_size: int) -> ExecuteModelRequest:
+    sampling_params = SamplingParams(temperature=0.8, top_p=0.95)
+    num_blocks = (prompt_len + output_len + block_size - 1) // block_size
+    seq_group_metadata_list: List[SequenceGroupMetadata] = []
+    for i in range(batch_size):
+        data = SequenceData(list(range(prompt_len)), list(range(output_len)))
+        data.update_num_computed_tokens(prompt_len + output_len - 1)
+        seq_group_metadata_list.append(
+            SequenceGroupMetadata(
+                request_id=f"cmpl-{i}",
+                is_prompt=False,
+                seq_data={i: data},
+                sampling_params=sampling_params,
+                block_tables={
+                    i: list(range(i * num_blocks, (i + 1) * num_blocks))
+                },
+                token_chunk_size=1,
+            ))
+    return ExecuteModelRequest(seq_group_metadata_list=seq_group_metadata_list,
+                               running_queue_size=batch_size)
+
+
+def pickle_dumps(request: ExecuteModelRequest) -> bytes:
+    return pickle.dumps(request, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def time_ms(fn: Callable[[], object], num_iters: int) -> float:
+    start = time.perf_counter()
+    for _ in range(num_iters):
+        fn()
+    return (time.perf_counter() - start) / num_iters * 1000
+
+
+def main(args):
+    print(f"{'batch':>6} {'bytes':>10} {'dumps ms':>10} {'loads ms':>10}")
+    for batch_size in args.batch_sizes:
+        request = make_request(batch_size, args.prompt_len, args.output_len,
+                               args.block_size)
+        payload = pickle_dumps(request)
+        dumps_ms = time_ms(lambda: pickle_dumps(request), args.num_iters)
+        loads_ms = time_ms(lambda: pickle.loads(payload), args.num_iters)
+        print(f"{batch_size:>6} {len(payload):>10} {dumps_ms:>10.3f} "
+              f"{loads_ms:>10.3f}")
+
+
+if __name__ == "__main__":
+    parser = FlexibleArgumentParser(
+        description='Benchmark the serialization of ExecuteModelRequest '
+        'sent from the engine to the workers.')
+    parser.add_argument('--batch-sizes',
+                        type=int,
+                        nargs='+',
+                        default=[8, 32, 128, 512, 1024])
+    parser.add_argument('--prompt-len', type=int, default=512)
+    parser.add_argument('--output-len', type=int, default=128)
+    parser.add_argument('--block-size', type=int, default=16)
+    parser.add_argument('--num-iters', type=int, default=20)
+    args = parser.parse_args()
+    main(args)
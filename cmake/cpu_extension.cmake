@@ -97,6 +97,7 @@ set(VLLM_EXT_SRC
     "csrc/cpu/cache.cpp"
     "csrc/cpu/layernorm.cpp"
     "csrc/cpu/pos_encoding.cpp"
+    "csrc/cpu/wna16_gemm.cpp"
     "csrc/cpu/torch_bindings.cpp")
 
 define_gpu_extension_target(
@@ -2,7 +2,7 @@
 
 namespace {
 
-template <typename scalar_t>
+template <typename scalar_t, typename cache_t = scalar_t>
 struct KernelVecType {
   using q_load_vec_type = void;
   using q_vec_type = void;
@@ -44,6 +44,46 @@ struct KernelVecType<c10::BFloat16> {
 };
 #endif
 
+// With an int8 KV cache, the keys and values are dequantized to FP32. A load
+// of 16 keys holds x = 8 elements of 2 tokens, whatever the model dtype.
+template <>
+struct KernelVecType<float, int8_t> {
+  using q_load_vec_type = vec_op::FP32Vec8;
+  using q_vec_type = vec_op::FP32Vec16;
+  using k_load_vec_type = vec_op::INT8Vec16;
+  using k_vec_type = vec_op::FP32Vec16;
+  using qk_acc_vec_type = vec_op::FP32Vec16;
+  using v_load_vec_type = vec_op::INT8Vec16;
+};
+
+template <>
+struct KernelVecType<c10::BFloat16, int8_t> {
+  using q_load_vec_type = vec_op::BF16Vec8;
+  using q_vec_type = vec_op::FP32Vec16;
+  using k_load_vec_type = vec_op::INT8Vec16;
+  using k_vec_type = vec_op::FP32Vec16;
+  using qk_acc_vec_type = vec_op::FP32Vec16;
+  using v_load_vec_type = vec_op::INT8Vec16;
+};
+
+// Each block of an int8 KV cache holds the int8 keys (values) of its tokens,
+// followed by a float scale per kv head and token, [num_kv_heads, block_size].
+// Returns the scales of a kv head in a block, or nullptr if the cache is not
+// quantized.
+template <typename cache_t, int HEAD_SIZE, int BLOCK_SIZE>
+FORCE_INLINE const float* getBlockScales(const cache_t* __restrict__ block,
+                                         const int num_kv_heads,
+                                         const int64_t kv_head_idx) {
+  if constexpr (std::is_same_v<cache_t, int8_t>) {
+    return reinterpret_cast<const float*>(block +
+                                          num_kv_heads * HEAD_SIZE *
+                                              BLOCK_SIZE) +
+           kv_head_idx * BLOCK_SIZE;
+  } else {
+    return nullptr;
+  }
+}
+
 template <typename T>
 FORCE_INLINE std::pair<T, T> reduceSoftmax(T* data, const int size,
                                            const int capacity) {
@@ -121,13 +161,15 @@ FORCE_INLINE void reducePartitonSoftmax(const T* max_data, T* sum_data,
   }
 }
 
-template <typename scalar_t, int HEAD_SIZE, int BLOCK_SIZE, int x>
+template <typename scalar_t, typename cache_t, int HEAD_SIZE, int BLOCK_SIZE,
+          int x>
 struct reduceQKBlockKernel {
-  using q_load_vec_type = typename KernelVecType<scalar_t>::q_load_vec_type;
-  using q_vec_type = typename KernelVecType<scalar_t>::q_vec_type;
-  using k_load_vec_type = typename KernelVecType<scalar_t>::k_load_vec_type;
-  using k_vec_type = typename KernelVecType<scalar_t>::k_vec_type;
-  using qk_acc_vec_type = typename KernelVecType<scalar_t>::qk_acc_vec_type;
+  using vec_types = KernelVecType<scalar_t, cache_t>;
+  using q_load_vec_type = typename vec_types::q_load_vec_type;
+  using q_vec_type = typename vec_types::q_vec_type;
+  using k_load_vec_type = typename vec_types::k_load_vec_type;
+  using k_vec_type = typename vec_types::k_vec_type;
+  using qk_acc_vec_type = typename vec_types::qk_acc_vec_type;
 
   constexpr static int TOKEN_PER_GROUP = k_load_vec_type::get_elem_num() / x;
   constexpr static int MAX_GROUP_NUM = 16 / TOKEN_PER_GROUP;
@@ -135,12 +177,13 @@ struct reduceQKBlockKernel {
 
   static_assert(MAX_GROUP_NUM == 8 || MAX_GROUP_NUM == 4);
   static_assert(k_load_vec_type::get_elem_num() % x == 0);
-  static_assert(q_load_vec_type::get_elem_num() * sizeof(scalar_t) == 16);
+  static_assert(q_load_vec_type::get_elem_num() == x);
 
   FORCE_INLINE static void call(const scalar_t* __restrict__ q,
-                                const scalar_t* __restrict__ k_block,
+                                const cache_t* __restrict__ k_block,
                                 float* __restrict__ logits, float scale,
-                                const int token_num) {
+                                const int token_num,
+                                const float* __restrict__ k_scales) {
     const int group_num = (token_num + TOKEN_PER_GROUP - 1) / TOKEN_PER_GROUP;
 
     qk_acc_vec_type group_accums[MAX_GROUP_NUM];
@@ -187,11 +230,15 @@ struct reduceQKBlockKernel {
     for (int token_group_idx = 0; token_group_idx < group_num;
          ++token_group_idx) {
       vec_op::unroll_loop<int, TOKEN_PER_GROUP>(
-          [&group_accums, logits, scale, token_group_idx](int token_idx) {
+          [&group_accums, logits, scale, k_scales,
+           token_group_idx](int token_idx) {
             float dot_v =
                 group_accums[token_group_idx]
                     .template reduce_sub_sum<qk_acc_vec_type::get_elem_num() /
                                              TOKEN_PER_GROUP>(token_idx);
+            if constexpr (std::is_same_v<cache_t, int8_t>) {
+              dot_v *= k_scales[token_group_idx * TOKEN_PER_GROUP + token_idx];
+            }
             logits[token_group_idx * TOKEN_PER_GROUP + token_idx] =
                 dot_v * scale;
           });
@@ -199,14 +246,19 @@ struct reduceQKBlockKernel {
   }
 };
 
-template <typename scalar_t, int HEAD_SIZE, int BLOCK_SIZE,
+template <typename scalar_t, typename cache_t, int HEAD_SIZE, int BLOCK_SIZE,
           int HEAD_PARTITION_SIZE, typename acc_t>
-FORCE_INLINE void reduceValueBlock(const float* prob, const scalar_t* v_block,
-                                   acc_t&& acc) {
-  using v_load_vec_type = typename KernelVecType<scalar_t>::v_load_vec_type;
+FORCE_INLINE void reduceValueBlock(const float* prob, const cache_t* v_block,
+                                   const float* v_scales, acc_t&& acc) {
+  using v_load_vec_type =
+      typename KernelVecType<scalar_t, cache_t>::v_load_vec_type;
   constexpr int ELEM_NUM = v_load_vec_type::get_elem_num();
   static_assert(BLOCK_SIZE == ELEM_NUM);
   vec_op::FP32Vec16 prob_vec(prob);
+  if constexpr (std::is_same_v<cache_t, int8_t>) {
+    // Scale the probabilities of the tokens rather than their values.
+    prob_vec = prob_vec * vec_op::FP32Vec16(v_scales);
+  }
 
   vec_op::unroll_loop<int, HEAD_PARTITION_SIZE>([&](int head_elem_idx) {
     v_load_vec_type v_vec(v_block + BLOCK_SIZE * head_elem_idx);
@@ -218,15 +270,15 @@ FORCE_INLINE void reduceValueBlock(const float* prob, const scalar_t* v_block,
 
 // Paged attention v1
 namespace {
-template <typename scalar_t, int HEAD_SIZE, int BLOCK_SIZE>
+template <typename scalar_t, typename cache_t, int HEAD_SIZE, int BLOCK_SIZE>
 struct paged_attention_v1_impl {
   static void call(
-      scalar_t* __restrict__ out,            // [num_seqs, num_heads, head_size]
-      const scalar_t* __restrict__ q,        // [num_seqs, num_heads, head_size]
-      const scalar_t* __restrict__ k_cache,  // [num_blocks, num_kv_heads,
-                                             // head_size/x, block_size, x]
-      const scalar_t* __restrict__ v_cache,  // [num_blocks, num_kv_heads,
-                                             // head_size, block_size]
+      scalar_t* __restrict__ out,           // [num_seqs, num_heads, head_size]
+      const scalar_t* __restrict__ q,       // [num_seqs, num_heads, head_size]
+      const cache_t* __restrict__ k_cache,  // [num_blocks, num_kv_heads,
+                                            // head_size/x, block_size, x]
+      const cache_t* __restrict__ v_cache,  // [num_blocks, num_kv_heads,
+                                            // head_size, block_size]
       const int num_kv_heads, const float scale,
       const int* __restrict__ block_tables,  // [num_seqs,
                                              // max_num_blocks_per_seq]
@@ -235,7 +287,8 @@ struct paged_attention_v1_impl {
       const float* __restrict__ alibi_slopes,  // [num_heads]
       const int q_stride, const int kv_block_stride, const int kv_head_stride,
       const int num_seqs, const int num_heads) {
-    constexpr int x = 16 / sizeof(scalar_t);
+    constexpr int x = KernelVecType<scalar_t, cache_t>::q_load_vec_type::
+        get_elem_num();
     const int num_queries_per_kv = num_heads / num_kv_heads;
 
     static_assert(BLOCK_SIZE == 16);
@@ -269,15 +322,19 @@ struct paged_attention_v1_impl {
         // Compute logits
         for (int block_idx = 0; block_idx < block_num; ++block_idx) {
           const int64_t physical_block_idx = seq_block_table[block_idx];
-          const scalar_t* __restrict__ k_block_cache_ptr =
-              k_cache + physical_block_idx * kv_block_stride +
-              kv_head_idx * kv_head_stride;
+          const cache_t* __restrict__ k_block_ptr =
+              k_cache + physical_block_idx * kv_block_stride;
+          const cache_t* __restrict__ k_block_cache_ptr =
+              k_block_ptr + kv_head_idx * kv_head_stride;
           float* __restrict__ head_block_logits =
               thread_block_logits + block_idx * BLOCK_SIZE;
 
-          reduceQKBlockKernel<scalar_t, HEAD_SIZE, BLOCK_SIZE, x>::call(
-              q_vec_ptr, k_block_cache_ptr, head_block_logits, scale,
-              block_idx == block_num - 1 ? last_block_token_num : BLOCK_SIZE);
+          reduceQKBlockKernel<scalar_t, cache_t, HEAD_SIZE, BLOCK_SIZE, x>::
+              call(q_vec_ptr, k_block_cache_ptr, head_block_logits, scale,
+                   block_idx == block_num - 1 ? last_block_token_num
+                                              : BLOCK_SIZE,
+                   getBlockScales<cache_t, HEAD_SIZE, BLOCK_SIZE>(
+                       k_block_ptr, num_kv_heads, kv_head_idx));
         }
 
         // Compute softmax
@@ -303,18 +360,22 @@ struct paged_attention_v1_impl {
             const int64_t physical_block_idx = seq_block_table[block_idx];
             const float* __restrict__ prob_vec_ptr =
                 thread_block_logits + block_idx * BLOCK_SIZE;
-            const scalar_t* __restrict__ v_block_cache_ptr =
-                v_cache + physical_block_idx * kv_block_stride +
-                kv_head_idx * kv_head_stride +
+            const cache_t* __restrict__ v_block_ptr =
+                v_cache + physical_block_idx * kv_block_stride;
+            const cache_t* __restrict__ v_block_cache_ptr =
+                v_block_ptr + kv_head_idx * kv_head_stride +
                 BLOCK_SIZE * head_part_idx * head_elem_num_per_partition;
-            reduceValueBlock<scalar_t, HEAD_SIZE, BLOCK_SIZE,
+            reduceValueBlock<scalar_t, cache_t, HEAD_SIZE, BLOCK_SIZE,
                              head_elem_num_per_partition>(
-                prob_vec_ptr, v_block_cache_ptr, accums);
+                prob_vec_ptr, v_block_cache_ptr,
+                getBlockScales<cache_t, HEAD_SIZE, BLOCK_SIZE>(
+                    v_block_ptr, num_kv_heads, kv_head_idx),
+                accums);
 
             if (block_idx != block_num - 1) {
               const int64_t next_physical_block_idx =
                   seq_block_table[block_idx + 1];
-              const scalar_t* __restrict__ next_v_block_cache_ptr =
+              const cache_t* __restrict__ next_v_block_cache_ptr =
                   v_cache + next_physical_block_idx * kv_block_stride +
                   kv_head_idx * kv_head_stride +
                   BLOCK_SIZE * head_part_idx * head_elem_num_per_partition;
@@ -340,14 +401,14 @@ struct paged_attention_v1_impl {
   }
 };
 
-#define LAUNCH_V1_ATTENTION_KERNEL(T, HEAD_SIZE, BLOCK_SIZE)                   \
-  paged_attention_v1_impl<T, HEAD_SIZE, BLOCK_SIZE>::call(                     \
+#define LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, HEAD_SIZE, BLOCK_SIZE)          \
+  paged_attention_v1_impl<T, CACHE_T, HEAD_SIZE, BLOCK_SIZE>::call(            \
       out_ptr, query_ptr, key_cache_ptr, value_cache_ptr, num_kv_heads, scale, \
       block_tables_ptr, seq_lens_ptr, max_num_blocks_per_seq,                  \
       alibi_slopes_ptr, q_stride, kv_block_stride, kv_head_stride, num_seqs,   \
       num_heads);
 
-template <typename T, int BLOCK_SIZE>
+template <typename T, typename CACHE_T, int BLOCK_SIZE>
 void paged_attention_v1_impl_launcher(
     torch::Tensor& out, torch::Tensor& query, torch::Tensor& key_cache,
     torch::Tensor& value_cache, int num_kv_heads, float scale,
@@ -369,32 +430,32 @@ void paged_attention_v1_impl_launcher(
 
   T* out_ptr = reinterpret_cast<T*>(out.data_ptr());
   T* query_ptr = reinterpret_cast<T*>(query.data_ptr());
-  T* key_cache_ptr = reinterpret_cast<T*>(key_cache.data_ptr());
-  T* value_cache_ptr = reinterpret_cast<T*>(value_cache.data_ptr());
+  CACHE_T* key_cache_ptr = reinterpret_cast<CACHE_T*>(key_cache.data_ptr());
+  CACHE_T* value_cache_ptr = reinterpret_cast<CACHE_T*>(value_cache.data_ptr());
   int* block_tables_ptr = block_tables.data_ptr<int>();
   int* seq_lens_ptr = seq_lens.data_ptr<int>();
 
   switch (head_size) {
     case 64:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 64, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 64, BLOCK_SIZE);
       break;
     case 80:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 80, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 80, BLOCK_SIZE);
       break;
     case 96:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 96, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 96, BLOCK_SIZE);
       break;
     case 112:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 112, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 112, BLOCK_SIZE);
       break;
     case 128:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 128, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 128, BLOCK_SIZE);
       break;
     case 192:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 192, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 192, BLOCK_SIZE);
       break;
     case 256:
-      LAUNCH_V1_ATTENTION_KERNEL(T, 256, BLOCK_SIZE);
+      LAUNCH_V1_ATTENTION_KERNEL(T, CACHE_T, 256, BLOCK_SIZE);
       break;
     default:
       TORCH_CHECK(false, "Unsupported head size: ", head_size);
@@ -402,15 +463,15 @@ void paged_attention_v1_impl_launcher(
   }
 }
 
-#define CALL_V1_KERNEL_LAUNCHER(T, BLOCK_SIZE)                               \
-  paged_attention_v1_impl_launcher<T, BLOCK_SIZE>(                           \
+#define CALL_V1_KERNEL_LAUNCHER(T, CACHE_T, BLOCK_SIZE)                      \
+  paged_attention_v1_impl_launcher<T, CACHE_T, BLOCK_SIZE>(                  \
       out, query, key_cache, value_cache, num_kv_heads, scale, block_tables, \
       seq_lens, max_seq_len, alibi_slopes);
 
-#define CALL_V1_KERNEL_LAUNCHER_BLOCK_SIZE(T)                     \
+#define CALL_V1_KERNEL_LAUNCHER_BLOCK_SIZE(T, CACHE_T)            \
   switch (block_size) {                                           \
     case 16:                                                      \
-      CALL_V1_KERNEL_LAUNCHER(T, 16);                             \
+      CALL_V1_KERNEL_LAUNCHER(T, CACHE_T, 16);                    \
       break;                                                      \
     default:                                                      \
       TORCH_CHECK(false, "Unsupported block size: ", block_size); \
@@ -430,17 +491,24 @@ void paged_attention_v1(
   TORCH_CHECK(kv_scale == 1.0f);
   TORCH_CHECK(blocksparse_vert_stride <= 1,
               "CPU backend does not support blocksparse attention yet.");
-  VLLM_DISPATCH_FLOATING_TYPES(query.scalar_type(), "paged_attention_v1_impl",
-                               [&] {
-                                 CPU_KERNEL_GUARD_IN(paged_attention_v1_impl)
-                                 CALL_V1_KERNEL_LAUNCHER_BLOCK_SIZE(scalar_t);
-                                 CPU_KERNEL_GUARD_OUT(paged_attention_v1_impl)
-                               });
+  TORCH_CHECK(kv_cache_dtype == "auto" || kv_cache_dtype == "int8",
+              "Unsupported KV cache dtype on CPU: ", kv_cache_dtype);
+  VLLM_DISPATCH_FLOATING_TYPES(
+      query.scalar_type(), "paged_attention_v1_impl", [&] {
+        CPU_KERNEL_GUARD_IN(paged_attention_v1_impl)
+        if (kv_cache_dtype == "int8") {
+          CALL_V1_KERNEL_LAUNCHER_BLOCK_SIZE(scalar_t, int8_t);
+        } else {
+          CALL_V1_KERNEL_LAUNCHER_BLOCK_SIZE(scalar_t, scalar_t);
+        }
+        CPU_KERNEL_GUARD_OUT(paged_attention_v1_impl)
+      });
 }
 
 // Paged attention v2
 namespace {
-template <typename scalar_t, int HEAD_SIZE, int BLOCK_SIZE, int PARTITION_SIZE>
+template <typename scalar_t, typename cache_t, int HEAD_SIZE, int BLOCK_SIZE,
+          int PARTITION_SIZE>
 struct paged_attention_v2_impl {
   static void call(
       scalar_t* __restrict__ out,            // [num_seqs, num_heads, head_size]
@@ -451,9 +519,9 @@ struct paged_attention_v2_impl {
       scalar_t* __restrict__ tmp_out,        // [num_seqs, num_heads,
                                              // max_num_partitions, head_size]
       const scalar_t* __restrict__ q,        // [num_seqs, num_heads, head_size]
-      const scalar_t* __restrict__ k_cache,  // [num_blocks, num_kv_heads,
+      const cache_t* __restrict__ k_cache,   // [num_blocks, num_kv_heads,
                                              // head_size/x, block_size, x]
-      const scalar_t* __restrict__ v_cache,  // [num_blocks, num_kv_heads,
+      const cache_t* __restrict__ v_cache,   // [num_blocks, num_kv_heads,
                                              // head_size, block_size]
       const int num_kv_heads, const float scale,
       const int* __restrict__ block_tables,  // [num_seqs,
@@ -463,7 +531,8 @@ struct paged_attention_v2_impl {
       const float* __restrict__ alibi_slopes,  // [num_heads]
       const int q_stride, const int kv_block_stride, const int kv_head_stride,
       const int num_seqs, const int num_heads, const int max_num_partitions) {
-    constexpr int x = 16 / sizeof(scalar_t);
+    constexpr int x = KernelVecType<scalar_t, cache_t>::q_load_vec_type::
+        get_elem_num();
     const int num_queries_per_kv = num_heads / num_kv_heads;
 
     static_assert(BLOCK_SIZE == 16);
@@ -501,15 +570,19 @@ struct paged_attention_v2_impl {
           // Compute logits
           for (int block_idx = 0; block_idx < block_num; ++block_idx) {
             const int64_t physical_block_idx = seq_block_table[block_idx];
-            const scalar_t* __restrict__ k_block_cache_ptr =
-                k_cache + physical_block_idx * kv_block_stride +
-                kv_head_idx * kv_head_stride;
+            const cache_t* __restrict__ k_block_ptr =
+                k_cache + physical_block_idx * kv_block_stride;
+            const cache_t* __restrict__ k_block_cache_ptr =
+                k_block_ptr + kv_head_idx * kv_head_stride;
             float* __restrict__ head_block_logits =
                 logits + block_idx * BLOCK_SIZE;
 
-            reduceQKBlockKernel<scalar_t, HEAD_SIZE, BLOCK_SIZE, x>::call(
-                q_vec_ptr, k_block_cache_ptr, head_block_logits, scale,
-                block_idx == block_num - 1 ? last_block_token_num : BLOCK_SIZE);
+            reduceQKBlockKernel<scalar_t, cache_t, HEAD_SIZE, BLOCK_SIZE, x>::
+                call(q_vec_ptr, k_block_cache_ptr, head_block_logits, scale,
+                     block_idx == block_num - 1 ? last_block_token_num
+                                                : BLOCK_SIZE,
+                     getBlockScales<cache_t, HEAD_SIZE, BLOCK_SIZE>(
+                         k_block_ptr, num_kv_heads, kv_head_idx));
           }
 
           std::pair<float, float> max_and_sum;
@@ -552,18 +625,22 @@ struct paged_attention_v2_impl {
               const int64_t physical_block_idx = seq_block_table[block_idx];
               const float* __restrict__ prob_vec_ptr =
                   logits + block_idx * BLOCK_SIZE;
-              const scalar_t* __restrict__ v_block_cache_ptr =
-                  v_cache + physical_block_idx * kv_block_stride +
-                  kv_head_idx * kv_head_stride +
+              const cache_t* __restrict__ v_block_ptr =
+                  v_cache + physical_block_idx * kv_block_stride;
+              const cache_t* __restrict__ v_block_cache_ptr =
+                  v_block_ptr + kv_head_idx * kv_head_stride +
                   BLOCK_SIZE * head_part_idx * head_elem_num_per_partition;
-              reduceValueBlock<scalar_t, HEAD_SIZE, BLOCK_SIZE,
+              reduceValueBlock<scalar_t, cache_t, HEAD_SIZE, BLOCK_SIZE,
                                head_elem_num_per_partition>(
-                  prob_vec_ptr, v_block_cache_ptr, accums);
+                  prob_vec_ptr, v_block_cache_ptr,
+                  getBlockScales<cache_t, HEAD_SIZE, BLOCK_SIZE>(
+                      v_block_ptr, num_kv_heads, kv_head_idx),
+                  accums);
 
               if (block_idx != block_num - 1) {
                 const int64_t next_physical_block_idx =
                     seq_block_table[block_idx + 1];
-                const scalar_t* __restrict__ next_v_block_cache_ptr =
+                const cache_t* __restrict__ next_v_block_cache_ptr =
                     v_cache + next_physical_block_idx * kv_block_stride +
                     kv_head_idx * kv_head_stride +
                     BLOCK_SIZE * head_part_idx * head_elem_num_per_partition;
@@ -651,15 +728,17 @@ struct paged_attention_v2_impl {
   }
 };
 
-#define LAUNCH_V2_ATTENTION_KERNEL(T, HEAD_SIZE, BLOCK_SIZE)                 \
-  paged_attention_v2_impl<T, HEAD_SIZE, BLOCK_SIZE, PARTITION_SIZE>::call(   \
+#define LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, HEAD_SIZE, BLOCK_SIZE)        \
+  paged_attention_v2_impl<T, CACHE_T, HEAD_SIZE, BLOCK_SIZE,                 \
+                          PARTITION_SIZE>::call(                             \
       out_ptr, exp_sums_ptr, max_logits_ptr, tmp_out_ptr, query_ptr,         \
       key_cache_ptr, value_cache_ptr, num_kv_heads, scale, block_tables_ptr, \
       seq_lens_ptr, max_num_blocks_per_seq, alibi_slopes_ptr, q_stride,      \
       kv_block_stride, kv_head_stride, num_seqs, num_heads,                  \
       max_num_partitions);
 
-template <typename T, int BLOCK_SIZE, int PARTITION_SIZE = 512>
+template <typename T, typename CACHE_T, int BLOCK_SIZE,
+          int PARTITION_SIZE = 512>
 void paged_attention_v2_impl_launcher(
     torch::Tensor& out, torch::Tensor& exp_sums, torch::Tensor& max_logits,
     torch::Tensor& tmp_out, torch::Tensor& query, torch::Tensor& key_cache,
@@ -686,32 +765,32 @@ void paged_attention_v2_impl_launcher(
   float* max_logits_ptr = reinterpret_cast<float*>(max_logits.data_ptr());
   T* tmp_out_ptr = reinterpret_cast<T*>(tmp_out.data_ptr());
   T* query_ptr = reinterpret_cast<T*>(query.data_ptr());
-  T* key_cache_ptr = reinterpret_cast<T*>(key_cache.data_ptr());
-  T* value_cache_ptr = reinterpret_cast<T*>(value_cache.data_ptr());
+  CACHE_T* key_cache_ptr = reinterpret_cast<CACHE_T*>(key_cache.data_ptr());
+  CACHE_T* value_cache_ptr = reinterpret_cast<CACHE_T*>(value_cache.data_ptr());
   int* block_tables_ptr = block_tables.data_ptr<int>();
   int* seq_lens_ptr = seq_lens.data_ptr<int>();
 
   switch (head_size) {
     case 64:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 64, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 64, BLOCK_SIZE);
       break;
     case 80:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 80, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 80, BLOCK_SIZE);
       break;
     case 96:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 96, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 96, BLOCK_SIZE);
       break;
     case 112:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 112, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 112, BLOCK_SIZE);
       break;
     case 128:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 128, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 128, BLOCK_SIZE);
       break;
     case 192:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 192, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 192, BLOCK_SIZE);
       break;
     case 256:
-      LAUNCH_V2_ATTENTION_KERNEL(T, 256, BLOCK_SIZE);
+      LAUNCH_V2_ATTENTION_KERNEL(T, CACHE_T, 256, BLOCK_SIZE);
       break;
     default:
       TORCH_CHECK(false, "Unsupported head size: ", head_size);
@@ -719,16 +798,16 @@ void paged_attention_v2_impl_launcher(
   }
 }
 
-#define CALL_V2_KERNEL_LAUNCHER(T, BLOCK_SIZE)                              \
-  paged_attention_v2_impl_launcher<T, BLOCK_SIZE>(                          \
+#define CALL_V2_KERNEL_LAUNCHER(T, CACHE_T, BLOCK_SIZE)                     \
+  paged_attention_v2_impl_launcher<T, CACHE_T, BLOCK_SIZE>(                 \
       out, exp_sums, max_logits, tmp_out, query, key_cache, value_cache,    \
       num_kv_heads, scale, block_tables, seq_lens, block_size, max_seq_len, \
       alibi_slopes);
 
-#define CALL_V2_KERNEL_LAUNCHER_BLOCK_SIZE(T)                     \
+#define CALL_V2_KERNEL_LAUNCHER_BLOCK_SIZE(T, CACHE_T)            \
   switch (block_size) {                                           \
     case 16:                                                      \
-      CALL_V2_KERNEL_LAUNCHER(T, 16);                             \
+      CALL_V2_KERNEL_LAUNCHER(T, CACHE_T, 16);                    \
       break;                                                      \
     default:                                                      \
       TORCH_CHECK(false, "Unsupported block size: ", block_size); \
@@ -749,10 +828,16 @@ void paged_attention_v2(
   TORCH_CHECK(kv_scale == 1.0f);
   TORCH_CHECK(blocksparse_vert_stride <= 1,
               "CPU backend does not support blocksparse attention yet.");
-  VLLM_DISPATCH_FLOATING_TYPES(query.scalar_type(), "paged_attention_v2_impl",
-                               [&] {
-                                 CPU_KERNEL_GUARD_IN(paged_attention_v2_impl)
-                                 CALL_V2_KERNEL_LAUNCHER_BLOCK_SIZE(scalar_t);
-                                 CPU_KERNEL_GUARD_OUT(paged_attention_v2_impl)
-                               });
+  TORCH_CHECK(kv_cache_dtype == "auto" || kv_cache_dtype == "int8",
+              "Unsupported KV cache dtype on CPU: ", kv_cache_dtype);
+  VLLM_DISPATCH_FLOATING_TYPES(
+      query.scalar_type(), "paged_attention_v2_impl", [&] {
+        CPU_KERNEL_GUARD_IN(paged_attention_v2_impl)
+        if (kv_cache_dtype == "int8") {
+          CALL_V2_KERNEL_LAUNCHER_BLOCK_SIZE(scalar_t, int8_t);
+        } else {
+          CALL_V2_KERNEL_LAUNCHER_BLOCK_SIZE(scalar_t, scalar_t);
+        }
+        CPU_KERNEL_GUARD_OUT(paged_attention_v2_impl)
+      });
 }
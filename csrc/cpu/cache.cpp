@@ -3,6 +3,14 @@
 
 #include "cpu_types.hpp"
 
+// The int8 KV cache is copied as the other cache types.
+#define VLLM_DISPATCH_CASE_KV_CACHE_TYPES(...)       \
+  VLLM_DISPATCH_CASE_FLOATING_TYPES(__VA_ARGS__)     \
+  AT_DISPATCH_CASE(at::ScalarType::Char, __VA_ARGS__)
+
+#define VLLM_DISPATCH_KV_CACHE_TYPES(TYPE, NAME, ...) \
+  AT_DISPATCH_SWITCH(TYPE, NAME, VLLM_DISPATCH_CASE_KV_CACHE_TYPES(__VA_ARGS__))
+
 namespace {
 template <typename scalar_t>
 void copy_blocks_cpu_impl(std::vector<torch::Tensor> const& key_caches,
@@ -80,6 +88,92 @@ void reshape_and_cache_cpu_impl(
     }
   }
 }
+
+constexpr int MAX_HEAD_SIZE = 256;
+
+// Quantizes a head of `head_size` elements to int8, with the scale of its
+// largest absolute value over 127, and returns the scale.
+template <typename scalar_t>
+FORCE_INLINE float quantize_head_int8(const scalar_t* __restrict__ src,
+                                      const int head_size,
+                                      int8_t* __restrict__ quantized) {
+  float max_abs = 0.0f;
+  for (int i = 0; i < head_size; ++i) {
+    max_abs = std::max(max_abs, std::abs(static_cast<float>(src[i])));
+  }
+  const float scale = max_abs / 127.0f;
+  const float inv_scale = max_abs > 0.0f ? 127.0f / max_abs : 0.0f;
+  for (int i = 0; i < head_size; ++i) {
+    quantized[i] = static_cast<int8_t>(
+        std::nearbyint(static_cast<float>(src[i]) * inv_scale));
+  }
+  return scale;
+}
+
+// Each block of the int8 KV cache holds the int8 keys
+// [num_heads, head_size/x, block_size, x] (values
+// [num_heads, head_size, block_size]) of its tokens, followed by their float
+// scales [num_heads, block_size]. A token and head has its own scale, so
+// writing a token never requantizes the others of the block.
+template <typename scalar_t>
+void reshape_and_cache_int8_cpu_impl(
+    const scalar_t* __restrict__ key, const scalar_t* __restrict__ value,
+    int8_t* __restrict__ key_cache, int8_t* __restrict__ value_cache,
+    const int64_t* __restrict__ slot_mapping, const int num_tokens,
+    const int key_stride, const int value_stride, const int num_heads,
+    const int head_size, const int block_size, const int x,
+    const int64_t kv_block_stride) {
+  const int block_elem_num = num_heads * head_size * block_size;
+
+#pragma omp parallel for collapse(2)
+  for (int token_idx = 0; token_idx < num_tokens; ++token_idx) {
+    for (int head_idx = 0; head_idx < num_heads; ++head_idx) {
+      const int64_t slot_idx = slot_mapping[token_idx];
+      if (slot_idx >= 0) {
+        const scalar_t* src_key_head_ptr =
+            key + token_idx * key_stride + head_idx * head_size;
+        const scalar_t* src_value_head_ptr =
+            value + token_idx * value_stride + head_idx * head_size;
+        const int64_t block_index = slot_idx / block_size;
+        const int64_t block_offset = slot_idx % block_size;
+        int8_t* target_key_block_ptr =
+            key_cache + kv_block_stride * block_index;
+        int8_t* target_value_block_ptr =
+            value_cache + kv_block_stride * block_index;
+        int8_t* target_key_head_ptr =
+            target_key_block_ptr + head_idx * block_size * head_size;
+        int8_t* target_value_head_ptr =
+            target_value_block_ptr + head_idx * block_size * head_size;
+        float* target_key_scale_ptr =
+            reinterpret_cast<float*>(target_key_block_ptr + block_elem_num) +
+            head_idx * block_size + block_offset;
+        float* target_value_scale_ptr =
+            reinterpret_cast<float*>(target_value_block_ptr + block_elem_num) +
+            head_idx * block_size + block_offset;
+
+        int8_t quantized[MAX_HEAD_SIZE];
+        *target_key_scale_ptr =
+            quantize_head_int8(src_key_head_ptr, head_size, quantized);
+        for (int src_key_idx = 0; src_key_idx < head_size; src_key_idx += x) {
+          const int64_t target_offset =
+              src_key_idx * block_size + block_offset * x;
+          for (int i = 0; i < x; ++i) {
+            target_key_head_ptr[target_offset + i] = quantized[src_key_idx + i];
+          }
+        }
+
+        *target_value_scale_ptr =
+            quantize_head_int8(src_value_head_ptr, head_size, quantized);
+        for (int src_value_idx = 0; src_value_idx < head_size;
+             ++src_value_idx) {
+          const int64_t target_offset =
+              src_value_idx * block_size + block_offset;
+          target_value_head_ptr[target_offset] = quantized[src_value_idx];
+        }
+      }
+    }
+  }
+}
 };  // namespace
 
 // Note: the key_caches and value_caches vectors are constant but
@@ -95,7 +189,7 @@ void copy_blocks(std::vector<torch::Tensor> const& key_caches,
   }
 
   const int element_num_per_block = key_caches[0][0].numel();
-  VLLM_DISPATCH_FLOATING_TYPES(
+  VLLM_DISPATCH_KV_CACHE_TYPES(
       key_caches[0].scalar_type(), "copy_blocks_cpu_impl", [&] {
         CPU_KERNEL_GUARD_IN(copy_blocks_cpu_impl)
         copy_blocks_cpu_impl<scalar_t>(key_caches, value_caches, block_mapping,
@@ -119,6 +213,27 @@ void reshape_and_cache(torch::Tensor& key, torch::Tensor& value,
   int key_stride = key.stride(0);
   int value_stride = value.stride(0);
 
+  if (kv_cache_dtype == "int8") {
+    TORCH_CHECK(key_cache.scalar_type() == at::ScalarType::Char);
+    TORCH_CHECK(key_cache.stride(0) == value_cache.stride(0));
+    TORCH_CHECK(head_size <= MAX_HEAD_SIZE,
+                "Unsupported head size: ", head_size);
+    VLLM_DISPATCH_FLOATING_TYPES(
+        key.scalar_type(), "reshape_and_cache_int8_cpu_impl", [&] {
+          CPU_KERNEL_GUARD_IN(reshape_and_cache_int8_cpu_impl)
+          reshape_and_cache_int8_cpu_impl<scalar_t>(
+              key.data_ptr<scalar_t>(), value.data_ptr<scalar_t>(),
+              key_cache.data_ptr<int8_t>(), value_cache.data_ptr<int8_t>(),
+              slot_mapping.data_ptr<int64_t>(), num_tokens, key_stride,
+              value_stride, num_heads, head_size, block_size, x,
+              key_cache.stride(0));
+          CPU_KERNEL_GUARD_OUT(reshape_and_cache_int8_cpu_impl)
+        });
+    return;
+  }
+  TORCH_CHECK(kv_cache_dtype == "auto",
+              "Unsupported KV cache dtype on CPU: ", kv_cache_dtype);
+
   VLLM_DISPATCH_FLOATING_TYPES(
       key.scalar_type(), "reshape_and_cache_cpu_impl", [&] {
         CPU_KERNEL_GUARD_IN(reshape_and_cache_cpu_impl)
@@ -117,6 +117,29 @@ struct BF16Vec32 : public Vec<BF16Vec32> {
   void save(void *ptr) const { *reinterpret_cast<ss16x8x4_t *>(ptr) = reg; }
 };
 
+struct INT8Vec16 : public Vec<INT8Vec16> {
+  constexpr static int VEC_ELEM_NUM = 16;
+
+  __vector signed char reg;
+
+  explicit INT8Vec16(const void *ptr)
+      : reg((__vector signed char)vec_xl(0, (signed char *)ptr)) {}
+
+  explicit INT8Vec16(__vector signed char data) : reg(data) {}
+
+  // The low and high 4 bits of each byte, as values in [0, 15].
+  INT8Vec16 low_nibbles() const {
+    return INT8Vec16(vec_and(reg, vec_splats((signed char)0x0F)));
+  }
+
+  INT8Vec16 high_nibbles() const {
+    return INT8Vec16(vec_and(vec_sr(reg, vec_splats((unsigned char)4)),
+                             vec_splats((signed char)0x0F)));
+  }
+
+  void save(void *ptr) const { vec_xst(reg, 0, (signed char *)ptr); }
+};
+
 struct FP32Vec4 : public Vec<FP32Vec4> {
   constexpr static int VEC_ELEM_NUM = 4;
   union AliasReg {
@@ -314,6 +337,15 @@ struct FP32Vec16 : public Vec<FP32Vec16> {
 
   explicit FP32Vec16(const BF16Vec8 &v) : FP32Vec16(FP32Vec8(v)) {}
 
+  explicit FP32Vec16(const INT8Vec16 &v) {
+    __vector signed short low = vec_unpackh(v.reg);
+    __vector signed short high = vec_unpackl(v.reg);
+    reg.val[0] = vec_ctf(vec_unpackh(low), 0);
+    reg.val[1] = vec_ctf(vec_unpackl(low), 0);
+    reg.val[2] = vec_ctf(vec_unpackh(high), 0);
+    reg.val[3] = vec_ctf(vec_unpackl(high), 0);
+  }
+
   FP32Vec16 operator*(const FP32Vec16 &b) const {
     return FP32Vec16(f32x4x4_t({
         vec_mul(reg.val[0], b.reg.val[0]),
@@ -157,6 +157,29 @@ struct BF16Vec32 : public Vec<BF16Vec32> {
 };
 #endif
 
+struct INT8Vec16 : public Vec<INT8Vec16> {
+  constexpr static int VEC_ELEM_NUM = 16;
+
+  __m128i reg;
+
+  explicit INT8Vec16(const void *ptr)
+      : reg((__m128i)_mm_loadu_si128((__m128i *)ptr)) {}
+
+  explicit INT8Vec16(__m128i data) : reg(data) {}
+
+  // The low and high 4 bits of each byte, as values in [0, 15].
+  INT8Vec16 low_nibbles() const {
+    return INT8Vec16(_mm_and_si128(reg, _mm_set1_epi8(0x0F)));
+  }
+
+  INT8Vec16 high_nibbles() const {
+    return INT8Vec16(
+        _mm_and_si128(_mm_srli_epi16(reg, 4), _mm_set1_epi8(0x0F)));
+  }
+
+  void save(void *ptr) const { *reinterpret_cast<__m128i *>(ptr) = reg; }
+};
+
 struct FP32Vec4 : public Vec<FP32Vec4> {
   constexpr static int VEC_ELEM_NUM = 4;
   union AliasReg {
@@ -297,6 +320,9 @@ struct FP32Vec16 : public Vec<FP32Vec16> {
 
   explicit FP32Vec16(const BF16Vec8 &v) : FP32Vec16(FP32Vec8(v)) {}
 
+  explicit FP32Vec16(const INT8Vec16 &v)
+      : reg(_mm512_cvtepi32_ps(_mm512_cvtepi8_epi32(v.reg))) {}
+
   FP32Vec16 operator*(const FP32Vec16 &b) const {
     return FP32Vec16(_mm512_mul_ps(reg, b.reg));
   }
@@ -377,6 +403,11 @@ struct FP32Vec16 : public Vec<FP32Vec16> {
 
   explicit FP32Vec16(const BF16Vec8 &v) : FP32Vec16(FP32Vec8(v)) {}
 
+  explicit FP32Vec16(const INT8Vec16 &v)
+      : reg_low(_mm256_cvtepi32_ps(_mm256_cvtepi8_epi32(v.reg))),
+        reg_high(_mm256_cvtepi32_ps(
+            _mm256_cvtepi8_epi32(_mm_bsrli_si128(v.reg, 8)))) {}
+
   FP32Vec16 operator*(const FP32Vec16 &b) const {
     return FP32Vec16(_mm256_mul_ps(reg_low, b.reg_low),
                      _mm256_mul_ps(reg_high, b.reg_high));
@@ -82,6 +82,14 @@ TORCH_LIBRARY_EXPAND(TORCH_EXTENSION_NAME, ops) {
       "                 Tensor! key, int head_size,"
       "                 Tensor cos_sin_cache, bool is_neox) -> ()");
   ops.impl("rotary_embedding", torch::kCPU, &rotary_embedding);
+
+  // Quantization ops
+  // Weight-only int4/int8 quantized GEMM on the weights unpacked by the
+  // cpu_wna16 quantization method.
+  ops.def(
+      "wna16_gemm(Tensor! out, Tensor input, Tensor qweight, Tensor scales,"
+      "           Tensor zeros, int num_bits, int group_size) -> ()");
+  ops.impl("wna16_gemm", torch::kCPU, &wna16_gemm);
 }
 
 TORCH_LIBRARY_EXPAND(CONCAT(TORCH_EXTENSION_NAME, _cache_ops), cache_ops) {
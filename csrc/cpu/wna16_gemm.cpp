@@ -0,0 +1,96 @@
+#include "cpu_types.hpp"
+
+namespace {
+// The number of weights of a row processed per step: two 16-byte loads of
+// int8 weights, or one of int4 weights.
+constexpr int WEIGHTS_PER_STEP = 32;
+
+// out[i, j] = sum_k x[i, k] * (q[j, k] - zeros[j, g]) * scales[j, g], for
+// the group g of k. A row of int8 weights holds their values, a row of int4
+// weights packs the weights k and k + 16 of each 32 in the low and high 4
+// bits of a byte.
+template <typename scalar_t, int BITS>
+void wna16_gemm_impl(scalar_t* __restrict__ out, const float* __restrict__ x,
+                     const float* __restrict__ x_group_sums,
+                     const uint8_t* __restrict__ qweight,
+                     const float* __restrict__ scales,
+                     const float* __restrict__ zeros, const int m,
+                     const int n, const int k, const int group_size) {
+  const int num_groups = k / group_size;
+  const int64_t row_bytes = (int64_t)k * BITS / 8;
+
+#pragma omp parallel for
+  for (int j = 0; j < n; ++j) {
+    const uint8_t* q_row = qweight + j * row_bytes;
+    const float* scales_row = scales + (int64_t)j * num_groups;
+    const float* zeros_row = zeros + (int64_t)j * num_groups;
+    for (int i = 0; i < m; ++i) {
+      const float* x_row = x + (int64_t)i * k;
+      const float* x_sums_row = x_group_sums + (int64_t)i * num_groups;
+      vec_op::FP32Vec16 acc(0.0);
+      // The zero points are subtracted once per group, from the sums of x.
+      float zeros_acc = 0.0;
+      for (int g = 0; g < num_groups; ++g) {
+        vec_op::FP32Vec16 group_acc(0.0);
+        const int group_end = (g + 1) * group_size;
+        for (int kk = g * group_size; kk < group_end;
+             kk += WEIGHTS_PER_STEP) {
+          vec_op::FP32Vec16 x_low(x_row + kk);
+          vec_op::FP32Vec16 x_high(x_row + kk + 16);
+          if constexpr (BITS == 8) {
+            vec_op::FP32Vec16 w_low(vec_op::INT8Vec16(q_row + kk));
+            vec_op::FP32Vec16 w_high(vec_op::INT8Vec16(q_row + kk + 16));
+            group_acc = group_acc + x_low * w_low + x_high * w_high;
+          } else {
+            vec_op::INT8Vec16 packed(q_row + kk / 2);
+            vec_op::FP32Vec16 w_low(packed.low_nibbles());
+            vec_op::FP32Vec16 w_high(packed.high_nibbles());
+            group_acc = group_acc + x_low * w_low + x_high * w_high;
+          }
+        }
+        acc = acc + group_acc * vec_op::FP32Vec16(scales_row[g]);
+        zeros_acc += scales_row[g] * zeros_row[g] * x_sums_row[g];
+      }
+      vec_op::storeFP32(acc.reduce_sum() - zeros_acc,
+                        out + (int64_t)i * n + j);
+    }
+  }
+}
+}  // namespace
+
+void wna16_gemm(torch::Tensor& out, torch::Tensor& input,
+                torch::Tensor& qweight, torch::Tensor& scales,
+                torch::Tensor& zeros, int64_t num_bits, int64_t group_size) {
+  TORCH_CHECK(num_bits == 4 || num_bits == 8,
+              "Unsupported number of weight bits: ", num_bits);
+  const int m = input.size(0);
+  const int k = input.size(1);
+  const int n = qweight.size(0);
+  TORCH_CHECK(group_size % WEIGHTS_PER_STEP == 0 && k % group_size == 0,
+              "The group size must be a multiple of ", WEIGHTS_PER_STEP,
+              " that divides the input size.");
+  TORCH_CHECK(qweight.size(1) * 8 == k * num_bits);
+
+  torch::Tensor x = input.to(torch::kFloat).contiguous();
+  torch::Tensor x_group_sums = x.view({m, k / group_size, group_size}).sum(-1);
+  const uint8_t* qweight_ptr =
+      reinterpret_cast<const uint8_t*>(qweight.data_ptr());
+
+  VLLM_DISPATCH_FLOATING_TYPES(out.scalar_type(), "wna16_gemm_impl", [&] {
+    CPU_KERNEL_GUARD_IN(wna16_gemm_impl)
+    if (num_bits == 8) {
+      wna16_gemm_impl<scalar_t, 8>(
+          out.data_ptr<scalar_t>(), x.data_ptr<float>(),
+          x_group_sums.data_ptr<float>(), qweight_ptr,
+          scales.data_ptr<float>(), zeros.data_ptr<float>(), m, n, k,
+          group_size);
+    } else {
+      wna16_gemm_impl<scalar_t, 4>(
+          out.data_ptr<scalar_t>(), x.data_ptr<float>(),
+          x_group_sums.data_ptr<float>(), qweight_ptr,
+          scales.data_ptr<float>(), zeros.data_ptr<float>(), m, n, k,
+          group_size);
+    }
+    CPU_KERNEL_GUARD_OUT(wna16_gemm_impl)
+  });
+}
@@ -52,6 +52,10 @@ void gelu_fast(torch::Tensor& out, torch::Tensor& input);
 
 void gelu_quick(torch::Tensor& out, torch::Tensor& input);
 
+void wna16_gemm(torch::Tensor& out, torch::Tensor& input,
+                torch::Tensor& qweight, torch::Tensor& scales,
+                torch::Tensor& zeros, int64_t num_bits, int64_t group_size);
+
 #ifndef USE_ROCM
 torch::Tensor aqlm_gemm(const torch::Tensor& input, const torch::Tensor& codes,
                         const torch::Tensor& codebooks,
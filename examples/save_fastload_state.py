@@ -0,0 +1,79 @@
+"""
+Saves the final, post-processed state of each worker's model to a fast-load
+checkpoint. Loading it skips parsing the original checkpoint and all weight
+processing, such as online quantization or Marlin repacking, which makes
+the engine start much faster for quantized models.
+
+The model runs a short generation before it is saved, so the state includes
+the work that some quantization methods only do on the first forward pass.
+A fast-load checkpoint only works with the same vLLM version, model
+configuration, dtype, quantization and parallelism it was saved with.
+
+Example usage:
+
+python save_fastload_state.py \
+    --model /path/to/load \
+    --quantization gptq_marlin \
+    --tensor-parallel-size 2 \
+    --output /path/to/save
+
+Then, the model can be loaded with
+
+llm = LLM(
+    model="/path/to/save",
+    load_format="fastload",
+    quantization="gptq_marlin",
+    tensor_parallel_size=2,
+)
+"""
+import dataclasses
+import os
+import shutil
+from pathlib import Path
+
+from vllm import LLM, EngineArgs, SamplingParams
+from vllm.utils import FlexibleArgumentParser
+
+parser = FlexibleArgumentParser()
+EngineArgs.add_cli_args(parser)
+parser.add_argument("--output",
+                    "-o",
+                    required=True,
+                    type=str,
+                    help="path to output checkpoint")
+parser.add_argument("--file-pattern",
+                    type=str,
+                    help="string pattern of saved filenames, with "
+                    "{pp_rank} and {tp_rank} placeholders")
+
+
+def main(args):
+    engine_args = EngineArgs.from_cli_args(args)
+    if engine_args.enable_lora:
+        raise ValueError("Saving with enable_lora=True is not supported!")
+    model_path = engine_args.model
+    if not Path(model_path).is_dir():
+        raise ValueError("model path must be a local directory")
+    # Create LLM instance from arguments
+    llm = LLM(**dataclasses.asdict(engine_args))
+    # Run the model once, so lazily processed weights reach their final form
+    llm.generate("Hello", SamplingParams(max_tokens=2))
+    # Prepare output directory
+    Path(args.output).mkdir(exist_ok=True)
+    # Dump worker states to output directory
+    model_executor = llm.llm_engine.model_executor
+    model_executor.save_fastload_state(path=args.output,
+                                       pattern=args.file_pattern)
+    # Copy metadata files to output directory
+    for file in os.listdir(model_path):
+        if os.path.splitext(file)[1] not in (".bin", ".pt", ".safetensors"):
+            if os.path.isdir(os.path.join(model_path, file)):
+                shutil.copytree(os.path.join(model_path, file),
+                                os.path.join(args.output, file))
+            else:
+                shutil.copy(os.path.join(model_path, file), args.output)
+
+
+if __name__ == "__main__":
+    args = parser.parse_args()
+    main(args)
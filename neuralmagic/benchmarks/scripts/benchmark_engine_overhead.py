@@ -0,0 +1,261 @@
+"""
+Benchmark the CPU overhead of each phase of an LLMEngine step.
+
+The model weights are random (load_format="dummy") and, by default, the
+engine runs on the CPU device, so the numbers isolate the Python work done
+around the forward pass: scheduling, input preparation, sampling metadata,
+output processing and detokenization. Each (batch size, input length)
+combination is reported as a separate BenchmarkResult JSON.
+"""
+
+import argparse
+import functools
+import time
+from collections import defaultdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List
+
+from vllm import EngineArgs, LLMEngine, SamplingParams
+from vllm.model_executor.sampling_metadata import SamplingMetadata
+
+# yapf: disable
+from .logging.benchmark_result import ENGINE_OVERHEAD_PHASES, BenchmarkResult
+from .logging.benchmark_result import (
+    BenchmarkEngineOverheadResultMetricTemplates as ResultMetricTemplates)
+
+# yapf: enable
+
+
+class PhaseTimer:
+    """Accumulates the wall time spent in each instrumented phase during the
+    current engine step."""
+
+    def __init__(self):
+        self.step_times: Dict[str, float] = defaultdict(float)
+        self.is_prefill = False
+
+    def wrap(self, phase: str, fn: Callable) -> Callable:
+
+        @functools.wraps(fn)
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.step_times[phase] += time.perf_counter() - start
+
+        return timed
+
+    def wrap_schedule(self, fn: Callable) -> Callable:
+        timed = self.wrap("schedule", fn)
+
+        @functools.wraps(fn)
+        def schedule(*args, **kwargs):
+            seq_group_metadata_list, scheduler_outputs = timed(
+                *args, **kwargs)
+            self.is_prefill = scheduler_outputs.num_prefill_groups > 0
+            return seq_group_metadata_list, scheduler_outputs
+
+        return schedule
+
+    def reset(self) -> None:
+        self.step_times.clear()
+        self.is_prefill = False
+
+
+def instrument_engine(engine: LLMEngine, timer: PhaseTimer) -> Callable:
+    """Wrap the engine's phases with `timer`. Returns a function that removes
+    the process-wide instrumentation."""
+    scheduler = engine.scheduler[0]
+    scheduler.schedule = timer.wrap_schedule(scheduler.schedule)
+    executor = engine.model_executor
+    executor.execute_model = timer.wrap("execute_model",
+                                        executor.execute_model)
+    engine._process_model_outputs = timer.wrap(
+        "process_outputs", engine._process_model_outputs)
+    detokenizer = engine.detokenizer
+    detokenizer.decode_sequence_inplace = timer.wrap(
+        "detokenize", detokenizer.decode_sequence_inplace)
+
+    model_runner = executor.driver_worker.model_runner
+    model_runner.prepare_model_input = timer.wrap(
+        "prepare_input", model_runner.prepare_model_input)
+    model = model_runner.model
+    model.sample = timer.wrap("sampler", model.sample)
+
+    # SamplingMetadata.prepare is a staticmethod called through the class.
+    prepare = SamplingMetadata.prepare
+    SamplingMetadata.prepare = staticmethod(
+        timer.wrap("sampling_metadata", prepare))
+
+    def uninstrument() -> None:
+        SamplingMetadata.prepare = staticmethod(prepare)
+
+    return uninstrument
+
+
+def run_config(args: argparse.Namespace, batch_size: int,
+               input_len: int) -> Dict[str, Dict[str, float]]:
+    """Run `batch_size` requests of `input_len` prompt tokens to completion in
+    one batch. Returns the mean wall time per step in ms, for each phase of
+    prefill and decode steps."""
+    engine_args = EngineArgs(model=args.model,
+                             tokenizer=args.tokenizer,
+                             device=args.device,
+                             load_format="dummy",
+                             dtype=args.dtype,
+                             enforce_eager=True,
+                             max_num_seqs=batch_size,
+                             max_num_batched_tokens=max(
+                                 batch_size * input_len,
+                                 input_len + args.output_len),
+                             max_model_len=input_len + args.output_len,
+                             swap_space=0,
+                             seed=args.seed)
+    engine = LLMEngine.from_engine_args(engine_args)
+    timer = PhaseTimer()
+    uninstrument = instrument_engine(engine, timer)
+
+    vocab_size = engine.get_model_config().get_vocab_size()
+    sampling_params = SamplingParams(temperature=args.temperature,
+                                     max_tokens=args.output_len,
+                                     ignore_eos=True)
+    step_times: Dict[str, List[Dict[str, float]]] = {
+        "prefill": [],
+        "decode": []
+    }
+    try:
+        for iteration in range(args.num_warmup_iters + args.num_iters):
+            for i in range(batch_size):
+                prompt_token_ids = [(i * input_len + j) % vocab_size
+                                    for j in range(input_len)]
+                engine.add_request(f"{iteration}-{i}",
+                                   {"prompt_token_ids": prompt_token_ids},
+                                   sampling_params)
+            while engine.has_unfinished_requests():
+                timer.reset()
+                timer.wrap("step", engine.step)()
+                if iteration < args.num_warmup_iters:
+                    continue
+                stage = "prefill" if timer.is_prefill else "decode"
+                step_times[stage].append(dict(timer.step_times))
+    finally:
+        uninstrument()
+
+    results: Dict[str, Dict[str, float]] = {}
+    for stage, steps in step_times.items():
+        if not steps:
+            continue
+        results[stage] = {
+            phase:
+            sum(step.get(phase, 0.0) for step in steps) / len(steps) * 1000
+            for phase in ENGINE_OVERHEAD_PHASES
+        }
+    del engine
+    return results
+
+
+def print_results(batch_size: int, input_len: int,
+                  results: Dict[str, Dict[str, float]]) -> None:
+    for stage, phase_ms in results.items():
+        phases = ", ".join(f"{phase} {ms:.3f}"
+                           for phase, ms in phase_ms.items())
+        print(f"batch {batch_size}, input len {input_len}, {stage} "
+              f"(ms/step): {phases}")
+
+
+def main(args: argparse.Namespace):
+    print(args)
+    for batch_size in args.batch_sizes:
+        for input_len in args.input_lens:
+            results = run_config(args, batch_size, input_len)
+            print_results(batch_size, input_len, results)
+
+            if args.save_directory is None:
+                continue
+
+            current_dt = datetime.now()
+            result = BenchmarkResult(
+                description=args.description,
+                date=current_dt,
+                script_name=Path(__file__).name,
+                script_args=vars(args),
+                tensor_parallel_size=1,
+                model=args.model,
+                tokenizer=args.tokenizer,
+                dataset=None)
+            if args.device == "cpu":
+                result[BenchmarkResult.GPU_DESCRIPTION_KEY_] = "cpu"
+            metadata: Dict[str, Any] = {
+                "batch_size": batch_size,
+                "input_len": input_len,
+                "output_len": args.output_len,
+                "device": args.device,
+            }
+            result[BenchmarkResult.METADATA_KEY_] = metadata
+            for stage, phase_ms in results.items():
+                for phase, ms in phase_ms.items():
+                    result.add_metric(
+                        getattr(ResultMetricTemplates, f"{stage}_{phase}_ms"),
+                        ms)
+
+            model_id = args.model.replace('/', '_')
+            current_dt_str = current_dt.strftime("%Y%m%d-%H%M%S")
+            file_name = Path(
+                args.save_directory
+            ) / f"benchmark_engine_overhead-{model_id}-bs{batch_size}-in{input_len}-{current_dt_str}.json"  # noqa: E501
+            result.store(file_name)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the CPU overhead of each engine step phase.")
+    parser.add_argument(
+        "--description",
+        type=str,
+        default="benchmark-engine-overhead",
+        help="Benchmark description. This is primarily useful when "
+        "we log the benchmark results and process them for plotting charts")
+    parser.add_argument("--model", type=str, default="facebook/opt-125m")
+    parser.add_argument("--tokenizer", type=str, default=None)
+    parser.add_argument("--device",
+                        type=str,
+                        default="cpu",
+                        choices=["cpu", "cuda"],
+                        help="Device to run the dummy model on.")
+    parser.add_argument("--dtype",
+                        type=str,
+                        default="auto",
+                        choices=["auto", "half", "bfloat16", "float"])
+    parser.add_argument("--batch-sizes",
+                        type=int,
+                        nargs="+",
+                        default=[1, 8, 32, 128],
+                        help="Number of requests scheduled together.")
+    parser.add_argument("--input-lens",
+                        type=int,
+                        nargs="+",
+                        default=[128, 1024],
+                        help="Prompt length of each request.")
+    parser.add_argument("--output-len",
+                        type=int,
+                        default=32,
+                        help="Number of tokens generated per request.")
+    parser.add_argument("--temperature",
+                        type=float,
+                        default=1.0,
+                        help="Sampling temperature, 0 for greedy sampling.")
+    parser.add_argument("--num-iters", type=int, default=3)
+    parser.add_argument("--num-warmup-iters", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--save-directory",
+                        type=str,
+                        default=None,
+                        help="Output directory to store result files")
+
+    args = parser.parse_args()
+    if args.tokenizer is None:
+        args.tokenizer = args.model
+
+    main(args)
@@ -0,0 +1,149 @@
+"""
+Benchmark the time it takes to import vllm and the OpenAI API server.
+
+Every import runs in a fresh interpreter, so nothing is cached in
+sys.modules. The script also checks that the modules which are meant to
+be imported lazily are not imported. These are the guided decoding
+backends, the quantization methods and the model implementations. If any
+of them is imported, the script fails, so that an accidental eager import
+shows up as a regression.
+"""
+
+import argparse
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+# yapf: disable
+from .logging.benchmark_result import IMPORT_TIME_MODULES, BenchmarkResult
+from .logging.benchmark_result import (
+    BenchmarkImportTimeResultMetricTemplates as ResultMetricTemplates)
+
+# yapf: enable
+
+# Modules that importing vllm or the API server must not import, including
+# their submodules.
+LAZY_MODULES = [
+    "outlines",
+    "lmformatenforcer",
+    "vllm.model_executor.guided_decoding.outlines_decoding",
+    "vllm.model_executor.guided_decoding.lm_format_enforcer_decoding",
+]
+
+# Packages whose submodules must not be imported, except for the allowed
+# ones.
+LAZY_PACKAGES = [
+    "vllm.model_executor.layers.quantization",
+    "vllm.model_executor.models",
+]
+ALLOWED_MODULES = {"vllm.model_executor.layers.quantization.base_config"}
+
+_IMPORT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - start
+print(json.dumps({{"elapsed": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def time_import(module: str) -> Tuple[float, List[str]]:
+    """Import `module` in a fresh interpreter. Returns the import time and
+    the modules that were loaded."""
+    output = subprocess.run(
+        [sys.executable, "-c",
+         _IMPORT_SCRIPT.format(module=module)],
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True).stdout
+    # Only the last line is ours, imports may print.
+    result = json.loads(output.strip().splitlines()[-1])
+    return result["elapsed"], result["modules"]
+
+
+def find_eager_imports(modules: List[str]) -> List[str]:
+    return [
+        module for module in modules
+        if any(module == lazy or module.startswith(f"{lazy}.")
+               for lazy in LAZY_MODULES) or (
+                   module not in ALLOWED_MODULES and any(
+                       module.startswith(f"{package}.")
+                       for package in LAZY_PACKAGES))
+    ]
+
+
+def main(args: argparse.Namespace):
+    print(args)
+    results: Dict[str, float] = {}
+    eager_imports: Dict[str, List[str]] = {}
+    for module in IMPORT_TIME_MODULES:
+        times = []
+        for _ in range(args.num_iters):
+            elapsed, modules = time_import(module)
+            times.append(elapsed)
+        results[module] = min(times) if args.use_min else sum(times) / len(
+            times)
+        eager_imports[module] = find_eager_imports(modules)
+        print(f"import {module}: {results[module]:.3f}s "
+              f"(min {min(times):.3f}s, max {max(times):.3f}s)")
+
+    if args.save_directory is not None:
+        current_dt = datetime.now()
+        result = BenchmarkResult(description=args.description,
+                                 date=current_dt,
+                                 script_name=Path(__file__).name,
+                                 script_args=vars(args),
+                                 tensor_parallel_size=1,
+                                 model="none",
+                                 tokenizer=None,
+                                 dataset=None)
+        result[BenchmarkResult.METADATA_KEY_] = {
+            "python_version": sys.version.split()[0],
+            "eager_imports": eager_imports,
+        }
+        for module, elapsed in results.items():
+            result.add_metric(
+                getattr(ResultMetricTemplates,
+                        f"{IMPORT_TIME_MODULES[module]}_s"), elapsed)
+        current_dt_str = current_dt.strftime("%Y%m%d-%H%M%S")
+        file_name = Path(args.save_directory
+                         ) / f"benchmark_import_time-{current_dt_str}.json"
+        result.store(file_name)
+
+    failed = False
+    for module, imported in eager_imports.items():
+        if imported:
+            failed = True
+            print(f"import {module} eagerly imported: {', '.join(imported)}")
+    if failed and not args.allow_eager_imports:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Benchmark the import time of vllm and the API server.")
+    parser.add_argument(
+        "--description",
+        type=str,
+        default="benchmark-import-time",
+        help="Benchmark description. This is primarily useful when "
+        "we log the benchmark results and process them for plotting charts")
+    parser.add_argument("--num-iters", type=int, default=5)
+    parser.add_argument("--use-min",
+                        action="store_true",
+                        help="Report the fastest import instead of the mean, "
+                        "which is less sensitive to a noisy host.")
+    parser.add_argument("--allow-eager-imports",
+                        action="store_true",
+                        help="Do not fail when a lazily imported module is "
+                        "imported.")
+    parser.add_argument("--save-directory",
+                        type=str,
+                        default=None,
+                        help="Output directory to store result files")
+
+    args = parser.parse_args()
+    main(args)
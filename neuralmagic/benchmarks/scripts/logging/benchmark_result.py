@@ -90,6 +90,38 @@ BenchmarkThroughputResultMetricTemplates = SimpleNamespace(
     token_throughput=MetricTemplate("token_throughput", "tokens/s", None,
                                     BenchmarkMetricType.BiggerIsBetter))
 
+# Engine phases timed by benchmark_engine_overhead.py, in step order.
+# Nested phases (e.g. sampling_metadata within prepare_input) are included in
+# their parent's time.
+ENGINE_OVERHEAD_PHASES = [
+    "schedule", "execute_model", "prepare_input", "sampling_metadata",
+    "sampler", "process_outputs", "detokenize", "step"
+]
+
+BenchmarkEngineOverheadResultMetricTemplates = SimpleNamespace(
+    **{
+        f"{stage}_{phase}_ms":
+        MetricTemplate(
+            f"{stage}_{phase}_ms", "ms/step", None,
+            BenchmarkMetricType.SmallerIsBetter
+            if stage == "decode" else BenchmarkMetricType.Observation)
+        for stage in ["prefill", "decode"] for phase in ENGINE_OVERHEAD_PHASES
+    })
+
+# Modules timed by benchmark_import_time.py -> metric name prefix.
+IMPORT_TIME_MODULES = {
+    "vllm": "import_vllm",
+    "vllm.entrypoints.openai.api_server": "import_api_server",
+}
+
+BenchmarkImportTimeResultMetricTemplates = SimpleNamespace(
+    **{
+        f"{name}_s":
+        MetricTemplate(f"{name}_s", "s", None,
+                       BenchmarkMetricType.SmallerIsBetter)
+        for name in IMPORT_TIME_MODULES.values()
+    })
+
 
 class BenchmarkResult:
 
@@ -121,6 +153,9 @@ class BenchmarkResult:
         cuda_device_names_key = "cuda_device_names"
         gpu_names = bench_ctx.get(cuda_device_names_key)
         assert gpu_names is not None
+        if not gpu_names:
+            # CPU only host, e.g. benchmark_engine_overhead.py on CPU.
+            return "cpu"
         gpu_name = gpu_names[0]
 
         # Make sure all gpus are the same before we report.
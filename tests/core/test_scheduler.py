@@ -499,6 +499,131 @@ def test_prefill_schedule_max_lora():
     assert budget.num_batched_tokens == 60
 
 
+def test_prefill_schedule_lora_not_ready():
+    """
+    Test requests whose LoRA is still loading are skipped until it is ready.
+    """
+    lora_config = LoRAConfig(max_lora_rank=8, max_loras=2)
+    scheduler = initialize_scheduler(lora_config=lora_config)
+    ready_loras: Set[int] = set()
+    scheduler.lora_ready_fn = lambda lora_id: lora_id in ready_loras
+    waiting: Deque[SequenceGroup] = deque()
+    _, seq_group = create_dummy_prompt("0",
+                                       prompt_length=60,
+                                       lora_request=LoRARequest(
+                                           lora_name="0",
+                                           lora_int_id=1,
+                                           lora_local_path="abc"))
+    waiting.append(seq_group)
+    _, seq_group = create_dummy_prompt("1", prompt_length=60)
+    waiting.append(seq_group)
+
+    # The LoRA request is skipped, the regular one is scheduled.
+    budget = create_token_budget(token_budget=120)
+    remaining_waiting, output = scheduler._schedule_prefills(
+        waiting, budget, set())
+    assert len(output.seq_groups) == 1
+    assert output.seq_groups[0].seq_group.request_id == "1"
+    assert len(remaining_waiting) == 1
+
+    # Once the LoRA is loaded, the request is scheduled.
+    ready_loras.add(1)
+    budget = create_token_budget(token_budget=120)
+    curr_loras: Set[int] = set()
+    remaining_waiting, output = scheduler._schedule_prefills(
+        remaining_waiting, budget, curr_loras)
+    assert len(output.seq_groups) == 1
+    assert output.seq_groups[0].seq_group.request_id == "0"
+    assert len(remaining_waiting) == 0
+    assert curr_loras == {1}
+
+
+def test_prefill_schedule_lora_affinity():
+    """
+    Test the affinity policy prefers active LoRAs and bounds the wait of
+    requests for other LoRAs.
+    """
+    lora_config = LoRAConfig(max_lora_rank=8,
+                             max_loras=1,
+                             lora_scheduling_policy="affinity",
+                             lora_affinity_max_wait=60.0)
+    scheduler = initialize_scheduler(lora_config=lora_config)
+    for i, lora_int_id in enumerate([2, 1]):
+        _, seq_group = create_dummy_prompt(str(i),
+                                           prompt_length=60,
+                                           lora_request=LoRARequest(
+                                               lora_name=str(lora_int_id),
+                                               lora_int_id=lora_int_id,
+                                               lora_local_path="abc"))
+        scheduler.add_seq_group(seq_group)
+    # LoRA 1 occupies the only GPU slot.
+    scheduler._active_loras[1] = None
+
+    # The request for the active LoRA is scheduled first.
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert [g.seq_group.request_id for g in out.scheduled_seq_groups] == ["1"]
+    assert out.num_lora_slot_swaps == 0
+
+    # Once it has waited for too long, the other request is scheduled in
+    # arrival order, ahead of a newer request for the active LoRA.
+    scheduler.abort_seq_group("1")
+    _, seq_group = create_dummy_prompt("2",
+                                       prompt_length=60,
+                                       lora_request=LoRARequest(
+                                           lora_name="1",
+                                           lora_int_id=1,
+                                           lora_local_path="abc"))
+    scheduler.add_seq_group(seq_group)
+    scheduler.lora_config.lora_affinity_max_wait = 0.0
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert [g.seq_group.request_id for g in out.scheduled_seq_groups] == ["0"]
+    assert out.num_lora_slot_swaps == 1
+    assert list(scheduler._active_loras) == [2]
+
+
+def test_prefill_schedule_lora_affinity_max_wait():
+    """
+    Test a request for another LoRA is admitted once it has waited for too
+    long, while newer requests for the active LoRA keep arriving.
+    """
+    lora_config = LoRAConfig(max_lora_rank=8,
+                             max_loras=1,
+                             lora_scheduling_policy="affinity",
+                             lora_affinity_max_wait=60.0)
+    # Only one prompt fits in a batch.
+    scheduler = initialize_scheduler(max_token_budget=60,
+                                     max_model_len=60,
+                                     lora_config=lora_config)
+    # LoRA 1 occupies the only GPU slot.
+    scheduler._active_loras[1] = None
+
+    def add_request(request_id: str, lora_int_id: int) -> SequenceGroup:
+        _, seq_group = create_dummy_prompt(request_id,
+                                           prompt_length=60,
+                                           lora_request=LoRARequest(
+                                               lora_name=str(lora_int_id),
+                                               lora_int_id=lora_int_id,
+                                               lora_local_path="abc"))
+        scheduler.add_seq_group(seq_group)
+        return seq_group
+
+    cold_seq_group = add_request("0", 2)
+    add_request("1", 1)
+    for i in range(2, 5):
+        add_request(str(i), 1)
+        _, out = schedule_and_update_computed_tokens(scheduler)
+        assert [g.seq_group.request_id
+                for g in out.scheduled_seq_groups] == [str(i - 1)]
+        # The waiting queue stays in arrival order.
+        assert [g.request_id for g in scheduler.waiting] == ["0", str(i)]
+        scheduler.abort_seq_group(str(i - 1))
+
+    cold_seq_group.metrics.arrival_time -= 60.0
+    _, out = schedule_and_update_computed_tokens(scheduler)
+    assert [g.seq_group.request_id for g in out.scheduled_seq_groups] == ["0"]
+    assert [g.request_id for g in scheduler.waiting] == ["4"]
+
+
 def test_prefill_schedule_no_block_manager_capacity():
     """
     Test sequence cannot be scheduled due to block manager has no capacity.
@@ -0,0 +1,174 @@
+"""Test pipeline stage bubble/busy timing across CPU pipeline stages.
+
+Run `pytest tests/distributed/test_pipeline_stage_times.py`.
+"""
+import multiprocessing
+import time
+from typing import List, Optional
+
+import pytest
+import torch
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.distributed import (ensure_model_parallel_initialized,
+                              init_distributed_environment)
+from vllm.sequence import (ExecuteModelRequest, IntermediateTensors,
+                           SamplerOutput)
+from vllm.utils import get_open_port
+from vllm.worker.worker_base import (LocalOrDistributedWorkerBase,
+                                     PipelineStageTimer, WorkerInput)
+
+if should_skip_test_group(group_name="TEST_DISTRIBUTED"):
+    pytest.skip("TEST_DISTRIBUTED=DISABLE, skipping distributed test group",
+                allow_module_level=True)
+
+PP_SIZE = 3
+NUM_STEPS = 4
+STEP_TIME_S = 0.05
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+def test_pipeline_stage_timer():
+    clock = FakeClock()
+    timer = PipelineStageTimer(clock)
+
+    timer.start_step()
+    clock.now = 1.0
+    times = timer.end_step()
+    # No previous step, so no bubble.
+    assert times.bubble_time == 0.0
+    assert times.busy_time == 1.0
+
+    clock.now = 3.0
+    timer.start_step()
+    clock.now = 3.5
+    times = timer.end_step()
+    assert times.bubble_time == 2.0
+    assert times.busy_time == 0.5
+
+    # Idle time after the execution loop stops is not a bubble.
+    timer.reset()
+    clock.now = 10.0
+    timer.start_step()
+    clock.now = 11.0
+    assert timer.end_step().bubble_time == 0.0
+
+
+class DummyModelRunner:
+
+    def prepare_model_input(self, seq_group_metadata_list, virtual_engine,
+                            finished_requests_ids):
+        return None
+
+    def execute_model(self, model_input, kv_caches, intermediate_tensors,
+                      num_steps):
+        time.sleep(STEP_TIME_S)
+        return IntermediateTensors(
+            {"hidden_states": torch.zeros(4, dtype=torch.float32)})
+
+
+class DummyLastStageModelRunner(DummyModelRunner):
+
+    def execute_model(self, model_input, kv_caches, intermediate_tensors,
+                      num_steps):
+        assert intermediate_tensors is not None
+        assert list(intermediate_tensors.tensors) == ["hidden_states"]
+        time.sleep(STEP_TIME_S)
+        return [SamplerOutput(outputs=[])]
+
+
+class DummyPipelineWorker(LocalOrDistributedWorkerBase):
+    """Runs one pipeline stage, without tensor parallel peers."""
+
+    def __init__(self, is_last_stage: bool):
+        self.is_driver_worker = True
+        self.model_runner = (DummyLastStageModelRunner()
+                             if is_last_stage else DummyModelRunner())
+
+    @property
+    def do_metadata_broadcast(self) -> bool:
+        return False
+
+    @property
+    def kv_cache(self) -> Optional[List[List[torch.Tensor]]]:
+        return None
+
+    def prepare_worker_input(
+            self, execute_model_req: ExecuteModelRequest) -> WorkerInput:
+        return WorkerInput(num_seq_groups=1)
+
+    def execute_worker(self, worker_input: WorkerInput) -> None:
+        pass
+
+    def init_device(self) -> None:
+        pass
+
+    def determine_num_available_blocks(self):
+        raise NotImplementedError
+
+    def initialize_cache(self, num_gpu_blocks: int,
+                         num_cpu_blocks: int) -> None:
+        raise NotImplementedError
+
+    def get_cache_block_size_bytes(self) -> int:
+        raise NotImplementedError
+
+    def add_lora(self, lora_request) -> bool:
+        raise NotImplementedError
+
+    def remove_lora(self, lora_id: int) -> bool:
+        raise NotImplementedError
+
+    def pin_lora(self, lora_id: int) -> bool:
+        raise NotImplementedError
+
+    def list_loras(self):
+        raise NotImplementedError
+
+
+def pipeline_stage_fn(rank: int, port: int):
+    init_distributed_environment(
+        world_size=PP_SIZE,
+        rank=rank,
+        distributed_init_method=f"tcp://localhost:{port}",
+        local_rank=rank,
+        backend="gloo")
+    ensure_model_parallel_initialized(1, PP_SIZE)
+
+    is_last_stage = rank == PP_SIZE - 1
+    worker = DummyPipelineWorker(is_last_stage)
+    for _ in range(NUM_STEPS):
+        output = worker.execute_model(
+            ExecuteModelRequest(seq_group_metadata_list=[]))
+        if not is_last_stage:
+            assert output == [None]
+            continue
+
+        stage_times = output[0].pipeline_stage_times
+        assert stage_times is not None
+        assert len(stage_times) == PP_SIZE
+        for times in stage_times:
+            assert times.busy_time >= STEP_TIME_S
+            assert times.bubble_time >= 0.0
+
+
+def test_pipeline_stage_times_cpu():
+    port = get_open_port()
+    processes = [
+        multiprocessing.Process(target=pipeline_stage_fn, args=(rank, port))
+        for rank in range(PP_SIZE)
+    ]
+    for p in processes:
+        p.start()
+    for p in processes:
+        p.join()
+    for p in processes:
+        assert p.exitcode == 0
@@ -0,0 +1,50 @@
+"""Test the LoRA cache hit and miss accounting of LoRA prefetching.
+
+Run `pytest tests/engine/test_lora_prefetch_stats.py`.
+"""
+from unittest.mock import MagicMock
+
+import pytest
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.engine.llm_engine import LLMEngine
+from vllm.executor.cpu_executor import CPUExecutor
+from vllm.lora.request import LoRARequest
+
+if should_skip_test_group(group_name="TEST_ENGINE"):
+    pytest.skip("TEST_ENGINE=DISABLE, skipping engine test group",
+                allow_module_level=True)
+
+
+def create_engine(model_executor) -> LLMEngine:
+    # Only the state used by LoRA prefetching is set up.
+    engine = LLMEngine.__new__(LLMEngine)
+    engine.model_executor = model_executor
+    engine.log_stats = True
+    engine._lora_load_start_times = {}
+    engine._num_lora_cache_hits = 0
+    engine._num_lora_cache_misses = 0
+    return engine
+
+
+def test_non_prefetching_executor():
+    # The CPU executor does not prefetch, and it is not started here since
+    # prefetch_lora does not use the workers.
+    engine = create_engine(CPUExecutor.__new__(CPUExecutor))
+    for lora_int_id in [1, 1, 2]:
+        engine._prefetch_lora(
+            LoRARequest(str(lora_int_id), lora_int_id, "/fake/path"))
+    assert engine._num_lora_cache_hits == 0
+    assert engine._num_lora_cache_misses == 0
+    assert engine._lora_load_start_times == {}
+
+
+def test_prefetching_executor():
+    model_executor = MagicMock()
+    engine = create_engine(model_executor)
+    for loaded in [True, False, False]:
+        model_executor.prefetch_lora.return_value = loaded
+        engine._prefetch_lora(LoRARequest("1", 1, "/fake/path"))
+    assert engine._num_lora_cache_hits == 2
+    assert engine._num_lora_cache_misses == 1
+    assert list(engine._lora_load_start_times) == [1]
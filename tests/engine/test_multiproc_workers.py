@@ -7,8 +7,18 @@ from typing import Any, List, Tuple
 import pytest
 
 from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.engine.arg_utils import EngineArgs
+from vllm.executor import multiproc_worker_utils
+from vllm.executor.multiproc_gpu_executor import MultiprocessingGPUExecutor
 from vllm.executor.multiproc_worker_utils import (ProcessWorkerWrapper,
                                                   ResultHandler, WorkerMonitor)
+from vllm.executor.serialization import (decode_model_outputs,
+                                         encode_model_outputs)
+from vllm.sequence import (CompletionSequenceGroupOutput,
+                           EmbeddingSequenceGroupOutput, Logprob,
+                           PoolerOutput, SamplerOutput, SequenceOutput)
+from vllm.utils import cuda_device_count_stateless
+from vllm.worker.worker import Worker
 
 if should_skip_test_group(group_name="TEST_ENGINE"):
     pytest.skip("TEST_ENGINE=DISABLE, skipping engine test group",
@@ -30,11 +40,36 @@ class DummyWorker:
 
         return self.rank, input
 
-
-def _start_workers() -> Tuple[List[ProcessWorkerWrapper], WorkerMonitor]:
+    def sampler_output_method(self, num_groups: int) -> List[SamplerOutput]:
+        return [_make_sampler_output(self.rank, num_groups)]
+
+
+def _make_sampler_output(rank: int, num_groups: int) -> SamplerOutput:
+    return SamplerOutput(outputs=[
+        CompletionSequenceGroupOutput(
+            samples=[
+                SequenceOutput(parent_seq_id=i,
+                               output_token=rank,
+                               logprobs={
+                                   rank: Logprob(-0.5, rank=1),
+                                   i: Logprob(float("-inf")),
+                               })
+            ],
+            prompt_logprobs=None if i % 2 else [None, {
+                rank: Logprob(-1.5, rank=3)
+            }],
+        ) for i in range(num_groups)
+    ])
+
+
+def _start_workers(
+    shm_result_bytes: int = 0
+) -> Tuple[List[ProcessWorkerWrapper], WorkerMonitor]:
     result_handler = ResultHandler()
     workers = [
-        ProcessWorkerWrapper(result_handler, partial(DummyWorker, rank=rank))
+        ProcessWorkerWrapper(result_handler,
+                             partial(DummyWorker, rank=rank),
+                             shm_result_bytes=shm_result_bytes)
         for rank in range(8)
     ]
 
@@ -181,3 +216,119 @@ async def test_local_workers_async() -> None:
         pytest.fail("task should fail once workers have been shut down")
     except Exception as e:
         assert isinstance(e, ChildProcessError)
+
+
+def test_model_output_serialization_roundtrip() -> None:
+    sampler_outputs = [_make_sampler_output(3, 5), SamplerOutput(outputs=[])]
+    encoded = encode_model_outputs(sampler_outputs)
+    assert encoded is not None
+    assert decode_model_outputs(encoded.to_bytes()) == sampler_outputs
+
+    pooler_outputs = [
+        PoolerOutput(outputs=[
+            EmbeddingSequenceGroupOutput([0.25, -1.0, 3.5]),
+            EmbeddingSequenceGroupOutput([]),
+        ])
+    ]
+    encoded = encode_model_outputs(pooler_outputs)
+    assert encoded is not None
+    assert decode_model_outputs(encoded.to_bytes()) == pooler_outputs
+
+    # Detokenized logprobs and non-output values take the pickle path.
+    detokenized = _make_sampler_output(0, 1)
+    detokenized[0].samples[0].logprobs[0].decoded_token = "a"
+    assert encode_model_outputs([detokenized]) is None
+    assert encode_model_outputs(("not", "outputs")) is None
+
+
+def test_local_workers_shm_results() -> None:
+    """Test model outputs returned through the shared-memory channel"""
+
+    # The last request does not fit in a chunk and falls back to the queue.
+    workers, worker_monitor = _start_workers(shm_result_bytes=64 * 1024)
+
+    for num_groups in (1, 16, 1, 4096):
+        worker_outputs = [
+            worker.execute_method("sampler_output_method", num_groups)
+            for worker in workers
+        ]
+        for rank, output in enumerate(worker_outputs):
+            assert output.get() == [_make_sampler_output(rank, num_groups)]
+
+    # Non model-output results still go through the result queue.
+    assert workers[1].execute_method("worker_method",
+                                     "test").get() == (1, input)
+
+    worker_monitor.close()
+    worker_monitor.join(5)
+
+
+def test_local_workers_shm_result_decode_error(monkeypatch) -> None:
+    """Test a frame that cannot be decoded fails only its own task"""
+
+    workers, worker_monitor = _start_workers(shm_result_bytes=64 * 1024)
+
+    def decode_truncated_frame(buf):
+        raise ValueError("truncated frame")
+
+    monkeypatch.setattr(multiproc_worker_utils, "decode_model_outputs",
+                        decode_truncated_frame)
+    with pytest.raises(ValueError, match="truncated frame"):
+        workers[0].execute_method("sampler_output_method", 1).get()
+
+    # The result handler and the worker's channel are still usable.
+    monkeypatch.undo()
+    assert workers[0].execute_method("sampler_output_method",
+                                     1).get() == [_make_sampler_output(0, 1)]
+
+    worker_monitor.close()
+    worker_monitor.join(5)
+
+
+def _worker_sampler_output_method(self: Worker,
+                                  num_groups: int) -> List[SamplerOutput]:
+    return [_make_sampler_output(self.rank, num_groups)]
+
+
+@pytest.mark.skipif(cuda_device_count_stateless() < 2,
+                    reason="Need at least 2 GPUs to run the test.")
+def test_multiproc_executor_shm_results(monkeypatch) -> None:
+    """Test model outputs returned by the remote workers of
+    MultiprocessingGPUExecutor through the shared-memory channel"""
+
+    if multiproc_worker_utils.mp_method != "fork":
+        pytest.skip("The worker processes must be forked to inherit the "
+                    "test method.")
+    monkeypatch.setenv("VLLM_WORKER_SHM_RESULT_BYTES", str(64 * 1024))
+    monkeypatch.setattr(Worker,
+                        "sampler_output_method",
+                        _worker_sampler_output_method,
+                        raising=False)
+
+    engine_config = EngineArgs(model="facebook/opt-125m",
+                               tensor_parallel_size=2,
+                               distributed_executor_backend="mp",
+                               enforce_eager=True,
+                               gpu_memory_utilization=0.3,
+                               max_model_len=256).create_engine_config()
+    executor = MultiprocessingGPUExecutor(
+        model_config=engine_config.model_config,
+        cache_config=engine_config.cache_config,
+        parallel_config=engine_config.parallel_config,
+        scheduler_config=engine_config.scheduler_config,
+        device_config=engine_config.device_config,
+        lora_config=engine_config.lora_config,
+        multimodal_config=engine_config.multimodal_config,
+        speculative_config=engine_config.speculative_config,
+        load_config=engine_config.load_config,
+    )
+    try:
+        assert all(worker._result_buffer is not None
+                   for worker in executor.workers)
+        for num_groups in (1, 64):
+            outputs = executor._run_workers("sampler_output_method",
+                                            num_groups)
+            assert outputs == [[_make_sampler_output(rank, num_groups)]
+                               for rank in range(2)]
+    finally:
+        executor.shutdown()
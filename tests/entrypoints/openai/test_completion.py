@@ -727,3 +727,51 @@ async def test_detokenize(client: openai.AsyncOpenAI, model_name: str):
                              })
     response.raise_for_status()
     assert response.json() == {"prompt": prompt}
+
+
+@pytest.mark.asyncio
+async def test_startup_profile(client: openai.AsyncOpenAI):
+    base_url = str(client.base_url)[:-3]
+
+    response = requests.get(base_url + "startup_profile")
+    response.raise_for_status()
+    profile = response.json()
+    assert list(profile) == [
+        "imports", "config", "tokenizer", "load", "profile", "graph_capture",
+        "server_bind"
+    ]
+    for phase in ("imports", "load", "profile", "server_bind"):
+        assert profile[phase] > 0, phase
+
+
+@pytest.mark.asyncio
+async def test_compact_logprobs(client: openai.AsyncOpenAI):
+    base_url = str(client.base_url)[:-3]
+    request = {
+        "model": MODEL_NAME,
+        "prompt": [0, 0, 0, 0, 0],
+        "max_tokens": 5,
+        "temperature": 0.0,
+        "logprobs": 3,
+    }
+
+    response = requests.post(base_url + "v1/completions", json=request)
+    response.raise_for_status()
+    expected = response.json()["choices"][0]["logprobs"]
+
+    response = requests.post(base_url + "v1/completions",
+                             json={
+                                 **request, "compact_logprobs": True
+                             })
+    response.raise_for_status()
+    logprobs = response.json()["choices"][0]["logprobs"]
+
+    assert len(logprobs["token_ids"]) == 5
+    assert logprobs["token_logprobs"] == pytest.approx(
+        expected["token_logprobs"])
+    for top_token_ids, top_logprobs, expected_top_logprobs in zip(
+            logprobs["top_token_ids"], logprobs["top_logprobs"],
+            expected["top_logprobs"]):
+        assert len(top_token_ids) == len(top_logprobs)
+        assert max(top_logprobs) == pytest.approx(
+            max(expected_top_logprobs.values()))
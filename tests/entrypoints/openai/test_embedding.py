@@ -35,6 +35,8 @@ def embedding_server(ray_ctx):
         "--max-model-len",
         "8192",
         "--enforce-eager",
+        "--embedding-cache-size",
+        "16",
     ])
 
 
@@ -142,9 +144,105 @@ async def test_batch_base64_embedding(embedding_client: openai.AsyncOpenAI,
     for data in responses_base64.data:
         decoded_responses_base64_data.append(
             np.frombuffer(base64.b64decode(data.embedding),
-                          dtype="float").tolist())
+                          dtype="<f4").tolist())
 
-    assert responses_float.data[0].embedding == decoded_responses_base64_data[
-        0]
-    assert responses_float.data[1].embedding == decoded_responses_base64_data[
-        1]
+    for data, decoded_data in zip(responses_float.data,
+                                  decoded_responses_base64_data):
+        assert np.allclose(data.embedding, decoded_data, rtol=1e-6)
+
+    responses_float16 = await embedding_client.embeddings.create(
+        input=input_texts,
+        model=model_name,
+        encoding_format="base64",
+        extra_body={"base64_dtype": "float16"})
+    for data, float16_data in zip(responses_float.data,
+                                  responses_float16.data):
+        decoded_data = np.frombuffer(base64.b64decode(float16_data.embedding),
+                                     dtype="<f2")
+        assert np.allclose(data.embedding, decoded_data, atol=1e-3)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "model_name",
+    [EMBEDDING_MODEL_NAME],
+)
+async def test_truncate_prompt_tokens(embedding_client: openai.AsyncOpenAI,
+                                      model_name: str):
+    input_tokens = [[4, 5, 7, 9, 20], [15, 29, 499, 24, 24]]
+    embeddings = await embedding_client.embeddings.create(
+        model=model_name,
+        input=input_tokens,
+        encoding_format="float",
+        extra_body={"truncate_prompt_tokens": 3},
+    )
+    assert len(embeddings.data) == 2
+    assert embeddings.usage.prompt_tokens == 6
+
+    # The last tokens are kept.
+    truncated = await embedding_client.embeddings.create(
+        model=model_name,
+        input=[tokens[-3:] for tokens in input_tokens],
+        encoding_format="float",
+    )
+    for data, expected in zip(embeddings.data, truncated.data):
+        assert np.allclose(data.embedding, expected.embedding, atol=1e-2)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "model_name",
+    [EMBEDDING_MODEL_NAME],
+)
+async def test_repeated_embedding(embedding_client: openai.AsyncOpenAI,
+                                  model_name: str):
+    input_texts = [
+        "The quick brown fox.", "A lazy dog.", "The quick brown fox."
+    ]
+    embeddings = await embedding_client.embeddings.create(
+        model=model_name,
+        input=input_texts,
+        encoding_format="float",
+    )
+    assert len(embeddings.data) == 3
+    assert [data.index for data in embeddings.data] == [0, 1, 2]
+    assert embeddings.data[0].embedding == embeddings.data[2].embedding
+    assert embeddings.data[0].embedding != embeddings.data[1].embedding
+
+    # The second request is served from the cache.
+    cached = await embedding_client.embeddings.create(
+        model=model_name,
+        input=input_texts[:2],
+        encoding_format="float",
+    )
+    assert cached.data[0].embedding == embeddings.data[0].embedding
+    assert cached.data[1].embedding == embeddings.data[1].embedding
+    assert cached.usage.prompt_tokens > 0
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "model_name",
+    [EMBEDDING_MODEL_NAME],
+)
+async def test_dimensions_and_quantization(
+        embedding_client: openai.AsyncOpenAI, model_name: str):
+    input_texts = ["The chef prepared a delicious meal."]
+    embeddings = await embedding_client.embeddings.create(
+        model=model_name,
+        input=input_texts,
+        encoding_format="float",
+        dimensions=256,
+    )
+    assert len(embeddings.data[0].embedding) == 256
+    assert np.isclose(np.linalg.norm(embeddings.data[0].embedding), 1.0)
+
+    embeddings = await embedding_client.embeddings.create(
+        model=model_name,
+        input=input_texts,
+        encoding_format="float",
+        dimensions=256,
+        extra_body={"quantization": "binary"},
+    )
+    assert len(embeddings.data[0].embedding) == 32
+    assert all(0 <= value <= 255 for value in embeddings.data[0].embedding)
@@ -0,0 +1,166 @@
+import random
+from typing import List, Tuple
+
+import pytest
+import torch
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.utils import is_cpu
+
+if should_skip_test_group(group_name="TEST_KERNELS"):
+    pytest.skip("TEST_KERNELS=DISABLE, skipping kernels test group",
+                allow_module_level=True)
+
+if not is_cpu():
+    pytest.skip("The Torch SDPA backend only runs on CPU.",
+                allow_module_level=True)
+
+from vllm.attention.backends.torch_sdpa import (  # noqa: E402
+    TorchSDPABackend, TorchSDPABackendImpl, _gather_cached_kv)
+from vllm.attention.ops.int8_paged_attn import (  # noqa: E402
+    Int8PagedAttention)
+
+NUM_BLOCKS = 128
+BLOCK_SIZE = 16
+NUM_HEADS = [(8, 8), (8, 2)]
+HEAD_SIZE = 64
+KV_CACHE_DTYPES = ["auto", "int8"]
+
+
+def _slot_mapping(block_table: List[int], start: int, end: int) -> List[int]:
+    return [
+        block_table[i // BLOCK_SIZE] * BLOCK_SIZE + i % BLOCK_SIZE
+        for i in range(start, end)
+    ]
+
+
+def _create_kv_cache(num_kv_heads: int, kv_cache_dtype: str) -> torch.Tensor:
+    if kv_cache_dtype == "int8":
+        kv_cache_shape = Int8PagedAttention.get_kv_cache_shape(
+            NUM_BLOCKS, BLOCK_SIZE, num_kv_heads, HEAD_SIZE)
+        return torch.zeros(kv_cache_shape, dtype=torch.int8)
+    kv_cache_shape = TorchSDPABackend.get_kv_cache_shape(
+        NUM_BLOCKS, BLOCK_SIZE, num_kv_heads, HEAD_SIZE)
+    return torch.zeros(kv_cache_shape, dtype=torch.float)
+
+
+@pytest.mark.parametrize("num_heads", NUM_HEADS)
+@pytest.mark.parametrize("context_len", [16, 21])
+@pytest.mark.parametrize("kv_cache_dtype", KV_CACHE_DTYPES)
+@torch.inference_mode()
+def test_chunked_prefill_with_decode(num_heads: Tuple[int, int],
+                                     context_len: int, kv_cache_dtype: str):
+    """A prompt chunk that attends to its cached context, batched with a
+    decode, matches the attention of the whole prompt."""
+    random.seed(0)
+    torch.manual_seed(0)
+    num_query_heads, num_kv_heads = num_heads
+    scale = HEAD_SIZE**-0.5
+    impl = TorchSDPABackendImpl(num_query_heads, HEAD_SIZE, scale,
+                                num_kv_heads, None, None, kv_cache_dtype)
+    kv_cache = _create_kv_cache(num_kv_heads, kv_cache_dtype)
+    # The cached keys and values are rounded to 1/254 of their largest
+    # absolute value in the int8 cache.
+    tol = 3e-2 if kv_cache_dtype == "int8" else 1e-4
+
+    prompt_len = context_len + 11
+    decode_len = 40
+    block_ids = random.sample(range(NUM_BLOCKS), 8)
+    prompt_blocks, decode_blocks = block_ids[:4], block_ids[4:]
+
+    def qkv(num_tokens: int):
+        return (torch.randn(num_tokens, num_query_heads * HEAD_SIZE),
+                torch.randn(num_tokens, num_kv_heads * HEAD_SIZE),
+                torch.randn(num_tokens, num_kv_heads * HEAD_SIZE))
+
+    def prefill_metadata(seq_lens: List[int], slot_mapping: List[int]):
+        return TorchSDPABackend.make_metadata(
+            is_prompt=True,
+            seq_lens=seq_lens,
+            seq_lens_tensor=None,
+            max_decode_seq_len=0,
+            num_prefills=len(seq_lens),
+            num_prefill_tokens=len(slot_mapping),
+            num_decode_tokens=0,
+            block_tables=torch.tensor([]),
+            slot_mapping=torch.tensor(slot_mapping, dtype=torch.long),
+        )
+
+    # The whole prompt, and the context of the decode.
+    query, key, value = qkv(prompt_len)
+    expected = impl.forward(
+        query, key, value, kv_cache,
+        prefill_metadata([prompt_len],
+                         _slot_mapping(prompt_blocks, 0, prompt_len)))
+    decode_q, decode_k, decode_v = qkv(decode_len)
+    impl.forward(
+        decode_q, decode_k, decode_v, kv_cache,
+        prefill_metadata([decode_len],
+                         _slot_mapping(decode_blocks, 0, decode_len)))
+    expected_decode = impl.forward(decode_q, decode_k, decode_v, None,
+                                   prefill_metadata([decode_len], []))[-1:]
+
+    # The last chunk of the prompt and the last token of the decode sequence
+    # in one batch. Their keys and values are written again, unchanged.
+    chunk = slice(context_len, prompt_len)
+    attn_metadata = TorchSDPABackend.make_metadata(
+        is_prompt=False,
+        seq_lens=[prompt_len, decode_len],
+        seq_lens_tensor=torch.tensor([prompt_len, decode_len],
+                                     dtype=torch.int),
+        max_decode_seq_len=decode_len,
+        num_prefills=1,
+        num_prefill_tokens=prompt_len - context_len,
+        num_decode_tokens=1,
+        block_tables=torch.tensor([prompt_blocks, decode_blocks],
+                                  dtype=torch.int),
+        slot_mapping=torch.tensor(
+            _slot_mapping(prompt_blocks, context_len, prompt_len) +
+            _slot_mapping(decode_blocks, decode_len - 1, decode_len),
+            dtype=torch.long),
+        context_lens=[context_len],
+    )
+    output = impl.forward(torch.cat([query[chunk], decode_q[-1:]]),
+                          torch.cat([key[chunk], decode_k[-1:]]),
+                          torch.cat([value[chunk], decode_v[-1:]]), kv_cache,
+                          attn_metadata)
+
+    torch.testing.assert_close(output[:-1],
+                               expected[chunk],
+                               atol=tol,
+                               rtol=tol)
+    torch.testing.assert_close(output[-1:],
+                               expected_decode,
+                               atol=tol,
+                               rtol=tol)
+
+
+@pytest.mark.parametrize("num_heads", NUM_HEADS)
+@torch.inference_mode()
+def test_int8_kv_cache(num_heads: Tuple[int, int]):
+    """The keys and values written to the int8 cache are read back within
+    half a quantization step."""
+    random.seed(0)
+    torch.manual_seed(0)
+    _, num_kv_heads = num_heads
+    kv_cache = _create_kv_cache(num_kv_heads, "int8")
+    num_tokens = 3 * BLOCK_SIZE + 5
+    block_table = random.sample(range(NUM_BLOCKS), 4)
+    key = torch.randn(num_tokens, num_kv_heads, HEAD_SIZE)
+    value = torch.randn(num_tokens, num_kv_heads, HEAD_SIZE)
+
+    key_cache, value_cache = Int8PagedAttention.split_kv_cache(
+        kv_cache, num_kv_heads, HEAD_SIZE)
+    Int8PagedAttention.write_to_paged_cache(
+        key, value, key_cache, value_cache,
+        torch.tensor(_slot_mapping(block_table, 0, num_tokens),
+                     dtype=torch.long), "int8", 1.0)
+    kv_scales = Int8PagedAttention.split_kv_cache_scales(
+        kv_cache, num_kv_heads, HEAD_SIZE)
+    cached_key, cached_value = _gather_cached_kv(
+        key_cache, value_cache, torch.tensor(block_table, dtype=torch.int),
+        num_tokens, kv_scales, torch.float)
+
+    for cached, expected in ((cached_key, key), (cached_value, value)):
+        step = expected.abs().amax(dim=-1, keepdim=True) / 127
+        assert ((cached - expected).abs() <= step / 2 + 1e-6).all()
@@ -14,6 +14,7 @@ from vllm.lora.layers import (ColumnParallelLinearWithLoRA,
 from vllm.lora.lora import LoRALayerWeights, PackedLoRALayerWeights
 from vllm.lora.models import (LoRAMapping, LoRAModel, LoRAModelManager,
                               LRUCacheLoRAModelManager)
+from vllm.lora.packed import load_packed_lora, save_packed_lora
 from vllm.lora.request import LoRARequest
 from vllm.lora.worker_manager import (LRUCacheWorkerLoRAManager,
                                       WorkerLoRAManager)
@@ -554,3 +555,47 @@ def test_packed_loras(dist_init, dummy_model_gate_up):
                           model_lora1.get_lora("up_proj").lora_a)
     assert torch.allclose(packed_lora1.lora_b[1],
                           model_lora1.get_lora("up_proj").lora_b)
+
+
+def test_packed_lora_file(tmp_path):
+    loras: Dict[str, LoRALayerWeights] = {
+        "q_proj":
+        LoRALayerWeights("q_proj",
+                         8,
+                         16,
+                         torch.rand([32, 8], dtype=torch.bfloat16),
+                         torch.rand([8, 48], dtype=torch.bfloat16)),
+        "embed_tokens":
+        LoRALayerWeights("embed_tokens",
+                         8,
+                         8,
+                         torch.rand([64, 8], dtype=torch.bfloat16),
+                         torch.rand([8, 32], dtype=torch.bfloat16),
+                         embeddings_tensor=torch.rand([4, 32],
+                                                      dtype=torch.bfloat16)),
+    }
+    for lora in loras.values():
+        lora.optimize()
+    lora_model = LoRAModel(1, 8, loras, scaling_factor=4.0)
+    path = str(tmp_path / "adapter.lora")
+    save_packed_lora(lora_model, path, max_lora_rank=16)
+
+    packed = load_packed_lora(path, 2)
+    assert packed.id == 2
+    assert packed.rank == 8
+    assert packed.scaling_factor == 4.0
+    assert set(packed.loras) == set(loras)
+    for module_name, lora in loras.items():
+        packed_lora = packed.get_lora(module_name)
+        assert packed_lora is not None
+        assert packed_lora.scaling == 1
+        # The rank is padded to max_lora_rank with zeros.
+        assert packed_lora.lora_a.shape == (lora.lora_a.shape[0], 16)
+        assert packed_lora.lora_b.shape == (16, lora.lora_b.shape[1])
+        assert torch.equal(packed_lora.lora_a[:, :8], lora.lora_a)
+        assert torch.equal(packed_lora.lora_b[:8], lora.lora_b)
+        assert not packed_lora.lora_a[:, 8:].any()
+        assert not packed_lora.lora_b[8:].any()
+    assert torch.equal(packed.get_lora("embed_tokens").embeddings_tensor,
+                       loras["embed_tokens"].embeddings_tensor)
+    assert packed.get_lora("q_proj").embeddings_tensor is None
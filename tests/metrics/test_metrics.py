@@ -111,6 +111,37 @@ def test_metric_set_tag_model_name(vllm_runner, model: str, dtype: str,
             f"actual: {metrics_tag_content!r}")
 
 
+@pytest.mark.parametrize("model", MODELS)
+@pytest.mark.parametrize("enforce_eager", [True, False])
+def test_metric_startup_timeline(vllm_runner, model: str,
+                                 enforce_eager: bool) -> None:
+    with vllm_runner(model,
+                     disable_log_stats=False,
+                     gpu_memory_utilization=0.3,
+                     enforce_eager=enforce_eager) as vllm_model:
+        engine = vllm_model.model.llm_engine
+        stat_logger = engine.stat_loggers['prometheus']
+        gauge = stat_logger.metrics.gauge_startup_phase_duration
+        phases = {
+            phase: gauge.labels(**stat_logger.labels,
+                                phase=phase)._value.get()
+            for phase in ("load", "profile", "graph_capture")
+        }
+
+    timeline = engine.startup_timeline
+    assert phases == {
+        "load": pytest.approx(timeline.load, abs=1e-3),
+        "profile": pytest.approx(timeline.profile, abs=1e-3),
+        "graph_capture": pytest.approx(timeline.graph_capture, abs=1e-3),
+    }
+    assert phases["load"] > 0
+    assert phases["profile"] > 0
+    if not enforce_eager:
+        # Capturing the CUDA graphs takes far longer than allocating the
+        # KV cache.
+        assert phases["graph_capture"] > phases["profile"]
+
+
 @pytest.mark.parametrize("model", MODELS)
 @pytest.mark.parametrize("dtype", ["half"])
 @pytest.mark.parametrize("max_tokens", [4])
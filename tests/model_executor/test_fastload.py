@@ -0,0 +1,106 @@
+import enum
+import os
+
+import pytest
+import torch
+from torch import nn
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.model_executor.model_loader.fastload import (load_fastload_state,
+                                                       save_fastload_state)
+
+if should_skip_test_group(group_name="TEST_MODEL_EXECUTOR"):
+    pytest.skip(
+        "TEST_MODEL_EXECUTOR=DISABLE, skipping model executor test group",
+        allow_module_level=True)
+
+
+class _State(enum.Enum):
+    RAW = enum.auto()
+    PACKED = enum.auto()
+
+
+class _Layer(nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.weight = nn.Parameter(torch.empty(8, 4), requires_grad=False)
+        self.scale = nn.Parameter(torch.empty(8), requires_grad=False)
+        self.state = _State.RAW
+        self.out_dtype = torch.float32
+
+    def process(self):
+        # Mimics process_weights_after_loading: the weight is replaced with
+        # a transposed view, a parameter is dropped and attributes change.
+        packed = torch.cat([self.weight.data, self.weight.data], dim=1)
+        self.weight = nn.Parameter(packed.t(), requires_grad=False)
+        self.scale = None
+        self.workspace = torch.arange(3)
+        self.state = _State.PACKED
+        self.out_dtype = torch.float16
+
+
+class _Model(nn.Module):
+
+    def __init__(self):
+        super().__init__()
+        self.embed = nn.Embedding(8, 4)
+        self.layer = _Layer()
+        self.lm_head = nn.Linear(4, 8, bias=False)
+        self.lm_head.weight = self.embed.weight
+        self.register_buffer("cache", torch.zeros(2))
+
+
+def test_fastload_round_trip(tmp_path):
+    torch.manual_seed(0)
+    model = _Model()
+    nn.init.normal_(model.layer.weight)
+    model.layer.process()
+    model.cache.fill_(3)
+    path = os.path.join(tmp_path, "model.fastload")
+    save_fastload_state(model, path)
+
+    loaded = _Model()
+    param = loaded.embed.weight
+    load_fastload_state(loaded, path, torch.device("cpu"))
+
+    # Existing parameters keep their identity, tied ones stay tied.
+    assert loaded.embed.weight is param
+    assert loaded.lm_head.weight is param
+    assert torch.equal(param, model.embed.weight)
+    assert loaded.layer.weight.stride() == model.layer.weight.stride()
+    assert torch.equal(loaded.layer.weight, model.layer.weight)
+    assert loaded.layer.scale is None
+    assert torch.equal(loaded.layer.workspace, torch.arange(3))
+    assert loaded.layer.state is _State.PACKED
+    assert loaded.layer.out_dtype == torch.float16
+    assert torch.equal(loaded.cache, model.cache)
+
+
+def test_fastload_missing_module(tmp_path):
+    path = os.path.join(tmp_path, "model.fastload")
+    save_fastload_state(_Layer(), path)
+    with pytest.raises(ValueError, match="missing"):
+        load_fastload_state(_Model(), path, torch.device("cpu"))
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="requires CUDA")
+def test_fastload_lazy(tmp_path):
+    torch.manual_seed(0)
+    model = nn.Sequential(nn.Linear(4, 4),
+                          nn.ModuleList([nn.Linear(4, 4) for _ in range(3)]))
+    path = os.path.join(tmp_path, "model.fastload")
+    save_fastload_state(model, path)
+
+    with torch.device("cuda"):
+        loaded = nn.Sequential(
+            nn.Linear(4, 4),
+            nn.ModuleList([nn.Linear(4, 4) for _ in range(3)]))
+    load_fastload_state(loaded, path, torch.device("cuda"), lazy=True)
+
+    # The modules outside of the layers are restored before returning.
+    assert torch.equal(loaded[0].weight.cpu(), model[0].weight)
+    x = torch.randn(2, 4)
+    for layer, expected in zip(loaded[1], model[1]):
+        # Every layer blocks until it is restored.
+        assert torch.equal(layer(x.cuda()).cpu(), expected(x))
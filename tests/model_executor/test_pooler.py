@@ -0,0 +1,89 @@
+from typing import List
+
+import pytest
+import torch
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.model_executor.layers.pooler import Pooler, PoolingType
+from vllm.model_executor.pooling_metadata import PoolingMetadata
+from vllm.pooling_params import PoolingParams
+
+if should_skip_test_group(group_name="TEST_MODEL_EXECUTOR"):
+    pytest.skip(
+        "TEST_MODEL_EXECUTOR=DISABLE, skipping model executor test group",
+        allow_module_level=True)
+
+PROMPT_LENS = [3, 1, 4]
+HIDDEN_SIZE = 16
+
+
+def _pool(hidden_states: torch.Tensor, params_list: List[PoolingParams],
+          normalize: bool) -> List[List[float]]:
+    pooler = Pooler(pooling_type=PoolingType.LAST, normalize=normalize)
+    pooling_metadata = PoolingMetadata(
+        seq_groups=[([i], params) for i, params in enumerate(params_list)],
+        seq_data={},
+        prompt_lens=PROMPT_LENS)
+    output = pooler(hidden_states, pooling_metadata)
+    return [out.embeddings for out in output.outputs]
+
+
+def test_pooling_types():
+    torch.manual_seed(0)
+    hidden_states = torch.randn(sum(PROMPT_LENS), HIDDEN_SIZE)
+    seqs = torch.split(hidden_states, PROMPT_LENS)
+
+    params_list = [
+        PoolingParams(),
+        PoolingParams(pooling_type="mean"),
+        PoolingParams(pooling_type="cls"),
+    ]
+    embeddings = _pool(hidden_states, params_list, normalize=False)
+    expected = [seqs[0][-1], seqs[1].mean(dim=0), seqs[2][0]]
+    for embedding, expected_embedding in zip(embeddings, expected):
+        assert torch.allclose(torch.tensor(embedding),
+                              expected_embedding,
+                              atol=1e-5)
+
+
+def test_dimensions_and_quantization():
+    torch.manual_seed(0)
+    hidden_states = torch.randn(sum(PROMPT_LENS), HIDDEN_SIZE)
+    last = torch.cumsum(torch.tensor(PROMPT_LENS), dim=0) - 1
+
+    params_list = [
+        PoolingParams(dimensions=4),
+        PoolingParams(dimensions=5, quantization="binary"),
+        PoolingParams(quantization="int8"),
+    ]
+    embeddings = _pool(hidden_states, params_list, normalize=True)
+
+    # The truncated embedding is normalized again.
+    truncated = hidden_states[last[0], :4]
+    assert torch.allclose(torch.tensor(embeddings[0]),
+                          truncated / truncated.norm(),
+                          atol=1e-5)
+
+    # One byte holds the sign bits of the first 5 dimensions.
+    bits = (hidden_states[last[1], :5] > 0).tolist()
+    assert embeddings[1] == [
+        sum(128 >> i for i, bit in enumerate(bits) if bit)
+    ]
+
+    int8 = torch.tensor(embeddings[2])
+    assert len(embeddings[2]) == HIDDEN_SIZE
+    assert all(isinstance(value, int) for value in embeddings[2])
+    assert int8.abs().max() == 127
+    normalized = torch.nn.functional.normalize(hidden_states[last[2]], dim=0)
+    assert torch.allclose(int8 / 127,
+                          normalized / normalized.abs().max(),
+                          atol=1 / 127)
+
+
+def test_invalid_pooling_params():
+    with pytest.raises(ValueError):
+        PoolingParams(pooling_type="max")
+    with pytest.raises(ValueError):
+        PoolingParams(dimensions=0)
+    with pytest.raises(ValueError):
+        PoolingParams(quantization="int4")
@@ -0,0 +1,40 @@
+import os
+import tempfile
+
+import pytest
+import torch
+from safetensors.torch import save_file
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.model_executor.model_loader.weight_utils import (
+    parallel_safetensors_weights_iterator, safetensors_weights_iterator)
+
+if should_skip_test_group(group_name="TEST_MODEL_EXECUTOR"):
+    pytest.skip(
+        "TEST_MODEL_EXECUTOR=DISABLE, skipping model executor test group",
+        allow_module_level=True)
+
+
+@pytest.mark.parametrize("num_threads", [1, 3])
+def test_parallel_safetensors_weights_iterator(num_threads):
+    with tempfile.TemporaryDirectory() as tmpdir:
+        files = []
+        for i in range(4):
+            tensors = {
+                f"layers.{i}.weight": torch.rand(17, 5),
+                # An odd-sized tensor misaligns the ones after it.
+                f"layers.{i}.mask": torch.ones(3, dtype=torch.bool),
+                f"layers.{i}.bias": torch.rand(7, dtype=torch.bfloat16),
+                f"layers.{i}.scale": torch.tensor(float(i)),
+            }
+            path = os.path.join(tmpdir, f"model-{i}.safetensors")
+            save_file(tensors, path)
+            files.append(path)
+
+        expected = dict(safetensors_weights_iterator(files))
+        actual = dict(
+            parallel_safetensors_weights_iterator(files, num_threads))
+        assert actual.keys() == expected.keys()
+        for name, tensor in expected.items():
+            assert actual[name].dtype == tensor.dtype
+            assert torch.equal(actual[name], tensor)
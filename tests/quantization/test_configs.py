@@ -3,6 +3,8 @@
 Run `pytest tests/quantization/test_configs.py --forked`.
 """
 
+import subprocess
+import sys
 from dataclasses import dataclass
 from typing import Tuple
 
@@ -11,6 +13,9 @@ import torch
 
 from tests.nm_utils.utils_skip import should_skip_test_group
 from vllm.config import ModelConfig
+from vllm.model_executor.layers.quantization import (
+    QUANTIZATION_METHODS, QuantizationConfig,
+    get_override_quantization_configs)
 
 if should_skip_test_group(group_name="TEST_QUANTIZATION"):
     pytest.skip("TEST_QUANTIZATION=DISABLE, skipping quantization test group",
@@ -80,3 +85,41 @@ def test_auto_gptq(model_arg_exptype: Tuple[str, None, str]) -> None:
         f"Expected quant_type == {expected_type} for {model_path}, "
         f"but found {found_quantization_type} "
         f"for no --quantization {quantization_arg} case")
+
+
+def test_quantization_methods_imported_lazily() -> None:
+    # Run in a fresh interpreter, other tests may have imported the methods.
+    script = ("import sys\n"
+              "from vllm.model_executor.layers.quantization import (\n"
+              "    QUANTIZATION_METHODS)\n"
+              "fp8 = 'vllm.model_executor.layers.quantization.fp8'\n"
+              "assert 'fp8' in QUANTIZATION_METHODS\n"
+              "assert fp8 not in sys.modules\n"
+              "assert QUANTIZATION_METHODS['fp8'].get_name() == 'fp8'\n"
+              "assert fp8 in sys.modules\n")
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_gptq_config_imports_only_override_methods() -> None:
+    # Run in a fresh interpreter, other tests may have imported the methods.
+    script = ("import sys\n"
+              "from vllm.config import ModelConfig\n"
+              "model = 'TheBloke/Llama-2-7B-Chat-GPTQ'\n"
+              "model_config = ModelConfig(model, model, 'auto', False,\n"
+              "                           'float16', 0)\n"
+              "assert model_config.quantization in ('gptq', 'gptq_marlin')\n"
+              "prefix = 'vllm.model_executor.layers.quantization.'\n"
+              "for method in ('aqlm', 'awq', 'deepspeedfp', 'fp8'):\n"
+              "    assert prefix + method not in sys.modules, method\n")
+    subprocess.run([sys.executable, "-c", script], check=True)
+
+
+def test_override_quantization_configs() -> None:
+    # The methods skipped when detecting the method of a checkpoint must not
+    # override it.
+    override_configs = list(get_override_quantization_configs())
+    default = QuantizationConfig.override_quantization_method.__func__
+    for config_cls in QUANTIZATION_METHODS.values():
+        overrides = config_cls.override_quantization_method.__func__
+        assert (overrides is not default) == (config_cls
+                                              in override_configs), config_cls
@@ -0,0 +1,170 @@
+"""Tests the weight-only int4/int8 CPU kernels on GPTQ, AWQ and
+compressed-tensors weights.
+
+Run `pytest tests/quantization/test_cpu_wna16.py`.
+"""
+from typing import Optional, Tuple
+
+import pytest
+import torch
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.utils import is_cpu
+
+if should_skip_test_group(group_name="TEST_QUANTIZATION"):
+    pytest.skip("TEST_QUANTIZATION=DISABLE, skipping quantization test group",
+                allow_module_level=True)
+
+if not is_cpu():
+    pytest.skip("The cpu_wna16 kernels only run on CPU.",
+                allow_module_level=True)
+
+from vllm.model_executor.layers.quantization.cpu_wna16 import (  # noqa: E402
+    CPUWNA16Config, CPUWNA16LinearMethod)
+
+INPUT_SIZE = 256
+OUTPUT_SIZE = 96
+AWQ_PACK_ORDER = [0, 2, 4, 6, 1, 3, 5, 7]
+
+# checkpoint format, weight bits, group size, desc_act
+CHECKPOINTS = [
+    ("gptq", 4, 64, False),
+    ("gptq", 4, 64, True),
+    ("gptq", 8, -1, False),
+    ("awq", 4, 64, False),
+    ("compressed-tensors", 4, 64, False),
+    ("compressed-tensors", 8, -1, False),
+]
+
+
+def _pack_int32(values: torch.Tensor, num_bits: int, dim: int) -> torch.Tensor:
+    values = values.movedim(dim, -1).to(torch.int64)
+    values = values.reshape(*values.shape[:-1], -1, 32 // num_bits)
+    packed = (values << torch.arange(0, 32, num_bits)).sum(dim=-1)
+    packed = torch.where(packed >= 2**31, packed - 2**32, packed)
+    return packed.to(torch.int32).movedim(-1, dim)
+
+
+def _awq_order(values: torch.Tensor) -> torch.Tensor:
+    shape = values.shape
+    return values.reshape(shape[0], -1, 8)[..., AWQ_PACK_ORDER].reshape(shape)
+
+
+def _create_layer(
+    checkpoint_format: str, weight_bits: int, group_size: int, desc_act: bool
+) -> Tuple[torch.nn.Module, torch.Tensor, Optional[torch.Tensor]]:
+    """Returns a layer loaded with random quantized weights, its float
+    weights and the permutation of its inputs."""
+    quant_config = CPUWNA16Config(weight_bits, group_size, desc_act,
+                                  checkpoint_format, False)
+    quant_method = CPUWNA16LinearMethod(quant_config)
+    layer = torch.nn.Module()
+    quant_method.create_weights(layer, INPUT_SIZE, [OUTPUT_SIZE], INPUT_SIZE,
+                                OUTPUT_SIZE, torch.float32)
+    layer.quant_method = quant_method
+
+    group_size = INPUT_SIZE if group_size == -1 else group_size
+    num_groups = INPUT_SIZE // group_size
+    g_idx = torch.arange(INPUT_SIZE) // group_size
+    if desc_act:
+        g_idx = torch.randperm(INPUT_SIZE) // group_size
+    qweight = torch.randint(0, 2**weight_bits, (OUTPUT_SIZE, INPUT_SIZE))
+    zeros = torch.randint(1, 2**weight_bits, (OUTPUT_SIZE, num_groups))
+    scales = torch.rand(OUTPUT_SIZE, num_groups) * 0.01 + 1e-3
+
+    if checkpoint_format == "gptq":
+        layer.qweight.copy_(_pack_int32(qweight.t(), weight_bits, dim=0))
+        layer.qzeros.copy_(_pack_int32(zeros.t() - 1, weight_bits, dim=1))
+        layer.scales.copy_(scales.t())
+        layer.g_idx.copy_(g_idx)
+    elif checkpoint_format == "awq":
+        layer.qweight.copy_(_pack_int32(_awq_order(qweight.t()), 4, dim=1))
+        layer.qzeros.copy_(_pack_int32(_awq_order(zeros.t()), 4, dim=1))
+        layer.scales.copy_(scales.t())
+    else:
+        zeros.fill_(2**(weight_bits - 1))
+        layer.weight_packed.copy_(_pack_int32(qweight, weight_bits, dim=1))
+        layer.weight_scale.copy_(scales)
+
+    weight = (qweight - zeros[:, g_idx]) * scales[:, g_idx]
+    quant_method.process_weights_after_loading(layer)
+    return layer, weight, layer.perm
+
+
+@pytest.mark.parametrize("checkpoint", CHECKPOINTS)
+@pytest.mark.parametrize("num_tokens", [1, 5, 33])
+@torch.inference_mode()
+def test_cpu_wna16_linear(checkpoint: Tuple[str, int, int, bool],
+                          num_tokens: int):
+    """The kernels, and the dense matmul of larger batches, match the matmul
+    of the dequantized weights."""
+    torch.manual_seed(0)
+    layer, weight, perm = _create_layer(*checkpoint)
+    if checkpoint[3]:
+        assert perm is not None
+    x = torch.randn(num_tokens, INPUT_SIZE)
+    bias = torch.randn(OUTPUT_SIZE)
+
+    output = layer.quant_method.apply(layer, x, bias)
+    torch.testing.assert_close(output,
+                               x @ weight.t() + bias,
+                               atol=1e-3,
+                               rtol=1e-3)
+
+
+def test_checkpoint_formats():
+    get_checkpoint_format = CPUWNA16Config.get_checkpoint_format
+    gptq = {"quant_method": "gptq", "bits": 4, "group_size": 128}
+    assert get_checkpoint_format(gptq) == "gptq"
+    assert get_checkpoint_format({**gptq, "bits": 3}) is None
+    assert get_checkpoint_format({**gptq, "group_size": 48}) is None
+    assert get_checkpoint_format({
+        **gptq, "checkpoint_format": "marlin"
+    }) is None
+
+    awq = {
+        "quant_method": "awq",
+        "bits": 4,
+        "group_size": 128,
+        "zero_point": True,
+        "version": "gemm"
+    }
+    assert get_checkpoint_format(awq) == "awq"
+    assert get_checkpoint_format({**awq, "version": "gemv"}) is None
+
+    weights = {
+        "num_bits": 4,
+        "type": "int",
+        "symmetric": True,
+        "strategy": "group",
+        "group_size": 128
+    }
+    compressed_tensors = {
+        "format": "pack-quantized",
+        "config_groups": {
+            "group_0": {
+                "targets": ["Linear"],
+                "weights": weights,
+                "input_activations": None,
+            }
+        },
+    }
+    assert get_checkpoint_format(compressed_tensors) == "compressed-tensors"
+    w8a8 = {
+        "format": "int-quantized",
+        "config_groups": {
+            "group_0": {
+                "targets": ["Linear"],
+                "weights": {
+                    **weights, "num_bits": 8,
+                    "strategy": "channel"
+                },
+                "input_activations": {
+                    "num_bits": 8,
+                    "strategy": "token",
+                    "dynamic": True
+                },
+            }
+        },
+    }
+    assert get_checkpoint_format(w8a8) is None
@@ -215,6 +215,59 @@ def test_raises_when_vocab_oob(above_or_below_vocab_range: str,
                           draft_token_ids)
 
 
+@pytest.mark.parametrize("seed", list(range(3)))
+@pytest.mark.parametrize("device", CUDA_DEVICES)
+@torch.inference_mode()
+def test_branch_rejection_sampling_keeps_target_distribution(
+        seed: int, device: str):
+    """Verify that verifying the first tokens of several branches one after
+    the other keeps the distribution of the first output token equal to the
+    target distribution, and that an accepted token comes from the selected
+    branch.
+    """
+    set_random_seed(seed)
+    torch.set_default_device(device)
+    batch_size = 100_000
+    num_branches = 3
+    k = 2
+    vocab_size = 8
+
+    rejection_sampler = RejectionSampler()
+    rejection_sampler.init_gpu_tensors(rank=int(device[-1]))
+
+    target_distribution = F.softmax(torch.rand(vocab_size), dim=-1)
+    target_probs = target_distribution.expand(batch_size, num_branches, k,
+                                              vocab_size)
+    # The branches propose the distinct first tokens 0, 1 and 2.
+    draft_token_ids = torch.randint(low=0,
+                                    high=vocab_size,
+                                    size=(batch_size, num_branches, k),
+                                    dtype=torch.int64)
+    draft_token_ids[:, :, 0] = torch.arange(num_branches)
+    draft_probs = F.one_hot(draft_token_ids,
+                            num_classes=vocab_size).to(torch.float32)
+    bonus_token_ids = torch.zeros((batch_size, num_branches, 1),
+                                  dtype=torch.int64)
+
+    output_token_ids, selected_branches = rejection_sampler.forward_branches(
+        target_probs, bonus_token_ids, draft_probs, draft_token_ids)
+    assert output_token_ids.shape == (batch_size, k + 1)
+    assert selected_branches.shape == (batch_size, )
+
+    first_token_ids = output_token_ids[:, 0]
+    observed_distribution = torch.bincount(
+        first_token_ids, minlength=vocab_size).float() / batch_size
+    assert torch.allclose(observed_distribution,
+                          target_distribution,
+                          atol=0.01)
+
+    # The first tokens of the branches are never recovered tokens, as the
+    # residual distribution excludes them.
+    accepted = first_token_ids < num_branches
+    assert torch.equal(first_token_ids[accepted],
+                       selected_branches[accepted])
+
+
 @pytest.mark.parametrize("draft_and_target_probs_equal", [True, False])
 @pytest.mark.parametrize("seed", list(range(5)))
 @torch.inference_mode()
@@ -4,15 +4,17 @@ import random
 from typing import Dict, List, Optional, Tuple
 from unittest.mock import patch
 
+import numpy as np
 import pytest
 import torch
 from transformers import GenerationConfig, GenerationMixin
 
 from tests.nm_utils.utils_skip import should_skip_test_group
-from vllm.model_executor.layers.sampler import Sampler
+from vllm.model_executor.layers.sampler import Sampler, _flatten_logprobs
 from vllm.model_executor.sampling_metadata import SamplingMetadata
 from vllm.model_executor.utils import set_random_seed
-from vllm.sequence import SamplingParams, SequenceData, SequenceGroupMetadata
+from vllm.sequence import (Logprob, LogprobsArray, SamplingParams,
+                           SequenceData, SequenceGroupMetadata)
 from vllm.utils import Counter, is_pin_memory_available
 
 if should_skip_test_group(group_name="TEST_SAMPLERS"):
@@ -706,3 +708,39 @@ def test_sampler_repetition_penalty_mixed(device: str):
 
     assert tokens1[0] == tokens2[1]
     assert tokens1[1] == tokens2[0]
+
+
+def test_flatten_logprobs():
+    token_ids = np.array([4, 9])
+    logprobs = np.array([-0.5, -3.0])
+    ranks = np.array([2, 7])
+    top_token_ids = np.array([[1, 4], [2, 3]])
+    top_logprobs = np.array([[-0.25, -0.5], [-1.0, -2.0]])
+
+    logprobs_array = LogprobsArray()
+    logprobs_array.extend_rows(*_flatten_logprobs(
+        token_ids, logprobs, ranks, top_token_ids, top_logprobs))
+
+    # Same entries, in the same order, as updating a dict of the sampled
+    # token with the top K.
+    assert logprobs_array == [
+        {
+            4: Logprob(-0.5, rank=2),
+            1: Logprob(-0.25, rank=1)
+        },
+        {
+            9: Logprob(-3.0, rank=7),
+            2: Logprob(-1.0, rank=1),
+            3: Logprob(-2.0, rank=2)
+        },
+    ]
+
+    logprobs_array = LogprobsArray()
+    logprobs_array.extend_rows(
+        *_flatten_logprobs(token_ids, logprobs, ranks, None, None))
+    assert logprobs_array == [{
+        4: Logprob(-0.5, rank=2)
+    }, {
+        9: Logprob(-3.0, rank=7)
+    }]
+
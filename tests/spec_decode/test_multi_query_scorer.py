@@ -0,0 +1,113 @@
+import pytest
+import torch
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.sequence import ExecuteModelRequest
+from vllm.spec_decode.batch_expansion import BatchExpansionTop1Scorer
+from vllm.spec_decode.interfaces import SpeculativeProposals
+from vllm.spec_decode.multi_query_scorer import MultiQueryTop1Scorer
+from vllm.worker.worker import Worker
+
+from .utils import (create_seq_group_metadata_from_prompts, create_worker,
+                    mock_worker)
+
+if should_skip_test_group(group_name="TEST_SPEC_DECODE"):
+    pytest.skip("TEST_SPEC_DECODE=DISABLE, skipping spec decode group",
+                allow_module_level=True)
+
+
+@pytest.mark.parametrize('k', [1, 2, 6])
+@pytest.mark.skip_global_cleanup
+def test_create_multi_query_seq_group_metadata(k: int):
+    """Verify a speculative sequence becomes a decode of its last token and
+    the k proposal tokens.
+    """
+    prompt_tokens = [1, 2, 3]
+    prev_output_tokens = [4, 5, 6]
+    token_ids = list(range(k))
+
+    num_tokens_processed = len(prompt_tokens) + len(prev_output_tokens) - 1
+    final_seq_len = len(prompt_tokens) + len(prev_output_tokens) + len(
+        token_ids)
+
+    block_size = 32
+    input_seq_group_metadata = create_seq_group_metadata_from_prompts(
+        [prompt_tokens], 2048 // block_size, block_size, [final_seq_len],
+        [prev_output_tokens], [num_tokens_processed])[0]
+    seq_id = list(input_seq_group_metadata.seq_data.keys())[0]
+
+    scorer = MultiQueryTop1Scorer(mock_worker(), 'cuda:0', 32_000)
+    output = scorer._create_multi_query_seq_group_metadata(
+        input_seq_group_metadata, token_ids)
+
+    assert not output.is_prompt
+    assert output.token_chunk_size == k + 1
+    assert output.request_id == input_seq_group_metadata.request_id
+    assert output.seq_data[seq_id].get_prompt_token_ids() == tuple(
+        prompt_tokens)
+    assert output.seq_data[seq_id].get_output_token_ids() == tuple(
+        prev_output_tokens + token_ids)
+    assert output.seq_data[seq_id].get_num_computed_tokens(
+    ) == num_tokens_processed
+    assert output.block_tables[
+        seq_id] == input_seq_group_metadata.block_tables[seq_id]
+
+
+@pytest.mark.parametrize('k', [1, 4])
+@pytest.mark.parametrize('batch_size', [1, 5])
+@torch.inference_mode()
+def test_multi_query_scores_match_batch_expansion(k: int, batch_size: int):
+    """Verify scoring the proposals as multi-token decodes gives the scores
+    of batch expansion, including for a sequence without proposals.
+    """
+    seed = 100
+    block_size = 16
+    num_gpu_blocks = 2048 // block_size
+    worker = create_worker(Worker, "JackFram/llama-68m", block_size,
+                           num_gpu_blocks, seed)
+    worker.model_runner.model.sampler.include_gpu_probs_tensor = True
+    worker.model_runner.model.sampler.should_modify_greedy_probs_inplace = (
+        True)
+    vocab_size = worker.vocab_size
+
+    prompts = [[7 + i] * (10 + 7 * i) for i in range(batch_size)]
+    first_tokens = [[11 + i] for i in range(batch_size)]
+    final_prompt_lens = [len(prompt) + k + 1 for prompt in prompts]
+
+    # Compute the KV of the prompts.
+    worker.execute_model(execute_model_req=ExecuteModelRequest(
+        seq_group_metadata_list=create_seq_group_metadata_from_prompts(
+            prompts, num_gpu_blocks, block_size, final_prompt_lens)))
+
+    proposal_token_ids = torch.randint(low=0,
+                                       high=vocab_size,
+                                       size=(batch_size, k),
+                                       dtype=torch.int64,
+                                       device='cuda')
+    proposal_lens = torch.full((batch_size, ), k, device='cuda')
+    if batch_size > 1:
+        proposal_token_ids[-1] = -1
+        proposal_lens[-1] = 0
+    proposals = SpeculativeProposals(
+        proposal_token_ids=proposal_token_ids,
+        proposal_probs=torch.zeros(batch_size, k, vocab_size, device='cuda'),
+        proposal_lens=proposal_lens)
+
+    scores = []
+    for scorer_cls in (BatchExpansionTop1Scorer, MultiQueryTop1Scorer):
+        scorer = scorer_cls(worker, 'cuda:0', vocab_size)
+        execute_model_req = ExecuteModelRequest(
+            seq_group_metadata_list=create_seq_group_metadata_from_prompts(
+                prompts, num_gpu_blocks, block_size, final_prompt_lens,
+                first_tokens),
+            num_lookahead_slots=k)
+        scores.append(scorer.score_proposals(execute_model_req, proposals))
+
+    expected, actual = scores
+    assert actual.token_ids.shape == expected.token_ids.shape
+    assert torch.allclose(actual.logprobs.exp(),
+                          expected.logprobs.exp(),
+                          atol=1e-3)
+    # Only the first position of a sequence without proposals is scored.
+    if batch_size > 1:
+        assert (actual.token_ids[-1, 1:] == -1).all()
@@ -3,7 +3,7 @@ import torch
 
 from tests.nm_utils.utils_skip import should_skip_test_group
 from vllm.sequence import ExecuteModelRequest
-from vllm.spec_decode.ngram_worker import NGramWorker
+from vllm.spec_decode.ngram_worker import NGramIndex, NGramWorker
 from vllm.spec_decode.top1_proposer import Top1Proposer
 
 from .utils import create_seq_group_metadata_from_prompts, create_worker
@@ -214,3 +214,48 @@ def test_ngram_algo_correctness_for_batches_match_all():
         assert proposals.proposal_token_ids[0][i] == prompts[0][i + 1]
         assert proposals.proposal_token_ids[1][i] == prompts[1][i + 3]
         assert proposals.proposal_token_ids[2][i] == prompts[2][i + 5]
+
+
+def test_ngram_index_incremental_update():
+    """Verify the n-gram index finds the same candidates when it is updated
+    with the tokens appended at each step as when it is built at once."""
+    ngram_index = NGramIndex(1, 3)
+    token_ids = [31, 32, 33, 34, 35, 36, 31]
+
+    ngram_index.update(token_ids)
+    assert ngram_index.propose(token_ids, 3) == [32, 33, 34]
+
+    # Appended tokens make a longer suffix match, and the proposal is
+    # clamped to the last token.
+    token_ids = token_ids + [32, 33, 34, 35, 36]
+    ngram_index.update(token_ids)
+    assert ngram_index.propose(token_ids, 3) == [31, 32, 33]
+
+    # The suffix does not match itself.
+    token_ids = [1, 2, 3]
+    ngram_index.update(token_ids)
+    assert ngram_index.propose(token_ids, 2) is None
+    token_ids = token_ids + [2, 3]
+    ngram_index.update(token_ids)
+    assert ngram_index.propose(token_ids, 2) == [2, 3]
+
+
+
+def test_ngram_index_branches():
+    """Verify the n-gram index proposes branches with distinct first tokens,
+    the first one being the single proposal."""
+    ngram_index = NGramIndex(1, 2, num_branches=3)
+    token_ids = [1, 2, 3, 4, 1, 2, 5, 6, 9, 2, 7, 8, 1, 2]
+    ngram_index.update(token_ids)
+
+    branches = ngram_index.propose_branches(token_ids, 2, 3)
+    assert branches[0] == ngram_index.propose(token_ids, 2)
+    assert len(branches) == 3
+    assert len({branch[0] for branch in branches}) == 3
+    assert sorted(branches) == [[3, 4], [5, 6], [7, 8]]
+
+    # The number of branches is bounded by the distinct continuations.
+    token_ids = [1, 2, 3, 1, 2]
+    ngram_index = NGramIndex(1, 2, num_branches=3)
+    ngram_index.update(token_ids)
+    assert ngram_index.propose_branches(token_ids, 1, 3) == [[3]]
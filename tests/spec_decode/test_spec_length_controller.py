@@ -0,0 +1,69 @@
+import random
+
+import pytest
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.spec_decode.spec_length_controller import (
+    SpeculationLengthController)
+
+if should_skip_test_group(group_name="TEST_SPEC_DECODE"):
+    pytest.skip("TEST_SPEC_DECODE=DISABLE, skipping spec decode group",
+                allow_module_level=True)
+
+
+def _step_time(batch_size: int, k: int) -> float:
+    # A fixed cost per step, per verified token and per proposal step.
+    return 0.01 + 0.0001 * batch_size * (k + 1) + 0.001 * k
+
+
+def _run(controller: SpeculationLengthController, acceptance_rate: float,
+         batch_size: int, max_k: int, num_steps: int) -> list:
+    chosen = []
+    for _ in range(num_steps):
+        k = controller.choose(batch_size=batch_size, max_k=max_k)
+        chosen.append(k)
+        num_accepted = []
+        for _ in range(batch_size):
+            n = 0
+            while n < k and random.random() < acceptance_rate:
+                n += 1
+            num_accepted.append(n)
+        controller.observe(batch_size=batch_size,
+                           k=k,
+                           num_accepted=num_accepted,
+                           step_time=_step_time(batch_size, k))
+    return chosen
+
+
+def test_uses_max_k_until_measured():
+    controller = SpeculationLengthController()
+    assert controller.choose(batch_size=8, max_k=5) == 5
+    assert controller.choose(batch_size=8, max_k=3) == 3
+
+
+def test_expected_num_tokens():
+    controller = SpeculationLengthController(initial_acceptance_rate=0.5)
+    assert controller.expected_num_tokens(0) == 1.0
+    assert controller.expected_num_tokens(2) == pytest.approx(1.75)
+
+    controller.observe(batch_size=2, k=4, num_accepted=[4, 4], step_time=1.0)
+    assert controller.acceptance_rate > 0.5
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_k_follows_acceptance_rate(seed: int):
+    random.seed(seed)
+    batch_size = 16
+    max_k = 5
+
+    controller = SpeculationLengthController(probe_interval=10)
+    chosen = _run(controller, 0.95, batch_size, max_k, num_steps=300)
+    assert controller.acceptance_rate == pytest.approx(0.95, abs=0.03)
+    assert sorted(chosen[-50:])[25] == max_k
+
+    # Speculation stops paying off once the drafts are mostly rejected.
+    chosen = _run(controller, 0.05, batch_size, max_k, num_steps=500)
+    assert controller.acceptance_rate < 0.2
+    assert sorted(chosen[-50:])[25] == 0
+    # The acceptance rate keeps being measured while speculation is off.
+    assert max(chosen[-50:]) > 0
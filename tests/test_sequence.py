@@ -1,6 +1,10 @@
+import copy
+import pickle
+
 import pytest
 
-from vllm.sequence import (CompletionSequenceGroupOutput, SamplerOutput,
+from vllm.sequence import (CompactLogprobs, CompletionSequenceGroupOutput,
+                           Logprob, LogprobsArray, SamplerOutput,
                            SequenceData, SequenceOutput)
 
 from .core.utils import create_dummy_prompt
@@ -95,3 +99,45 @@ def test_sequence_group_stage():
     assert seq_group.is_prefill() is True
     seq_group.update_num_computed_tokens(1)
     assert seq_group.is_prefill() is False
+
+
+def test_logprobs_array():
+    positions = [
+        None,
+        {
+            5: Logprob(-0.5, rank=2),
+            3: Logprob(-0.25, rank=1)
+        },
+        {
+            7: Logprob(float("-inf"))
+        },
+    ]
+    logprobs = LogprobsArray()
+    logprobs.extend(positions)
+
+    assert len(logprobs) == 3
+    assert logprobs == positions
+    assert logprobs[0] is None
+    assert isinstance(logprobs[1], CompactLogprobs)
+    assert list(logprobs[1]) == [5, 3]
+    assert logprobs[1][3] == Logprob(-0.25, rank=1)
+    assert logprobs[-1][7].rank is None
+    assert 7 not in logprobs[1]
+    with pytest.raises(KeyError):
+        logprobs[1][7]
+    assert logprobs[1:] == positions[1:]
+    assert copy.deepcopy(logprobs) == positions
+    assert pickle.loads(pickle.dumps(logprobs)) == positions
+
+    # The Logprob objects are created on access, so the decoded text is
+    # stored through the view.
+    logprobs[1].set_decoded_token(3, "a")
+    assert logprobs[1][3].decoded_token == "a"
+    assert logprobs[1][5].decoded_token is None
+
+    # Appending a view copies its entries, including the decoded text.
+    other = LogprobsArray()
+    other.append(logprobs[1])
+    assert other == positions[1:2]
+    assert other[0][3].decoded_token == "a"
+
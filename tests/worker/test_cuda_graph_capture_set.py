@@ -0,0 +1,70 @@
+import json
+import os
+
+import pytest
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.worker.cuda_graph_capture_set import CUDAGraphCaptureSet
+
+if should_skip_test_group(group_name="TEST_WORKER"):
+    pytest.skip("TEST_WORKER=DISABLE, skipping worker test group",
+                allow_module_level=True)
+
+BATCH_SIZES = [1, 2, 4, 8, 16, 24, 32]
+
+
+def test_select_without_history():
+    assert CUDAGraphCaptureSet(BATCH_SIZES).select() == BATCH_SIZES
+    assert CUDAGraphCaptureSet(BATCH_SIZES, lazy=True).select() == []
+
+
+def test_select_covers_most_steps():
+    capture_set = CUDAGraphCaptureSet(BATCH_SIZES, coverage=0.9)
+    capture_set.counts = {8: 60, 1: 25, 32: 10, 4: 5}
+    assert capture_set.select() == [1, 8, 32]
+    capture_set.coverage = 1.0
+    assert capture_set.select() == [1, 4, 8, 32]
+
+
+def test_persistence(tmp_path):
+    path = os.path.join(tmp_path, "capture_sets", "counts.json")
+    capture_set = CUDAGraphCaptureSet(BATCH_SIZES, path=path, save_interval=3)
+    capture_set.load()
+    assert capture_set.counts == {}
+
+    for batch_size in (8, 8, 16):
+        assert not capture_set.should_save()
+        capture_set.record(batch_size, hit=True)
+    assert capture_set.should_save()
+    capture_set.save()
+    assert not capture_set.should_save()
+    assert os.listdir(os.path.dirname(path)) == ["counts.json"]
+
+    # The counts of a previous run only keep the batch sizes that can still
+    # be captured.
+    loaded = CUDAGraphCaptureSet([1, 2, 4, 8], path=path)
+    loaded.load()
+    assert loaded.counts == {8: 2}
+    assert loaded.select() == [8]
+
+    with open(path, "w") as f:
+        json.dump({"counts": [8]}, f)
+    loaded.load()
+    assert loaded.counts == {}
+
+
+def test_lazy_capture():
+    capture_set = CUDAGraphCaptureSet(BATCH_SIZES,
+                                      lazy=True,
+                                      min_steps_to_capture=2)
+    capture_set.record(4, hit=False)
+    assert not capture_set.should_capture(4)
+    capture_set.record(8, hit=True)
+    capture_set.record(8, hit=True)
+    assert not capture_set.should_capture(8)
+    capture_set.record(4, hit=False)
+    assert capture_set.should_capture(4)
+    assert capture_set.counts == {4: 2, 8: 2}
+
+    capture_set.lazy = False
+    assert not capture_set.should_capture(4)
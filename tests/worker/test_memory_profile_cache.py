@@ -0,0 +1,96 @@
+import os
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from tests.nm_utils.utils_skip import should_skip_test_group
+from vllm.engine.arg_utils import EngineArgs
+from vllm.utils import get_distributed_init_method, get_ip, get_open_port
+from vllm.worker.memory_profile_cache import (MemoryProfile,
+                                              get_memory_profile_path,
+                                              load_memory_profile,
+                                              save_memory_profile)
+from vllm.worker.worker import Worker
+
+if should_skip_test_group(group_name="TEST_WORKER"):
+    pytest.skip("TEST_WORKER=DISABLE, skipping worker test group",
+                allow_module_level=True)
+
+
+def test_memory_profile_file(tmp_path):
+    path = os.path.join(tmp_path, "profiles", "profile.json")
+    assert load_memory_profile(path) is None
+
+    profile = MemoryProfile(peak_memory=3 << 30, activation_memory=1 << 30)
+    save_memory_profile(path, profile)
+    assert load_memory_profile(path) == profile
+    assert os.listdir(os.path.dirname(path)) == ["profile.json"]
+
+    with open(path, "w") as f:
+        f.write("{")
+    assert load_memory_profile(path) is None
+
+
+def test_speculative_memory_profile_path(tmp_path, monkeypatch):
+    """The scorer of speculative decoding is profiled with the draft model
+    loaded, so its profiles are not shared with other configurations."""
+    monkeypatch.setattr(
+        torch.cuda, "get_device_properties",
+        lambda device: SimpleNamespace(name="GPU", total_memory=80 << 30))
+
+    def profile_path(**speculative_args) -> str:
+        engine_config = EngineArgs(model="JackFram/llama-160m",
+                                   use_v2_block_manager=True,
+                                   **speculative_args).create_engine_config()
+        return get_memory_profile_path(
+            str(tmp_path), engine_config.model_config,
+            engine_config.parallel_config, engine_config.scheduler_config,
+            None, None, engine_config.speculative_config,
+            torch.device("cuda:0"), 0, "ModelRunner")
+
+    paths = [
+        profile_path(),
+        profile_path(speculative_model="JackFram/llama-68m",
+                     num_speculative_tokens=3),
+        profile_path(speculative_model="JackFram/llama-68m",
+                     num_speculative_tokens=5),
+    ]
+    assert len(set(paths)) == len(paths)
+    assert profile_path() == paths[0]
+
+
+def test_cached_memory_profile(tmp_path, monkeypatch):
+    monkeypatch.setenv("VLLM_MEMORY_PROFILE_CACHE_DIR", str(tmp_path))
+    engine_args = EngineArgs(model="facebook/opt-125m",
+                             dtype="half",
+                             load_format="dummy")
+    engine_config = engine_args.create_engine_config()
+    distributed_init_method = get_distributed_init_method(
+        get_ip(), get_open_port())
+    worker = Worker(
+        model_config=engine_config.model_config,
+        parallel_config=engine_config.parallel_config,
+        scheduler_config=engine_config.scheduler_config,
+        device_config=engine_config.device_config,
+        cache_config=engine_config.cache_config,
+        load_config=engine_config.load_config,
+        local_rank=0,
+        rank=0,
+        distributed_init_method=distributed_init_method,
+        is_driver_worker=True,
+    )
+    worker.init_device()
+    worker.load_model()
+
+    num_blocks = worker.determine_num_available_blocks()
+    assert len(os.listdir(tmp_path)) == 1
+    assert worker._memory_profile_to_verify is None
+
+    def profile_run():
+        raise AssertionError("The cached memory profile was not used.")
+
+    # A restart with the same configuration reuses the profile.
+    monkeypatch.setattr(worker.model_runner, "profile_run", profile_run)
+    assert worker.determine_num_available_blocks() == num_blocks
+    assert worker._memory_profile_to_verify is not None
@@ -384,3 +384,166 @@ def test_hybrid_batches(batch_size, enforce_eager, distributed_init):
     for attr_expected, attr_actual in zip(vars(attn_metadata.decode_metadata),
                                           vars(decode_meta_actual)):
         assert attr_expected[1] == attr_actual[1]
+
+
+@pytest.mark.parametrize("batch_size", [1, 3, 17, 64])
+@pytest.mark.parametrize("enforce_eager", [True, False])
+def test_prepare_decode_input_buffers(batch_size, enforce_eager):
+    model_runner = _create_model_runner(
+        "facebook/opt-125m",
+        seed=0,
+        dtype="float16",
+        enforce_eager=enforce_eager,
+        max_num_batched_tokens=100000,
+        max_num_seqs=100000,
+        enable_chunked_prefill=False,
+    )
+    assert model_runner.decode_input_buffers is not None
+    block_size = model_runner.block_size
+
+    seq_group_metadata_list: List[SequenceGroupMetadata] = []
+    for i in range(batch_size):
+        context_len = 7 * i + 1
+        seq_data = SequenceData(list(range(context_len)))
+        seq_data.update_num_computed_tokens(context_len)
+        seq_data.append_token_id(i, 0)
+        num_blocks = (context_len + 1 + block_size - 1) // block_size
+        seq_group_metadata_list.append(
+            SequenceGroupMetadata(
+                request_id=f"test_{i}",
+                is_prompt=False,
+                seq_data={0: seq_data},
+                sampling_params=SamplingParams(temperature=0),
+                block_tables={0: list(range(i * 100, i * 100 + num_blocks))},
+            ))
+
+    # Run the buffered path twice, so that the second run reuses the slots.
+    model_runner._prepare_model_input_tensors(seq_group_metadata_list[::-1])
+    actual = model_runner._prepare_model_input_tensors(
+        seq_group_metadata_list)
+    buffers = model_runner.decode_input_buffers
+    model_runner.decode_input_buffers = None
+    expected = model_runner._prepare_model_input_tensors(
+        seq_group_metadata_list)
+    model_runner.decode_input_buffers = buffers
+
+    assert actual.seq_lens == expected.seq_lens
+    assert actual.query_lens == expected.query_lens
+    assert actual.request_ids_to_seq_ids == expected.request_ids_to_seq_ids
+    torch.testing.assert_close(actual.input_tokens, expected.input_tokens)
+    torch.testing.assert_close(actual.input_positions,
+                               expected.input_positions)
+
+    actual_meta = actual.attn_metadata
+    expected_meta = expected.attn_metadata
+    for name in ("num_prefills", "num_prefill_tokens", "num_decode_tokens",
+                 "seq_lens", "max_query_len", "max_prefill_seq_len",
+                 "max_decode_seq_len", "use_cuda_graph"):
+        assert getattr(actual_meta, name) == getattr(expected_meta, name)
+    for name in ("slot_mapping", "seq_lens_tensor", "context_lens_tensor",
+                 "query_start_loc", "seq_start_loc"):
+        torch.testing.assert_close(getattr(actual_meta, name),
+                                   getattr(expected_meta, name),
+                                   check_dtype=False)
+    # Only the entries covered by each sequence's block table are read.
+    for i, seq_group_metadata in enumerate(seq_group_metadata_list):
+        block_table = seq_group_metadata.block_tables[0]
+        assert actual_meta.block_tables[i, :len(block_table)].tolist() == (
+            block_table)
+
+
+@pytest.mark.parametrize("use_input_buffers", [True, False])
+def test_prepare_decode_uncaptured_batch_size(use_input_buffers):
+    model_runner = _create_model_runner(
+        "facebook/opt-125m",
+        seed=0,
+        dtype="float16",
+        enforce_eager=False,
+        max_num_batched_tokens=100000,
+        max_num_seqs=100000,
+        enable_chunked_prefill=False,
+    )
+    if not use_input_buffers:
+        model_runner.decode_input_buffers = None
+    model_runner.cuda_graph_batch_sizes = {8}
+
+    def prepare(batch_size: int):
+        seq_group_metadata_list: List[SequenceGroupMetadata] = []
+        for i in range(batch_size):
+            seq_data = SequenceData(list(range(4)))
+            seq_data.update_num_computed_tokens(4)
+            seq_data.append_token_id(1, 0)
+            seq_group_metadata_list.append(
+                SequenceGroupMetadata(
+                    request_id=f"test_{i}",
+                    is_prompt=False,
+                    seq_data={0: seq_data},
+                    sampling_params=SamplingParams(temperature=0),
+                    block_tables={0: [1]},
+                ))
+        return model_runner._prepare_model_input_tensors(
+            seq_group_metadata_list)
+
+    # A batch size with a graph is padded.
+    model_input = prepare(5)
+    assert model_input.attn_metadata.use_cuda_graph
+    assert len(model_input.input_tokens) == 8
+
+    # The others run eagerly, without padding.
+    model_input = prepare(3)
+    assert not model_input.attn_metadata.use_cuda_graph
+    assert len(model_input.input_tokens) == 3
+
+
+def test_lazy_cuda_graph_capture(monkeypatch):
+    monkeypatch.setenv("VLLM_CUDA_GRAPH_LAZY_CAPTURE", "1")
+    model_runner = _create_model_runner(
+        "facebook/opt-125m",
+        seed=0,
+        dtype="float16",
+        enforce_eager=False,
+        max_num_batched_tokens=100000,
+        max_num_seqs=32,
+        enable_chunked_prefill=False,
+    )
+    capture_set = model_runner.graph_capture_set
+    assert capture_set.batch_sizes == [1, 2, 4, 8, 16, 24, 32]
+    assert capture_set.lazy
+    # Stand in for `capture_model`, which needs a GPU and a KV cache.
+    model_runner.cuda_graph_batch_sizes = set(capture_set.select())
+    model_runner._graph_capture_inputs = object()
+    captured: List[int] = []
+
+    def capture_graphs(batch_sizes: List[int]) -> None:
+        captured.extend(batch_sizes)
+        model_runner.cuda_graph_batch_sizes.update(batch_sizes)
+
+    monkeypatch.setattr(model_runner, "_capture_graphs", capture_graphs)
+
+    seq_group_metadata_list: List[SequenceGroupMetadata] = []
+    for i in range(6):
+        seq_data = SequenceData(list(range(4)))
+        seq_data.update_num_computed_tokens(4)
+        seq_data.append_token_id(1, 0)
+        seq_group_metadata_list.append(
+            SequenceGroupMetadata(
+                request_id=f"test_{i}",
+                is_prompt=False,
+                seq_data={0: seq_data},
+                sampling_params=SamplingParams(temperature=0),
+                block_tables={0: [1]},
+            ))
+
+    usages = []
+    for _ in range(capture_set.min_steps_to_capture + 1):
+        model_input = model_runner._prepare_model_input_tensors(
+            seq_group_metadata_list)
+        usages.append(model_runner._record_cuda_graph_usage(model_input))
+
+    # The steps run eagerly until the graph of the padded batch size is
+    # captured.
+    assert captured == [8]
+    assert [usage.batch_size for usage in usages] == [8] * len(usages)
+    assert [usage.hit for usage in usages
+            ] == [False] * capture_set.min_steps_to_capture + [True]
+    assert len(model_input.input_tokens) == 8
@@ -191,6 +191,14 @@ def gptq_shuffle(q_weight: torch.Tensor, q_perm: torch.Tensor,
     torch.ops._C.gptq_shuffle(q_weight, q_perm, bit)
 
 
+# cpu wna16
+def wna16_gemm(out: torch.Tensor, input: torch.Tensor, qweight: torch.Tensor,
+               scales: torch.Tensor, zeros: torch.Tensor, num_bits: int,
+               group_size: int) -> None:
+    torch.ops._C.wna16_gemm(out, input, qweight, scales, zeros, num_bits,
+                            group_size)
+
+
 # squeezellm
 def squeezellm_gemm(vec: torch.Tensor, mat: torch.Tensor, mul: torch.Tensor,
                     lookup_table: torch.Tensor) -> None:
@@ -8,6 +8,7 @@ from torch.nn.functional import scaled_dot_product_attention
 
 from vllm.attention.backends.abstract import (AttentionBackend, AttentionImpl,
                                               AttentionMetadata)
+from vllm.attention.ops.int8_paged_attn import Int8PagedAttention
 from vllm.attention.ops.paged_attn import PagedAttentionMetadata
 from vllm.utils import is_cpu
 
@@ -63,12 +64,19 @@ class TorchSDPABackend(AttentionBackend):
 @dataclass
 class TorchSDPAMetadata(AttentionMetadata, PagedAttentionMetadata):
     """Metadata for TorchSDPABackend.
+
+    A batch holds the prefills first, which may be chunks of prompts whose
+    first tokens are in the KV cache, and then the decodes.
     """
-    # Currently, input sequences can only contain all prompts
-    # or all decoding. True if all sequences are prompts.
+    # True if all sequences are prompts.
     is_prompt: bool
     slot_mapping: torch.Tensor
+    # The lengths of the prefills, then of the decodes.
     seq_lens: Optional[List[int]]
+    # (num_prefills,). The number of tokens of each prefill that are already
+    # in the KV cache, from prefix caching or the previous chunks. None if
+    # there are none.
+    context_lens: Optional[List[int]] = None
 
     def __post_init__(self):
         # Set during the execution of the first attention op.
@@ -76,25 +84,64 @@ class TorchSDPAMetadata(AttentionMetadata, PagedAttentionMetadata):
         # when alibi slopes is used. It is because of the limitation
         # from xformer API.
         # will not appear in the __repr__ and __init__
-        self.attn_bias: Optional[List[torch.Tensor]] = None
+        self.attn_bias: Optional[List[Optional[torch.Tensor]]] = None
+        self._cached_prefill_metadata: Optional[TorchSDPAMetadata] = None
+        self._cached_decode_metadata: Optional[TorchSDPAMetadata] = None
 
     @property
     def prefill_metadata(self) -> Optional["TorchSDPAMetadata"]:
-        # Currently chunked prefill is not supported
+        if self.num_prefills == 0:
+            return None
         if self.num_decode_tokens == 0:
-            assert self.num_prefills > 0
             return self
 
-        return None
+        if self._cached_prefill_metadata is not None:
+            return self._cached_prefill_metadata
+
+        assert self.seq_lens is not None
+        assert self.seq_lens_tensor is not None
+        assert self.block_tables is not None
+
+        self._cached_prefill_metadata = TorchSDPAMetadata(
+            is_prompt=True,
+            num_prefills=self.num_prefills,
+            num_prefill_tokens=self.num_prefill_tokens,
+            num_decode_tokens=0,
+            slot_mapping=self.slot_mapping[:self.num_prefill_tokens],
+            seq_lens=self.seq_lens[:self.num_prefills],
+            seq_lens_tensor=self.seq_lens_tensor[:self.num_prefills],
+            max_decode_seq_len=0,
+            block_tables=self.block_tables[:self.num_prefills],
+            context_lens=self.context_lens,
+        )
+        return self._cached_prefill_metadata
 
     @property
     def decode_metadata(self) -> Optional["TorchSDPAMetadata"]:
-        # Currently chunked prefill is not supported
-        if self.num_prefills > 0:
-            assert self.num_decode_tokens == 0
+        if self.num_decode_tokens == 0:
             return None
+        if self.num_prefills == 0:
+            return self
 
-        return self
+        if self._cached_decode_metadata is not None:
+            return self._cached_decode_metadata
+
+        assert self.seq_lens is not None
+        assert self.seq_lens_tensor is not None
+        assert self.block_tables is not None
+
+        self._cached_decode_metadata = TorchSDPAMetadata(
+            is_prompt=False,
+            num_prefills=0,
+            num_prefill_tokens=0,
+            num_decode_tokens=self.num_decode_tokens,
+            slot_mapping=self.slot_mapping[self.num_prefill_tokens:],
+            seq_lens=self.seq_lens[self.num_prefills:],
+            seq_lens_tensor=self.seq_lens_tensor[self.num_prefills:],
+            max_decode_seq_len=self.max_decode_seq_len,
+            block_tables=self.block_tables[self.num_prefills:],
+        )
+        return self._cached_decode_metadata
 
 
 class TorchSDPABackendImpl(AttentionImpl[TorchSDPAMetadata]):
@@ -132,10 +179,13 @@ class TorchSDPABackendImpl(AttentionImpl[TorchSDPAMetadata]):
             raise ValueError(
                 f"Head size {head_size} is not supported by PagedAttention. "
                 f"Supported head sizes are: {supported_head_sizes}.")
-        if kv_cache_dtype != "auto":
+        if kv_cache_dtype not in ("auto", "int8"):
             raise NotImplementedError(
                 "Torch SDPA backend does not support FP8 KV cache. "
-                "Please use xFormers backend instead.")
+                "Please use the int8 KV cache instead.")
+        # The int8 KV cache is only supported by the kernels of vLLM.
+        self.paged_attn = (Int8PagedAttention
+                           if kv_cache_dtype == "int8" else PagedAttention)
 
     def forward(
         self,
@@ -165,70 +215,46 @@ class TorchSDPABackendImpl(AttentionImpl[TorchSDPAMetadata]):
         value = value.view(-1, self.num_kv_heads, self.head_size)
 
         if kv_cache is not None:
-            key_cache, value_cache = PagedAttention.split_kv_cache(
+            key_cache, value_cache = self.paged_attn.split_kv_cache(
                 kv_cache, self.num_kv_heads, self.head_size)
-            PagedAttention.write_to_paged_cache(key, value, key_cache,
-                                                value_cache,
-                                                attn_metadata.slot_mapping,
-                                                self.kv_cache_dtype, kv_scale)
-
-        if attn_metadata.is_prompt:
-            assert attn_metadata.seq_lens is not None
-            if (kv_cache is None or attn_metadata.block_tables.numel() == 0):
-                if self.num_kv_heads != self.num_heads:
-                    key = key.repeat_interleave(self.num_queries_per_kv, dim=1)
-                    value = value.repeat_interleave(self.num_queries_per_kv,
-                                                    dim=1)
-
-                if attn_metadata.attn_bias is None:
-                    if self.alibi_slopes is not None:
-                        att_masks = _make_alibi_bias(
-                            self.alibi_slopes, query.dtype,
-                            attn_metadata.seq_lens)  # type: ignore
-                    elif self.sliding_window is not None:
-                        att_masks = _make_sliding_window_bias(
-                            attn_metadata.seq_lens, self.sliding_window,
-                            query.dtype)  # type: ignore
-                    else:
-                        att_masks = [None] * len(attn_metadata.seq_lens)
-                    attn_metadata.attn_bias = att_masks
-
-                query = query.movedim(0, query.dim() - 2)
-                key = key.movedim(0, key.dim() - 2)
-                value = value.movedim(0, value.dim() - 2)
-
-                start = 0
-                output = torch.empty(
-                    (num_tokens, self.num_heads, self.head_size),
-                    dtype=query.dtype)
-                for seq_len, mask in zip(attn_metadata.seq_lens,
-                                         attn_metadata.attn_bias):
-                    end = start + seq_len
-                    sub_out = scaled_dot_product_attention(
-                        query[None, :, start:end, :],
-                        key[None, :, start:end, :],
-                        value[None, :, start:end, :],
-                        attn_mask=mask,
-                        dropout_p=0.0,
-                        is_causal=not self.need_mask,
-                        scale=self.scale).squeeze(0).movedim(
-                            query.dim() - 2, 0)
-                    output[start:end, :, :] = sub_out
-                    start = end
+            self.paged_attn.write_to_paged_cache(key, value, key_cache,
+                                                 value_cache,
+                                                 attn_metadata.slot_mapping,
+                                                 self.kv_cache_dtype, kv_scale)
+
+        output = torch.empty((num_tokens, self.num_heads, self.head_size),
+                             dtype=query.dtype)
+        num_prefill_tokens = attn_metadata.num_prefill_tokens
+
+        if prefill_meta := attn_metadata.prefill_metadata:
+            assert prefill_meta.seq_lens is not None
+            prefill_query = query[:num_prefill_tokens]
+            prefill_key = key[:num_prefill_tokens]
+            prefill_value = value[:num_prefill_tokens]
+            if (kv_cache is None or prefill_meta.context_lens is None
+                    or not any(prefill_meta.context_lens)):
+                output[:num_prefill_tokens] = self._run_sdpa_prefill(
+                    prefill_query, prefill_key, prefill_value, prefill_meta)
             else:
-                # prefix-enabled attention
-                raise RuntimeError(
-                    "Torch SDPA backend doesn't support prefix decoding.")
-
-        else:
+                # Prefix-enabled attention: the chunks attend to the tokens
+                # of their sequence in the KV cache too.
+                kv_scales = None
+                if self.kv_cache_dtype == "int8":
+                    kv_scales = Int8PagedAttention.split_kv_cache_scales(
+                        kv_cache, self.num_kv_heads, self.head_size)
+                output[:num_prefill_tokens] = self._run_sdpa_prefix_prefill(
+                    prefill_query, prefill_key, prefill_value, key_cache,
+                    value_cache, kv_scales, prefill_meta)
+
+        if decode_meta := attn_metadata.decode_metadata:
             # Decoding run.
-            output = PagedAttention.forward_decode(
-                query,
+            output[num_prefill_tokens:] = self.paged_attn.forward_decode(
+                query[num_prefill_tokens:],
                 key_cache,
                 value_cache,
-                attn_metadata.block_tables,
-                attn_metadata.seq_lens_tensor,
-                attn_metadata.max_decode_seq_len,
+                decode_meta.block_tables,
+                decode_meta.seq_lens_tensor,
+                decode_meta.max_decode_seq_len,
                 self.kv_cache_dtype,
                 self.num_kv_heads,
                 self.scale,
@@ -239,6 +265,172 @@ class TorchSDPABackendImpl(AttentionImpl[TorchSDPAMetadata]):
         # Reshape the output tensor.
         return output.view(-1, self.num_heads * self.head_size)
 
+    def _run_sdpa_prefill(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor,
+        value: torch.Tensor,
+        attn_metadata: TorchSDPAMetadata,
+    ) -> torch.Tensor:
+        """Attention of whole prompts, which only attend to themselves."""
+        assert attn_metadata.seq_lens is not None
+        num_tokens = query.shape[0]
+        if self.num_kv_heads != self.num_heads:
+            key = key.repeat_interleave(self.num_queries_per_kv, dim=1)
+            value = value.repeat_interleave(self.num_queries_per_kv, dim=1)
+
+        if attn_metadata.attn_bias is None:
+            if self.alibi_slopes is not None:
+                att_masks = _make_alibi_bias(
+                    self.alibi_slopes, query.dtype,
+                    attn_metadata.seq_lens)  # type: ignore
+            elif self.sliding_window is not None:
+                att_masks = _make_sliding_window_bias(
+                    attn_metadata.seq_lens, self.sliding_window,
+                    query.dtype)  # type: ignore
+            else:
+                att_masks = [None] * len(attn_metadata.seq_lens)
+            attn_metadata.attn_bias = att_masks
+
+        query = query.movedim(0, query.dim() - 2)
+        key = key.movedim(0, key.dim() - 2)
+        value = value.movedim(0, value.dim() - 2)
+
+        start = 0
+        output = torch.empty((num_tokens, self.num_heads, self.head_size),
+                             dtype=query.dtype)
+        for seq_len, mask in zip(attn_metadata.seq_lens,
+                                 attn_metadata.attn_bias):
+            end = start + seq_len
+            sub_out = scaled_dot_product_attention(
+                query[None, :, start:end, :],
+                key[None, :, start:end, :],
+                value[None, :, start:end, :],
+                attn_mask=mask,
+                dropout_p=0.0,
+                is_causal=not self.need_mask,
+                scale=self.scale).squeeze(0).movedim(query.dim() - 2, 0)
+            output[start:end, :, :] = sub_out
+            start = end
+        return output
+
+    def _run_sdpa_prefix_prefill(
+        self,
+        query: torch.Tensor,
+        key: torch.Tensor,
+        value: torch.Tensor,
+        key_cache: torch.Tensor,
+        value_cache: torch.Tensor,
+        kv_scales: Optional[Tuple[torch.Tensor, torch.Tensor]],
+        attn_metadata: TorchSDPAMetadata,
+    ) -> torch.Tensor:
+        """Attention of prompt chunks, which attend to the cached tokens of
+        their sequence and causally to themselves."""
+        assert attn_metadata.seq_lens is not None
+        assert attn_metadata.context_lens is not None
+        assert attn_metadata.block_tables is not None
+        if attn_metadata.attn_bias is None:
+            attn_metadata.attn_bias = [
+                _make_prefix_bias(context_len, seq_len, self.alibi_slopes,
+                                  self.sliding_window, query.dtype)
+                for seq_len, context_len in zip(attn_metadata.seq_lens,
+                                                attn_metadata.context_lens)
+            ]
+
+        start = 0
+        output = torch.empty_like(query)
+        for i, (seq_len, context_len, mask) in enumerate(
+                zip(attn_metadata.seq_lens, attn_metadata.context_lens,
+                    attn_metadata.attn_bias)):
+            end = start + seq_len - context_len
+            sub_key = key[start:end]
+            sub_value = value[start:end]
+            if context_len > 0:
+                cached_key, cached_value = _gather_cached_kv(
+                    key_cache, value_cache, attn_metadata.block_tables[i],
+                    context_len, kv_scales, query.dtype)
+                sub_key = torch.cat([cached_key, sub_key])
+                sub_value = torch.cat([cached_value, sub_value])
+            if self.num_kv_heads != self.num_heads:
+                sub_key = sub_key.repeat_interleave(self.num_queries_per_kv,
+                                                    dim=1)
+                sub_value = sub_value.repeat_interleave(
+                    self.num_queries_per_kv, dim=1)
+            sub_out = scaled_dot_product_attention(
+                query[start:end].movedim(0, 1)[None],
+                sub_key.movedim(0, 1)[None],
+                sub_value.movedim(0, 1)[None],
+                attn_mask=mask,
+                dropout_p=0.0,
+                scale=self.scale).squeeze(0).movedim(0, 1)
+            output[start:end] = sub_out
+            start = end
+        return output
+
+
+def _gather_cached_kv(
+    key_cache: torch.Tensor,
+    value_cache: torch.Tensor,
+    block_table: torch.Tensor,
+    num_tokens: int,
+    kv_scales: Optional[Tuple[torch.Tensor, torch.Tensor]] = None,
+    dtype: Optional[torch.dtype] = None,
+) -> Tuple[torch.Tensor, torch.Tensor]:
+    """Gather the first `num_tokens` keys and values of a sequence from the
+    paged cache, as [num_tokens, num_kv_heads, head_size] tensors.
+
+    The keys and values of an int8 cache are dequantized to `dtype` with
+    their [num_blocks, num_kv_heads, block_size] scales `kv_scales`.
+    """
+    num_kv_heads = value_cache.shape[1]
+    if key_cache.dim() == 5:
+        # [num_blocks, num_kv_heads, head_size // x, block_size, x] and
+        # [num_blocks, num_kv_heads, head_size, block_size].
+        block_size = key_cache.shape[3]
+        block_ids = block_table[:(num_tokens + block_size - 1) //
+                                block_size].long()
+        keys = key_cache[block_ids].permute(0, 3, 1, 2, 4)
+        values = value_cache[block_ids].permute(0, 3, 1, 2)
+    else:
+        # [num_blocks, num_kv_heads, block_size, head_size].
+        block_size = key_cache.shape[2]
+        block_ids = block_table[:(num_tokens + block_size - 1) //
+                                block_size].long()
+        keys = key_cache[block_ids].permute(0, 2, 1, 3)
+        values = value_cache[block_ids].permute(0, 2, 1, 3)
+    head_size = values.shape[-1]
+    keys = keys.reshape(-1, num_kv_heads, head_size)[:num_tokens]
+    values = values.reshape(-1, num_kv_heads, head_size)[:num_tokens]
+    if kv_scales is not None:
+        # [num_tokens, num_kv_heads, 1].
+        key_scales, value_scales = (scales[block_ids].transpose(1, 2).reshape(
+            -1, num_kv_heads, 1)[:num_tokens] for scales in kv_scales)
+        keys = (keys.to(torch.float32) * key_scales).to(dtype)
+        values = (values.to(torch.float32) * value_scales).to(dtype)
+    return keys, values
+
+
+def _make_prefix_bias(
+    context_len: int,
+    seq_len: int,
+    alibi_slopes: Optional[torch.Tensor],
+    sliding_window: Optional[int],
+    dtype: torch.dtype,
+) -> torch.Tensor:
+    """The bias of the tokens [context_len, seq_len) of a sequence over its
+    tokens [0, seq_len)."""
+    query_positions = torch.arange(context_len, seq_len)[:, None]
+    key_positions = torch.arange(seq_len)[None, :]
+    allowed = key_positions <= query_positions
+    if sliding_window is not None:
+        allowed &= query_positions - key_positions < sliding_window
+    bias = torch.zeros(allowed.shape,
+                       dtype=torch.float32).masked_fill_(~allowed, -torch.inf)
+    if alibi_slopes is not None:
+        distances = (key_positions - query_positions).to(torch.float32)
+        bias = bias[None] + alibi_slopes[:, None, None] * distances[None]
+    return bias.to(dtype)
+
 
 def _make_alibi_bias(
     alibi_slopes: torch.Tensor,
@@ -0,0 +1,68 @@
+from typing import Tuple
+
+import torch
+
+from vllm.attention.ops.paged_attn import PagedAttention
+
+# The number of elements of a key that are contiguous in the int8 key cache,
+# whatever the dtype of the model.
+_X = 8
+# The size in bytes of the float scale of a token and kv head.
+_SCALE_SIZE = 4
+
+
+class Int8PagedAttention(PagedAttention):
+    """PagedAttention over an int8 KV cache, only implemented by the CPU
+    kernels.
+
+    Each block of the key (value) cache holds the int8 keys
+    [num_kv_heads, head_size // x, block_size, x] (values
+    [num_kv_heads, head_size, block_size]) of its tokens, followed by their
+    float32 scales [num_kv_heads, block_size]. The key and value of a token
+    and kv head are quantized symmetrically with their own scale when they
+    are written, so the other tokens of the block are never requantized.
+    """
+
+    @staticmethod
+    def get_kv_cache_shape(
+        num_blocks: int,
+        block_size: int,
+        num_kv_heads: int,
+        head_size: int,
+    ) -> Tuple[int, ...]:
+        return (2, num_blocks,
+                block_size * num_kv_heads * (head_size + _SCALE_SIZE))
+
+    @staticmethod
+    def split_kv_cache(
+        kv_cache: torch.Tensor,
+        num_kv_heads: int,
+        head_size: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        num_blocks = kv_cache.shape[1]
+        num_elems = kv_cache.shape[2] // (head_size + _SCALE_SIZE) * head_size
+
+        key_cache = kv_cache[0, :, :num_elems]
+        key_cache = key_cache.view(num_blocks, num_kv_heads, head_size // _X,
+                                   -1, _X)
+        value_cache = kv_cache[1, :, :num_elems]
+        value_cache = value_cache.view(num_blocks, num_kv_heads, head_size,
+                                       -1)
+        return key_cache, value_cache
+
+    @staticmethod
+    def split_kv_cache_scales(
+        kv_cache: torch.Tensor,
+        num_kv_heads: int,
+        head_size: int,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Returns the [num_blocks, num_kv_heads, block_size] scales of the
+        keys and values in the cache."""
+        num_blocks = kv_cache.shape[1]
+        num_elems = kv_cache.shape[2] // (head_size + _SCALE_SIZE) * head_size
+
+        key_scales = kv_cache[0, :, num_elems:].view(torch.float32)
+        key_scales = key_scales.view(num_blocks, num_kv_heads, -1)
+        value_scales = kv_cache[1, :, num_elems:].view(torch.float32)
+        value_scales = value_scales.view(num_blocks, num_kv_heads, -1)
+        return key_scales, value_scales
@@ -8,7 +8,8 @@ from transformers import PretrainedConfig
 
 import vllm.envs as envs
 from vllm.logger import init_logger
-from vllm.model_executor.layers.quantization import QUANTIZATION_METHODS
+from vllm.model_executor.layers.quantization import (
+    QUANTIZATION_METHODS, get_override_quantization_configs)
 from vllm.model_executor.models import ModelRegistry
 from vllm.tracing import is_otel_installed
 from vllm.transformers_utils.config import get_config, get_hf_text_config
@@ -233,6 +234,7 @@ class ModelConfig:
     def _verify_quantization(self) -> None:
         supported_quantization = [*QUANTIZATION_METHODS]
         rocm_supported_quantization = ["gptq", "squeezellm"]
+        cpu_supported_quantization = ["cpu_wna16"]
         if self.quantization is not None:
             self.quantization = self.quantization.lower()
 
@@ -243,7 +245,7 @@ class ModelConfig:
             quant_method = quant_cfg.get("quant_method", "").lower()
 
             # Detect which checkpoint is it
-            for _, method in QUANTIZATION_METHODS.items():
+            for method in get_override_quantization_configs():
                 quantization_override = method.override_quantization_method(
                     quant_cfg, self.quantization)
                 if quantization_override:
@@ -271,8 +273,12 @@ class ModelConfig:
                 raise ValueError(
                     f"{self.quantization} quantization is currently not "
                     f"supported in ROCm.")
-            if (self.quantization
-                    not in ("fp8", "marlin", "gptq_marlin_24", "gptq_marlin")):
+            if is_cpu() != (self.quantization in cpu_supported_quantization):
+                raise ValueError(
+                    f"{self.quantization} quantization is currently not "
+                    f"supported on {'CPU' if is_cpu() else 'GPU'}.")
+            if (self.quantization not in ("fp8", "marlin", "gptq_marlin_24",
+                                          "gptq_marlin", "cpu_wna16")):
                 logger.warning(
                     "%s quantization is not fully "
                     "optimized yet. The speed can be slower than "
@@ -502,6 +508,14 @@ class CacheConfig:
                 "memory footprint and boosts the performance. "
                 "Meanwhile, it may cause accuracy drop without a proper "
                 "scaling factor")
+        elif self.cache_dtype == "int8":
+            if not is_cpu():
+                raise ValueError(
+                    "int8 kv cache is only supported by the CPU backend.")
+            logger.info(
+                "Using int8 data type to store kv cache. It halves the "
+                "memory footprint and bandwidth of the kv cache of a 16-bit "
+                "model, with a scale per token and head.")
         else:
             raise ValueError(f"Unknown kv cache dtype: {self.cache_dtype}")
 
@@ -598,6 +612,7 @@ class LoadFormat(str, enum.Enum):
     TENSORIZER = "tensorizer"
     SHARDED_STATE = "sharded_state"
     BITSANDBYTES = "bitsandbytes"
+    FASTLOAD = "fastload"
 
 
 @dataclass
@@ -617,6 +632,8 @@ class LoadConfig:
                 mainly for profiling.
             "tensorizer" will use CoreWeave's tensorizer library for
                 fast weight loading.
+            "fastload" will map the per-worker, post-processed state saved
+                by `examples/save_fastload_state.py`.
     """
 
     load_format: Union[str, LoadFormat, "BaseModelLoader"] = LoadFormat.AUTO
@@ -909,6 +926,9 @@ class SpeculativeConfig:
         draft_token_acceptance_method: str,
         typical_acceptance_sampler_posterior_threshold: Optional[float],
         typical_acceptance_sampler_posterior_alpha: Optional[float],
+        adaptive_num_speculative_tokens: bool = False,
+        num_speculative_branches: int = 1,
+        multi_query_scoring: bool = False,
     ) -> Optional["SpeculativeConfig"]:
         """Create a SpeculativeConfig if possible, else return None.
 
@@ -958,6 +978,15 @@ class SpeculativeConfig:
             typical_acceptance_sampler_posterior_alpha (Optional[float]):
                 A scaling factor for the entropy-based threshold in the
                 TypicalAcceptanceSampler.
+            adaptive_num_speculative_tokens (bool): Whether the number of
+                speculative tokens of each step is chosen from the measured
+                acceptance rate and step times, up to num_speculative_tokens.
+            num_speculative_branches (int): The number of alternative
+                proposals of each sequence that are verified in the same
+                forward pass. Only supported by ngram speculation.
+            multi_query_scoring (bool): Whether the proposal tokens of each
+                sequence are scored as a single decode of several tokens,
+                instead of by batch expansion.
     
         Returns:
             Optional["SpeculativeConfig"]: An instance of SpeculativeConfig if
@@ -1083,6 +1112,9 @@ class SpeculativeConfig:
                 typical_acceptance_sampler_posterior_threshold,
             typical_acceptance_sampler_posterior_alpha=\
                 typical_acceptance_sampler_posterior_alpha,
+            adaptive_num_speculative_tokens=adaptive_num_speculative_tokens,
+            num_speculative_branches=num_speculative_branches,
+            multi_query_scoring=multi_query_scoring,
         )
 
     @staticmethod
@@ -1167,6 +1199,9 @@ class SpeculativeConfig:
         draft_token_acceptance_method: str,
         typical_acceptance_sampler_posterior_threshold: float,
         typical_acceptance_sampler_posterior_alpha: float,
+        adaptive_num_speculative_tokens: bool = False,
+        num_speculative_branches: int = 1,
+        multi_query_scoring: bool = False,
     ):
         """Create a SpeculativeConfig object.
 
@@ -1193,6 +1228,14 @@ class SpeculativeConfig:
             typical_acceptance_sampler_posterior_alpha (Optional[float]):
                 A scaling factor for the entropy-based threshold in the
                 TypicalAcceptanceSampler.
+            adaptive_num_speculative_tokens: Whether the number of
+                speculative tokens of each step is chosen from the measured
+                acceptance rate and step times, up to num_speculative_tokens.
+            num_speculative_branches: The number of alternative proposals of
+                each sequence that are verified in the same forward pass.
+            multi_query_scoring: Whether the proposal tokens of each
+                sequence are scored as a single decode of several tokens,
+                instead of by batch expansion.
         """
         self.draft_model_config = draft_model_config
         self.draft_parallel_config = draft_parallel_config
@@ -1206,6 +1249,9 @@ class SpeculativeConfig:
             typical_acceptance_sampler_posterior_threshold
         self.typical_acceptance_sampler_posterior_alpha = \
             typical_acceptance_sampler_posterior_alpha
+        self.adaptive_num_speculative_tokens = adaptive_num_speculative_tokens
+        self.num_speculative_branches = num_speculative_branches
+        self.multi_query_scoring = multi_query_scoring
 
         self._verify_args()
 
@@ -1243,6 +1289,21 @@ class SpeculativeConfig:
                 f"typical_acceptance_sampler_posterior_alpha = "
                 f"{self.typical_acceptance_sampler_posterior_alpha}")
 
+        if self.num_speculative_branches < 1:
+            raise ValueError("Expected num_speculative_branches to be at "
+                             f"least one ({self.num_speculative_branches}).")
+
+        if (self.num_speculative_branches > 1
+                and self.ngram_prompt_lookup_max == 0):
+            raise ValueError(
+                "num_speculative_branches > 1 is only supported with ngram "
+                "speculation (speculative_model=[ngram]).")
+
+        if self.multi_query_scoring and self.num_speculative_branches > 1:
+            raise ValueError(
+                "Multi-query scoring does not support "
+                "num_speculative_branches > 1.")
+
     @property
     def num_lookahead_slots(self) -> int:
         """The number of additional slots the scheduler should allocate per
@@ -1273,6 +1334,11 @@ class LoRAConfig:
     # This is a constant.
     lora_vocab_padding_size: ClassVar[int] = 256
     long_lora_scaling_factors: Optional[Tuple[float]] = None
+    # "fcfs" admits waiting requests in arrival order. "affinity" prefers
+    # requests whose LoRA is already in a GPU slot, but never delays a
+    # request by more than lora_affinity_max_wait seconds.
+    lora_scheduling_policy: str = "fcfs"
+    lora_affinity_max_wait: float = 2.0
 
     def __post_init__(self):
         # Keep this in sync with csrc/punica/bgmv/bgmv_config.h
@@ -1288,6 +1354,14 @@ class LoRAConfig:
                 f"must be one of {possible_lora_extra_vocab_size}.")
         if self.max_loras < 1:
             raise ValueError(f"max_loras ({self.max_loras}) must be >= 1.")
+        if self.lora_scheduling_policy not in ("fcfs", "affinity"):
+            raise ValueError(
+                "lora_scheduling_policy must be 'fcfs' or 'affinity', got "
+                f"{self.lora_scheduling_policy!r}.")
+        if self.lora_affinity_max_wait < 0:
+            raise ValueError(
+                f"lora_affinity_max_wait ({self.lora_affinity_max_wait}) "
+                "must be >= 0.")
         if self.max_cpu_loras is None:
             self.max_cpu_loras = self.max_loras
         elif self.max_cpu_loras < self.max_loras:
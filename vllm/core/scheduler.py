@@ -2,9 +2,10 @@ import enum
 import os
 import random
 import time
-from collections import deque
+from collections import OrderedDict, deque
 from dataclasses import dataclass, field
-from typing import Deque, Dict, Iterable, List, Optional, Set, Tuple, Union
+from typing import (Callable, Deque, Dict, Iterable, List, Optional, Set,
+                    Tuple, Union)
 
 from vllm.config import CacheConfig, LoRAConfig, SchedulerConfig
 from vllm.core.interfaces import AllocStatus, BlockSpaceManager
@@ -130,6 +131,9 @@ class SchedulerOutputs:
     # The number of requests in the running queue
     running_queue_size: int
     preempted: int
+    # The number of LoRAs that have to be moved into a GPU slot, evicting
+    # another LoRA, to run this batch.
+    num_lora_slot_swaps: int = 0
 
     def __post_init__(self):
         # Swap in and swap out should never happen at the same time.
@@ -257,6 +261,7 @@ class Scheduler:
         cache_config: CacheConfig,
         lora_config: Optional[LoRAConfig],
         pipeline_parallel_size: int = 1,
+        lora_ready_fn: Optional[Callable[[int], bool]] = None,
     ) -> None:
         self.scheduler_config = scheduler_config
         self.cache_config = cache_config
@@ -264,6 +269,14 @@ class Scheduler:
         # simple and NOT fair. It can lead to starvation of some
         # LoRAs. This should be improved in the future.
         self.lora_config = lora_config
+        # Returns False while a LoRA is still being loaded in the background.
+        # Waiting requests for such LoRAs are skipped instead of stalling the
+        # step that would load it.
+        self.lora_ready_fn = lora_ready_fn
+        # Mirror of the LRU ordered LoRAs that occupy the GPU slots of the
+        # workers. Used to count slot swaps and, with the affinity policy, to
+        # prefer requests whose LoRA is already active.
+        self._active_loras: OrderedDict[int, None] = OrderedDict()
 
         version = "v1"
         if self.scheduler_config.use_v2_block_manager:
@@ -324,6 +337,11 @@ class Scheduler:
     def lora_enabled(self) -> bool:
         return bool(self.lora_config)
 
+    @property
+    def lora_affinity_enabled(self) -> bool:
+        return (self.lora_config is not None
+                and self.lora_config.lora_scheduling_policy == "affinity")
+
     @property
     def num_decoding_tokens_per_seq(self) -> int:
         """The number of new tokens."""
@@ -666,6 +684,13 @@ class Scheduler:
         # We don't sort waiting queue because we assume it is sorted.
         # Copy the queue so that the input queue is not modified.
         waiting_queue = deque([s for s in waiting_queue])
+        arrival_order = waiting_queue
+        if self.lora_affinity_enabled:
+            assert curr_loras is not None
+            # Only this pass sees the reordered queue. The remaining queue
+            # keeps the arrival order, which the reordering relies on.
+            waiting_queue = self._order_by_lora_affinity(
+                arrival_order, curr_loras)
 
         leftover_waiting_sequences: Deque[SequenceGroup] = deque()
         while self._passed_delay(time.time()) and waiting_queue:
@@ -721,6 +746,14 @@ class Scheduler:
                     leftover_waiting_sequences.appendleft(seq_group)
                     waiting_queue.popleft()
                     continue
+                if (lora_int_id > 0 and lora_int_id not in curr_loras
+                        and self.lora_ready_fn is not None
+                        and not self.lora_ready_fn(lora_int_id)):
+                    # The LoRA is still loading, so we skip this request
+                    # for now.
+                    leftover_waiting_sequences.appendleft(seq_group)
+                    waiting_queue.popleft()
+                    continue
 
             num_new_seqs = seq_group.get_max_num_running_seqs()
             if (num_new_tokens == 0
@@ -741,6 +774,11 @@ class Scheduler:
 
         # Queue requests that couldn't be scheduled.
         waiting_queue.extendleft(leftover_waiting_sequences)
+        if waiting_queue is not arrival_order:
+            removed = set(s.seq_group.request_id for s in seq_groups)
+            removed.update(s.request_id for s in ignored_seq_groups)
+            waiting_queue = deque(s for s in arrival_order
+                                  if s.request_id not in removed)
         if len(seq_groups) > 0:
             self.prev_prompt = True
 
@@ -749,6 +787,53 @@ class Scheduler:
             ignored_seq_groups=ignored_seq_groups,
             num_lookahead_slots=self._get_num_lookahead_slots(is_prefill=True))
 
+    def _order_by_lora_affinity(
+            self, waiting_queue: Deque[SequenceGroup],
+            curr_loras: Set[int]) -> Deque[SequenceGroup]:
+        """Move waiting requests whose LoRA would evict another LoRA from
+        its GPU slot behind the requests that can run without a swap.
+
+        Requests that have waited for longer than `lora_affinity_max_wait`
+        seconds keep their place in the waiting queue, which is in arrival
+        order, so they rank ahead of every later arrival and a cold LoRA is
+        not starved.
+        """
+        assert self.lora_config is not None
+        max_loras = self.lora_config.max_loras
+        max_wait = self.lora_config.lora_affinity_max_wait
+        now = time.time()
+        warm: Deque[SequenceGroup] = deque()
+        cold: Deque[SequenceGroup] = deque()
+        for seq_group in waiting_queue:
+            lora_int_id = seq_group.lora_int_id
+            if (lora_int_id == 0 or lora_int_id in curr_loras
+                    or lora_int_id in self._active_loras
+                    or len(self._active_loras) < max_loras
+                    or now - seq_group.metrics.arrival_time >= max_wait):
+                warm.append(seq_group)
+            else:
+                cold.append(seq_group)
+        warm.extend(cold)
+        return warm
+
+    def _update_active_loras(self,
+                             scheduler_outputs: SchedulerOutputs) -> int:
+        """Apply the LoRAs of a scheduled batch to the mirror of the GPU
+        slots, the same way the workers' LRU cache does, and return the number
+        of slot swaps."""
+        assert self.lora_config is not None
+        num_swaps = 0
+        for lora_request in scheduler_outputs.lora_requests:
+            lora_int_id = lora_request.lora_int_id
+            if lora_int_id in self._active_loras:
+                self._active_loras.move_to_end(lora_int_id)
+                continue
+            if len(self._active_loras) >= self.lora_config.max_loras:
+                self._active_loras.popitem(last=False)
+                num_swaps += 1
+            self._active_loras[lora_int_id] = None
+        return num_swaps
+
     def _schedule_default(self) -> SchedulerOutputs:
         """Schedule queued requests.
         
@@ -964,6 +1049,9 @@ class Scheduler:
         # This function call changes the internal states of the scheduler
         # such as self.running, self.swapped, and self.waiting.
         scheduler_outputs = self._schedule()
+        if self.lora_enabled:
+            scheduler_outputs.num_lora_slot_swaps = self._update_active_loras(
+                scheduler_outputs)
         now = time.time()
 
         # Create input data structures.
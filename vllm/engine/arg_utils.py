@@ -75,6 +75,8 @@ class EngineArgs:
     long_lora_scaling_factors: Optional[Tuple[float]] = None
     lora_dtype: str = 'auto'
     max_cpu_loras: Optional[int] = None
+    lora_scheduling_policy: str = 'fcfs'
+    lora_affinity_max_wait: float = 2.0
     device: str = 'auto'
     ray_workers_use_nsight: bool = False
     num_gpu_blocks_override: Optional[int] = None
@@ -97,6 +99,9 @@ class EngineArgs:
     spec_decoding_acceptance_method: str = 'rejection_sampler'
     typical_acceptance_sampler_posterior_threshold: Optional[float] = None
     typical_acceptance_sampler_posterior_alpha: Optional[float] = None
+    speculative_adaptive_num_tokens: bool = False
+    num_speculative_branches: int = 1
+    speculative_multi_query_scoring: bool = False
     qlora_adapter_name_or_path: Optional[str] = None
 
     otlp_traces_endpoint: Optional[str] = None
@@ -169,7 +174,7 @@ class EngineArgs:
             default=EngineArgs.load_format,
             choices=[
                 'auto', 'pt', 'safetensors', 'npcache', 'dummy', 'tensorizer',
-                'bitsandbytes'
+                'bitsandbytes', 'fastload'
             ],
             help='The format of the model weights to load.\n\n'
             '* "auto" will try to load the weights in the safetensors format '
@@ -185,7 +190,9 @@ class EngineArgs:
             'CoreWeave. See the Tensorize vLLM Model script in the Examples '
             'section for more information.\n'
             '* "bitsandbytes" will load the weights using bitsandbytes '
-            'quantization.\n')
+            'quantization.\n'
+            '* "fastload" will load the post-processed per-worker state '
+            'saved by examples/save_fastload_state.py.\n')
         parser.add_argument(
             '--dtype',
             type=str,
@@ -204,11 +211,12 @@ class EngineArgs:
         parser.add_argument(
             '--kv-cache-dtype',
             type=str,
-            choices=['auto', 'fp8', 'fp8_e5m2', 'fp8_e4m3'],
+            choices=['auto', 'fp8', 'fp8_e5m2', 'fp8_e4m3', 'int8'],
             default=EngineArgs.kv_cache_dtype,
             help='Data type for kv cache storage. If "auto", will use model '
             'data type. CUDA 11.8+ supports fp8 (=fp8_e4m3) and fp8_e5m2. '
-            'ROCm (AMD GPU) supports fp8 (=fp8_e4m3)')
+            'ROCm (AMD GPU) supports fp8 (=fp8_e4m3). The CPU backend '
+            'supports int8, with a scale per token and head.')
         parser.add_argument(
             '--quantization-param-path',
             type=nullable_str,
@@ -456,6 +464,23 @@ class EngineArgs:
             help=('Maximum number of LoRAs to store in CPU memory. '
                   'Must be >= than max_num_seqs. '
                   'Defaults to max_num_seqs.'))
+        parser.add_argument(
+            '--lora-scheduling-policy',
+            type=str,
+            default=EngineArgs.lora_scheduling_policy,
+            choices=['fcfs', 'affinity'],
+            help=('Order in which waiting LoRA requests are admitted. '
+                  '"fcfs" follows arrival order. "affinity" prefers '
+                  'requests whose LoRA is already in a GPU slot, to '
+                  'reduce LoRA swaps when there are more LoRAs than '
+                  'max_loras.'))
+        parser.add_argument(
+            '--lora-affinity-max-wait',
+            type=float,
+            default=EngineArgs.lora_affinity_max_wait,
+            help=('With the affinity LoRA scheduling policy, the time in '
+                  'seconds after which a request whose LoRA is not in a '
+                  'GPU slot is admitted in arrival order.'))
         parser.add_argument(
             '--fully-sharded-loras',
             action='store_true',
@@ -566,6 +591,33 @@ class EngineArgs:
             'to sqrt of --typical-acceptance-sampler-posterior-threshold '
             'i.e. 0.3')
 
+        parser.add_argument(
+            '--speculative-adaptive-num-tokens',
+            action='store_true',
+            help='Choose the number of speculative tokens of each step, '
+            'between 0 and --num-speculative-tokens, to maximize the '
+            'expected number of emitted tokens per second given the '
+            'measured draft acceptance rate and step times.')
+
+        parser.add_argument(
+            '--num-speculative-branches',
+            type=int,
+            default=EngineArgs.num_speculative_branches,
+            help='The number of alternative ngram proposals of each '
+            'sequence, starting with different tokens, that are verified in '
+            'the same forward pass. The branch with the longest accepted '
+            'prefix is kept. Every branch but the first reserves KV cache '
+            'blocks for max_num_seqs sequences.')
+
+        parser.add_argument(
+            '--speculative-multi-query-scoring',
+            action='store_true',
+            help='Score the proposal tokens of each sequence as a single '
+            'decode of several tokens with the chunked prefill attention, '
+            'instead of one sequence per token (batch expansion). Requires '
+            'the FLASH_ATTN or XFORMERS attention backend, and runs the '
+            'scoring steps without CUDA graphs.')
+
         parser.add_argument('--model-loader-extra-config',
                             type=nullable_str,
                             default=EngineArgs.model_loader_extra_config,
@@ -704,6 +756,10 @@ class EngineArgs:
             typical_acceptance_sampler_posterior_threshold,
             typical_acceptance_sampler_posterior_alpha=self.
             typical_acceptance_sampler_posterior_alpha,
+            adaptive_num_speculative_tokens=self.
+            speculative_adaptive_num_tokens,
+            num_speculative_branches=self.num_speculative_branches,
+            multi_query_scoring=self.speculative_multi_query_scoring,
         )
 
         scheduler_config = SchedulerConfig(
@@ -727,7 +783,10 @@ class EngineArgs:
             long_lora_scaling_factors=self.long_lora_scaling_factors,
             lora_dtype=self.lora_dtype,
             max_cpu_loras=self.max_cpu_loras if self.max_cpu_loras
-            and self.max_cpu_loras > 0 else None) if self.enable_lora else None
+            and self.max_cpu_loras > 0 else None,
+            lora_scheduling_policy=self.lora_scheduling_policy,
+            lora_affinity_max_wait=self.lora_affinity_max_wait,
+        ) if self.enable_lora else None
 
         if self.qlora_adapter_name_or_path is not None and \
             self.qlora_adapter_name_or_path != "":
@@ -12,6 +12,7 @@ from vllm.core.scheduler import SchedulerOutputs
 from vllm.engine.arg_utils import AsyncEngineArgs
 from vllm.engine.async_timeout import asyncio_timeout
 from vllm.engine.llm_engine import LLMEngine
+from vllm.engine.metrics import StartupTimeline
 from vllm.executor.ray_utils import initialize_ray_cluster, ray
 from vllm.inputs import LLMInputs, PromptInputs
 from vllm.logger import init_logger
@@ -379,7 +380,10 @@ class AsyncLLMEngine:
     ) -> "AsyncLLMEngine":
         """Creates an async LLM engine from the engine arguments."""
         # Create the engine configs.
+        start = time.perf_counter()
         engine_config = engine_args.create_engine_config()
+        startup_timeline = StartupTimeline(config=time.perf_counter() -
+                                           start)
 
         if engine_args.engine_use_ray:
             from vllm.executor import ray_utils
@@ -438,6 +442,7 @@ class AsyncLLMEngine:
             max_log_len=engine_args.max_log_len,
             start_engine_loop=start_engine_loop,
             usage_context=usage_context,
+            startup_timeline=startup_timeline,
         )
         return engine
 
@@ -903,6 +908,24 @@ class AsyncLLMEngine:
         else:
             return self.engine.get_decoding_config()
 
+    async def get_startup_timeline(self) -> StartupTimeline:
+        """Get the duration of each startup phase."""
+        if self.engine_use_ray:
+            return await (
+                self.engine.get_startup_timeline.remote()  # type: ignore
+            )
+        else:
+            return self.engine.get_startup_timeline()
+
+    async def update_startup_timeline(self, **phases: float) -> None:
+        """Set the durations of startup phases that ran outside of the
+        engine, then log and publish the timeline."""
+        if self.engine_use_ray:
+            await self.engine.update_startup_timeline.remote(  # type: ignore
+                **phases)
+        else:
+            self.engine.update_startup_timeline(**phases)
+
     async def do_log_stats(
             self,
             scheduler_outputs: Optional[SchedulerOutputs] = None,
@@ -14,7 +14,7 @@ from vllm.core.scheduler import (ScheduledSequenceGroup, Scheduler,
                                  SchedulerOutputs)
 from vllm.engine.arg_utils import EngineArgs
 from vllm.engine.metrics import (LoggingStatLogger, PrometheusStatLogger,
-                                 StatLoggerBase, Stats)
+                                 StartupTimeline, StatLoggerBase, Stats)
 from vllm.engine.output_processor.interfaces import (
     SequenceGroupOutputProcessor)
 from vllm.engine.output_processor.stop_checker import StopChecker
@@ -165,6 +165,7 @@ class LLMEngine:
         log_stats: bool,
         usage_context: UsageContext = UsageContext.ENGINE_CONTEXT,
         stat_loggers: Optional[Dict[str, StatLoggerBase]] = None,
+        startup_timeline: Optional[StartupTimeline] = None,
     ) -> None:
         logger.info(
             "Initializing an LLM engine (v%s) with config: "
@@ -227,9 +228,13 @@ class LLMEngine:
         self.observability_config = observability_config or ObservabilityConfig(
         )
         self.log_stats = log_stats
+        self.startup_timeline = (startup_timeline if startup_timeline
+                                 is not None else StartupTimeline())
 
         if not self.model_config.skip_tokenizer_init:
+            start = time.perf_counter()
             self.tokenizer = self._init_tokenizer()
+            self.startup_timeline.tokenizer = time.perf_counter() - start
             self.detokenizer = Detokenizer(self.tokenizer)
         else:
             self.tokenizer = None
@@ -242,6 +247,7 @@ class LLMEngine:
         self.input_processor = INPUT_REGISTRY.create_input_processor(
             self.model_config)
 
+        start = time.perf_counter()
         self.model_executor = executor_class(
             model_config=model_config,
             cache_config=cache_config,
@@ -253,6 +259,7 @@ class LLMEngine:
             speculative_config=speculative_config,
             load_config=load_config,
         )
+        self.startup_timeline.load = time.perf_counter() - start
 
         if not self.model_config.embedding_mode:
             self._initialize_kv_caches()
@@ -301,11 +308,21 @@ class LLMEngine:
         # NOTE: the cache_config here have been updated with the numbers of
         # GPU and CPU blocks, which are profiled in the distributed executor.
         self.scheduler = [
-            Scheduler(scheduler_config, cache_config, lora_config,
-                      parallel_config.pipeline_parallel_size)
+            Scheduler(scheduler_config,
+                      cache_config,
+                      lora_config,
+                      parallel_config.pipeline_parallel_size,
+                      lora_ready_fn=(self.model_executor.is_lora_ready
+                                     if lora_config else None))
             for _ in range(parallel_config.pipeline_parallel_size)
         ]
 
+        # LoRA adapter loads started by arriving requests and not yet seen
+        # finished, with their start times. Reported in the stats.
+        self._lora_load_start_times: Dict[int, float] = {}
+        self._num_lora_cache_hits = 0
+        self._num_lora_cache_misses = 0
+
         # Metric Logging.
         if self.log_stats:
             if stat_loggers is not None:
@@ -345,14 +362,25 @@ class LLMEngine:
                 ),
             ))
 
+        self._log_startup_timeline()
+
+    def _log_startup_timeline(self) -> None:
+        logger.info("Startup profile (seconds): %s",
+                    self.startup_timeline.metrics_info())
+        if self.log_stats and "prometheus" in self.stat_loggers:
+            self.stat_loggers["prometheus"].info("startup_timeline",
+                                                 self.startup_timeline)
+
     def _initialize_kv_caches(self) -> None:
         """Initialize the KV cache in the worker(s).
 
         The workers will determine the number of blocks in both the GPU cache
         and the swap CPU cache.
         """
+        start = time.perf_counter()
         num_gpu_blocks, num_cpu_blocks = (
             self.model_executor.determine_num_available_blocks())
+        self.startup_timeline.profile = time.perf_counter() - start
 
         if self.cache_config.num_gpu_blocks_override is not None:
             num_gpu_blocks_override = self.cache_config.num_gpu_blocks_override
@@ -365,7 +393,9 @@ class LLMEngine:
         self.cache_config.num_gpu_blocks = num_gpu_blocks
         self.cache_config.num_cpu_blocks = num_cpu_blocks
 
+        start = time.perf_counter()
         self.model_executor.initialize_cache(num_gpu_blocks, num_cpu_blocks)
+        self.startup_timeline.graph_capture = time.perf_counter() - start
 
     @classmethod
     def from_engine_args(
@@ -375,7 +405,10 @@ class LLMEngine:
     ) -> "LLMEngine":
         """Creates an LLM engine from the engine arguments."""
         # Create the engine configs.
+        start = time.perf_counter()
         engine_config = engine_args.create_engine_config()
+        startup_timeline = StartupTimeline(config=time.perf_counter() -
+                                           start)
         distributed_executor_backend = (
             engine_config.parallel_config.distributed_executor_backend)
 
@@ -418,6 +451,7 @@ class LLMEngine:
             executor_class=executor_class,
             log_stats=not engine_args.disable_log_stats,
             usage_context=usage_context,
+            startup_timeline=startup_timeline,
         )
         return engine
 
@@ -482,6 +516,23 @@ class LLMEngine:
 
         return self.tokenizer.get_lora_tokenizer(lora_request).eos_token_id
 
+    def _prefetch_lora(self, lora_request: LoRARequest) -> None:
+        """Start loading the LoRA of an arriving request, so that the
+        scheduler can skip the request until the LoRA is ready instead of
+        stalling the step that first uses it."""
+        loaded = self.model_executor.prefetch_lora(lora_request)
+        if loaded is None:
+            # The executor does not prefetch, so it cannot tell hits from
+            # misses or time the load.
+            return
+        if loaded:
+            self._num_lora_cache_misses += 1
+            if self.log_stats:
+                self._lora_load_start_times.setdefault(
+                    lora_request.lora_int_id, time.time())
+        else:
+            self._num_lora_cache_hits += 1
+
     def _add_processed_request(
         self,
         request_id: str,
@@ -499,6 +550,9 @@ class LLMEngine:
         seq = Sequence(seq_id, processed_inputs, block_size, eos_token_id,
                        lora_request)
 
+        if lora_request is not None:
+            self._prefetch_lora(lora_request)
+
         # Create a SequenceGroup based on SamplingParams or PoolingParams
         if isinstance(params, SamplingParams):
             seq_group = self._create_sequence_group_with_sampling(
@@ -711,6 +765,20 @@ class LLMEngine:
         """Gets the decoding configuration."""
         return self.decoding_config
 
+    def get_startup_timeline(self) -> StartupTimeline:
+        """Gets the duration of each startup phase."""
+        return self.startup_timeline
+
+    def update_startup_timeline(self, **phases: float) -> None:
+        """Sets the durations of startup phases that ran outside of the
+        engine, e.g. `imports` and `server_bind`, then logs and publishes the
+        timeline."""
+        for phase, seconds in phases.items():
+            if not hasattr(self.startup_timeline, phase):
+                raise ValueError(f"Unknown startup phase: {phase}")
+            setattr(self.startup_timeline, phase, seconds)
+        self._log_startup_timeline()
+
     def get_num_unfinished_requests(self) -> int:
         """Gets the number of unfinished requests."""
         return sum(scheduler.get_num_unfinished_seq_groups()
@@ -949,6 +1017,8 @@ class LLMEngine:
         num_generation_tokens_iter = 0
         time_to_first_tokens_iter: List[float] = []
         time_per_output_tokens_iter: List[float] = []
+        num_lora_slot_swaps_iter = (0 if scheduler_outputs is None else
+                                    scheduler_outputs.num_lora_slot_swaps)
         num_preemption_iter = (0 if scheduler_outputs is None else
                                scheduler_outputs.preempted)
 
@@ -1042,6 +1112,24 @@ class LLMEngine:
         else:
             spec_decode_metrics = None
 
+        # Pipeline parallel stages report their per-step timings through the
+        # output of the last stage.
+        pipeline_stage_times = (model_output[0].pipeline_stage_times
+                                if model_output else None)
+        cuda_graph_usage = (model_output[0].cuda_graph_usage
+                            if model_output else None)
+
+        # LoRA adapter loading
+        lora_load_latencies_iter: List[float] = []
+        for lora_id, start_time in list(self._lora_load_start_times.items()):
+            if self.model_executor.is_lora_ready(lora_id):
+                lora_load_latencies_iter.append(now - start_time)
+                del self._lora_load_start_times[lora_id]
+        num_lora_cache_hits_iter = self._num_lora_cache_hits
+        num_lora_cache_misses_iter = self._num_lora_cache_misses
+        self._num_lora_cache_hits = 0
+        self._num_lora_cache_misses = 0
+
         return Stats(
             now=now,
             # System stats
@@ -1059,7 +1147,13 @@ class LLMEngine:
             time_to_first_tokens_iter=time_to_first_tokens_iter,
             time_per_output_tokens_iter=time_per_output_tokens_iter,
             spec_decode_metrics=spec_decode_metrics,
+            pipeline_stage_times=pipeline_stage_times,
+            cuda_graph_usage=cuda_graph_usage,
             num_preemption_iter=num_preemption_iter,
+            lora_load_latencies_iter=lora_load_latencies_iter,
+            num_lora_cache_hits_iter=num_lora_cache_hits_iter,
+            num_lora_cache_misses_iter=num_lora_cache_misses_iter,
+            num_lora_slot_swaps_iter=num_lora_slot_swaps_iter,
 
             # Request stats
             #   Latency
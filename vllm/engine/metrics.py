@@ -1,6 +1,7 @@
+import math
 import time
 from abc import ABC, abstractmethod
-from dataclasses import dataclass
+from dataclasses import asdict, dataclass, field
 from typing import TYPE_CHECKING
 from typing import Counter as CollectionsCounter
 from typing import Dict, List, Optional, Protocol, Union
@@ -17,6 +18,7 @@ else:
     ray_metrics = None
 
 if TYPE_CHECKING:
+    from vllm.sequence import CUDAGraphUsage, PipelineStageTimes
     from vllm.spec_decode.metrics import SpecDecodeWorkerMetrics
 
 logger = init_logger(__name__)
@@ -30,6 +32,10 @@ prometheus_client.disable_created_metrics()
 # begin-metrics-definitions
 class Metrics:
     labelname_finish_reason = "finished_reason"
+    labelname_pp_stage = "pp_stage"
+    labelname_startup_phase = "phase"
+    labelname_batch_size = "batch_size"
+    labelname_num_spec_tokens = "num_spec_tokens"
     _base_library = prometheus_client
 
     def __init__(self, labelnames: List[str], max_model_len: int):
@@ -40,6 +46,11 @@ class Metrics:
         self.info_cache_config = prometheus_client.Info(
             name='vllm:cache_config',
             documentation='information of cache_config')
+        self.gauge_startup_phase_duration = self._base_library.Gauge(
+            name="vllm:startup_phase_duration_seconds",
+            documentation="Wall time of each startup phase, e.g. model "
+            "loading, memory profiling and CUDA graph capture.",
+            labelnames=labelnames + [Metrics.labelname_startup_phase])
 
         # System stats
         #   Scheduler State
@@ -94,6 +105,66 @@ class Metrics:
                 0.01, 0.025, 0.05, 0.075, 0.1, 0.15, 0.2, 0.3, 0.4, 0.5, 0.75,
                 1.0, 2.5
             ])
+        #   Pipeline parallel
+        self.counter_pipeline_bubble_time = self._base_library.Counter(
+            name="vllm:pipeline_stage_bubble_seconds_total",
+            documentation=("Time each pipeline parallel stage spent idle "
+                           "waiting for its inputs between steps."),
+            labelnames=labelnames + [Metrics.labelname_pp_stage])
+        self.counter_pipeline_busy_time = self._base_library.Counter(
+            name="vllm:pipeline_stage_busy_seconds_total",
+            documentation=("Time each pipeline parallel stage spent "
+                           "executing the model."),
+            labelnames=labelnames + [Metrics.labelname_pp_stage])
+        #   CUDA graphs
+        self.counter_cuda_graph_hits = self._base_library.Counter(
+            name="vllm:cuda_graph_hits_total",
+            documentation=("Number of decode steps that ran as a captured "
+                           "CUDA graph, per padded batch size."),
+            labelnames=labelnames + [Metrics.labelname_batch_size])
+        self.counter_cuda_graph_misses = self._base_library.Counter(
+            name="vllm:cuda_graph_misses_total",
+            documentation=("Number of decode steps that ran eagerly because "
+                           "no CUDA graph was captured for their padded "
+                           "batch size."),
+            labelnames=labelnames + [Metrics.labelname_batch_size])
+        #   Speculative decoding
+        self.counter_spec_decode_num_spec_tokens = self._base_library.Counter(
+            name="vllm:spec_decode_num_spec_tokens_steps_total",
+            documentation=("Number of speculative decoding steps per number "
+                           "of speculative tokens."),
+            labelnames=labelnames + [Metrics.labelname_num_spec_tokens])
+        self.gauge_spec_decode_goodput = self._base_library.Gauge(
+            name="vllm:spec_decode_goodput_tokens_per_second",
+            documentation=("Tokens emitted per second of speculative "
+                           "decoding steps, over the last metrics interval."),
+            labelnames=labelnames)
+        #   LoRA adapters
+        self.histogram_lora_load_latency = self._base_library.Histogram(
+            name="vllm:lora_load_latency_seconds",
+            documentation=("Histogram of the time from an arriving request "
+                           "starting to load its LoRA adapter until the "
+                           "adapter is ready, in seconds."),
+            labelnames=labelnames,
+            buckets=[
+                0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0,
+                60.0
+            ])
+        self.counter_lora_cache_hits = self._base_library.Counter(
+            name="vllm:lora_cache_hits_total",
+            documentation=("Number of requests whose LoRA adapter was "
+                           "already loaded or loading on arrival."),
+            labelnames=labelnames)
+        self.counter_lora_cache_misses = self._base_library.Counter(
+            name="vllm:lora_cache_misses_total",
+            documentation=("Number of requests whose LoRA adapter had to be "
+                           "loaded on arrival."),
+            labelnames=labelnames)
+        self.counter_lora_slot_swaps = self._base_library.Counter(
+            name="vllm:lora_slot_swaps_total",
+            documentation=("Number of times a LoRA adapter was moved into a "
+                           "GPU slot, evicting another adapter."),
+            labelnames=labelnames)
 
         # Request stats
         #   Latency
@@ -227,6 +298,45 @@ class Stats:
 
     spec_decode_metrics: Optional["SpecDecodeWorkerMetrics"] = None
 
+    # Per-stage timing of the step, only set with pipeline parallel.
+    pipeline_stage_times: Optional[List["PipelineStageTimes"]] = None
+
+    # Whether the step ran as a CUDA graph, only set for decode steps that
+    # can.
+    cuda_graph_usage: Optional["CUDAGraphUsage"] = None
+
+    # LoRA adapter loading, only set with LoRA enabled.
+    lora_load_latencies_iter: List[float] = field(default_factory=list)
+    num_lora_cache_hits_iter: int = 0
+    num_lora_cache_misses_iter: int = 0
+    num_lora_slot_swaps_iter: int = 0
+
+
+@dataclass
+class StartupTimeline:
+    """Wall time in seconds of each phase of the startup, in order. The
+    phases before and after the engine are only set by the API server."""
+    # Python imports, from the start of the process.
+    imports: float = 0.0
+    # Creating the engine configs from the engine arguments.
+    config: float = 0.0
+    # Tokenizer initialization.
+    tokenizer: float = 0.0
+    # Worker initialization and model loading.
+    load: float = 0.0
+    # Profiling run that sizes the KV cache.
+    profile: float = 0.0
+    # KV cache allocation and CUDA graph capture.
+    graph_capture: float = 0.0
+    # Starting the API server until it listens.
+    server_bind: float = 0.0
+
+    def metrics_info(self) -> Dict[str, str]:
+        return {
+            phase: f"{seconds:.3f}"
+            for phase, seconds in asdict(self).items()
+        }
+
 
 class SupportsMetricsInfo(Protocol):
 
@@ -267,6 +377,13 @@ class StatLoggerBase(ABC):
 class LoggingStatLogger(StatLoggerBase):
     """LoggingStatLogger is used in LLMEngine to log to Stdout."""
 
+    def __init__(self, local_interval: float) -> None:
+        super().__init__(local_interval)
+        # Accumulated per-stage bubble and busy time over the current local
+        # logging interval (pipeline parallel only).
+        self.pipeline_bubble_time: List[float] = []
+        self.pipeline_busy_time: List[float] = []
+
     def info(self, type: str, obj: SupportsMetricsInfo) -> None:
         raise NotImplementedError
 
@@ -277,6 +394,14 @@ class LoggingStatLogger(StatLoggerBase):
         # Save tracked stats for token counters.
         self.num_prompt_tokens.append(stats.num_prompt_tokens_iter)
         self.num_generation_tokens.append(stats.num_generation_tokens_iter)
+        if stats.pipeline_stage_times is not None:
+            num_stages = len(stats.pipeline_stage_times)
+            if len(self.pipeline_bubble_time) != num_stages:
+                self.pipeline_bubble_time = [0.0] * num_stages
+                self.pipeline_busy_time = [0.0] * num_stages
+            for stage, times in enumerate(stats.pipeline_stage_times):
+                self.pipeline_bubble_time[stage] += times.bubble_time
+                self.pipeline_busy_time[stage] += times.busy_time
 
         # Log locally every local_interval seconds.
         if local_interval_elapsed(stats.now, self.last_local_log,
@@ -317,6 +442,20 @@ class LoggingStatLogger(StatLoggerBase):
                     self._format_spec_decode_metrics_str(
                         stats.spec_decode_metrics))
 
+            if self.pipeline_bubble_time:
+                logger.info(self._format_pipeline_bubble_str())
+                self.pipeline_bubble_time = []
+                self.pipeline_busy_time = []
+
+    def _format_pipeline_bubble_str(self) -> str:
+        ratios = []
+        for stage, (bubble, busy) in enumerate(
+                zip(self.pipeline_bubble_time, self.pipeline_busy_time)):
+            total = bubble + busy
+            ratio = bubble / total if total > 0 else 0.0
+            ratios.append(f"stage {stage}: {ratio * 100:.1f}%")
+        return "Pipeline bubble ratio: " + ", ".join(ratios) + "."
+
     def _format_spec_decode_metrics_str(
             self, metrics: "SpecDecodeWorkerMetrics") -> str:
 
@@ -326,7 +465,19 @@ class LoggingStatLogger(StatLoggerBase):
                 f"Number of speculative tokens: {metrics.num_spec_tokens}, "
                 f"Number of accepted tokens: {metrics.accepted_tokens}, "
                 f"Number of draft tokens tokens: {metrics.draft_tokens}, "
-                f"Number of emitted tokens tokens: {metrics.emitted_tokens}.")
+                f"Number of emitted tokens tokens: {metrics.emitted_tokens}"
+                + self._format_spec_decode_length_str(metrics) + ".")
+
+    def _format_spec_decode_length_str(
+            self, metrics: "SpecDecodeWorkerMetrics") -> str:
+        if not metrics.num_spec_tokens_counts:
+            return ""
+        num_steps = sum(metrics.num_spec_tokens_counts.values())
+        distribution = ", ".join(
+            f"{k}: {count / num_steps * 100:.1f}%"
+            for k, count in sorted(metrics.num_spec_tokens_counts.items()))
+        return (f", Speculative tokens per step: {distribution}, "
+                f"Goodput: {metrics.goodput:.1f} tokens/s")
 
 
 class PrometheusStatLogger(StatLoggerBase):
@@ -344,6 +495,12 @@ class PrometheusStatLogger(StatLoggerBase):
     def info(self, type: str, obj: SupportsMetricsInfo) -> None:
         if type == "cache_config":
             self.metrics.info_cache_config.info(obj.metrics_info())
+        elif type == "startup_timeline":
+            label_key = Metrics.labelname_startup_phase
+            for phase, seconds in obj.metrics_info().items():
+                self.metrics.gauge_startup_phase_duration.labels(**{
+                    **self.labels, label_key: phase
+                }).set(float(seconds))
 
     def _log_gauge(self, gauge, data: Union[int, float]) -> None:
         # Convenience function for logging to gauge.
@@ -389,6 +546,43 @@ class PrometheusStatLogger(StatLoggerBase):
                             stats.time_to_first_tokens_iter)
         self._log_histogram(self.metrics.histogram_time_per_output_token,
                             stats.time_per_output_tokens_iter)
+        if stats.pipeline_stage_times is not None:
+            for stage, times in enumerate(stats.pipeline_stage_times):
+                stage_labels = {
+                    **self.labels, Metrics.labelname_pp_stage: str(stage)
+                }
+                self.metrics.counter_pipeline_bubble_time.labels(
+                    **stage_labels).inc(times.bubble_time)
+                self.metrics.counter_pipeline_busy_time.labels(
+                    **stage_labels).inc(times.busy_time)
+        if stats.cuda_graph_usage is not None:
+            counter = (self.metrics.counter_cuda_graph_hits
+                       if stats.cuda_graph_usage.hit else
+                       self.metrics.counter_cuda_graph_misses)
+            counter.labels(
+                **{
+                    **self.labels, Metrics.labelname_batch_size:
+                    str(stats.cuda_graph_usage.batch_size)
+                }).inc()
+        if stats.spec_decode_metrics is not None:
+            self._log_counter_labels(
+                self.metrics.counter_spec_decode_num_spec_tokens,
+                CollectionsCounter({
+                    str(k): count
+                    for k, count in
+                    stats.spec_decode_metrics.num_spec_tokens_counts.items()
+                }), Metrics.labelname_num_spec_tokens)
+            if not math.isnan(stats.spec_decode_metrics.goodput):
+                self._log_gauge(self.metrics.gauge_spec_decode_goodput,
+                                stats.spec_decode_metrics.goodput)
+        self._log_histogram(self.metrics.histogram_lora_load_latency,
+                            stats.lora_load_latencies_iter)
+        self._log_counter(self.metrics.counter_lora_cache_hits,
+                          stats.num_lora_cache_hits_iter)
+        self._log_counter(self.metrics.counter_lora_cache_misses,
+                          stats.num_lora_cache_misses_iter)
+        self._log_counter(self.metrics.counter_lora_slot_swaps,
+                          stats.num_lora_slot_swaps_iter)
 
         # Request level data
         # Latency
@@ -2,17 +2,21 @@ import asyncio
 import importlib
 import inspect
 import re
+import time
 from contextlib import asynccontextmanager
+from dataclasses import asdict
 from http import HTTPStatus
-from typing import Optional, Set
+from typing import Any, Awaitable, Callable, Dict, Optional, Set, Union
 
 import fastapi
+import psutil
 import uvicorn
 from fastapi import Request
 from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response, StreamingResponse
 from prometheus_client import make_asgi_app
+from pydantic import BaseModel
 from starlette.routing import Mount
 
 import vllm.envs as envs
@@ -37,6 +41,11 @@ from vllm.logger import init_logger
 from vllm.usage.usage_lib import UsageContext
 from vllm.version import __version__ as VLLM_VERSION
 
+try:
+    import orjson
+except ImportError:
+    orjson = None  # type: ignore
+
 TIMEOUT_KEEP_ALIVE = 5  # seconds
 
 openai_serving_chat: OpenAIServingChat
@@ -67,6 +76,20 @@ async def lifespan(app: fastapi.FastAPI):
 app = fastapi.FastAPI(lifespan=lifespan)
 
 
+class _Server(uvicorn.Server):
+    """A uvicorn server that runs a callback once it listens."""
+
+    def __init__(self, config: uvicorn.Config,
+                 on_listen: Callable[[], Awaitable[None]]):
+        super().__init__(config)
+        self.on_listen = on_listen
+
+    async def startup(self, sockets=None) -> None:
+        await super().startup(sockets=sockets)
+        if not self.should_exit:
+            await self.on_listen()
+
+
 def parse_args():
     parser = make_arg_parser()
     return parser.parse_args()
@@ -79,10 +102,28 @@ route.path_regex = re.compile('^/metrics(?P<path>.*)$')
 app.routes.append(route)
 
 
+def create_json_response(content: Union[BaseModel, Dict[str, Any]],
+                         status_code: int = HTTPStatus.OK) -> Response:
+    """Serialize a response with orjson if it is installed, and otherwise
+    with the serializer of pydantic, both of which are much faster than the
+    json module for large embeddings and logprobs."""
+    if orjson is not None:
+        if isinstance(content, BaseModel):
+            content = content.model_dump()
+        body = orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+    elif isinstance(content, BaseModel):
+        body = content.model_dump_json().encode()
+    else:
+        return JSONResponse(content=content, status_code=status_code)
+    return Response(content=body,
+                    status_code=status_code,
+                    media_type="application/json")
+
+
 @app.exception_handler(RequestValidationError)
 async def validation_exception_handler(_, exc):
     err = openai_serving_chat.create_error_response(message=str(exc))
-    return JSONResponse(err.model_dump(), status_code=HTTPStatus.BAD_REQUEST)
+    return create_json_response(err, status_code=HTTPStatus.BAD_REQUEST)
 
 
 @app.get("/health")
@@ -96,34 +137,38 @@ async def health() -> Response:
 async def tokenize(request: TokenizeRequest):
     generator = await openai_serving_completion.create_tokenize(request)
     if isinstance(generator, ErrorResponse):
-        return JSONResponse(content=generator.model_dump(),
-                            status_code=generator.code)
+        return create_json_response(generator, status_code=generator.code)
     else:
         assert isinstance(generator, TokenizeResponse)
-        return JSONResponse(content=generator.model_dump())
+        return create_json_response(generator)
 
 
 @app.post("/detokenize")
 async def detokenize(request: DetokenizeRequest):
     generator = await openai_serving_completion.create_detokenize(request)
     if isinstance(generator, ErrorResponse):
-        return JSONResponse(content=generator.model_dump(),
-                            status_code=generator.code)
+        return create_json_response(generator, status_code=generator.code)
     else:
         assert isinstance(generator, DetokenizeResponse)
-        return JSONResponse(content=generator.model_dump())
+        return create_json_response(generator)
 
 
 @app.get("/v1/models")
 async def show_available_models():
     models = await openai_serving_chat.show_available_models()
-    return JSONResponse(content=models.model_dump())
+    return create_json_response(models)
+
+
+@app.get("/startup_profile")
+async def show_startup_profile():
+    timeline = await openai_serving_chat.engine.get_startup_timeline()
+    return create_json_response(asdict(timeline))
 
 
 @app.get("/version")
 async def show_version():
     ver = {"version": VLLM_VERSION}
-    return JSONResponse(content=ver)
+    return create_json_response(ver)
 
 
 @app.post("/v1/chat/completions")
@@ -132,14 +177,13 @@ async def create_chat_completion(request: ChatCompletionRequest,
     generator = await openai_serving_chat.create_chat_completion(
         request, raw_request)
     if isinstance(generator, ErrorResponse):
-        return JSONResponse(content=generator.model_dump(),
-                            status_code=generator.code)
+        return create_json_response(generator, status_code=generator.code)
     if request.stream:
         return StreamingResponse(content=generator,
                                  media_type="text/event-stream")
     else:
         assert isinstance(generator, ChatCompletionResponse)
-        return JSONResponse(content=generator.model_dump())
+        return create_json_response(generator)
 
 
 @app.post("/v1/completions")
@@ -147,13 +191,12 @@ async def create_completion(request: CompletionRequest, raw_request: Request):
     generator = await openai_serving_completion.create_completion(
         request, raw_request)
     if isinstance(generator, ErrorResponse):
-        return JSONResponse(content=generator.model_dump(),
-                            status_code=generator.code)
+        return create_json_response(generator, status_code=generator.code)
     if request.stream:
         return StreamingResponse(content=generator,
                                  media_type="text/event-stream")
     else:
-        return JSONResponse(content=generator.model_dump())
+        return create_json_response(generator)
 
 
 @app.post("/v1/embeddings")
@@ -161,13 +204,14 @@ async def create_embedding(request: EmbeddingRequest, raw_request: Request):
     generator = await openai_serving_embedding.create_embedding(
         request, raw_request)
     if isinstance(generator, ErrorResponse):
-        return JSONResponse(content=generator.model_dump(),
-                            status_code=generator.code)
+        return create_json_response(generator, status_code=generator.code)
     else:
-        return JSONResponse(content=generator.model_dump())
+        return create_json_response(generator)
 
 
 if __name__ == "__main__":
+    # Everything up to here is spent starting Python and importing modules.
+    imports_time = time.time() - psutil.Process().create_time()
     args = parse_args()
 
     app.add_middleware(
@@ -237,15 +281,28 @@ if __name__ == "__main__":
                                             args.chat_template)
     openai_serving_completion = OpenAIServingCompletion(
         engine, model_config, served_model_names, args.lora_modules)
-    openai_serving_embedding = OpenAIServingEmbedding(engine, model_config,
-                                                      served_model_names)
+    openai_serving_embedding = OpenAIServingEmbedding(
+        engine,
+        model_config,
+        served_model_names,
+        cache_size=args.embedding_cache_size,
+        truncate_prompt_tokens=args.embedding_truncate_prompt_tokens)
     app.root_path = args.root_path
-    uvicorn.run(app,
-                host=args.host,
-                port=args.port,
-                log_level=args.uvicorn_log_level,
-                timeout_keep_alive=TIMEOUT_KEEP_ALIVE,
-                ssl_keyfile=args.ssl_keyfile,
-                ssl_certfile=args.ssl_certfile,
-                ssl_ca_certs=args.ssl_ca_certs,
-                ssl_cert_reqs=args.ssl_cert_reqs)
+
+    server_start = time.perf_counter()
+
+    async def log_startup_timeline() -> None:
+        await engine.update_startup_timeline(
+            imports=imports_time,
+            server_bind=time.perf_counter() - server_start)
+
+    config = uvicorn.Config(app,
+                            host=args.host,
+                            port=args.port,
+                            log_level=args.uvicorn_log_level,
+                            timeout_keep_alive=TIMEOUT_KEEP_ALIVE,
+                            ssl_keyfile=args.ssl_keyfile,
+                            ssl_certfile=args.ssl_certfile,
+                            ssl_ca_certs=args.ssl_ca_certs,
+                            ssl_cert_reqs=args.ssl_cert_reqs)
+    _Server(config, on_listen=log_startup_timeline).run()
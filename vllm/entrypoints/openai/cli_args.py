@@ -112,5 +112,21 @@ def make_arg_parser():
         "If a class is provided, vLLM will add it to the server "
         "using app.add_middleware(). ")
 
+    parser.add_argument(
+        "--embedding-cache-size",
+        type=int,
+        default=0,
+        help="The number of embeddings kept in an LRU cache, keyed by the "
+        "model, the input text or token ids and the pooling parameters. "
+        "Repeated inputs within a request are embedded once. 0 disables the "
+        "cache.")
+    parser.add_argument(
+        "--embedding-truncate-prompt-tokens",
+        type=int,
+        default=None,
+        help="Truncate the inputs of the embedding requests that do not set "
+        "truncate_prompt_tokens to this many tokens, instead of rejecting "
+        "the inputs that are longer than the model context.")
+
     parser = AsyncEngineArgs.add_cli_args(parser)
     return parser
@@ -248,6 +248,13 @@ class ChatCompletionRequest(OpenAIBaseModel):
         description=(
             "If specified, will override the default whitespace pattern "
             "for guided json decoding."))
+    compact_logprobs: Optional[bool] = Field(
+        default=False,
+        description=(
+            "If true, the logprobs are returned as parallel arrays of token "
+            "ids and logprobs instead of decoded tokens, which are much "
+            "cheaper to produce and to parse."),
+    )
 
     # doc: end-chat-completion-extra-params
 
@@ -440,6 +447,13 @@ class CompletionRequest(OpenAIBaseModel):
         description=(
             "If specified, will override the default whitespace pattern "
             "for guided json decoding."))
+    compact_logprobs: Optional[bool] = Field(
+        default=False,
+        description=(
+            "If true, the logprobs are returned as parallel arrays of token "
+            "ids and logprobs instead of decoded tokens, which are much "
+            "cheaper to produce and to parse."),
+    )
 
     # doc: end-completion-extra-params
 
@@ -538,11 +552,33 @@ class EmbeddingRequest(BaseModel):
 
     # doc: begin-embedding-pooling-params
     additional_data: Optional[Any] = None
+    base64_dtype: Optional[Literal["float32", "float16"]] = Field(
+        default="float32",
+        description=(
+            "The element type of the base64 embeddings, which are the raw "
+            "little-endian bytes of the vector."),
+    )
+    truncate_prompt_tokens: Optional[Annotated[int, Field(ge=1)]] = None
+    pooling_type: Optional[Literal["last", "mean", "cls"]] = Field(
+        default=None,
+        description=(
+            "How the hidden states of the input are pooled. If not set, "
+            "the pooling of the model is used."),
+    )
+    quantization: Optional[Literal["int8", "binary"]] = Field(
+        default=None,
+        description=(
+            "If set, the embedding is returned as int8 integers, or as "
+            "sign bits packed into bytes, instead of floats."),
+    )
 
     # doc: end-embedding-pooling-params
 
     def to_pooling_params(self):
-        return PoolingParams(additional_data=self.additional_data)
+        return PoolingParams(additional_data=self.additional_data,
+                             pooling_type=self.pooling_type,
+                             dimensions=self.dimensions,
+                             quantization=self.quantization)
 
 
 class CompletionLogProbs(OpenAIBaseModel):
@@ -553,10 +589,19 @@ class CompletionLogProbs(OpenAIBaseModel):
                                      float]]] = Field(default_factory=list)
 
 
+class LogProbsArrays(OpenAIBaseModel):
+    """The logprobs of a choice as parallel arrays, with one entry per token
+    and None for the tokens without logprobs."""
+    token_ids: List[int] = Field(default_factory=list)
+    token_logprobs: List[Optional[float]] = Field(default_factory=list)
+    top_token_ids: List[Optional[List[int]]] = Field(default_factory=list)
+    top_logprobs: List[Optional[List[float]]] = Field(default_factory=list)
+
+
 class CompletionResponseChoice(OpenAIBaseModel):
     index: int
     text: str
-    logprobs: Optional[CompletionLogProbs] = None
+    logprobs: Optional[Union[CompletionLogProbs, LogProbsArrays]] = None
     finish_reason: Optional[str] = None
     stop_reason: Optional[Union[int, str]] = Field(
         default=None,
@@ -579,7 +624,7 @@ class CompletionResponse(OpenAIBaseModel):
 class CompletionResponseStreamChoice(OpenAIBaseModel):
     index: int
     text: str
-    logprobs: Optional[CompletionLogProbs] = None
+    logprobs: Optional[Union[CompletionLogProbs, LogProbsArrays]] = None
     finish_reason: Optional[str] = None
     stop_reason: Optional[Union[int, str]] = Field(
         default=None,
@@ -602,7 +647,7 @@ class CompletionStreamResponse(OpenAIBaseModel):
 class EmbeddingResponseData(BaseModel):
     index: int
     object: str = "embedding"
-    embedding: Union[List[float], str]
+    embedding: Union[List[int], List[float], str]
 
 
 class EmbeddingResponse(BaseModel):
@@ -648,7 +693,7 @@ class ChatCompletionLogProbs(OpenAIBaseModel):
 class ChatCompletionResponseChoice(OpenAIBaseModel):
     index: int
     message: ChatMessage
-    logprobs: Optional[ChatCompletionLogProbs] = None
+    logprobs: Optional[Union[ChatCompletionLogProbs, LogProbsArrays]] = None
     finish_reason: Optional[str] = None
     stop_reason: Optional[Union[int, str]] = None
 
@@ -671,7 +716,7 @@ class DeltaMessage(OpenAIBaseModel):
 class ChatCompletionResponseStreamChoice(OpenAIBaseModel):
     index: int
     delta: DeltaMessage
-    logprobs: Optional[ChatCompletionLogProbs] = None
+    logprobs: Optional[Union[ChatCompletionLogProbs, LogProbsArrays]] = None
     finish_reason: Optional[str] = None
     stop_reason: Optional[Union[int, str]] = None
 
@@ -2,8 +2,8 @@ import codecs
 import time
 from dataclasses import dataclass, field
 from functools import cached_property
-from typing import (AsyncGenerator, AsyncIterator, Awaitable, Dict, Iterable,
-                    List, Optional)
+from typing import (AsyncGenerator, AsyncIterator, Awaitable, Iterable, List,
+                    Mapping, Optional)
 from typing import Sequence as GenericSequence
 from typing import TypedDict, Union, cast, final
 
@@ -20,7 +20,7 @@ from vllm.entrypoints.openai.protocol import (
     ChatCompletionRequest, ChatCompletionResponse,
     ChatCompletionResponseChoice, ChatCompletionResponseStreamChoice,
     ChatCompletionStreamResponse, ChatMessage, DeltaMessage, ErrorResponse,
-    FunctionCall, ToolCall, UsageInfo)
+    FunctionCall, LogProbsArrays, ToolCall, UsageInfo)
 from vllm.entrypoints.openai.serving_engine import (LoRAModulePath,
                                                     OpenAIServing)
 from vllm.inputs import PromptInputs
@@ -406,6 +406,7 @@ class OpenAIServingChat(OpenAIServing):
                             token_ids=delta_token_ids,
                             top_logprobs=out_logprobs,
                             num_output_top_logprobs=request.top_logprobs,
+                            compact=bool(request.compact_logprobs),
                         )
                     else:
                         logprobs = None
@@ -523,6 +524,7 @@ class OpenAIServingChat(OpenAIServing):
                     token_ids=token_ids,
                     top_logprobs=out_logprobs,
                     num_output_top_logprobs=request.top_logprobs,
+                    compact=bool(request.compact_logprobs),
                 )
             else:
                 logprobs = None
@@ -577,7 +579,7 @@ class OpenAIServingChat(OpenAIServing):
         return response
 
     def _get_top_logprobs(
-            self, logprobs: Dict[int, Logprob],
+            self, logprobs: Mapping[int, Logprob],
             top_logprobs: Optional[int]) -> List[ChatCompletionLogProb]:
         return [
             ChatCompletionLogProb(
@@ -594,10 +596,15 @@ class OpenAIServingChat(OpenAIServing):
     def _create_chat_logprobs(
         self,
         token_ids: GenericSequence[int],
-        top_logprobs: GenericSequence[Optional[Dict[int, Logprob]]],
+        top_logprobs: GenericSequence[Optional[Mapping[int, Logprob]]],
         num_output_top_logprobs: Optional[int] = None,
-    ) -> ChatCompletionLogProbs:
-        """Create OpenAI-style logprobs."""
+        compact: bool = False,
+    ) -> Union[ChatCompletionLogProbs, LogProbsArrays]:
+        """Create OpenAI-style logprobs, or the logprobs arrays if
+        `compact`."""
+        if compact:
+            return self._create_logprobs_arrays(token_ids, top_logprobs,
+                                                num_output_top_logprobs or 0)
 
         logprobs_content = []
 
@@ -611,13 +618,13 @@ class OpenAIServingChat(OpenAIServing):
                             self.tokenizer.decode(token_id).encode(
                                 "utf-8", errors="replace"))))
             else:
+                step_token_logprob = step_top_logprobs[token_id]
                 logprobs_content.append(
                     ChatCompletionLogProbsContent(
-                        token=step_top_logprobs[token_id].decoded_token,
-                        logprob=max(step_top_logprobs[token_id].logprob,
-                                    -9999.0),
+                        token=step_token_logprob.decoded_token,
+                        logprob=max(step_token_logprob.logprob, -9999.0),
                         bytes=list(
-                            step_top_logprobs[token_id].decoded_token.encode(
+                            step_token_logprob.decoded_token.encode(
                                 "utf-8", errors="replace")),
                         top_logprobs=self._get_top_logprobs(
                             step_top_logprobs, num_output_top_logprobs)))
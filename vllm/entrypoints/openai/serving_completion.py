@@ -1,8 +1,8 @@
 import time
 from typing import (AsyncGenerator, AsyncIterator, Callable, Dict, List,
-                    Optional)
+                    Mapping, Optional)
 from typing import Sequence as GenericSequence
-from typing import Tuple
+from typing import Tuple, Union
 
 from fastapi import Request
 
@@ -18,6 +18,7 @@ from vllm.entrypoints.openai.protocol import (CompletionLogProbs,
                                               CompletionStreamResponse,
                                               DetokenizeRequest,
                                               DetokenizeResponse,
+                                              LogProbsArrays,
                                               TokenizeRequest,
                                               TokenizeResponse, UsageInfo)
 # yapf: enable
@@ -263,6 +264,7 @@ class OpenAIServingCompletion(OpenAIServing):
                             top_logprobs=out_logprobs,
                             num_output_top_logprobs=request.logprobs,
                             initial_text_offset=len(previous_texts[i]),
+                            compact=bool(request.compact_logprobs),
                         )
                     else:
                         logprobs = None
@@ -362,6 +364,7 @@ class OpenAIServingCompletion(OpenAIServing):
                         token_ids=token_ids,
                         top_logprobs=out_logprobs,
                         num_output_top_logprobs=request.logprobs,
+                        compact=bool(request.compact_logprobs),
                     )
                 else:
                     logprobs = None
@@ -396,11 +399,17 @@ class OpenAIServingCompletion(OpenAIServing):
     def _create_completion_logprobs(
         self,
         token_ids: GenericSequence[int],
-        top_logprobs: GenericSequence[Optional[Dict[int, Logprob]]],
+        top_logprobs: GenericSequence[Optional[Mapping[int, Logprob]]],
         num_output_top_logprobs: int,
         initial_text_offset: int = 0,
-    ) -> CompletionLogProbs:
-        """Create logprobs for OpenAI Completion API."""
+        compact: bool = False,
+    ) -> Union[CompletionLogProbs, LogProbsArrays]:
+        """Create logprobs for OpenAI Completion API, or the logprobs arrays
+        if `compact`."""
+        if compact:
+            # The top num_output_top_logprobs + 1 logprobs, as below.
+            return self._create_logprobs_arrays(token_ids, top_logprobs,
+                                                num_output_top_logprobs + 1)
         out_text_offset: List[int] = []
         out_token_logprobs: List[Optional[float]] = []
         out_tokens: List[str] = []
@@ -416,10 +425,9 @@ class OpenAIServingCompletion(OpenAIServing):
                 out_token_logprobs.append(None)
                 out_top_logprobs.append(None)
             else:
-                token = self._get_decoded_token(step_top_logprobs[token_id],
-                                                token_id)
-                token_logprob = max(step_top_logprobs[token_id].logprob,
-                                    -9999.0)
+                step_token_logprob = step_top_logprobs[token_id]
+                token = self._get_decoded_token(step_token_logprob, token_id)
+                token_logprob = max(step_token_logprob.logprob, -9999.0)
                 out_tokens.append(token)
                 out_token_logprobs.append(token_logprob)
 
@@ -1,6 +1,11 @@
 import base64
+import hashlib
 import time
-from typing import AsyncIterator, List, Optional, Tuple
+import unicodedata
+from array import array
+from collections import OrderedDict
+from typing import (AsyncIterator, Dict, Hashable, List, Optional, Tuple,
+                    Union)
 
 import numpy as np
 from fastapi import Request
@@ -14,17 +19,68 @@ from vllm.entrypoints.openai.serving_completion import parse_prompt_format
 from vllm.entrypoints.openai.serving_engine import OpenAIServing
 from vllm.logger import init_logger
 from vllm.outputs import EmbeddingRequestOutput
+from vllm.pooling_params import PoolingParams
 from vllm.utils import merge_async_iterators, random_uuid
 
 logger = init_logger(__name__)
 
 TypeTokenIDs = List[int]
 
+# The little-endian element types of the base64 embeddings, by float type
+# or quantization.
+_BASE64_DTYPES = {
+    "float32": "<f4",
+    "float16": "<f2",
+    "int8": "i1",
+    "binary": "u1",
+}
+
+
+class EmbeddingCache:
+    """An LRU cache of the embeddings of recent inputs.
+
+    The inputs are keyed by a hash of their NFC-normalized text, or of their
+    token ids, together with the model, the truncation and the pooling
+    parameters that the embedding depends on.
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._outputs: OrderedDict[Hashable,
+                                   EmbeddingRequestOutput] = OrderedDict()
+
+    @staticmethod
+    def make_key(model_name: str, prompt: Union[str, TypeTokenIDs],
+                 truncate_prompt_tokens: Optional[int],
+                 pooling_params: PoolingParams) -> Hashable:
+        if isinstance(prompt, str):
+            digest = hashlib.sha256(
+                unicodedata.normalize("NFC", prompt).encode()).digest()
+        else:
+            digest = hashlib.sha256(array("q", prompt).tobytes()).digest()
+        return (model_name, isinstance(prompt, str), digest,
+                truncate_prompt_tokens, repr(pooling_params))
+
+    def get(self, key: Hashable) -> Optional[EmbeddingRequestOutput]:
+        output = self._outputs.get(key)
+        if output is not None:
+            self._outputs.move_to_end(key)
+        return output
+
+    def put(self, key: Hashable, output: EmbeddingRequestOutput) -> None:
+        self._outputs[key] = output
+        self._outputs.move_to_end(key)
+        if len(self._outputs) > self.capacity:
+            self._outputs.popitem(last=False)
+
 
 def request_output_to_embedding_response(
-        final_res_batch: List[EmbeddingRequestOutput], request_id: str,
-        created_time: int, model_name: str,
-        encoding_format: str) -> EmbeddingResponse:
+        final_res_batch: List[EmbeddingRequestOutput],
+        request_id: str,
+        created_time: int,
+        model_name: str,
+        encoding_format: str,
+        base64_dtype: str = "float32") -> EmbeddingResponse:
     data: List[EmbeddingResponseData] = []
     num_prompt_tokens = 0
     for idx, final_res in enumerate(final_res_batch):
@@ -32,7 +88,9 @@ def request_output_to_embedding_response(
         prompt_token_ids = final_res.prompt_token_ids
         embedding = final_res.outputs.embedding
         if encoding_format == "base64":
-            embedding = base64.b64encode(np.array(embedding))
+            embedding = base64.b64encode(
+                np.array(embedding,
+                         dtype=_BASE64_DTYPES[base64_dtype]).tobytes()).decode()
         embedding_data = EmbeddingResponseData(index=idx, embedding=embedding)
         data.append(embedding_data)
 
@@ -54,13 +112,20 @@ def request_output_to_embedding_response(
 
 class OpenAIServingEmbedding(OpenAIServing):
 
-    def __init__(self, engine: AsyncLLMEngine, model_config: ModelConfig,
-                 served_model_names: List[str]):
+    def __init__(self,
+                 engine: AsyncLLMEngine,
+                 model_config: ModelConfig,
+                 served_model_names: List[str],
+                 cache_size: int = 0,
+                 truncate_prompt_tokens: Optional[int] = None):
         super().__init__(engine=engine,
                          model_config=model_config,
                          served_model_names=served_model_names,
                          lora_modules=None)
         self._check_embedding_mode(model_config.embedding_mode)
+        self.cache = EmbeddingCache(cache_size) if cache_size > 0 else None
+        # The truncation of the requests that do not set one.
+        self.truncate_prompt_tokens = truncate_prompt_tokens
 
     async def create_embedding(self, request: EmbeddingRequest,
                                raw_request: Request):
@@ -75,9 +140,15 @@ class OpenAIServingEmbedding(OpenAIServing):
 
         encoding_format = (request.encoding_format
                            if request.encoding_format else "float")
-        if request.dimensions is not None:
+        # Quantized embeddings are encoded with their integer type.
+        base64_dtype = (request.quantization or request.base64_dtype
+                        or "float32")
+        hidden_size = self.model_config.get_hidden_size()
+        if request.dimensions is not None and (request.dimensions >
+                                               hidden_size):
             return self.create_error_response(
-                "dimensions is currently not supported")
+                f"dimensions must be at most {hidden_size}, "
+                f"got {request.dimensions}")
 
         model_name = request.model
         request_id = f"cmpl-{random_uuid()}"
@@ -85,17 +156,44 @@ class OpenAIServingEmbedding(OpenAIServing):
 
         # Schedule the request and get the result generator.
         generators = []
+        # The prompt index of each generator, and the cache key of each
+        # scheduled prompt. Repeated inputs are only scheduled once.
+        generator_prompt_indices: List[int] = []
+        cache_keys: Dict[Hashable, int] = {}
+        duplicate_prompt_indices: Dict[int, int] = {}
+        final_res_batch: List[Optional[EmbeddingRequestOutput]]
         try:
             prompt_is_tokens, prompts = parse_prompt_format(request.input)
             pooling_params = request.to_pooling_params()
+            truncate_prompt_tokens = (request.truncate_prompt_tokens
+                                      or self.truncate_prompt_tokens)
+            final_res_batch = [None] * len(prompts)
 
             for i, prompt in enumerate(prompts):
+                if self.cache is not None:
+                    cache_key = self.cache.make_key(self.served_model_names[0],
+                                                    prompt,
+                                                    truncate_prompt_tokens,
+                                                    pooling_params)
+                    if cache_key in cache_keys:
+                        duplicate_prompt_indices[i] = cache_keys[cache_key]
+                        continue
+                    cached_res = self.cache.get(cache_key)
+                    if cached_res is not None:
+                        final_res_batch[i] = cached_res
+                        continue
+                    cache_keys[cache_key] = i
+
                 if prompt_is_tokens:
                     prompt_formats = self._validate_prompt_and_tokenize(
-                        request, prompt_ids=prompt)
+                        request,
+                        prompt_ids=prompt,
+                        truncate_prompt_tokens=truncate_prompt_tokens)
                 else:
                     prompt_formats = self._validate_prompt_and_tokenize(
-                        request, prompt=prompt)
+                        request,
+                        prompt=prompt,
+                        truncate_prompt_tokens=truncate_prompt_tokens)
 
                 prompt_ids, prompt_text = prompt_formats
 
@@ -109,6 +207,7 @@ class OpenAIServingEmbedding(OpenAIServing):
                 )
 
                 generators.append(generator)
+                generator_prompt_indices.append(i)
         except ValueError as e:
             # TODO: Use a vllm-specific Validation Error
             return self.create_error_response(str(e))
@@ -117,19 +216,25 @@ class OpenAIServingEmbedding(OpenAIServing):
             int, EmbeddingRequestOutput]] = merge_async_iterators(*generators)
 
         # Non-streaming response
-        final_res_batch: List[Optional[EmbeddingRequestOutput]]
-        final_res_batch = [None] * len(prompts)
         try:
-            async for i, res in result_generator:
+            async for j, res in result_generator:
+                i = generator_prompt_indices[j]
                 if await raw_request.is_disconnected():
                     # Abort the request if the client disconnects.
                     await self.engine.abort(f"{request_id}-{i}")
                     # TODO: Use a vllm-specific Validation Error
                     return self.create_error_response("Client disconnected")
                 final_res_batch[i] = res
+            if self.cache is not None:
+                for cache_key, i in cache_keys.items():
+                    res = final_res_batch[i]
+                    if res is not None and res.finished:
+                        self.cache.put(cache_key, res)
+            for i, j in duplicate_prompt_indices.items():
+                final_res_batch[i] = final_res_batch[j]
             response = request_output_to_embedding_response(
                 final_res_batch, request_id, created_time, model_name,
-                encoding_format)
+                encoding_format, base64_dtype)
         except ValueError as e:
             # TODO: Use a vllm-specific Validation Error
             return self.create_error_response(str(e))
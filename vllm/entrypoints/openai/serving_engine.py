@@ -1,7 +1,9 @@
 import json
 from dataclasses import dataclass
 from http import HTTPStatus
-from typing import Any, Dict, List, Optional, Tuple, Union
+from typing import Any, Dict, List, Mapping, Optional
+from typing import Sequence as GenericSequence
+from typing import Tuple, Union
 
 from pydantic import Field
 from typing_extensions import Annotated
@@ -12,7 +14,8 @@ from vllm.entrypoints.openai.protocol import (ChatCompletionRequest,
                                               CompletionRequest,
                                               DetokenizeRequest,
                                               EmbeddingRequest, ErrorResponse,
-                                              ModelCard, ModelList,
+                                              LogProbsArrays, ModelCard,
+                                              ModelList,
                                               ModelPermission, TokenizeRequest)
 from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
@@ -207,3 +210,38 @@ class OpenAIServing:
         if logprob.decoded_token is not None:
             return logprob.decoded_token
         return self.tokenizer.decode(token_id)
+
+    @staticmethod
+    def _create_logprobs_arrays(
+        token_ids: GenericSequence[int],
+        top_logprobs: GenericSequence[Optional[Mapping[int, Logprob]]],
+        num_top_logprobs: int,
+    ) -> LogProbsArrays:
+        """Create logprobs as parallel arrays of token ids and logprobs.
+
+        Unlike the OpenAI formats, the tokens are not decoded, and each
+        position is two short lists instead of a list of objects or a dict.
+        """
+        out_token_logprobs: List[Optional[float]] = []
+        out_top_token_ids: List[Optional[List[int]]] = []
+        out_top_logprobs: List[Optional[List[float]]] = []
+        for i, token_id in enumerate(token_ids):
+            step_top_logprobs = top_logprobs[i]
+            if step_top_logprobs is None:
+                out_token_logprobs.append(None)
+                out_top_token_ids.append(None)
+                out_top_logprobs.append(None)
+                continue
+            # Convert float("-inf") to the JSON-serializable float that
+            # OpenAI uses.
+            out_token_logprobs.append(
+                max(step_top_logprobs[token_id].logprob, -9999.0))
+            step_items = list(step_top_logprobs.items())[:num_top_logprobs]
+            out_top_token_ids.append([item[0] for item in step_items])
+            out_top_logprobs.append(
+                [max(item[1].logprob, -9999.0) for item in step_items])
+
+        return LogProbsArrays(token_ids=list(token_ids),
+                              token_logprobs=out_token_logprobs,
+                              top_token_ids=out_top_token_ids,
+                              top_logprobs=out_top_logprobs)
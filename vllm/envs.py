@@ -35,6 +35,14 @@ if TYPE_CHECKING:
     VLLM_FUSED_MOE_CHUNK_SIZE: int = 64 * 1024
     VLLM_USE_RAY_COMPILED_DAG: bool = False
     VLLM_WORKER_MULTIPROC_METHOD: str = "fork"
+    VLLM_WORKER_SHM_RESULT_BYTES: int = 0
+    VLLM_LORA_PREFETCH_WORKERS: int = 1
+    VLLM_LORA_PACKED_CACHE_DIR: Optional[str] = None
+    VLLM_SAFETENSORS_LOAD_THREADS: int = 0
+    VLLM_MEMORY_PROFILE_CACHE_DIR: Optional[str] = None
+    VLLM_MEMORY_PROFILE_VERIFY: bool = True
+    VLLM_CUDA_GRAPH_CAPTURE_SET_DIR: Optional[str] = None
+    VLLM_CUDA_GRAPH_LAZY_CAPTURE: bool = False
     VLLM_IMAGE_FETCH_TIMEOUT: int = 5
     VLLM_TARGET_DEVICE: str = "cuda"
     MAX_JOBS: Optional[str] = None
@@ -240,6 +248,62 @@ environment_variables: Dict[str, Callable[[], Any]] = {
     "VLLM_WORKER_MULTIPROC_METHOD":
     lambda: os.getenv("VLLM_WORKER_MULTIPROC_METHOD", "fork"),
 
+    # Size in bytes of each chunk of the shared-memory channel multiprocessing
+    # workers use to return model outputs without pickling them.
+    # 0 (the default) sends all results through the result queue. The remote
+    # tensor parallel workers do not return the per-step outputs, which come
+    # from the driver worker in the engine process, so today only methods
+    # that return model outputs from the remote workers use the channel.
+    "VLLM_WORKER_SHM_RESULT_BYTES":
+    lambda: int(os.getenv("VLLM_WORKER_SHM_RESULT_BYTES", "0")),
+
+    # Number of background threads the driver worker uses to load LoRA
+    # adapters as soon as their requests arrive. Requests are not scheduled
+    # until their adapter is loaded. 0 loads adapters synchronously at the
+    # start of the first step that uses them.
+    "VLLM_LORA_PREFETCH_WORKERS":
+    lambda: int(os.getenv("VLLM_LORA_PREFETCH_WORKERS", "1")),
+
+    # If set, LoRA adapters are converted on first load into a pre-packed
+    # format in this directory, and later loads memory-map the packed file
+    # instead of deserializing the checkpoint.
+    "VLLM_LORA_PACKED_CACHE_DIR":
+    lambda: (os.path.expanduser(os.environ["VLLM_LORA_PACKED_CACHE_DIR"])
+             if "VLLM_LORA_PACKED_CACHE_DIR" in os.environ else None),
+
+    # Number of threads used to read safetensors checkpoint files. While the
+    # weights of one file are loaded into the model, the next files are read
+    # in the background. 0 reads the files one by one as they are consumed.
+    "VLLM_SAFETENSORS_LOAD_THREADS":
+    lambda: int(os.getenv("VLLM_SAFETENSORS_LOAD_THREADS", "0")),
+
+    # Directory in which the GPU workers store the results of the memory
+    # profiling run, keyed by the configuration. A later start with the same
+    # configuration reuses them and skips the profiling run. Disabled if unset.
+    "VLLM_MEMORY_PROFILE_CACHE_DIR":
+    lambda: (os.path.expanduser(os.environ["VLLM_MEMORY_PROFILE_CACHE_DIR"])
+             if "VLLM_MEMORY_PROFILE_CACHE_DIR" in os.environ else None),
+
+    # If set, a worker that reused a cached memory profile compares the
+    # activation memory of the served batches against it, and removes the
+    # cached profile if they need more.
+    "VLLM_MEMORY_PROFILE_VERIFY":
+    lambda: bool(int(os.getenv("VLLM_MEMORY_PROFILE_VERIFY", "1"))),
+
+    # Directory in which the model runner records how often each padded
+    # decode batch size ran. If set, a later start with the same
+    # configuration only captures CUDA graphs for the batch sizes that
+    # covered most of the decode steps of previous runs.
+    "VLLM_CUDA_GRAPH_CAPTURE_SET_DIR":
+    lambda: (os.path.expanduser(os.environ["VLLM_CUDA_GRAPH_CAPTURE_SET_DIR"])
+             if "VLLM_CUDA_GRAPH_CAPTURE_SET_DIR" in os.environ else None),
+
+    # If set, CUDA graphs of batch sizes that were not captured at startup
+    # are captured between steps once the batch size is seen while serving.
+    # Until then, those steps run eagerly.
+    "VLLM_CUDA_GRAPH_LAZY_CAPTURE":
+    lambda: bool(int(os.getenv("VLLM_CUDA_GRAPH_LAZY_CAPTURE", "0"))),
+
     # Timeout for fetching images when serving multimodal models
     # Default is 5 seconds
     "VLLM_IMAGE_FETCH_TIMEOUT":
@@ -20,9 +20,10 @@ class CPUExecutor(ExecutorBase):
         assert self.device_config.device_type == "cpu"
         assert self.lora_config is None, "cpu backend doesn't support LoRA"
         self.model_config = _verify_and_get_model_config(self.model_config)
-        self.cache_config = _verify_and_get_cache_config(self.cache_config)
+        self.cache_config = _verify_and_get_cache_config(
+            self.cache_config, self.model_config)
         self.scheduler_config = _verify_and_get_scheduler_config(
-            self.scheduler_config)
+            self.scheduler_config, self.model_config)
 
         # Instantiate the worker and load the model to CPU.
         self._init_worker()
@@ -124,20 +125,32 @@ def _verify_and_get_model_config(config: ModelConfig) -> ModelConfig:
 
 
 def _verify_and_get_scheduler_config(
-        config: SchedulerConfig) -> SchedulerConfig:
-    if config.chunked_prefill_enabled:
-        logger.warning("Chunked prefill is not supported on CPU, disable it.")
+        config: SchedulerConfig,
+        model_config: ModelConfig) -> SchedulerConfig:
+    if (config.chunked_prefill_enabled
+            and model_config.get_sliding_window() is not None):
+        logger.warning("Chunked prefill is not supported on CPU with "
+                       "sliding window attention, disable it.")
         config.chunked_prefill_enabled = False
 
     return config
 
 
-def _verify_and_get_cache_config(config: CacheConfig) -> CacheConfig:
+def _verify_and_get_cache_config(config: CacheConfig,
+                                 model_config: ModelConfig) -> CacheConfig:
     _GB = 1 << 30
-    if config.enable_prefix_caching:
-        logger.warning("Prefix caching is not supported on CPU, disable it.")
+    if (config.enable_prefix_caching
+            and model_config.get_sliding_window() is not None):
+        logger.warning("Prefix caching is not supported on CPU with "
+                       "sliding window attention, disable it.")
         config.enable_prefix_caching = False
 
+    if config.cache_dtype not in ("auto", "int8"):
+        logger.warning(
+            "%s kv cache is not supported on CPU, using the int8 kv cache "
+            "instead.", config.cache_dtype)
+        config.cache_dtype = "int8"
+
     kv_cache_space = envs.VLLM_CPU_KVCACHE_SPACE
 
     if kv_cache_space >= 0:
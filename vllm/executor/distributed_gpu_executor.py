@@ -110,6 +110,11 @@ class DistributedGPUExecutor(GPUExecutor):
     def list_loras(self) -> Set[int]:
         return self._run_workers("list_loras")
 
+    # prefetch_lora and is_lora_ready are inherited from GPUExecutor and only
+    # run in the local driver worker: the remote workers may be busy in their
+    # execution loop, which does not take other calls. They load LoRAs on
+    # first use.
+
     def save_sharded_state(
         self,
         path: str,
@@ -121,6 +126,13 @@ class DistributedGPUExecutor(GPUExecutor):
                           pattern=pattern,
                           max_size=max_size)
 
+    def save_fastload_state(
+        self,
+        path: str,
+        pattern: Optional[str] = None,
+    ) -> None:
+        self._run_workers("save_fastload_state", path=path, pattern=pattern)
+
     @abstractmethod
     def _driver_execute_model(
         self, execute_model_req: Optional[ExecuteModelRequest]
@@ -95,6 +95,17 @@ class ExecutorBase(ABC):
     def list_loras(self) -> Set[int]:
         raise NotImplementedError
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> Optional[bool]:
+        """Starts loading a LoRA in the background ahead of its first use,
+        if the executor supports it. Returns True if the LoRA had to be
+        loaded, False if it was already loaded or loading, and None if the
+        executor does not prefetch."""
+        return None
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        """Returns False while a background load of the LoRA is running."""
+        return True
+
     @abstractmethod
     def check_health(self) -> None:
         """Checks if the executor is healthy. If not, it should raise an
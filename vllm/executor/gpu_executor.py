@@ -107,6 +107,21 @@ class GPUExecutor(ExecutorBase):
     def list_loras(self) -> Set[int]:
         return self.driver_worker.list_loras()
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> Optional[bool]:
+        assert lora_request.lora_int_id > 0, "lora_id must be greater than 0."
+        return self.driver_worker.prefetch_lora(lora_request)
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        assert lora_id > 0, "lora_id must be greater than 0."
+        return self.driver_worker.is_lora_ready(lora_id)
+
+    def save_fastload_state(
+        self,
+        path: str,
+        pattern: Optional[str] = None,
+    ) -> None:
+        self.driver_worker.save_fastload_state(path=path, pattern=pattern)
+
     def check_health(self) -> None:
         # GPUExecutor will always be healthy as long as
         # it's running.
@@ -13,6 +13,10 @@ from typing import (Any, Callable, Dict, Generic, List, Optional, TextIO,
                     TypeVar, Union)
 
 import vllm.envs as envs
+from vllm.distributed.device_communicators.shm_broadcast import (
+    ShmRingBuffer, ShmRingBufferIO)
+from vllm.executor.serialization import (decode_model_outputs,
+                                         encode_model_outputs)
 from vllm.logger import init_logger
 
 logger = init_logger(__name__)
@@ -27,6 +31,10 @@ RESET = '\033[0;0m'
 
 JOIN_TIMEOUT_S = 2
 
+# Number of in-flight results each worker can hold in its shared-memory
+# result channel before it has to wait for the engine to read them.
+SHM_RESULT_MAX_CHUNKS = 4
+
 mp_method = envs.VLLM_WORKER_MULTIPROC_METHOD
 mp = multiprocessing.get_context(mp_method)
 
@@ -38,6 +46,9 @@ class Result(Generic[T]):
     task_id: uuid.UUID
     value: Optional[T] = None
     exception: Optional[BaseException] = None
+    # Set when the value was written to the shared-memory result channel
+    # with this id rather than pickled through the result queue.
+    shm_channel: Optional[int] = None
 
 
 class ResultFuture(threading.Event, Generic[T]):
@@ -79,9 +90,18 @@ class ResultHandler(threading.Thread):
         super().__init__(daemon=True)
         self.result_queue = mp.Queue()
         self.tasks: Dict[uuid.UUID, Union[ResultFuture, asyncio.Future]] = {}
+        self.shm_channels: List[ShmRingBufferIO] = []
+
+    def add_shm_channel(self, buffer: ShmRingBuffer) -> int:
+        """Register a worker's shared-memory result buffer, returning the
+        channel id the worker should tag its results with."""
+        self.shm_channels.append(ShmRingBufferIO(buffer, reader_rank=0))
+        return len(self.shm_channels) - 1
 
     def run(self):
         for result in iter(self.result_queue.get, _TERMINATE):
+            if result.shm_channel is not None:
+                self._read_shm_result(result)
             future = self.tasks.pop(result.task_id)
             _set_future_result(future, result)
         # Ensure that all waiters will receive an exception
@@ -91,6 +111,22 @@ class ResultHandler(threading.Thread):
                 Result(task_id=task_id,
                        exception=ChildProcessError("worker died")))
 
+    def _read_shm_result(self, result: Result) -> None:
+        """Read the value of `result` from its shared-memory channel. A frame
+        that cannot be read or decoded fails only its own task."""
+        assert result.shm_channel is not None
+        try:
+            with self.shm_channels[result.shm_channel].acquire_read(
+            ) as buf:
+                # Decode inside the block, so that the chunk is released for
+                # the worker even if decoding fails.
+                try:
+                    result.value = decode_model_outputs(buf)
+                except Exception as e:
+                    result.exception = e
+        except Exception as e:
+            result.exception = e
+
     def close(self):
         self.result_queue.put(_TERMINATE)
 
@@ -142,13 +178,36 @@ class WorkerMonitor(threading.Thread):
 
 class ProcessWorkerWrapper:
     """Local process wrapper for vllm.worker.Worker,
-    for handling single-node multi-GPU tensor parallel."""
-
-    def __init__(self, result_handler: ResultHandler,
-                 worker_factory: Callable[[], Any]) -> None:
+    for handling single-node multi-GPU tensor parallel.
+
+    If `shm_result_bytes` (default: `VLLM_WORKER_SHM_RESULT_BYTES`) is
+    non-zero, model outputs returned by the worker are written to a
+    shared-memory ring buffer of that chunk size using the typed encoding in
+    `vllm.executor.serialization`, and only a small notification goes
+    through the result queue. Other results, and outputs that do not fit in
+    a chunk, are pickled through the queue as before.
+
+    The per-step outputs of `MultiprocessingGPUExecutor` come from the driver
+    worker, which runs in the engine process, so they do not use the channel.
+    """
+
+    def __init__(self,
+                 result_handler: ResultHandler,
+                 worker_factory: Callable[[], Any],
+                 shm_result_bytes: Optional[int] = None) -> None:
         self._task_queue = mp.Queue()
         self.result_queue = result_handler.result_queue
         self.tasks = result_handler.tasks
+
+        if shm_result_bytes is None:
+            shm_result_bytes = envs.VLLM_WORKER_SHM_RESULT_BYTES
+        self._result_buffer: Optional[ShmRingBuffer] = None
+        shm_channel: Optional[int] = None
+        if shm_result_bytes > 0:
+            self._result_buffer = ShmRingBuffer(1, shm_result_bytes,
+                                                SHM_RESULT_MAX_CHUNKS)
+            shm_channel = result_handler.add_shm_channel(self._result_buffer)
+
         self.process: BaseProcess = mp.Process(  # type: ignore[attr-defined]
             target=_run_worker_process,
             name="VllmWorkerProcess",
@@ -156,6 +215,8 @@ class ProcessWorkerWrapper:
                 worker_factory=worker_factory,
                 task_queue=self._task_queue,
                 result_queue=self.result_queue,
+                result_buffer=self._result_buffer,
+                shm_channel=shm_channel,
             ),
             daemon=True)
 
@@ -197,6 +258,8 @@ def _run_worker_process(
     worker_factory: Callable[[], Any],
     task_queue: Queue,
     result_queue: Queue,
+    result_buffer: Optional[ShmRingBuffer] = None,
+    shm_channel: Optional[int] = None,
 ) -> None:
     """Worker process event loop"""
 
@@ -210,6 +273,10 @@ def _run_worker_process(
     worker = worker_factory()
     del worker_factory
 
+    result_writer = None
+    if result_buffer is not None:
+        result_writer = ShmRingBufferIO(result_buffer, reader_rank=-1)
+
     # Accept tasks from the engine in task_queue
     # and return task output in result_queue
     logger.info("Worker ready; awaiting tasks")
@@ -227,6 +294,11 @@ def _run_worker_process(
                     "Exception in worker %s while processing method %s: %s, %s",
                     process_name, method, e, tb)
                 exception = e
+            if result_writer is not None and _write_shm_result(
+                    result_writer, output):
+                result_queue.put(
+                    Result(task_id=task_id, shm_channel=shm_channel))
+                continue
             result_queue.put(
                 Result(task_id=task_id, value=output, exception=exception))
     except KeyboardInterrupt:
@@ -237,6 +309,18 @@ def _run_worker_process(
     logger.info("Worker exiting")
 
 
+def _write_shm_result(result_writer: ShmRingBufferIO, output: Any) -> bool:
+    """Write `output` to the shared-memory result channel if it has a fast
+    path encoding that fits in one chunk. Returns whether it was written."""
+    encoded = encode_model_outputs(output)
+    if (encoded is None
+            or encoded.nbytes > result_writer.buffer.max_chunk_bytes):
+        return False
+    with result_writer.acquire_write() as buf:
+        encoded.write_to(buf)
+    return True
+
+
 def _add_prefix(file: TextIO, worker_name: str, pid: int) -> None:
     """Prepend each output line with process-specific prefix"""
 
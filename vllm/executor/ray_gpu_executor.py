@@ -10,6 +10,7 @@ from vllm.executor.distributed_gpu_executor import (  # yapf: disable
     DistributedGPUExecutor, DistributedGPUExecutorAsync)
 from vllm.executor.ray_utils import RayWorkerWrapper, ray
 from vllm.logger import init_logger
+from vllm.lora.request import LoRARequest
 from vllm.sequence import ExecuteModelRequest, SamplerOutput
 from vllm.utils import (error_on_invalid_device_count_status,
                         get_distributed_init_method, get_ip, get_open_port,
@@ -224,6 +225,17 @@ class RayGPUExecutor(DistributedGPUExecutor):
         return self.driver_worker.execute_method("execute_model",
                                                  execute_model_req)
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> Optional[bool]:
+        # As in DistributedGPUExecutor, only the local driver worker
+        # prefetches. Here it is wrapped in a RayWorkerWrapper.
+        assert lora_request.lora_int_id > 0, "lora_id must be greater than 0."
+        return self.driver_worker.execute_method("prefetch_lora",
+                                                 lora_request)
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        assert lora_id > 0, "lora_id must be greater than 0."
+        return self.driver_worker.execute_method("is_lora_ready", lora_id)
+
     def _run_workers(
         self,
         method: str,
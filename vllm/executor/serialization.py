@@ -0,0 +1,330 @@
+"""Compact encodings for the objects exchanged between the engine and its
+workers.
+
+Model outputs
+-------------
+
+Pickling a `SamplerOutput` walks every nested `CompletionSequenceGroupOutput`,
+`SequenceOutput` and `Logprob` object. The encoder below flattens the outputs
+into a few typed `array.array` columns instead (token ids, logprobs, ranks and
+embedding values), which can be copied into a shared-memory buffer in one
+pass and sliced back out on the engine side.
+
+Only the common, host-only shape of the outputs has a fast path. Anything
+else (device tensors attached to a `SamplerOutput`, already-detokenized
+logprobs, foreign output types) makes `encode_model_outputs` return None so
+that the caller can fall back to pickle.
+"""
+import pickle
+import struct
+from array import array
+from typing import List, Mapping, Optional, Sequence, Union
+
+from vllm.sequence import (CompactLogprobs, CompletionSequenceGroupOutput,
+                           EmbeddingSequenceGroupOutput, Logprob,
+                           LogprobsArray, PoolerOutput, PromptLogprobs,
+                           SamplerOutput, SequenceOutput)
+
+ModelOutputs = List[Union[SamplerOutput, PoolerOutput]]
+
+_MAGIC = b"VMO1"
+_KIND_SAMPLER = 1
+_KIND_POOLER = 2
+
+# magic, kind, number of columns, total encoded size in bytes
+_HEADER = struct.Struct("=4sBxxxIQ")
+_ALIGNMENT = 8
+
+# Column layouts. The last column of every kind is a pickled blob holding
+# the (small) per-output spec decode metrics and pipeline stage times.
+_SAMPLER_COLUMNS = (
+    "q",  # number of sequence groups per SamplerOutput
+    "q",  # number of samples per group
+    "q",  # number of prompt logprob positions per group (-1: None)
+    "q",  # parent seq id per sample
+    "q",  # output token per sample
+    "q",  # number of logprobs per sample
+    "q",  # number of logprobs per prompt position (-1: None)
+    "i",  # sample logprob token ids
+    "d",  # sample logprob values
+    "i",  # sample logprob ranks (-1: None)
+    "i",  # prompt logprob token ids
+    "d",  # prompt logprob values
+    "i",  # prompt logprob ranks (-1: None)
+    "B",  # pickled per-output stats
+)
+_POOLER_COLUMNS = (
+    "q",  # number of sequence groups per PoolerOutput
+    "q",  # embedding size per group
+    "d",  # embedding values
+    "B",  # pickled per-output stats
+)
+
+
+class _NotEncodable(Exception):
+    pass
+
+
+class EncodedModelOutputs:
+    """Model outputs flattened into typed columns, ready to be copied into a
+    contiguous buffer with `write_to`."""
+
+    def __init__(self, kind: int, columns: Sequence[array]) -> None:
+        self.kind = kind
+        self.columns = [memoryview(column).cast("B") for column in columns]
+        self.column_nbytes = array("Q", [len(c) for c in self.columns])
+        self.nbytes = (_HEADER.size + len(self.column_nbytes) * 8 +
+                       sum(_aligned(n) for n in self.column_nbytes))
+
+    def write_to(self, buf: memoryview) -> None:
+        """Write the encoded outputs to the beginning of `buf`."""
+        if len(buf) < self.nbytes:
+            raise ValueError(f"Buffer of {len(buf)} bytes is too small for "
+                             f"{self.nbytes} bytes of encoded outputs")
+        _HEADER.pack_into(buf, 0, _MAGIC, self.kind, len(self.columns),
+                          self.nbytes)
+        offset = _HEADER.size
+        table = memoryview(self.column_nbytes).cast("B")
+        buf[offset:offset + len(table)] = table
+        offset += len(table)
+        for column in self.columns:
+            buf[offset:offset + len(column)] = column
+            offset += _aligned(len(column))
+
+    def to_bytes(self) -> bytes:
+        buf = bytearray(self.nbytes)
+        self.write_to(memoryview(buf))
+        return bytes(buf)
+
+
+def _aligned(nbytes: int) -> int:
+    return (nbytes + _ALIGNMENT - 1) // _ALIGNMENT * _ALIGNMENT
+
+
+def encode_model_outputs(outputs: object) -> Optional[EncodedModelOutputs]:
+    """Encode the return value of `execute_model` if it has a fast path.
+
+    Returns None when `outputs` is not a non-empty list of host-only
+    `SamplerOutput` or `PoolerOutput` objects.
+    """
+    if not isinstance(outputs, list) or not outputs:
+        return None
+    try:
+        if all(type(output) is SamplerOutput for output in outputs):
+            return _encode_sampler_outputs(outputs)
+        if all(type(output) is PoolerOutput for output in outputs):
+            return _encode_pooler_outputs(outputs)
+    except _NotEncodable:
+        pass
+    return None
+
+
+def decode_model_outputs(buf: Union[bytes, memoryview]) -> ModelOutputs:
+    """Decode outputs previously written by `EncodedModelOutputs.write_to`.
+
+    The columns are copied out of `buf`, so the buffer can be reused as soon
+    as this function returns.
+    """
+    buf = memoryview(buf)
+    magic, kind, num_columns, nbytes = _HEADER.unpack_from(buf, 0)
+    if magic != _MAGIC:
+        raise ValueError("Buffer does not contain encoded model outputs")
+    offset = _HEADER.size
+    column_nbytes = array("Q")
+    column_nbytes.frombytes(buf[offset:offset + num_columns * 8])
+    offset += num_columns * 8
+
+    typecodes = (_SAMPLER_COLUMNS
+                 if kind == _KIND_SAMPLER else _POOLER_COLUMNS)
+    assert len(typecodes) == num_columns
+    columns: List[array] = []
+    for typecode, size in zip(typecodes, column_nbytes):
+        column = array(typecode)
+        column.frombytes(buf[offset:offset + size])
+        columns.append(column)
+        offset += _aligned(size)
+    assert offset == nbytes
+
+    if kind == _KIND_SAMPLER:
+        return _decode_sampler_outputs(columns)  # type: ignore[return-value]
+    return _decode_pooler_outputs(columns)  # type: ignore[return-value]
+
+
+def _append_logprobs(logprobs: Mapping[int, Logprob], token_ids: array,
+                     values: array, ranks: array) -> None:
+    if isinstance(logprobs, CompactLogprobs):
+        # The typecodes of the columns match the ones of LogprobsArray.
+        source = logprobs._array
+        start, end = logprobs._start, logprobs._end
+        if (source.decoded_tokens is not None and any(
+                token is not None
+                for token in source.decoded_tokens[start:end])):
+            raise _NotEncodable
+        token_ids.extend(source.token_ids[start:end])
+        values.extend(source.logprobs[start:end])
+        ranks.extend(source.ranks[start:end])
+        return
+    for token_id, logprob in logprobs.items():
+        if logprob.decoded_token is not None:
+            raise _NotEncodable
+        token_ids.append(token_id)
+        values.append(logprob.logprob)
+        ranks.append(-1 if logprob.rank is None else logprob.rank)
+
+
+def _pickle_stats(outputs: Sequence[Union[SamplerOutput,
+                                          PoolerOutput]]) -> array:
+    stats = [(output.spec_decode_worker_metrics, output.pipeline_stage_times,
+              output.cuda_graph_usage) for output in outputs]
+    if all(s == (None, None, None) for s in stats):
+        return array("B")
+    return array("B", pickle.dumps(stats, protocol=pickle.HIGHEST_PROTOCOL))
+
+
+def _unpickle_stats(column: array, num_outputs: int) -> list:
+    if not column:
+        return [(None, None, None)] * num_outputs
+    return pickle.loads(column.tobytes())
+
+
+def _encode_sampler_outputs(
+        outputs: List[SamplerOutput]) -> EncodedModelOutputs:
+    columns = [array(typecode) for typecode in _SAMPLER_COLUMNS]
+    (num_groups, num_samples, num_prompt_positions, parent_ids, tokens,
+     num_logprobs, num_prompt_logprobs, lp_ids, lp_values, lp_ranks,
+     plp_ids, plp_values, plp_ranks, _) = columns
+
+    for output in outputs:
+        if (output.sampled_token_probs is not None
+                or output.logprobs is not None
+                or output.sampled_token_ids is not None
+                or output.hidden_states is not None):
+            raise _NotEncodable
+        num_groups.append(len(output.outputs))
+        for group in output.outputs:
+            if type(group) is not CompletionSequenceGroupOutput:
+                raise _NotEncodable
+            num_samples.append(len(group.samples))
+            for sample in group.samples:
+                parent_ids.append(sample.parent_seq_id)
+                tokens.append(sample.output_token)
+                num_logprobs.append(len(sample.logprobs))
+                _append_logprobs(sample.logprobs, lp_ids, lp_values, lp_ranks)
+
+            if group.prompt_logprobs is None:
+                num_prompt_positions.append(-1)
+                continue
+            num_prompt_positions.append(len(group.prompt_logprobs))
+            for position in group.prompt_logprobs:
+                if position is None:
+                    num_prompt_logprobs.append(-1)
+                    continue
+                num_prompt_logprobs.append(len(position))
+                _append_logprobs(position, plp_ids, plp_values, plp_ranks)
+
+    columns[-1] = _pickle_stats(outputs)
+    return EncodedModelOutputs(_KIND_SAMPLER, columns)
+
+
+def _read_logprobs(counts: array, token_ids: array, values: array,
+                   ranks: array) -> LogprobsArray:
+    """Wrap the flattened id/value/rank columns in a LogprobsArray with one
+    position per count. A negative count is a position without logprobs."""
+    logprobs = LogprobsArray()
+    logprobs.token_ids = token_ids
+    logprobs.logprobs = values
+    logprobs.ranks = ranks
+    offset = 0
+    offsets = logprobs.offsets
+    for count in counts:
+        if count > 0:
+            offset += count
+        offsets.append(offset)
+    return logprobs
+
+
+def _decode_sampler_outputs(columns: List[array]) -> List[SamplerOutput]:
+    (num_groups, num_samples, num_prompt_positions, parent_ids, tokens,
+     num_logprobs, num_prompt_logprobs, lp_ids, lp_values, lp_ranks,
+     plp_ids, plp_values, plp_ranks, stats_column) = columns
+    sample_logprobs = _read_logprobs(num_logprobs, lp_ids, lp_values,
+                                     lp_ranks)
+    prompt_logprobs_array = _read_logprobs(num_prompt_logprobs, plp_ids,
+                                           plp_values, plp_ranks)
+    parent_ids_list = parent_ids.tolist()
+    tokens_list = tokens.tolist()
+    stats = _unpickle_stats(stats_column, len(num_groups))
+
+    group_idx = 0
+    sample_idx = 0
+    prompt_position_idx = 0
+    results: List[SamplerOutput] = []
+    for output_idx, group_count in enumerate(num_groups):
+        groups: List[CompletionSequenceGroupOutput] = []
+        for _ in range(group_count):
+            samples: List[SequenceOutput] = []
+            for _ in range(num_samples[group_idx]):
+                samples.append(
+                    SequenceOutput(
+                        parent_ids_list[sample_idx], tokens_list[sample_idx],
+                        sample_logprobs[sample_idx] or {}))
+                sample_idx += 1
+
+            prompt_logprobs: Optional[PromptLogprobs] = None
+            num_positions = num_prompt_positions[group_idx]
+            if num_positions >= 0:
+                prompt_logprobs = prompt_logprobs_array[
+                    prompt_position_idx:prompt_position_idx + num_positions]
+                prompt_position_idx += num_positions
+            groups.append(
+                CompletionSequenceGroupOutput(samples, prompt_logprobs))
+            group_idx += 1
+        (spec_decode_worker_metrics, pipeline_stage_times,
+         cuda_graph_usage) = stats[output_idx]
+        results.append(
+            SamplerOutput(
+                outputs=groups,
+                spec_decode_worker_metrics=spec_decode_worker_metrics,
+                pipeline_stage_times=pipeline_stage_times,
+                cuda_graph_usage=cuda_graph_usage))
+    return results
+
+
+def _encode_pooler_outputs(outputs: List[PoolerOutput]) -> EncodedModelOutputs:
+    columns = [array(typecode) for typecode in _POOLER_COLUMNS]
+    num_groups, embedding_sizes, values, _ = columns
+    for output in outputs:
+        num_groups.append(len(output.outputs))
+        for group in output.outputs:
+            if type(group) is not EmbeddingSequenceGroupOutput:
+                raise _NotEncodable
+            embedding_sizes.append(len(group.embeddings))
+            values.extend(group.embeddings)
+    columns[-1] = _pickle_stats(outputs)
+    return EncodedModelOutputs(_KIND_POOLER, columns)
+
+
+def _decode_pooler_outputs(columns: List[array]) -> List[PoolerOutput]:
+    num_groups, embedding_sizes, values, stats_column = columns
+    values_list = values.tolist()
+    stats = _unpickle_stats(stats_column, len(num_groups))
+    results: List[PoolerOutput] = []
+    offset = 0
+    group_idx = 0
+    for output_idx, group_count in enumerate(num_groups):
+        groups: List[EmbeddingSequenceGroupOutput] = []
+        for size in embedding_sizes[group_idx:group_idx + group_count]:
+            groups.append(
+                EmbeddingSequenceGroupOutput(values_list[offset:offset +
+                                                         size]))
+            offset += size
+        group_idx += group_count
+        (spec_decode_worker_metrics, pipeline_stage_times,
+         cuda_graph_usage) = stats[output_idx]
+        results.append(
+            PoolerOutput(
+                outputs=groups,
+                spec_decode_worker_metrics=spec_decode_worker_metrics,
+                pipeline_stage_times=pipeline_stage_times,
+                cuda_graph_usage=cuda_graph_usage))
+    return results
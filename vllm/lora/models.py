@@ -470,6 +470,9 @@ class LoRAModelManager:
     def __len__(self) -> int:
         return len(self._registered_loras)
 
+    def __contains__(self, lora_id: int) -> bool:
+        return lora_id in self._registered_loras
+
     def activate_lora(
         self,
         lora_id: int,
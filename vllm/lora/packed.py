@@ -0,0 +1,184 @@
+"""A pre-packed, memory-mapped on-disk format for LoRA adapters.
+
+A packed file holds the weights of one adapter exactly as the LoRA layers
+consume them: already in the target dtype, with the scaling merged into
+lora_b, lm_head padding applied and the rank padded to `max_lora_rank`.
+Loading it maps the file and wraps each matrix in a tensor that references
+the page cache, so there is nothing to deserialize or convert and the CPU
+LoRA cache does not hold private copies of the weights. Activating such an
+adapter copies straight from the mapped pages into the stacked LoRA
+buffers of the layers.
+
+Layout: `_MAGIC`, a little-endian uint64 header length, the JSON header,
+then the tensors, each starting at a multiple of `_ALIGNMENT` bytes.
+"""
+import hashlib
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, List, Optional, Tuple, Type
+
+import torch
+
+from vllm.lora.lora import LoRALayerWeights
+from vllm.lora.models import LoRAModel
+
+_MAGIC = b"VLLMLORA"
+_FORMAT_VERSION = 1
+_ALIGNMENT = 64
+_HEADER_LEN = struct.Struct("<Q")
+
+
+def get_packed_lora_path(cache_dir: str, lora_dir: str,
+                         dtype: Optional[torch.dtype], max_lora_rank: int,
+                         target_embedding_padding: Optional[int],
+                         max_position_embeddings: Optional[int]) -> str:
+    """Return the path of the packed file for a LoRA checkpoint directory.
+
+    The name depends on everything that changes the packed weights, including
+    the modification times of the checkpoint files, so a stale file is never
+    picked up after the checkpoint is updated.
+    """
+    lora_dir = os.path.abspath(lora_dir)
+    mtimes = {
+        name: os.stat(os.path.join(lora_dir, name)).st_mtime_ns
+        for name in sorted(os.listdir(lora_dir))
+        if os.path.isfile(os.path.join(lora_dir, name))
+    }
+    key = json.dumps([
+        _FORMAT_VERSION, lora_dir, mtimes,
+        str(dtype), max_lora_rank, target_embedding_padding,
+        max_position_embeddings
+    ])
+    digest = hashlib.sha256(key.encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{digest}.lora")
+
+
+def _pad_rank(tensor: torch.Tensor, dim: int, rank: int) -> torch.Tensor:
+    # Zero rows/columns beyond the adapter's rank do not change the output.
+    addition = rank - tensor.shape[dim]
+    if addition <= 0:
+        return tensor
+    pad = (0, 0, 0, addition) if dim == 0 else (0, addition)
+    return torch.nn.functional.pad(tensor, pad)
+
+
+def save_packed_lora(lora: LoRAModel, path: str,
+                     max_lora_rank: Optional[int] = None) -> None:
+    """Write `lora` to `path` in the packed format.
+
+    The file is written next to `path` and renamed into place, so concurrent
+    writers (e.g. tensor parallel workers sharing a cache directory) and
+    readers never see a partial file.
+    """
+    rank = max_lora_rank or lora.rank
+    chunks: List[Tuple[int, torch.Tensor]] = []
+    offset = 0
+
+    def add(tensor: Optional[torch.Tensor]) -> Optional[Dict[str, Any]]:
+        nonlocal offset
+        if tensor is None:
+            return None
+        tensor = tensor.detach().cpu().contiguous()
+        offset = -(-offset // _ALIGNMENT) * _ALIGNMENT
+        entry = {
+            "offset": offset,
+            "shape": list(tensor.shape),
+            "dtype": str(tensor.dtype).split(".")[-1],
+        }
+        chunks.append((offset, tensor))
+        offset += tensor.numel() * tensor.element_size()
+        return entry
+
+    modules: Dict[str, Dict[str, Any]] = {}
+    for module_name, module_lora in lora.loras.items():
+        assert not module_lora.is_packed, (
+            "Save the LoRA before it is added to a LoRAModelManager.")
+        module_lora.optimize()
+        # Store the matrices transposed, as the layers copy them into the
+        # stacked buffers, with the rank padded to max_lora_rank.
+        lora_a = _pad_rank(module_lora.lora_a, 1, rank).t()
+        lora_b = _pad_rank(module_lora.lora_b, 0, rank).t()
+        modules[module_name] = {
+            "lora_a": add(lora_a),
+            "lora_b": add(lora_b),
+            "embeddings": add(module_lora.embeddings_tensor),
+        }
+    header = json.dumps({
+        "version": _FORMAT_VERSION,
+        "rank": lora.rank,
+        "scaling_factor": lora.scaling_factor,
+        "modules": modules,
+    }).encode()
+    data_start = -(-(len(_MAGIC) + _HEADER_LEN.size + len(header)) //
+                   _ALIGNMENT) * _ALIGNMENT
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            for chunk_offset, tensor in chunks:
+                f.seek(data_start + chunk_offset)
+                f.write(tensor.view(torch.uint8).numpy().tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def load_packed_lora(
+        path: str,
+        lora_model_id: int,
+        lora_model_cls: Type[LoRAModel] = LoRAModel) -> LoRAModel:
+    """Map a packed file written by `save_packed_lora` into a LoRAModel.
+
+    The tensors reference the mapped pages and are only valid for reading.
+    The mapping is private, so an accidental write stays in this process.
+    """
+    with open(path, "rb") as f:
+        buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+    if buf[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{path} is not a packed LoRA file.")
+    header_start = len(_MAGIC) + _HEADER_LEN.size
+    (header_len, ) = _HEADER_LEN.unpack_from(buf, len(_MAGIC))
+    header = json.loads(buf[header_start:header_start + header_len])
+    if header["version"] != _FORMAT_VERSION:
+        raise ValueError(f"{path} has packed LoRA format version "
+                         f"{header['version']}, expected {_FORMAT_VERSION}.")
+    data_start = -(-(header_start + header_len) // _ALIGNMENT) * _ALIGNMENT
+
+    def get(entry: Optional[Dict[str, Any]]) -> Optional[torch.Tensor]:
+        if entry is None:
+            return None
+        dtype = getattr(torch, entry["dtype"])
+        numel = 1
+        for size in entry["shape"]:
+            numel *= size
+        tensor = torch.frombuffer(buf,
+                                  dtype=dtype,
+                                  count=numel,
+                                  offset=data_start + entry["offset"])
+        return tensor.view(entry["shape"])
+
+    rank = header["rank"]
+    loras: Dict[str, LoRALayerWeights] = {}
+    for module_name, entry in header["modules"].items():
+        lora_a = get(entry["lora_a"])
+        lora_b = get(entry["lora_b"])
+        assert lora_a is not None and lora_b is not None
+        loras[module_name] = LoRALayerWeights(
+            module_name,
+            rank,
+            lora_alpha=rank,
+            lora_a=lora_a.t(),
+            lora_b=lora_b.t(),
+            embeddings_tensor=get(entry["embeddings"]),
+            scaling=1.0)
+    return lora_model_cls(lora_model_id,
+                          rank,
+                          loras,
+                          scaling_factor=header["scaling_factor"])
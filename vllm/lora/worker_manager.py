@@ -1,14 +1,20 @@
+import os
+import threading
 from abc import ABC, abstractmethod
+from concurrent.futures import Future, ThreadPoolExecutor
 from contextlib import contextmanager
 from typing import Any, Dict, List, Literal, Optional, Set, Type, Union
 
 import torch
 
+import vllm.envs as envs
 from vllm.config import LoRAConfig
 from vllm.logger import init_logger
 from vllm.lora.layers import LoRAMapping
 from vllm.lora.models import (LoRAModel, LoRAModelManager,
                               LRUCacheLoRAModelManager, create_lora_manager)
+from vllm.lora.packed import (get_packed_lora_path, load_packed_lora,
+                              save_packed_lora)
 from vllm.lora.request import LoRARequest
 
 logger = init_logger(__name__)
@@ -67,6 +73,16 @@ class AbstractWorkerLoRAManager(ABC):
     def add_dummy_lora(self, lora_request: LoRARequest, rank: int) -> bool:
         ...
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> Optional[bool]:
+        """Start loading a LoRA ahead of its first use. Returns True if the
+        LoRA had to be loaded, False if it was already loaded or loading,
+        and None if the manager does not prefetch."""
+        return None
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        """Whether using the LoRA would not wait for a background load."""
+        return True
+
     @abstractmethod
     def remove_lora(self, lora_id: int) -> bool:
         ...
@@ -105,6 +121,12 @@ class WorkerLoRAManager(AbstractWorkerLoRAManager):
         self.embedding_padding_modules = embedding_padding_modules
         # Lazily initialized by create_lora_manager.
         self._lora_manager: LoRAModelManager
+        # LoRAs loading in the background, see prefetch_lora. The engine
+        # calls prefetch_lora and is_lora_ready from its own thread while a
+        # step may be running, so the map is guarded by a lock.
+        self._prefetch_lock = threading.Lock()
+        self._prefetched_loras: Dict[int, Future] = {}
+        self._prefetch_executor: Optional[ThreadPoolExecutor] = None
         super().__init__(
             max_num_seqs,
             max_num_batched_tokens,
@@ -161,7 +183,21 @@ class WorkerLoRAManager(AbstractWorkerLoRAManager):
             self.add_lora(loras_map[lora_id])
 
     def _load_lora(self, lora_request: LoRARequest) -> LoRAModel:
+        packed_path = None
+        packed_cache_dir = envs.VLLM_LORA_PACKED_CACHE_DIR
+        target_embedding_padding = (self.vocab_size +
+                                    self.lora_config.lora_extra_vocab_size)
         try:
+            if packed_cache_dir is not None:
+                packed_path = get_packed_lora_path(
+                    packed_cache_dir, lora_request.lora_local_path,
+                    self.lora_config.lora_dtype,
+                    self.lora_config.max_lora_rank, target_embedding_padding,
+                    self.max_position_embeddings)
+                if os.path.isfile(packed_path):
+                    return load_packed_lora(packed_path,
+                                            lora_request.lora_int_id,
+                                            self._lora_model_cls)
             model = self._lora_manager.model
             supported_lora_modules = model.supported_lora_modules
             packed_modules_mapping = model.packed_modules_mapping
@@ -179,8 +215,7 @@ class WorkerLoRAManager(AbstractWorkerLoRAManager):
                 lora_model_id=lora_request.lora_int_id,
                 device="cpu",
                 dtype=self.lora_config.lora_dtype,
-                target_embedding_padding=self.vocab_size +
-                self.lora_config.lora_extra_vocab_size,
+                target_embedding_padding=target_embedding_padding,
                 embedding_modules=self.embedding_modules,
                 embedding_padding_modules=self.embedding_padding_modules,
             )
@@ -195,8 +230,58 @@ class WorkerLoRAManager(AbstractWorkerLoRAManager):
             raise ValueError(f"LoRA added vocab size {lora.extra_vocab_size} "
                              f"is greater than lora_extra_vocab_size "
                              f"{self.lora_config.lora_extra_vocab_size}.")
+        if packed_path is not None:
+            try:
+                save_packed_lora(lora, packed_path,
+                                 self.lora_config.max_lora_rank)
+            except OSError:
+                logger.warning("Failed to write packed LoRA %s to %s.",
+                               lora_request.lora_local_path,
+                               packed_path,
+                               exc_info=True)
         return lora
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> bool:
+        lora_id = lora_request.lora_int_id
+        with self._prefetch_lock:
+            if (lora_id in self._lora_manager
+                    or lora_id in self._prefetched_loras):
+                return False
+            # Bound the memory held by LoRAs that no step has used yet, e.g.
+            # when their requests were aborted. The LoRA is then loaded
+            # synchronously on first use.
+            num_workers = envs.VLLM_LORA_PREFETCH_WORKERS
+            if (num_workers > 0 and len(self._prefetched_loras) <
+                    self._lora_manager.capacity):
+                if self._prefetch_executor is None:
+                    self._prefetch_executor = ThreadPoolExecutor(
+                        max_workers=num_workers,
+                        thread_name_prefix="lora_prefetch")
+                self._prefetched_loras[lora_id] = (
+                    self._prefetch_executor.submit(self._load_lora,
+                                                   lora_request))
+        return True
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        with self._prefetch_lock:
+            future = self._prefetched_loras.get(lora_id)
+        return future is None or future.done()
+
+    def _get_or_load_lora(self, lora_request: LoRARequest) -> LoRAModel:
+        """Return the prefetched LoRA, waiting for it if its load is still
+        running, or load it now if it was not prefetched."""
+        with self._prefetch_lock:
+            future = self._prefetched_loras.pop(lora_request.lora_int_id,
+                                                None)
+        if future is None:
+            return self._load_lora(lora_request)
+        # Raises the same errors as a synchronous load.
+        return future.result()
+
+    def _discard_prefetched_lora(self, lora_id: int) -> None:
+        with self._prefetch_lock:
+            self._prefetched_loras.pop(lora_id, None)
+
     def add_dummy_lora(self, lora_request: LoRARequest, rank: int) -> bool:
         if lora_request.lora_int_id in self.list_loras():
             return False
@@ -213,18 +298,21 @@ class WorkerLoRAManager(AbstractWorkerLoRAManager):
     def add_lora(self, lora_request: LoRARequest) -> bool:
         if lora_request.lora_int_id in self.list_loras():
             return False
-        lora = self._load_lora(lora_request)
+        lora = self._get_or_load_lora(lora_request)
         loaded = self._lora_manager.add_lora(lora)
         self._lora_manager.activate_lora(lora.id)
         return loaded
 
     def remove_lora(self, lora_id: int) -> bool:
+        self._discard_prefetched_lora(lora_id)
         return self._lora_manager.remove_lora(lora_id)
 
     def pin_lora(self, lora_id: int) -> bool:
         return self._lora_manager.pin_lora(lora_id)
 
     def remove_all_loras(self):
+        with self._prefetch_lock:
+            self._prefetched_loras.clear()
         self._lora_manager.remove_all_loras()
 
     def list_loras(self) -> Set[int]:
@@ -275,7 +363,7 @@ class LRUCacheWorkerLoRAManager(WorkerLoRAManager):
             if len(self._lora_manager) + 1 > self._lora_manager.capacity:
                 assert isinstance(self._lora_manager, LRUCacheLoRAModelManager)
                 self._lora_manager.remove_oldest_lora()
-            lora = self._load_lora(lora_request)
+            lora = self._get_or_load_lora(lora_request)
             loaded = self._lora_manager.add_lora(lora)
         else:
             # If the lora is already loaded, just touch it to
@@ -3,10 +3,6 @@ from typing import Optional, Union
 from vllm.entrypoints.openai.protocol import (
     ChatCompletionNamedToolChoiceParam, ChatCompletionRequest,
     CompletionRequest)
-from vllm.model_executor.guided_decoding.lm_format_enforcer_decoding import (
-    get_lm_format_enforcer_guided_decoding_logits_processor)
-from vllm.model_executor.guided_decoding.outlines_decoding import (
-    get_outlines_guided_decoding_logits_processor)
 from vllm.sampling_params import LogitsProcessor
 
 
@@ -16,10 +12,15 @@ async def get_guided_decoding_logits_processor(
         tokenizer) -> Optional[LogitsProcessor]:
     request = _adapt_request_for_tool_use(request)
 
+    # The backends are imported on first use, as importing them is slow.
     if guided_decoding_backend == 'outlines':
+        from vllm.model_executor.guided_decoding.outlines_decoding import (
+            get_outlines_guided_decoding_logits_processor)
         return await get_outlines_guided_decoding_logits_processor(
             request, tokenizer)
     if guided_decoding_backend == 'lm-format-enforcer':
+        from vllm.model_executor.guided_decoding.lm_format_enforcer_decoding import (  # noqa: E501
+            get_lm_format_enforcer_guided_decoding_logits_processor)
         return await get_lm_format_enforcer_guided_decoding_logits_processor(
             request, tokenizer)
 
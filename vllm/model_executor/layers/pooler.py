@@ -1,16 +1,20 @@
 from enum import IntEnum
+from typing import List, Optional
 
 import torch
 import torch.nn as nn
 
 from vllm.model_executor.pooling_metadata import (PoolingMetadata,
                                                   PoolingTensors)
+from vllm.pooling_params import PoolingParams
 from vllm.sequence import EmbeddingSequenceGroupOutput, PoolerOutput
 
 
 class PoolingType(IntEnum):
     """Enumeration for different types of pooling methods."""
     LAST = 0
+    MEAN = 1
+    CLS = 2
 
 
 class Pooler(nn.Module):
@@ -18,11 +22,18 @@ class Pooler(nn.Module):
 
     This layer does the following:
     1. Extracts specific tokens or aggregates data based on pooling method.
-    2. Normalizes output if specified.
-    3. Returns structured results as `PoolerOutput`.
+    2. Truncates the pooled data to the requested dimensions.
+    3. Normalizes output if specified.
+    4. Quantizes the output if requested.
+    5. Returns structured results as `PoolerOutput`.
+
+    The pooling type, dimensions and quantization can be set per request
+    through `PoolingParams`. All of it runs on the device, and the results
+    are copied to the host once per quantization in the batch.
 
     Attributes:
-        pooling_type: The type of pooling to use (LAST, AVERAGE, MAX).
+        pooling_type: The type of pooling used by the requests that do not
+            set one (LAST, MEAN, CLS).
         normalize: Whether to normalize the pooled data.
     """
 
@@ -31,6 +42,29 @@ class Pooler(nn.Module):
         self.pooling_type = pooling_type
         self.normalize = normalize
 
+    def _pool(self, hidden_states: torch.Tensor, prompt_lens: torch.Tensor,
+              pooling_type: PoolingType) -> torch.Tensor:
+        last_token_flat_indices = torch.cumsum(prompt_lens, dim=0) - 1
+        if pooling_type == PoolingType.LAST:
+            return hidden_states[last_token_flat_indices]
+        if pooling_type == PoolingType.CLS:
+            first_token_flat_indices = (last_token_flat_indices -
+                                        prompt_lens + 1)
+            return hidden_states[first_token_flat_indices]
+        if pooling_type == PoolingType.MEAN:
+            seq_indices = torch.repeat_interleave(
+                torch.arange(prompt_lens.shape[0],
+                             device=hidden_states.device),
+                prompt_lens,
+                output_size=hidden_states.shape[0])
+            sums = torch.zeros(prompt_lens.shape[0],
+                               hidden_states.shape[1],
+                               dtype=torch.float32,
+                               device=hidden_states.device)
+            sums.index_add_(0, seq_indices, hidden_states.float())
+            return (sums / prompt_lens.unsqueeze(1)).to(hidden_states.dtype)
+        raise ValueError(f"Invalid pooling type: {pooling_type}")
+
     def forward(
         self,
         hidden_states: torch.Tensor,
@@ -40,17 +74,87 @@ class Pooler(nn.Module):
         prompt_lens = PoolingTensors.from_pooling_metadata(
             pooling_metadata, hidden_states.device).prompt_lens
 
-        if self.pooling_type == PoolingType.LAST:
-            last_token_flat_indices = torch.cumsum(prompt_lens, dim=0) - 1
-            pooled_data = hidden_states[last_token_flat_indices]
-        else:
-            raise ValueError(f"Invalid pooling type: {self.pooling_type}")
+        # The profile run has no pooling parameters.
+        default_params = PoolingParams()
+        params_list: List[PoolingParams] = []
+        for seq_ids, pooling_params in pooling_metadata.seq_groups:
+            params_list.extend([pooling_params or default_params] *
+                               len(seq_ids))
+        num_seqs = len(params_list)
+        hidden_size = hidden_states.shape[1]
+
+        # Group the sequences by pooling type, so that each type runs once.
+        pooling_types = [
+            PoolingType[params.pooling_type.upper()]
+            if params.pooling_type is not None else self.pooling_type
+            for params in params_list
+        ]
+        pooled_data = self._pool(hidden_states, prompt_lens, pooling_types[0])
+        for pooling_type in dict.fromkeys(pooling_types[1:]):
+            if pooling_type == pooling_types[0]:
+                continue
+            type_indices = torch.tensor(
+                [i for i, t in enumerate(pooling_types) if t == pooling_type],
+                device=hidden_states.device)
+            pooled_data[type_indices] = self._pool(
+                hidden_states, prompt_lens, pooling_type)[type_indices]
+
+        # Matryoshka truncation: zero the dropped dimensions, so that they do
+        # not count in the norm, and slice them off on the host.
+        dimensions = [
+            min(params.dimensions or hidden_size, hidden_size)
+            for params in params_list
+        ]
+        if any(dims < hidden_size for dims in dimensions):
+            dims_t = torch.tensor(dimensions, device=hidden_states.device)
+            mask = (torch.arange(hidden_size, device=hidden_states.device) <
+                    dims_t.unsqueeze(1))
+            pooled_data = pooled_data * mask
 
         if self.normalize:
             pooled_data = nn.functional.normalize(pooled_data, p=2, dim=1)
 
+        embeddings: List[List[float]] = [[] for _ in range(num_seqs)]
+        quantizations = [params.quantization for params in params_list]
+        for quantization in dict.fromkeys(quantizations):
+            indices = [
+                i for i, q in enumerate(quantizations) if q == quantization
+            ]
+            data = pooled_data
+            if len(indices) < num_seqs:
+                data = pooled_data[torch.tensor(indices,
+                                                device=pooled_data.device)]
+            # Copy the embeddings to the host at once.
+            rows = _quantize(data, quantization).tolist()
+            for i, row in zip(indices, rows):
+                dims = dimensions[i]
+                if quantization == "binary":
+                    dims = (dims + 7) // 8
+                embeddings[i] = row[:dims] if dims < len(row) else row
+
         pooled_outputs = [
-            EmbeddingSequenceGroupOutput(data.tolist()) for data in pooled_data
+            EmbeddingSequenceGroupOutput(embedding)
+            for embedding in embeddings
         ]
 
         return PoolerOutput(outputs=pooled_outputs)
+
+
+def _quantize(data: torch.Tensor, quantization: Optional[str]) -> torch.Tensor:
+    """Quantize each row of the pooled data, see `PoolingParams`."""
+    if quantization is None:
+        return data
+    if quantization == "int8":
+        scale = 127.0 / data.abs().amax(dim=1, keepdim=True).clamp(min=1e-12)
+        return (data.float() * scale).round().clamp(-127, 127).to(torch.int8)
+    if quantization == "binary":
+        bits = (data > 0).to(torch.uint8)
+        pad = -bits.shape[1] % 8
+        if pad:
+            bits = nn.functional.pad(bits, (0, pad))
+        weights = torch.tensor([128, 64, 32, 16, 8, 4, 2, 1],
+                               dtype=torch.uint8,
+                               device=data.device)
+        return (bits.view(bits.shape[0], -1, 8) * weights).sum(
+            dim=2, dtype=torch.uint8)
+    raise ValueError(f"Invalid quantization: {quantization}")
@@ -1,40 +1,57 @@
-from typing import Dict, Type
+import importlib
+from typing import Dict, Iterator, Mapping, Tuple, Type
 
-from vllm.model_executor.layers.quantization.aqlm import AQLMConfig
-from vllm.model_executor.layers.quantization.awq import AWQConfig
 from vllm.model_executor.layers.quantization.base_config import (
     QuantizationConfig)
-from vllm.model_executor.layers.quantization.bitsandbytes import (
-    BitsAndBytesConfig)
-from vllm.model_executor.layers.quantization.compressed_tensors.compressed_tensors import (  # noqa: E501
-    CompressedTensorsConfig)
-from vllm.model_executor.layers.quantization.deepspeedfp import (
-    DeepSpeedFPConfig)
-from vllm.model_executor.layers.quantization.fp8 import Fp8Config
-from vllm.model_executor.layers.quantization.gptq import GPTQConfig
-from vllm.model_executor.layers.quantization.gptq_marlin import (
-    GPTQMarlinConfig)
-from vllm.model_executor.layers.quantization.gptq_marlin_24 import (
-    GPTQMarlin24Config)
-from vllm.model_executor.layers.quantization.marlin import MarlinConfig
-from vllm.model_executor.layers.quantization.squeezellm import SqueezeLLMConfig
-
-QUANTIZATION_METHODS: Dict[str, Type[QuantizationConfig]] = {
-    "aqlm": AQLMConfig,
-    "awq": AWQConfig,
-    "deepspeedfp": DeepSpeedFPConfig,
-    "fp8": Fp8Config,
+
+# Method -> (module, class). The modules are only imported when the config
+# class of their method is looked up, as some of them import custom ops or
+# third-party libraries.
+_QUANTIZATION_METHODS: Dict[str, Tuple[str, str]] = {
+    # Comes first, so that its override_quantization_method(..) runs the
+    # gptq, awq and compressed-tensors checkpoints on CPU.
+    "cpu_wna16": ("cpu_wna16", "CPUWNA16Config"),
+    "aqlm": ("aqlm", "AQLMConfig"),
+    "awq": ("awq", "AWQConfig"),
+    "deepspeedfp": ("deepspeedfp", "DeepSpeedFPConfig"),
+    "fp8": ("fp8", "Fp8Config"),
     # The order of gptq methods is important for config.py iteration over
     # override_quantization_method(..)
-    "marlin": MarlinConfig,
-    "gptq_marlin_24": GPTQMarlin24Config,
-    "gptq_marlin": GPTQMarlinConfig,
-    "gptq": GPTQConfig,
-    "squeezellm": SqueezeLLMConfig,
-    "compressed-tensors": CompressedTensorsConfig,
-    "bitsandbytes": BitsAndBytesConfig,
+    "marlin": ("marlin", "MarlinConfig"),
+    "gptq_marlin_24": ("gptq_marlin_24", "GPTQMarlin24Config"),
+    "gptq_marlin": ("gptq_marlin", "GPTQMarlinConfig"),
+    "gptq": ("gptq", "GPTQConfig"),
+    "squeezellm": ("squeezellm", "SqueezeLLMConfig"),
+    "compressed-tensors": ("compressed_tensors.compressed_tensors",
+                           "CompressedTensorsConfig"),
+    "bitsandbytes": ("bitsandbytes", "BitsAndBytesConfig"),
 }
 
+# The methods whose config class implements override_quantization_method(..).
+# Detecting the method of a checkpoint only imports these.
+_OVERRIDE_METHODS = {"cpu_wna16", "marlin", "gptq_marlin_24", "gptq_marlin"}
+
+
+class _LazyQuantizationMethods(Mapping[str, Type[QuantizationConfig]]):
+    """Quantization method -> config class, importing the class on first
+    access. Listing the methods imports nothing."""
+
+    def __getitem__(self, method: str) -> Type[QuantizationConfig]:
+        module_name, cls_name = _QUANTIZATION_METHODS[method]
+        module = importlib.import_module(
+            f"vllm.model_executor.layers.quantization.{module_name}")
+        return getattr(module, cls_name)
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(_QUANTIZATION_METHODS)
+
+    def __len__(self) -> int:
+        return len(_QUANTIZATION_METHODS)
+
+
+QUANTIZATION_METHODS: Mapping[str, Type[QuantizationConfig]] = (
+    _LazyQuantizationMethods())
+
 
 def get_quantization_config(quantization: str) -> Type[QuantizationConfig]:
     if quantization not in QUANTIZATION_METHODS:
@@ -42,8 +59,17 @@ def get_quantization_config(quantization: str) -> Type[QuantizationConfig]:
     return QUANTIZATION_METHODS[quantization]
 
 
+def get_override_quantization_configs() -> Iterator[Type[QuantizationConfig]]:
+    """Yield the config classes that may override the quantization method of
+    a checkpoint, in order of priority. Each one is imported when reached."""
+    for method in _QUANTIZATION_METHODS:
+        if method in _OVERRIDE_METHODS:
+            yield QUANTIZATION_METHODS[method]
+
+
 __all__ = [
     "QuantizationConfig",
     "get_quantization_config",
+    "get_override_quantization_configs",
     "QUANTIZATION_METHODS",
 ]
@@ -0,0 +1,475 @@
+from typing import Any, Dict, List, Optional
+
+import torch
+import torch.nn.functional as F
+from torch.nn.parameter import Parameter
+
+from vllm import _custom_ops as ops
+from vllm.logger import init_logger
+from vllm.model_executor.layers.linear import LinearBase, LinearMethodBase
+from vllm.model_executor.layers.quantization.base_config import (
+    QuantizationConfig)
+from vllm.model_executor.layers.quantization.compressed_tensors.utils import (
+    CompressionFormat, QuantizationArgs, QuantizationStrategy,
+    QuantizationType)
+from vllm.model_executor.layers.vocab_parallel_embedding import ParallelLMHead
+from vllm.model_executor.utils import set_weight_attrs
+from vllm.utils import is_cpu
+
+logger = init_logger(__name__)
+
+_SUPPORTED_BITS = [4, 8]
+# The kernel reads the weights of a row 32 at a time, so the groups are
+# multiples of 32 weights.
+_WEIGHTS_PER_STEP = 32
+# The int4 weights of output channel i of an AWQ int32 are at position
+# _AWQ_REVERSE_ORDER[i] of the int32.
+_AWQ_REVERSE_ORDER = [0, 4, 1, 5, 2, 6, 3, 7]
+# The parameters of each checkpoint format, replaced by the unpacked weights
+# once they are loaded.
+_CHECKPOINT_PARAMS = {
+    "gptq": ("qweight", "qzeros", "scales", "g_idx"),
+    "awq": ("qweight", "qzeros", "scales"),
+    "compressed-tensors": ("weight_packed", "weight_scale", "weight_shape"),
+}
+# Batches of more tokens are compute bound: they dequantize the weight and
+# run a dense matmul instead of the kernel.
+_MAX_KERNEL_TOKENS = 16
+
+
+class CPUWNA16Config(QuantizationConfig):
+    """Config class for the weight-only int4/int8 CPU kernels, which run the
+    GPTQ, AWQ and compressed-tensors wNa16 checkpoints on CPU."""
+
+    def __init__(
+        self,
+        weight_bits: int,
+        group_size: int,
+        desc_act: bool,
+        checkpoint_format: str,
+        lm_head_quantized: bool,
+    ) -> None:
+        self.weight_bits = weight_bits
+        self.group_size = group_size
+        self.desc_act = desc_act
+        self.checkpoint_format = checkpoint_format
+        self.lm_head_quantized = lm_head_quantized
+        if self.weight_bits not in _SUPPORTED_BITS:
+            raise ValueError(
+                "Currently, only 4/8-bit weight quantization is supported "
+                f"on CPU, but got {self.weight_bits} bits.")
+        if self.checkpoint_format not in _CHECKPOINT_PARAMS:
+            raise ValueError(
+                f"Unknown checkpoint format: {self.checkpoint_format}.")
+
+    def __repr__(self) -> str:
+        return (f"CPUWNA16Config(weight_bits={self.weight_bits}, "
+                f"group_size={self.group_size}, "
+                f"desc_act={self.desc_act}, "
+                f"checkpoint_format={self.checkpoint_format}, "
+                f"lm_head_quantized={self.lm_head_quantized})")
+
+    @classmethod
+    def get_name(cls) -> str:
+        return "cpu_wna16"
+
+    @classmethod
+    def get_supported_act_dtypes(cls) -> List[torch.dtype]:
+        return [torch.bfloat16, torch.float32]
+
+    @classmethod
+    def get_min_capability(cls) -> int:
+        # Runs on CPU, which has no compute capability.
+        return 0
+
+    @classmethod
+    def get_config_filenames(cls) -> List[str]:
+        return ["quant_config.json", "quantize_config.json"]
+
+    @classmethod
+    def from_config(cls, config: Dict[str, Any]) -> "CPUWNA16Config":
+        checkpoint_format = cls.get_checkpoint_format(config)
+        if checkpoint_format is None:
+            raise ValueError(
+                "Only 4/8-bit GPTQ, 4-bit AWQ and compressed-tensors wNa16 "
+                "checkpoints with groups of a multiple of "
+                f"{_WEIGHTS_PER_STEP} weights run on CPU, got {config}.")
+        if checkpoint_format == "compressed-tensors":
+            weight_args = cls._get_wna16_weight_args(config)
+            assert weight_args is not None
+            group_size = (weight_args.group_size if weight_args.strategy
+                          == QuantizationStrategy.GROUP.value else -1)
+            return cls(weight_args.num_bits, group_size, False,
+                       checkpoint_format, False)
+        weight_bits = cls.get_from_keys(config, ["w_bit", "bits"])
+        group_size = cls.get_from_keys(config, ["q_group_size", "group_size"])
+        desc_act = cls.get_from_keys_or(config, ["desc_act"], default=False)
+        lm_head_quantized = cls.get_from_keys_or(config, ["lm_head"],
+                                                 default=False)
+        return cls(weight_bits, group_size, desc_act, checkpoint_format,
+                   lm_head_quantized)
+
+    @classmethod
+    def override_quantization_method(cls, hf_quant_cfg,
+                                     user_quant) -> Optional[str]:
+        if not is_cpu():
+            return None
+        checkpoint_format = cls.get_checkpoint_format(hf_quant_cfg)
+        if checkpoint_format is None:
+            return None
+        if user_quant is None or user_quant in (cls.get_name(),
+                                                checkpoint_format):
+            logger.info("Running the %s checkpoint with the %s CPU kernels.",
+                        checkpoint_format, cls.get_name())
+            return cls.get_name()
+        return None
+
+    @classmethod
+    def get_checkpoint_format(cls, quant_config: Dict[str,
+                                                      Any]) -> Optional[str]:
+        """Returns the format of a quantized checkpoint that the CPU kernels
+        run: "gptq", "awq" or "compressed-tensors". None if they don't run
+        the checkpoint."""
+        if "config_groups" in quant_config:
+            if cls._get_wna16_weight_args(quant_config) is None:
+                return None
+            return "compressed-tensors"
+
+        quant_method = quant_config.get("quant_method", "").lower()
+        if not quant_method:
+            # The quantize_config.json of a GPTQ checkpoint, or the
+            # quant_config.json of an AWQ checkpoint.
+            quant_method = "awq" if "zero_point" in quant_config else "gptq"
+        weight_bits = cls.get_from_keys_or(quant_config, ["w_bit", "bits"],
+                                           default=None)
+        group_size = cls.get_from_keys_or(quant_config,
+                                          ["q_group_size", "group_size"],
+                                          default=None)
+        if quant_method == "gptq":
+            supported = (weight_bits in _SUPPORTED_BITS
+                         and quant_config.get("checkpoint_format",
+                                              "gptq") == "gptq")
+        elif quant_method == "awq":
+            supported = (weight_bits == 4
+                         and quant_config.get("zero_point", True)
+                         and quant_config.get("version",
+                                              "gemm").lower() == "gemm")
+        else:
+            return None
+        if group_size is None or (group_size != -1
+                                  and group_size % _WEIGHTS_PER_STEP != 0):
+            return None
+        return quant_method if supported else None
+
+    @staticmethod
+    def _get_wna16_weight_args(
+            quant_config: Dict[str, Any]) -> Optional[QuantizationArgs]:
+        """Returns the weight quantization of a compressed-tensors checkpoint
+        whose layers all have the same symmetric int4/int8 weight-only
+        quantization, per channel or group. None for other checkpoints."""
+        if quant_config.get("format") != CompressionFormat.pack_quantized.value:
+            return None
+        all_weight_args: List[QuantizationArgs] = []
+        for group in quant_config["config_groups"].values():
+            if group.get("input_activations") is not None:
+                return None
+            all_weight_args.append(
+                QuantizationArgs.parse_obj(group.get("weights")))
+        if not all_weight_args or any(weight_args != all_weight_args[0]
+                                      for weight_args in all_weight_args):
+            return None
+
+        weight_args = all_weight_args[0]
+        if weight_args.strategy == QuantizationStrategy.GROUP.value:
+            supported_group = (weight_args.group_size is not None
+                               and weight_args.group_size %
+                               _WEIGHTS_PER_STEP == 0)
+        else:
+            supported_group = (
+                weight_args.strategy == QuantizationStrategy.CHANNEL.value)
+        if (weight_args.num_bits not in _SUPPORTED_BITS
+                or weight_args.type != QuantizationType.INT
+                or not weight_args.symmetric or weight_args.dynamic
+                or not supported_group):
+            return None
+        return weight_args
+
+    def get_quant_method(
+            self, layer: torch.nn.Module) -> Optional["CPUWNA16LinearMethod"]:
+        if (isinstance(layer, LinearBase) or
+            (isinstance(layer, ParallelLMHead) and self.lm_head_quantized)):
+            return CPUWNA16LinearMethod(self)
+        return None
+
+    def get_scaled_act_names(self) -> List[str]:
+        return []
+
+
+def _unpack_int32(packed: torch.Tensor, num_bits: int,
+                  dim: int) -> torch.Tensor:
+    """Unpacks the values of `num_bits` bits packed in the int32s of `packed`
+    along `dim`, starting from the lowest bits."""
+    shifts = torch.arange(0, 32, num_bits, dtype=torch.int32)
+    unpacked = (packed.unsqueeze(-1) >> shifts) & ((1 << num_bits) - 1)
+    shape = list(packed.shape)
+    shape[dim] *= len(shifts)
+    return unpacked.movedim(-1, dim + 1).reshape(shape)
+
+
+def _reorder_awq(unpacked: torch.Tensor) -> torch.Tensor:
+    """Puts the output channels unpacked from AWQ int32s in order."""
+    shape = unpacked.shape
+    return unpacked.view(*shape[:-1], -1, 8)[..., _AWQ_REVERSE_ORDER].reshape(
+        shape)
+
+
+class CPUWNA16LinearMethod(LinearMethodBase):
+    """Linear method for the weight-only int4/int8 CPU kernels.
+
+    The weights are loaded in the layout of their checkpoint format, then
+    unpacked into the layout of the kernels: the [output_size, input_size]
+    int8 weights, or int4 weights packed two to a byte, where byte i of each
+    16 holds weight i of 32 in its low 4 bits and weight i + 16 in its high
+    4 bits. The scales and zero points of the groups are float32
+    [output_size, num_groups] tensors.
+
+    Args:
+        quant_config: The CPU wNa16 quantization config.
+    """
+
+    def __init__(self, quant_config: CPUWNA16Config):
+        self.quant_config = quant_config
+
+    def create_weights(
+        self,
+        layer: torch.nn.Module,
+        input_size_per_partition: int,
+        output_partition_sizes: List[int],
+        input_size: int,
+        output_size: int,
+        params_dtype: torch.dtype,
+        **extra_weight_attrs,
+    ):
+        del output_size  # Unused.
+        output_size_per_partition = sum(output_partition_sizes)
+        weight_bits = self.quant_config.weight_bits
+        pack_factor = 32 // weight_bits
+        if self.quant_config.group_size != -1:
+            group_size = self.quant_config.group_size
+        else:
+            group_size = input_size
+        if (input_size_per_partition % group_size != 0
+                or group_size % _WEIGHTS_PER_STEP != 0):
+            raise ValueError(
+                "The input size is not aligned with the quantized "
+                "weight shape. This can be caused by too large "
+                "tensor parallel size.")
+        checkpoint_format = self.quant_config.checkpoint_format
+        # GPTQ and AWQ pack the zero points along the output.
+        if (checkpoint_format != "compressed-tensors"
+                and output_size_per_partition % pack_factor != 0):
+            raise ValueError(
+                "The output size is not aligned with the quantized "
+                "weight shape. This can be caused by too large "
+                "tensor parallel size.")
+        num_groups = input_size_per_partition // group_size
+        # The scales and zero points of the groups are partitioned with the
+        # input, those of the channels are not.
+        group_input_dim = None if self.quant_config.group_size == -1 else 0
+
+        params: Dict[str, Parameter] = {}
+        if checkpoint_format == "gptq":
+            params["qweight"] = Parameter(torch.empty(
+                input_size_per_partition // pack_factor,
+                output_size_per_partition,
+                dtype=torch.int32),
+                                          requires_grad=False)
+            set_weight_attrs(
+                params["qweight"], {
+                    "input_dim": 0,
+                    "output_dim": 1,
+                    "packed_dim": 0,
+                    "pack_factor": pack_factor,
+                })
+            params["qzeros"] = Parameter(torch.empty(
+                num_groups,
+                output_size_per_partition // pack_factor,
+                dtype=torch.int32),
+                                         requires_grad=False)
+            set_weight_attrs(
+                params["qzeros"], {
+                    "input_dim": group_input_dim,
+                    "output_dim": 1,
+                    "packed_dim": 1,
+                    "pack_factor": pack_factor,
+                })
+            params["scales"] = Parameter(torch.empty(
+                num_groups, output_size_per_partition, dtype=params_dtype),
+                                         requires_grad=False)
+            set_weight_attrs(params["scales"], {
+                "input_dim": group_input_dim,
+                "output_dim": 1,
+            })
+            params["g_idx"] = Parameter(
+                torch.arange(input_size_per_partition, dtype=torch.int32) //
+                group_size,
+                requires_grad=False)
+            # Ignore warning from fused linear layers such as
+            # QKVParallelLinear.
+            set_weight_attrs(params["g_idx"], {
+                "input_dim": 0,
+                "ignore_warning": True
+            })
+        elif checkpoint_format == "awq":
+            params["qweight"] = Parameter(torch.empty(
+                input_size_per_partition,
+                output_size_per_partition // pack_factor,
+                dtype=torch.int32),
+                                          requires_grad=False)
+            set_weight_attrs(
+                params["qweight"], {
+                    "input_dim": 0,
+                    "output_dim": 1,
+                    "packed_dim": 1,
+                    "pack_factor": pack_factor,
+                })
+            params["qzeros"] = Parameter(torch.empty(
+                num_groups,
+                output_size_per_partition // pack_factor,
+                dtype=torch.int32),
+                                         requires_grad=False)
+            set_weight_attrs(
+                params["qzeros"], {
+                    "input_dim": group_input_dim,
+                    "output_dim": 1,
+                    "packed_dim": 1,
+                    "pack_factor": pack_factor,
+                })
+            params["scales"] = Parameter(torch.empty(
+                num_groups, output_size_per_partition, dtype=params_dtype),
+                                         requires_grad=False)
+            set_weight_attrs(params["scales"], {
+                "input_dim": group_input_dim,
+                "output_dim": 1,
+            })
+        else:
+            params["weight_packed"] = Parameter(torch.empty(
+                output_size_per_partition,
+                input_size_per_partition // pack_factor,
+                dtype=torch.int32),
+                                                requires_grad=False)
+            set_weight_attrs(
+                params["weight_packed"], {
+                    "input_dim": 1,
+                    "output_dim": 0,
+                    "packed_dim": 1,
+                    "pack_factor": pack_factor,
+                })
+            params["weight_scale"] = Parameter(torch.empty(
+                output_size_per_partition, num_groups, dtype=params_dtype),
+                                               requires_grad=False)
+            set_weight_attrs(params["weight_scale"], {
+                "input_dim": None if group_input_dim is None else 1,
+                "output_dim": 0,
+            })
+            # The shape of the weights before packing.
+            params["weight_shape"] = Parameter(torch.empty(2,
+                                                           dtype=torch.int64),
+                                               requires_grad=False)
+            set_weight_attrs(params["weight_shape"], {"ignore_warning": True})
+
+        for name, param in params.items():
+            layer.register_parameter(name, param)
+            set_weight_attrs(param, extra_weight_attrs)
+        layer.group_size = group_size
+
+    def process_weights_after_loading(self, layer: torch.nn.Module) -> None:
+        weight_bits = self.quant_config.weight_bits
+        checkpoint_format = self.quant_config.checkpoint_format
+        perm = None
+        # The [output_size, input_size] weights, and the
+        # [output_size, num_groups] scales and zero points, in the units of
+        # the weights.
+        if checkpoint_format == "gptq":
+            qweight = _unpack_int32(layer.qweight, weight_bits, dim=0).t()
+            # GPTQ stores the zero points minus 1.
+            zeros = _unpack_int32(layer.qzeros, weight_bits, dim=1).t() + 1
+            scales = layer.scales.t()
+            if (self.quant_config.desc_act
+                    and self.quant_config.group_size != -1):
+                # The weights of a group are contiguous once sorted by group,
+                # the inputs are permuted the same way.
+                perm = torch.argsort(layer.g_idx)
+                qweight = qweight[:, perm]
+        elif checkpoint_format == "awq":
+            qweight = _reorder_awq(_unpack_int32(layer.qweight, 4, dim=1)).t()
+            zeros = _reorder_awq(_unpack_int32(layer.qzeros, 4, dim=1)).t()
+            scales = layer.scales.t()
+        else:
+            qweight = _unpack_int32(layer.weight_packed, weight_bits, dim=1)
+            # The symmetric weights are stored with an offset of half their
+            # range.
+            zeros = torch.full(layer.weight_scale.shape,
+                               1 << (weight_bits - 1))
+            scales = layer.weight_scale
+
+        if weight_bits == 8:
+            # Centered on 0 to fit in int8.
+            qweight = (qweight - 128).to(torch.int8)
+            zeros = zeros - 128
+        else:
+            qweight = qweight.to(torch.uint8).reshape(qweight.shape[0], -1, 2,
+                                                      16)
+            qweight = (qweight[:, :, 0] | (qweight[:, :, 1] << 4)).reshape(
+                qweight.shape[0], -1)
+
+        for name in _CHECKPOINT_PARAMS[checkpoint_format]:
+            delattr(layer, name)
+        layer.register_parameter(
+            "qweight", Parameter(qweight.contiguous(), requires_grad=False))
+        layer.register_parameter(
+            "scales",
+            Parameter(scales.to(torch.float32).contiguous(),
+                      requires_grad=False))
+        layer.register_parameter(
+            "zeros",
+            Parameter(zeros.to(torch.float32).contiguous(),
+                      requires_grad=False))
+        layer.register_parameter(
+            "perm",
+            None if perm is None else Parameter(perm, requires_grad=False))
+
+    def apply(self,
+              layer: torch.nn.Module,
+              x: torch.Tensor,
+              bias: Optional[torch.Tensor] = None) -> torch.Tensor:
+        out_shape = x.shape[:-1] + (layer.qweight.shape[0], )
+        reshaped_x = x.reshape(-1, x.shape[-1])
+        if layer.perm is not None:
+            reshaped_x = reshaped_x[:, layer.perm]
+
+        if reshaped_x.shape[0] > _MAX_KERNEL_TOKENS:
+            weight = self._dequantize(layer).to(x.dtype)
+            output = F.linear(reshaped_x, weight)
+        else:
+            output = torch.empty(reshaped_x.shape[0],
+                                 layer.qweight.shape[0],
+                                 dtype=x.dtype)
+            ops.wna16_gemm(output, reshaped_x, layer.qweight, layer.scales,
+                           layer.zeros, self.quant_config.weight_bits,
+                           layer.group_size)
+        if bias is not None:
+            output.add_(bias)
+        return output.reshape(out_shape)
+
+    def _dequantize(self, layer: torch.nn.Module) -> torch.Tensor:
+        """Returns the float32 [output_size, input_size] weights."""
+        qweight = layer.qweight
+        output_size = qweight.shape[0]
+        if self.quant_config.weight_bits == 4:
+            qweight = qweight.view(output_size, -1, 1, 16)
+            qweight = torch.cat((qweight & 0x0F, qweight >> 4), dim=2)
+        qweight = qweight.reshape(output_size, -1, layer.group_size)
+        weight = ((qweight.to(torch.float32) - layer.zeros.unsqueeze(-1)) *
+                  layer.scales.unsqueeze(-1))
+        return weight.reshape(output_size, -1)
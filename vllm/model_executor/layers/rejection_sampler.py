@@ -93,6 +93,111 @@ class RejectionSampler(SpecDecodeBaseSampler):
 
         return output_token_ids
 
+    def forward_branches(
+        self,
+        target_probs: torch.Tensor,
+        bonus_token_ids: torch.Tensor,
+        draft_probs: torch.Tensor,
+        draft_token_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Verify several branches of draft tokens for each sequence, which
+        all continue the same context.
+
+        The first draft tokens of the branches are verified one after the
+        other with recursive rejection sampling, as in "SpecInfer:
+        Accelerating Generative Large Language Model Serving with Tree-based
+        Speculative Inference and Verification"
+        https://arxiv.org/abs/2305.09781: each branch is verified against the
+        target distribution conditioned on the rejection of the previous
+        ones. The later tokens of the branch whose first token is accepted
+        are verified as in forward, so the output still follows the target
+        distribution. See SpecDecodeBaseSampler.forward_branches for the
+        shapes.
+        """
+        batch_size, _, k = draft_token_ids.shape
+        selected_branches, first_accepted, first_recovered_token_ids = (
+            self._select_branches(target_probs[:, 0, 0], draft_probs[:, :, 0],
+                                  draft_token_ids[:, :, 0]))
+
+        rows = torch.arange(batch_size, device=target_probs.device)
+        draft_token_ids = draft_token_ids[rows, selected_branches]
+        accepted, recovered_token_ids = (
+            self._batch_modified_rejection_sampling(
+                target_probs[rows, selected_branches],
+                draft_probs[rows, selected_branches],
+                draft_token_ids,
+            ))
+        accepted[:, 0] = first_accepted
+        recovered_token_ids[:, 0] = first_recovered_token_ids
+
+        output_token_ids = self._create_output(
+            accepted,
+            recovered_token_ids,
+            draft_token_ids,
+            bonus_token_ids[rows, selected_branches],
+        )
+        return output_token_ids, selected_branches
+
+    def _select_branches(
+            self,
+            target_probs: torch.Tensor,  # [batch_size, vocab_size]
+            draft_probs: torch.Tensor,  # [batch_size, num_branches, vocab_size]
+            draft_token_ids: torch.Tensor,  # [batch_size, num_branches]
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Verify the first draft token of every branch with recursive
+        rejection sampling.
+
+        Returns:
+            A tuple of three tensors, of shape [batch_size]:
+            0: The branch whose first token is accepted, or 0.
+            1: Whether a first token is accepted.
+            2: A token id sampled from the distribution left after all first
+                tokens are rejected.
+        """
+        batch_size, num_branches = draft_token_ids.shape
+        device = target_probs.device
+        rows = torch.arange(batch_size, device=device)
+
+        probs = target_probs.clone()
+        selected_branches = torch.zeros(batch_size,
+                                        dtype=torch.long,
+                                        device=device)
+        accepted = torch.zeros(batch_size, dtype=torch.bool, device=device)
+        uniform_rand = torch.rand(batch_size,
+                                  num_branches,
+                                  dtype=self.probs_dtype,
+                                  device=device)
+        for branch in range(num_branches):
+            token_ids = draft_token_ids[:, branch]
+            branch_draft_probs = draft_probs[:, branch]
+            capped_ratio = torch.clamp(probs[rows, token_ids] /
+                                       branch_draft_probs[rows, token_ids],
+                                       max=1)
+            accepted_branch = ~accepted & (uniform_rand[:, branch] <
+                                           capped_ratio)
+            selected_branches.masked_fill_(accepted_branch, branch)
+            accepted |= accepted_branch
+
+            # The target distribution given that this branch is rejected.
+            residual = torch.clamp(probs - branch_draft_probs,
+                                   min=self._smallest_positive_value)
+            residual /= residual.sum(dim=-1, keepdim=True)
+            probs = torch.where(accepted[:, None], probs, residual)
+
+        # NOTE: probs is overwritten by _multinomial.
+        recovered_token_ids = _multinomial(probs, num_samples=1).view(
+            batch_size)
+        return selected_branches, accepted, recovered_token_ids
+
+    def _verify(
+        self,
+        target_probs: torch.Tensor,
+        draft_probs: torch.Tensor,
+        draft_token_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        return self._batch_modified_rejection_sampling(
+            target_probs, draft_probs, draft_token_ids)
+
     def _batch_modified_rejection_sampling(
             self,
             target_probs: torch.Tensor,  # [batch_size, k, vocab_size]
@@ -2,6 +2,7 @@
 import itertools
 from typing import Dict, List, Optional, Tuple
 
+import numpy as np
 import torch
 import torch.nn as nn
 
@@ -10,7 +11,7 @@ from vllm.model_executor.sampling_metadata import (SamplingMetadata,
                                                    SamplingTensors,
                                                    SequenceGroupToSample)
 from vllm.sampling_params import SamplingType
-from vllm.sequence import (CompletionSequenceGroupOutput, Logprob,
+from vllm.sequence import (CompletionSequenceGroupOutput, LogprobsArray,
                            PromptLogprobs, SampleLogprobs, SamplerOutput,
                            SequenceOutput)
 
@@ -791,15 +792,17 @@ def _get_logprobs(
     else:
         top_logprobs, top_token_ids = None, None
 
-    selected_logprobs = selected_logprobs.to('cpu')
-    ranks = ranks.to('cpu')
+    selected_logprobs = selected_logprobs.to('cpu').numpy()
+    ranks = ranks.to('cpu').numpy()
     if top_logprobs is not None and top_token_ids is not None:
-        top_logprobs = top_logprobs.to('cpu')
-        top_token_ids = top_token_ids.to('cpu')
+        top_logprobs = top_logprobs.to('cpu').numpy()
+        top_token_ids = top_token_ids.to('cpu').numpy()
 
-    # Find prompt/sample logprobs.
+    # Find prompt/sample logprobs. The sample logprobs of all sequence groups
+    # share one array, which the sequences copy their rows out of.
     prompt_logprobs_per_seq_group: List[Optional[PromptLogprobs]] = []
     sample_logprobs_per_seq_group: List[SampleLogprobs] = []
+    sample_logprobs_array = LogprobsArray()
     top_logprob_idx = 0
     selected_logprobs_idx = 0
 
@@ -814,18 +817,63 @@ def _get_logprobs(
         (sampled_logprobs, top_logprob_idx,
          selected_logprobs_idx) = _get_sampled_logprob_if_needed(
              seq_group, sample_result, selected_logprobs, ranks, top_token_ids,
-             top_logprobs, selected_logprobs_idx, top_logprob_idx)
+             top_logprobs, selected_logprobs_idx, top_logprob_idx,
+             sample_logprobs_array)
         sample_logprobs_per_seq_group.append(sampled_logprobs)
 
     return prompt_logprobs_per_seq_group, sample_logprobs_per_seq_group
 
 
+def _flatten_logprobs(
+    token_ids: np.ndarray,
+    logprobs: np.ndarray,
+    ranks: np.ndarray,
+    top_token_ids: Optional[np.ndarray],
+    top_logprobs: Optional[np.ndarray],
+) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+    """Flatten the logprobs of several positions for
+    `LogprobsArray.extend_rows`.
+
+    Each position holds its token, followed by the top K tokens, which are
+    already sorted by rank, so their ranks are 1 ~ K. A token that is also
+    among the top K is only kept once, first, with the logprob and rank of
+    its top K entry.
+
+    Returns the flat token ids, logprobs and ranks, and the number of
+    entries of each position.
+    """
+    num_positions = len(token_ids)
+    if top_token_ids is None or top_token_ids.shape[1] == 0:
+        return (token_ids, logprobs, ranks,
+                np.ones(num_positions, dtype=np.int64))
+    assert top_logprobs is not None
+    num_logprobs = top_token_ids.shape[1]
+    is_top = top_token_ids == token_ids[:, None]
+    in_top = is_top.any(axis=1)
+    top_idx = is_top.argmax(axis=1)[in_top]
+    logprobs = logprobs.astype(np.float64)
+    ranks = ranks.astype(np.int64)
+    logprobs[in_top] = top_logprobs[in_top, top_idx]
+    ranks[in_top] = top_idx + 1
+
+    keep = np.concatenate([np.ones((num_positions, 1), dtype=bool), ~is_top],
+                          axis=1)
+    all_token_ids = np.concatenate([token_ids[:, None], top_token_ids],
+                                   axis=1)
+    all_logprobs = np.concatenate([logprobs[:, None], top_logprobs], axis=1)
+    top_ranks = np.broadcast_to(np.arange(1, num_logprobs + 1),
+                                (num_positions, num_logprobs))
+    all_ranks = np.concatenate([ranks[:, None], top_ranks], axis=1)
+    return (all_token_ids[keep], all_logprobs[keep], all_ranks[keep],
+            keep.sum(axis=1))
+
+
 def _get_prompt_logprob_if_needed(
     seq_group: SequenceGroupToSample,
-    selected_logprobs: torch.Tensor,
-    ranks: torch.Tensor,
-    top_token_ids: torch.Tensor,
-    top_logprobs: torch.Tensor,
+    selected_logprobs: np.ndarray,
+    ranks: np.ndarray,
+    top_token_ids: Optional[np.ndarray],
+    top_logprobs: Optional[np.ndarray],
     selected_logprobs_idx: int,
     top_logprob_idx: int,
 ):
@@ -834,63 +882,47 @@ def _get_prompt_logprob_if_needed(
     is_prompt = seq_group.is_prompt
 
     # Find prompt logprobs
-    prompt_logprobs: Optional[PromptLogprobs] = None
+    prompt_logprobs: Optional[LogprobsArray] = None
     if is_prompt and sampling_params.prompt_logprobs is not None:
-        prompt_logprobs = []
         num_logprobs = sampling_params.prompt_logprobs
         next_prompt_tokens = _get_next_prompt_tokens(seq_group)
-        # Pre-select indexes and create a list. It is faster than calling .item
-        # repetitively.
-        selected_logprob_items = selected_logprobs[
-            selected_logprobs_idx:selected_logprobs_idx +
-            len(next_prompt_tokens)].tolist()
-        rank_items = ranks[selected_logprobs_idx:selected_logprobs_idx +
-                           len(next_prompt_tokens)].tolist()
-
-        for idx, token_id in enumerate(next_prompt_tokens):
-            # Calculate the prompt logprob of the real prompt tokens.
-            # {token_id: (logprob, rank_from_vocab)}
-            prompt_logprobs_dict: Dict[int, Tuple[float, int]] = {
-                token_id: (selected_logprob_items[idx], rank_items[idx])
-            }
-
-            # Add top K prompt logprobs along with its rank.
-            if num_logprobs > 0:
-                top_ids = top_token_ids[
-                    top_logprob_idx, :num_logprobs].tolist()
-                top_probs = top_logprobs[
-                    top_logprob_idx, :num_logprobs].tolist()
-                # Top K is already sorted by rank, so we can use 1 ~
-                # num_logprobs + 1 for rank.
-                top_ranks = range(1, num_logprobs + 1)
-                prompt_logprobs_dict.update({
-                    top_id: (top_prob, rank)
-                    for top_id, top_prob, rank in zip(top_ids, top_probs,
-                                                      top_ranks)
-                })
-            prompt_logprobs.append({
-                token_id: Logprob(*logprob_and_rank)
-                for token_id, logprob_and_rank in prompt_logprobs_dict.items()
-            })
-            # + 1 to go to the next prompt token.
-            top_logprob_idx += 1
-
+        num_tokens = len(next_prompt_tokens)
+        position_top_token_ids = None
+        position_top_logprobs = None
+        if num_logprobs > 0:
+            assert top_token_ids is not None and top_logprobs is not None
+            position_top_token_ids = top_token_ids[
+                top_logprob_idx:top_logprob_idx + num_tokens, :num_logprobs]
+            position_top_logprobs = top_logprobs[
+                top_logprob_idx:top_logprob_idx + num_tokens, :num_logprobs]
+        prompt_logprobs = LogprobsArray()
+        prompt_logprobs.extend_rows(*_flatten_logprobs(
+            np.array(next_prompt_tokens, dtype=np.int64),
+            selected_logprobs[selected_logprobs_idx:selected_logprobs_idx +
+                              num_tokens],
+            ranks[selected_logprobs_idx:selected_logprobs_idx + num_tokens],
+            position_top_token_ids, position_top_logprobs))
+
+        # + 1 per prompt token to go to the next prompt token.
+        top_logprob_idx += num_tokens
         # + len(next_prompt_tokens) to go to the next prompt.
-        selected_logprobs_idx += len(next_prompt_tokens)
+        selected_logprobs_idx += num_tokens
     return prompt_logprobs, top_logprob_idx, selected_logprobs_idx
 
 
 def _get_sampled_logprob_if_needed(
     seq_group: SequenceGroupToSample,
     sample_result: Tuple[List[int], List[int]],
-    selected_logprobs: torch.Tensor,
-    ranks: torch.Tensor,
-    top_token_ids: torch.Tensor,
-    top_logprobs: torch.Tensor,
+    selected_logprobs: np.ndarray,
+    ranks: np.ndarray,
+    top_token_ids: Optional[np.ndarray],
+    top_logprobs: Optional[np.ndarray],
     selected_logprobs_idx: int,
     top_logprob_idx: int,
+    sample_logprobs_array: LogprobsArray,
 ):
-    """Compute the sample logprob if needed."""
+    """Compute the sample logprob if needed. The rows are appended to
+    `sample_logprobs_array`."""
     seq_ids = seq_group.seq_ids
     num_logprobs = seq_group.sampling_params.logprobs or 0
     sampled_logprobs: SampleLogprobs = []
@@ -898,39 +930,23 @@ def _get_sampled_logprob_if_needed(
 
     if seq_group.do_sample:
         assert len(next_token_ids) > 0
-        # Pre-select items from tensor. tolist() is faster than repetitive
-        # `.item()` calls.
-        selected_logprob_items = selected_logprobs[
-            selected_logprobs_idx:selected_logprobs_idx +
-            len(next_token_ids)].tolist()
-        rank_items = ranks[selected_logprobs_idx:selected_logprobs_idx +
-                           len(next_token_ids)].tolist()
-        for idx, (next_token_id,
-                  parent_id) in enumerate(zip(next_token_ids, parent_seq_ids)):
-            # Get the logprob of a sampled token.
-            sampled_logprobs_dict = {
-                next_token_id: (selected_logprob_items[idx], rank_items[idx])
-            }
-            # Get top K logprobs.
-            if num_logprobs > 0:
-                top_ids = top_token_ids[top_logprob_idx +
-                                        parent_id, :num_logprobs].tolist()
-                top_probs = top_logprobs[top_logprob_idx +
-                                         parent_id, :num_logprobs].tolist()
-                # Top K is already sorted by rank, so we can use 1 ~
-                # num_logprobs + 1 for rank.
-                top_ranks = range(1, num_logprobs + 1)
-                sampled_logprobs_dict.update({
-                    top_id: (top_prob, rank)
-                    for top_id, top_prob, rank in zip(top_ids, top_probs,
-                                                      top_ranks)
-                })
-
-            sampled_logprobs.append({
-                token_id: Logprob(*logprob_and_rank)
-                for token_id, logprob_and_rank in
-                sampled_logprobs_dict.items()
-            })
+        num_samples = len(next_token_ids)
+        sample_top_token_ids = None
+        sample_top_logprobs = None
+        # Get top K logprobs.
+        if num_logprobs > 0:
+            assert top_token_ids is not None and top_logprobs is not None
+            top_rows = top_logprob_idx + np.array(parent_seq_ids)
+            sample_top_token_ids = top_token_ids[top_rows, :num_logprobs]
+            sample_top_logprobs = top_logprobs[top_rows, :num_logprobs]
+        first_position = len(sample_logprobs_array)
+        sample_logprobs_array.extend_rows(*_flatten_logprobs(
+            np.array(next_token_ids, dtype=np.int64),
+            selected_logprobs[selected_logprobs_idx:selected_logprobs_idx +
+                              num_samples],
+            ranks[selected_logprobs_idx:selected_logprobs_idx + num_samples],
+            sample_top_token_ids, sample_top_logprobs))
+        sampled_logprobs = sample_logprobs_array[first_position:]
 
         # NOTE: This part of code is not intuitive. `selected_logprobs` include
         # logprobs for the current step, which has len(next_token_ids) tokens
@@ -1,5 +1,5 @@
 from abc import abstractmethod
-from typing import Optional
+from typing import Optional, Tuple
 
 import torch
 import torch.jit
@@ -64,6 +64,61 @@ class SpecDecodeBaseSampler(nn.Module):
     ) -> torch.Tensor:
         raise NotImplementedError
 
+    def forward_branches(
+        self,
+        target_probs: torch.Tensor,
+        bonus_token_ids: torch.Tensor,
+        draft_probs: torch.Tensor,
+        draft_token_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Verify several branches of draft tokens for each sequence, which
+        all continue the same context, and keep the branch with the longest
+        accepted prefix (the first one on a tie).
+
+        Args:
+            target_probs: shape = [batch_size, num_branches, k, vocab_size]
+            bonus_token_ids: shape = [batch_size, num_branches,
+                num_bonus_tokens]
+            draft_probs: shape = [batch_size, num_branches, k, vocab_size]
+            draft_token_ids: shape = [batch_size, num_branches, k]
+
+        Returns:
+            A tuple of two tensors:
+            0: The output token ids of the kept branches, as returned by
+                forward. shape = [batch_size, k + num_bonus_tokens]
+            1: The index of the kept branch of each sequence.
+                shape = [batch_size]
+        """
+        batch_size, num_branches, k = draft_token_ids.shape
+        accepted, substitute_token_ids = self._verify(
+            target_probs.flatten(0, 1), draft_probs.flatten(0, 1),
+            draft_token_ids.flatten(0, 1))
+        accepted = accepted.view(batch_size, num_branches, k)
+        substitute_token_ids = substitute_token_ids.view(
+            batch_size, num_branches, k)
+
+        num_leading_accepted = accepted.long().cumprod(dim=-1).sum(dim=-1)
+        selected_branches = num_leading_accepted.argmax(dim=1)
+        rows = torch.arange(batch_size, device=draft_token_ids.device)
+        output_token_ids = self._create_output(
+            accepted[rows, selected_branches],
+            substitute_token_ids[rows, selected_branches],
+            draft_token_ids[rows, selected_branches],
+            bonus_token_ids[rows, selected_branches],
+        )
+        return output_token_ids, selected_branches
+
+    def _verify(
+        self,
+        target_probs: torch.Tensor,
+        draft_probs: torch.Tensor,
+        draft_token_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        """Return which draft tokens are accepted, without applying
+        causality, and the token ids that replace a rejected draft token.
+        Both have shape [batch_size, k]."""
+        raise NotImplementedError
+
     def _create_output(
             self,
             accepted: torch.Tensor,  # [batch_size, k]
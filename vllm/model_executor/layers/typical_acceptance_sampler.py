@@ -1,3 +1,5 @@
+from typing import Tuple
+
 import torch
 import torch.jit
 
@@ -82,14 +84,25 @@ class TypicalAcceptanceSampler(SpecDecodeBaseSampler):
         if self._strict_mode:
             self._raise_if_incorrect_input(target_probs, draft_token_ids,
                                            bonus_token_ids)
-        accepted = self._evaluate_accepted_tokens(target_probs,
-                                                  draft_token_ids)
-        recovered_token_ids = self._replacement_token_ids(target_probs)
+        accepted, recovered_token_ids = self._verify(target_probs,
+                                                     draft_probs,
+                                                     draft_token_ids)
         output_token_ids = self._create_output(accepted, recovered_token_ids,
                                                draft_token_ids,
                                                bonus_token_ids)
         return output_token_ids
 
+    def _verify(
+        self,
+        target_probs: torch.Tensor,
+        draft_probs: torch.Tensor,
+        draft_token_ids: torch.Tensor,
+    ) -> Tuple[torch.Tensor, torch.Tensor]:
+        accepted = self._evaluate_accepted_tokens(target_probs,
+                                                  draft_token_ids)
+        recovered_token_ids = self._replacement_token_ids(target_probs)
+        return accepted, recovered_token_ids
+
     def _evaluate_accepted_tokens(self, target_probs, draft_token_ids):
         r"""
         Evaluates and returns a mask of accepted tokens based on the
@@ -0,0 +1,449 @@
+"""Fast-load checkpoints: the final, post-processed state of one worker's
+model in a single aligned file.
+
+The state is captured after `process_weights_after_loading` and after any
+lazy repacking done by the first forward passes (e.g. GPTQ Marlin), so
+loading it skips checkpoint parsing, the per-parameter weight loaders and
+all repacking and quantization work. It covers, for every module:
+
+* the parameters and buffers, which keep their strides, dtypes and any
+  storage they share with other tensors,
+* tensor attributes such as Marlin workspaces, and
+* simple attributes that processing may change, such as dtypes, enum states
+  and scales that were replaced with None.
+
+File layout: `_MAGIC`, a little-endian uint64 header length, the JSON
+header, then the tensor storages. The data section starts at a multiple of
+`_DATA_ALIGNMENT` bytes and every storage at a multiple of
+`_STORAGE_ALIGNMENT` bytes.
+"""
+import enum
+import functools
+import importlib
+import json
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import torch
+from torch import nn
+
+from vllm.logger import init_logger
+
+logger = init_logger(__name__)
+
+_MAGIC = b"VLLMFAST"
+_FORMAT_VERSION = 1
+_HEADER_LEN = struct.Struct("<Q")
+_DATA_ALIGNMENT = 4096
+_STORAGE_ALIGNMENT = 256
+# Storages are uploaded to the device in chunks of at least this size.
+_UPLOAD_CHUNK_BYTES = 256 * 1024 * 1024
+
+# Attributes every nn.Module has. They are not part of the model state.
+_MODULE_INTERNALS = frozenset(nn.Module().__dict__)
+
+_PRIMITIVES = (bool, int, float, str)
+
+
+def _align(value: int, alignment: int) -> int:
+    return -(-value // alignment) * alignment
+
+
+def _dtype_name(dtype: torch.dtype) -> str:
+    return str(dtype).split(".")[-1]
+
+
+class _StateWriter:
+    """Collects the tensors and attributes of a model into a header and a
+    list of storages."""
+
+    def __init__(self):
+        self.storages: List[torch.Tensor] = []
+        self.storage_offsets: List[int] = []
+        self.tensors: List[Dict[str, Any]] = []
+        self._storage_ids: Dict[Tuple[torch.device, int], int] = {}
+        self._tensor_ids: Dict[int, int] = {}
+        self._nbytes = 0
+
+    def _add_storage(self, tensor: torch.Tensor) -> int:
+        storage = tensor.untyped_storage()
+        key = (tensor.device, storage.data_ptr())
+        if key not in self._storage_ids:
+            data = torch.empty(0, dtype=torch.uint8,
+                               device=tensor.device).set_(storage)
+            self._nbytes = _align(self._nbytes, _STORAGE_ALIGNMENT)
+            self._storage_ids[key] = len(self.storages)
+            self.storages.append(data)
+            self.storage_offsets.append(self._nbytes)
+            self._nbytes += data.numel()
+        return self._storage_ids[key]
+
+    def add_tensor(self, tensor: torch.Tensor) -> Dict[str, int]:
+        if id(tensor) not in self._tensor_ids:
+            self._tensor_ids[id(tensor)] = len(self.tensors)
+            self.tensors.append({
+                "storage": self._add_storage(tensor),
+                "dtype": _dtype_name(tensor.dtype),
+                "shape": list(tensor.shape),
+                "stride": list(tensor.stride()),
+                "offset": tensor.storage_offset(),
+            })
+        return {"tensor": self._tensor_ids[id(tensor)]}
+
+    def encode_attribute(self, value: Any) -> Optional[Dict[str, Any]]:
+        """Encode an attribute value, or return None if it is not part of
+        the captured state."""
+        if value is None or isinstance(value, _PRIMITIVES):
+            return {"value": value}
+        if isinstance(value, torch.Tensor):
+            return self.add_tensor(value)
+        if isinstance(value, torch.dtype):
+            return {"dtype": _dtype_name(value)}
+        if isinstance(value, enum.Enum):
+            cls = type(value)
+            return {
+                "enum": f"{cls.__module__}:{cls.__qualname__}",
+                "name": value.name
+            }
+        if isinstance(value, (list, tuple)) and all(
+                v is None or isinstance(v, _PRIMITIVES) for v in value):
+            return {"value": list(value)}
+        return None
+
+    def add_module(self, module: nn.Module) -> Dict[str, Any]:
+        parameters = {
+            name: None if param is None else self.add_tensor(param)
+            for name, param in module._parameters.items()
+        }
+        buffers = {
+            name: None if buffer is None else self.add_tensor(buffer)
+            for name, buffer in module._buffers.items()
+        }
+        attributes = {}
+        for name, value in module.__dict__.items():
+            if name in _MODULE_INTERNALS:
+                continue
+            encoded = self.encode_attribute(value)
+            if encoded is not None:
+                attributes[name] = encoded
+        return {
+            "parameters": parameters,
+            "buffers": buffers,
+            "attributes": attributes,
+        }
+
+
+def save_fastload_state(model: nn.Module, path: str) -> None:
+    """Save the current state of `model` to the fast-load file `path`."""
+    writer = _StateWriter()
+    modules = {
+        name: writer.add_module(module)
+        for name, module in model.named_modules()
+    }
+    header = json.dumps({
+        "version": _FORMAT_VERSION,
+        "tensors": writer.tensors,
+        "storages": [{
+            "offset": offset,
+            "nbytes": storage.numel()
+        } for storage, offset in zip(writer.storages,
+                                     writer.storage_offsets)],
+        "modules": modules,
+    }).encode()
+    data_start = _align(len(_MAGIC) + _HEADER_LEN.size + len(header),
+                        _DATA_ALIGNMENT)
+
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(_MAGIC)
+            f.write(_HEADER_LEN.pack(len(header)))
+            f.write(header)
+            for storage, offset in zip(writer.storages,
+                                       writer.storage_offsets):
+                f.seek(data_start + offset)
+                f.write(storage.cpu().numpy().tobytes())
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def _read_header(buf: mmap.mmap, path: str) -> Tuple[Dict[str, Any], int]:
+    if buf[:len(_MAGIC)] != _MAGIC:
+        raise ValueError(f"{path} is not a fast-load checkpoint.")
+    header_start = len(_MAGIC) + _HEADER_LEN.size
+    (header_len, ) = _HEADER_LEN.unpack_from(buf, len(_MAGIC))
+    header = json.loads(buf[header_start:header_start + header_len])
+    if header["version"] != _FORMAT_VERSION:
+        raise ValueError(f"{path} has fast-load format version "
+                         f"{header['version']}, expected {_FORMAT_VERSION}.")
+    return header, _align(header_start + header_len, _DATA_ALIGNMENT)
+
+
+def _load_storages(buf: mmap.mmap, data_start: int,
+                   storages: List[Dict[str, int]],
+                   device: torch.device) -> List[torch.Tensor]:
+    """Return a uint8 tensor for each storage. On CPU, they are views of the
+    mapped file. Otherwise the file is uploaded in large chunks of adjacent
+    storages and the storages are views of the chunks."""
+    if not storages:
+        return []
+    data_end = max(s["offset"] + s["nbytes"] for s in storages)
+    data = torch.frombuffer(buf,
+                            dtype=torch.uint8,
+                            count=data_end,
+                            offset=data_start)
+    if device.type == "cpu":
+        return [
+            data[s["offset"]:s["offset"] + s["nbytes"]] for s in storages
+        ]
+
+    result: List[torch.Tensor] = []
+    chunk: List[Dict[str, int]] = []
+
+    def upload_chunk() -> None:
+        start = chunk[0]["offset"]
+        end = chunk[-1]["offset"] + chunk[-1]["nbytes"]
+        device_chunk = data[start:end].to(device)
+        for s in chunk:
+            result.append(device_chunk[s["offset"] - start:s["offset"] -
+                                       start + s["nbytes"]])
+        chunk.clear()
+
+    for storage in storages:
+        if chunk and (storage["offset"] - chunk[-1]["offset"] -
+                      chunk[-1]["nbytes"] >= _STORAGE_ALIGNMENT):
+            # Do not upload the storages of other modules in between.
+            upload_chunk()
+        chunk.append(storage)
+        if (storage["offset"] + storage["nbytes"] - chunk[0]["offset"] >=
+                _UPLOAD_CHUNK_BYTES):
+            upload_chunk()
+    if chunk:
+        upload_chunk()
+    return result
+
+
+def _decode_attribute(encoded: Dict[str, Any],
+                      tensors: List[torch.Tensor]) -> Any:
+    if "value" in encoded:
+        return encoded["value"]
+    if "tensor" in encoded:
+        return tensors[encoded["tensor"]]
+    if "dtype" in encoded:
+        return getattr(torch, encoded["dtype"])
+    module_name, qualname = encoded["enum"].split(":")
+    cls: Any = importlib.import_module(module_name)
+    for name in qualname.split("."):
+        cls = getattr(cls, name)
+    return cls[encoded["name"]]
+
+
+def _split_layers(module: nn.Module, prefix: str,
+                  layers: List[str]) -> None:
+    """Collect the names of the elements of the outermost ModuleLists, which
+    are the layers of the model, in order."""
+    for child_name, child in module.named_children():
+        name = f"{prefix}.{child_name}" if prefix else child_name
+        if isinstance(module, nn.ModuleList):
+            layers.append(name)
+        else:
+            _split_layers(child, name, layers)
+
+
+class _FastLoadState:
+    """A mapped fast-load checkpoint that is replayed onto a model, one group
+    of modules at a time."""
+
+    def __init__(self, model: nn.Module, path: str, device: torch.device):
+        with open(path, "rb") as f:
+            # A private mapping, since torch only wraps writable buffers.
+            self.buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_COPY)
+        header, self.data_start = _read_header(self.buf, path)
+        self.device = device
+        self.modules = dict(model.named_modules())
+        self.records: Dict[str, Dict[str, Any]] = header["modules"]
+        self.storage_infos: List[Dict[str, int]] = header["storages"]
+        self.tensor_infos: List[Dict[str, Any]] = header["tensors"]
+        self.storages: List[Optional[torch.Tensor]] = [None] * len(
+            self.storage_infos)
+        self.tensors: List[Optional[torch.Tensor]] = [None] * len(
+            self.tensor_infos)
+        # Tensors shared between modules, e.g. tied embeddings, stay shared.
+        self.new_parameters: Dict[int, nn.Parameter] = {}
+
+        missing = self.modules.keys() - self.records.keys()
+        if missing:
+            raise ValueError(f"Modules {sorted(missing)[:5]} are missing "
+                             f"from the fast-load checkpoint {path}.")
+        for name, module in self.modules.items():
+            for param_name in module._parameters:
+                if param_name not in self.records[name]["parameters"]:
+                    raise ValueError(f"Parameter {name}.{param_name} is "
+                                     f"missing from the fast-load checkpoint "
+                                     f"{path}.")
+
+    def _tensor_ids(self, record: Dict[str, Any]) -> List[int]:
+        refs = [
+            *record["parameters"].values(), *record["buffers"].values(),
+            *record["attributes"].values()
+        ]
+        return [ref["tensor"] for ref in refs if ref and "tensor" in ref]
+
+    def load(self, names: List[str]) -> None:
+        """Release the initial parameters of the modules `names`, then
+        restore their saved state."""
+        for name in names:
+            for param in self.modules[name]._parameters.values():
+                if param is not None:
+                    # Free the memory before the saved state is uploaded.
+                    param.data = torch.empty(0,
+                                             dtype=param.dtype,
+                                             device=param.device)
+
+        tensor_ids = sorted({
+            tensor_id
+            for name in names
+            for tensor_id in self._tensor_ids(self.records[name])
+            if self.tensors[tensor_id] is None
+        })
+        storage_ids = sorted({
+            self.tensor_infos[tensor_id]["storage"]
+            for tensor_id in tensor_ids
+            if self.storages[self.tensor_infos[tensor_id]["storage"]] is None
+        })
+        storages = _load_storages(
+            self.buf, self.data_start,
+            [self.storage_infos[i] for i in storage_ids], self.device)
+        for storage_id, storage in zip(storage_ids, storages):
+            self.storages[storage_id] = storage
+        for tensor_id in tensor_ids:
+            info = self.tensor_infos[tensor_id]
+            storage = self.storages[info["storage"]]
+            assert storage is not None
+            flat = storage.view(getattr(torch, info["dtype"]))
+            self.tensors[tensor_id] = torch.as_strided(
+                flat, info["shape"], info["stride"],
+                flat.storage_offset() + info["offset"])
+
+        for name in names:
+            self._replay(self.modules[name], self.records[name])
+
+    def _replay(self, module: nn.Module, record: Dict[str, Any]) -> None:
+        tensors = self.tensors
+        new_parameters = self.new_parameters
+        for param_name, ref in record["parameters"].items():
+            if ref is None:
+                module.register_parameter(param_name, None)
+                continue
+            tensor = tensors[ref["tensor"]]
+            param = module._parameters.get(param_name)
+            if param is not None and ref["tensor"] not in new_parameters:
+                param.data = tensor
+                new_parameters[ref["tensor"]] = param
+            elif ref["tensor"] in new_parameters:
+                module._parameters[param_name] = new_parameters[ref["tensor"]]
+            else:
+                param = nn.Parameter(tensor, requires_grad=False)
+                new_parameters[ref["tensor"]] = param
+                module.register_parameter(param_name, param)
+        for buffer_name, ref in record["buffers"].items():
+            module._buffers[buffer_name] = (None if ref is None else
+                                            tensors[ref["tensor"]])
+        for attr_name, encoded in record["attributes"].items():
+            setattr(module, attr_name, _decode_attribute(encoded, tensors))
+
+
+class _LayerMaterializer:
+    """Restores the layers of a model in a background thread. A forward pre
+    hook on every layer blocks until the layer is resident."""
+
+    def __init__(self, model: nn.Module, state: _FastLoadState):
+        self.state = state
+        roots: List[str] = []
+        _split_layers(model, "", roots)
+        self.layers = [[
+            name for name in state.modules
+            if name == root or name.startswith(f"{root}.")
+        ] for root in roots]
+        self.ready = [threading.Event() for _ in roots]
+        self.error: Optional[BaseException] = None
+        self.hooks = [
+            state.modules[root].register_forward_pre_hook(
+                functools.partial(self._wait, index))
+            for index, root in enumerate(roots)
+        ]
+        in_layers = {name for layer in self.layers for name in layer}
+        self.others = [
+            name for name in state.modules if name not in in_layers
+        ]
+        self.thread = threading.Thread(target=self._run,
+                                       name="fastload-materializer",
+                                       daemon=True)
+
+    def start(self) -> None:
+        # Everything outside of the layers (embeddings, final norm, LM head)
+        # is restored up front, as it is used at the start and end of every
+        # forward pass.
+        self.state.load(self.others)
+        self.thread.start()
+
+    def _run(self) -> None:
+        start = time.perf_counter()
+        try:
+            if self.state.device.type == "cuda":
+                # The device is a per thread setting.
+                torch.cuda.set_device(self.state.device)
+            for index, layer in enumerate(self.layers):
+                # The uploads are issued on the default stream of the device,
+                # so the forward passes queued after the event is set run
+                # after them.
+                self.state.load(layer)
+                self.ready[index].set()
+        except BaseException as e:
+            self.error = e
+            for event in self.ready:
+                event.set()
+            raise
+        logger.info("Materialized %d layers in the background in %.2fs.",
+                    len(self.layers),
+                    time.perf_counter() - start)
+
+    def _wait(self, index: int, module: nn.Module, args: Any) -> None:
+        self.ready[index].wait()
+        if self.error is not None:
+            raise RuntimeError("Restoring the model weights failed."
+                               ) from self.error
+        self.hooks[index].remove()
+
+
+def load_fastload_state(model: nn.Module,
+                        path: str,
+                        device: torch.device,
+                        lazy: bool = False) -> None:
+    """Restore the state saved by `save_fastload_state` into `model`, which
+    must be a freshly initialized instance of the same model with the same
+    configuration and parallelism.
+
+    Existing parameters keep their identity and attributes, only their data
+    is replaced. Parameters that were replaced during processing are
+    replaced the same way.
+
+    With `lazy`, only the modules outside of the layers are restored before
+    returning. The layers are restored one by one in a background thread, and
+    a forward pass blocks at each layer until it is restored. On CPU, the
+    tensors are views of the mapped file, which are already paged in on
+    demand, so the state is always restored eagerly.
+    """
+    if device.type == "cuda" and device.index is None:
+        device = torch.device("cuda", torch.cuda.current_device())
+    state = _FastLoadState(model, path, device)
+    if not lazy or device.type == "cpu":
+        state.load(list(state.modules))
+        return
+    _LayerMaterializer(model, state).start()
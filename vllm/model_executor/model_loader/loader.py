@@ -15,13 +15,15 @@ import torch
 from huggingface_hub import HfApi, hf_hub_download
 from torch import nn
 
+import vllm.envs as envs
 from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoadFormat,
                          LoRAConfig, ModelConfig, MultiModalConfig,
                          ParallelConfig, SchedulerConfig)
-from vllm.envs import VLLM_USE_MODELSCOPE
 from vllm.logger import init_logger
 from vllm.model_executor.layers.quantization.base_config import (
     QuantizationConfig)
+from vllm.model_executor.model_loader.fastload import (load_fastload_state,
+                                                       save_fastload_state)
 from vllm.model_executor.model_loader.tensorizer import (
     TensorizerConfig, is_vllm_tensorized, load_with_tensorizer,
     serialize_vllm_model, tensorizer_weights_iterator)
@@ -32,13 +34,13 @@ from vllm.model_executor.model_loader.weight_utils import (
     download_safetensors_index_file_from_hf, download_weights_from_hf,
     filter_duplicate_safetensors_files, filter_files_not_needed_for_inference,
     get_quant_config, get_sparse_config, initialize_dummy_weights,
-    np_cache_weights_iterator, pt_weights_iterator,
-    safetensors_weights_iterator)
+    np_cache_weights_iterator, parallel_safetensors_weights_iterator,
+    pt_weights_iterator, safetensors_weights_iterator)
 from vllm.model_executor.models.interfaces import (supports_lora,
                                                    supports_vision)
 from vllm.model_executor.utils import set_weight_attrs
 from vllm.platforms import current_platform
-from vllm.utils import is_tpu
+from vllm.utils import is_cpu, is_tpu
 
 logger = init_logger(__name__)
 
@@ -49,8 +51,12 @@ def _get_quantization_config(
     """Get the quantization config."""
     if model_config.quantization is not None:
         quant_config = get_quant_config(model_config, load_config)
-        capability = current_platform.get_device_capability()
-        capability = capability[0] * 10 + capability[1]
+        if is_cpu():
+            # Only the methods without a minimum capability run on CPU.
+            capability = 0
+        else:
+            capability = current_platform.get_device_capability()
+            capability = capability[0] * 10 + capability[1]
         if capability < quant_config.get_min_capability():
             raise ValueError(
                 f"The quantization method {model_config.quantization} is not "
@@ -161,7 +167,7 @@ class DefaultModelLoader(BaseModelLoader):
 
         Returns the path to the downloaded model, or None if the model is not
         downloaded from ModelScope."""
-        if VLLM_USE_MODELSCOPE:
+        if envs.VLLM_USE_MODELSCOPE:
             # download model from ModelScope hub,
             # lazy import so that modelscope is not required for normal use.
             # pylint: disable=C.
@@ -257,6 +263,9 @@ class DefaultModelLoader(BaseModelLoader):
             weights_iterator = np_cache_weights_iterator(
                 model_name_or_path, self.load_config.download_dir, hf_folder,
                 hf_weights_files)
+        elif use_safetensors and envs.VLLM_SAFETENSORS_LOAD_THREADS > 0:
+            weights_iterator = parallel_safetensors_weights_iterator(
+                hf_weights_files, envs.VLLM_SAFETENSORS_LOAD_THREADS)
         elif use_safetensors:
             weights_iterator = safetensors_weights_iterator(hf_weights_files)
         else:
@@ -602,6 +611,99 @@ class ShardedStateLoader(BaseModelLoader):
             )
 
 
+class FastLoadModelLoader(BaseModelLoader):
+    """
+    Model loader for fast-load checkpoints, which hold the final state of
+    each worker's model, after weight processing such as quantization or
+    Marlin repacking, in one file. The file is memory-mapped and the tensors
+    are viewed directly (CPU) or uploaded in large chunks (GPU), so neither
+    the checkpoint parsing nor the weight processing runs again. See
+    `examples/save_fastload_state.py` for creating a fast-load checkpoint.
+
+    With `{"lazy": true}` in the extra config, the decoder layers are
+    uploaded one by one in the background after the model is returned, and
+    the first forward pass waits for each layer as it reaches it. The
+    startup forward passes, i.e. the memory profiling run and the CUDA graph
+    capture, then overlap with the upload but still wait for every layer.
+    The engine comes up before all layers are resident when neither runs:
+    with a cached memory profile (`VLLM_MEMORY_PROFILE_CACHE_DIR`), and with
+    `VLLM_CUDA_GRAPH_LAZY_CAPTURE`, which defers all graph captures to
+    between steps in this mode, or `--enforce-eager`.
+    """
+
+    DEFAULT_PATTERN = "model-pp-{pp_rank}-tp-{tp_rank}.fastload"
+
+    def __init__(self, load_config: LoadConfig):
+        super().__init__(load_config)
+        extra_config = ({} if load_config.model_loader_extra_config is None
+                        else load_config.model_loader_extra_config.copy())
+        self.pattern = extra_config.pop("pattern", self.DEFAULT_PATTERN)
+        self.lazy = bool(extra_config.pop("lazy", False))
+        if extra_config:
+            raise ValueError(f"Unexpected extra config keys for load format "
+                             f"{load_config.load_format}: "
+                             f"{load_config.model_loader_extra_config.keys()}")
+
+    @staticmethod
+    def _get_filename(pattern: str) -> str:
+        from vllm.distributed import (get_pp_group,
+                                      get_tensor_model_parallel_rank)
+        return pattern.format(pp_rank=get_pp_group().rank_in_group,
+                              tp_rank=get_tensor_model_parallel_rank())
+
+    def load_model(self, *, model_config: ModelConfig,
+                   device_config: DeviceConfig,
+                   lora_config: Optional[LoRAConfig],
+                   multimodal_config: Optional[MultiModalConfig],
+                   parallel_config: ParallelConfig,
+                   scheduler_config: SchedulerConfig,
+                   cache_config: CacheConfig) -> nn.Module:
+        if os.path.isdir(model_config.model):
+            local_model_path = model_config.model
+        else:
+            local_model_path = download_weights_from_hf(
+                model_config.model, self.load_config.download_dir,
+                ["*.fastload"], model_config.revision)
+        path = os.path.join(local_model_path,
+                            self._get_filename(self.pattern))
+        if not os.path.isfile(path):
+            raise ValueError(f"Could not find fast-load checkpoint file "
+                             f"'{path}'.")
+        if self.lazy and lora_config:
+            # The LoRA layers wrap the base layers right after loading.
+            raise ValueError("Lazy fast-load is not supported with LoRA.")
+        if (self.lazy and not model_config.enforce_eager
+                and not envs.VLLM_CUDA_GRAPH_LAZY_CAPTURE):
+            logger.info(
+                "CUDA graph capture waits until all layers are loaded, so "
+                "the engine is not ready before that. Set "
+                "VLLM_CUDA_GRAPH_LAZY_CAPTURE=1 and "
+                "VLLM_MEMORY_PROFILE_CACHE_DIR to start serving earlier.")
+
+        with set_default_torch_dtype(model_config.dtype):
+            with torch.device(device_config.device):
+                model = _initialize_model(model_config, self.load_config,
+                                          lora_config, multimodal_config,
+                                          cache_config)
+            load_fastload_state(model,
+                                path,
+                                device_config.device,
+                                lazy=self.lazy)
+        return model.eval()
+
+    @staticmethod
+    def save_model(
+        model: torch.nn.Module,
+        path: str,
+        pattern: Optional[str] = None,
+    ) -> None:
+        if pattern is None:
+            pattern = FastLoadModelLoader.DEFAULT_PATTERN
+        save_fastload_state(
+            model, os.path.join(path,
+                                FastLoadModelLoader._get_filename(pattern)))
+
+
 class BitsAndBytesModelLoader(BaseModelLoader):
     """Model loader to load model weights with BitAndBytes quantization."""
 
@@ -852,6 +954,9 @@ def get_model_loader(load_config: LoadConfig) -> BaseModelLoader:
     if load_config.load_format == LoadFormat.SHARDED_STATE:
         return ShardedStateLoader(load_config)
 
+    if load_config.load_format == LoadFormat.FASTLOAD:
+        return FastLoadModelLoader(load_config)
+
     if load_config.load_format == LoadFormat.BITSANDBYTES:
         return BitsAndBytesModelLoader(load_config)
 
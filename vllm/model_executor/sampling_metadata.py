@@ -204,6 +204,35 @@ def _prepare_seq_groups(
         sample_indices: List[int] = []
         do_sample = seq_group_metadata.do_sample
 
+        if not is_prompt and seq_group_metadata.token_chunk_size > 1:
+            # A decode that scores several tokens at once, e.g. speculative
+            # tokens, is sampled at every position, as one decode of the
+            # sequence up to that position each.
+            if sampling_params.seed is not None:
+                generator = seq_group_metadata.state.generator
+            for seq_data in _get_seq_data_per_position(seq_group_metadata):
+                sample_indices = []
+                if do_sample:
+                    selected_token_indices.append(model_output_idx)
+                    model_output_idx += 1
+                    sample_indices.append(logit_idx)
+                    categorized_sample_indices[
+                        sampling_params.sampling_type].append(
+                            (logit_idx, sample_idx))
+                    logit_idx += 1
+                    sample_idx += 1
+                seq_groups.append(
+                    SequenceGroupToSample(seq_ids=seq_ids,
+                                          sampling_params=sampling_params,
+                                          seq_data=seq_data,
+                                          seq_len=None,
+                                          query_len=None,
+                                          generator=generator,
+                                          is_prompt=False,
+                                          prompt_logprob_indices=[],
+                                          sample_indices=sample_indices))
+            continue
+
         if seq_group_metadata.is_prompt:
             if sampling_params.seed is not None:
                 seq_group_metadata.state.generator = torch.Generator(
@@ -286,6 +315,44 @@ def _prepare_seq_groups(
             num_prompts)
 
 
+def _get_seq_data_per_position(
+        seq_group_metadata: SequenceGroupMetadata
+) -> List[Dict[int, SequenceData]]:
+    """Return the sequence data of each position of a multi-token decode,
+    which only holds the tokens up to that position.
+
+    The sequence data is shared by all the positions when sampling does not
+    depend on the previous tokens, so that it is not copied.
+    """
+    num_positions = seq_group_metadata.token_chunk_size
+    seq_data = seq_group_metadata.seq_data
+    if not _depends_on_token_ids(seq_group_metadata.sampling_params):
+        return [seq_data] * num_positions
+    seq_data_per_position: List[Dict[int, SequenceData]] = []
+    for num_later_tokens in range(num_positions - 1, 0, -1):
+        seq_data_per_position.append({
+            seq_id: SequenceData(
+                prompt_token_ids=data.get_prompt_token_ids(),
+                output_token_ids=data.get_output_token_ids()
+                [:data.get_output_len() - num_later_tokens],
+            )
+            for seq_id, data in seq_data.items()
+        })
+    seq_data_per_position.append(seq_data)
+    return seq_data_per_position
+
+
+def _depends_on_token_ids(sampling_params: SamplingParams) -> bool:
+    """Whether sampling reads the tokens of the sequence: for the penalties,
+    min_tokens, the logits processors or the seed."""
+    return (sampling_params.seed is not None
+            or sampling_params.min_tokens > 0
+            or bool(sampling_params.logits_processors)
+            or abs(sampling_params.presence_penalty) >= _SAMPLING_EPS
+            or abs(sampling_params.frequency_penalty) >= _SAMPLING_EPS
+            or abs(sampling_params.repetition_penalty - 1.0) >= _SAMPLING_EPS)
+
+
 @dataclass
 class SamplingTensors:
     """Tensors for sampling."""
@@ -53,8 +53,9 @@ class EmbeddingOutput:
     """The output data of one completion output of a request.
 
     Args:
-        embedding: The embedding vector, which is a list of floats. The
-        length of vector depends on the model as listed in the embedding guide.
+        embedding: The embedding vector, which is a list of floats, or of
+        integers if it is quantized. The length of vector depends on the model
+        as listed in the embedding guide, unless it is truncated.
     """
 
     embedding: List[float]
@@ -1,20 +1,62 @@
 from typing import Any, Optional
 
+_POOLING_TYPES = ("last", "mean", "cls")
+_QUANTIZATIONS = ("int8", "binary")
+
 
 class PoolingParams:
     """Pooling parameters for pooling.
 
     Attributes:
         additional_data: Any additional data needed for pooling.
+        pooling_type: How the hidden states of a sequence are pooled: "last"
+            (the last token), "mean" (the mean over the tokens) or "cls" (the
+            first token). None uses the pooling of the model.
+        dimensions: The number of leading dimensions of the embedding to
+            keep, for models trained with Matryoshka representation learning.
+            The truncated embedding is normalized again if the model
+            normalizes its embeddings. None keeps all the dimensions.
+        quantization: "int8" scales each embedding by 127 over its largest
+            absolute value and rounds it to integers in [-127, 127]. "binary"
+            keeps the sign bit of each dimension, packed 8 to a byte in
+            big-endian bit order, as integers in [0, 255]. None returns
+            floats.
     """
 
-    def __init__(self, additional_data: Optional[Any] = None):
+    def __init__(self,
+                 additional_data: Optional[Any] = None,
+                 pooling_type: Optional[str] = None,
+                 dimensions: Optional[int] = None,
+                 quantization: Optional[str] = None):
         self.additional_data = additional_data
+        self.pooling_type = pooling_type
+        self.dimensions = dimensions
+        self.quantization = quantization
+        self._verify_args()
+
+    def _verify_args(self) -> None:
+        if (self.pooling_type is not None
+                and self.pooling_type not in _POOLING_TYPES):
+            raise ValueError(f"pooling_type must be one of {_POOLING_TYPES}, "
+                             f"got {self.pooling_type}.")
+        if self.dimensions is not None and self.dimensions < 1:
+            raise ValueError(
+                f"dimensions must be at least 1, got {self.dimensions}.")
+        if (self.quantization is not None
+                and self.quantization not in _QUANTIZATIONS):
+            raise ValueError(f"quantization must be one of {_QUANTIZATIONS}, "
+                             f"got {self.quantization}.")
 
     def clone(self) -> "PoolingParams":
         """Returns a deep copy of the PoolingParams instance."""
-        return PoolingParams(additional_data=self.additional_data, )
+        return PoolingParams(additional_data=self.additional_data,
+                             pooling_type=self.pooling_type,
+                             dimensions=self.dimensions,
+                             quantization=self.quantization)
 
     def __repr__(self) -> str:
         return (f"PoolingParams("
-                f"additional_metadata={self.additional_data})")
+                f"additional_metadata={self.additional_data}, "
+                f"pooling_type={self.pooling_type}, "
+                f"dimensions={self.dimensions}, "
+                f"quantization={self.quantization})")
@@ -3,9 +3,14 @@ import copy
 import enum
 import math
 from abc import ABC, abstractmethod
+from array import array
 from dataclasses import dataclass, field
-from typing import TYPE_CHECKING, Dict, List, Optional, Tuple, Union
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, List, Mapping
+from typing import Optional
+from typing import Sequence as GenericSequence
+from typing import Tuple, Union, overload
 
+import numpy as np
 import torch
 
 from vllm.lora.request import LoRARequest
@@ -32,11 +37,194 @@ class Logprob:
     decoded_token: Optional[str] = None
 
 
+class CompactLogprobs(Mapping[int, Logprob]):
+    """The logprobs of one token position, read from a `LogprobsArray`.
+
+    It behaves like the `Dict[int, Logprob]` the position would otherwise be
+    stored as, with the entries in the same order, but the `Logprob` objects
+    are only created on access. Changing one of them has no effect, use
+    `set_decoded_token` to store the decoded text of an entry.
+    """
+    __slots__ = ("_array", "_start", "_end")
+
+    def __init__(self, logprobs_array: "LogprobsArray", start: int,
+                 end: int) -> None:
+        self._array = logprobs_array
+        self._start = start
+        self._end = end
+
+    def _index(self, token_id: int) -> int:
+        token_ids = self._array.token_ids
+        for i in range(self._start, self._end):
+            if token_ids[i] == token_id:
+                return i
+        raise KeyError(token_id)
+
+    def _logprob(self, i: int) -> Logprob:
+        logprobs_array = self._array
+        rank = logprobs_array.ranks[i]
+        decoded_tokens = logprobs_array.decoded_tokens
+        return Logprob(logprobs_array.logprobs[i], None if rank < 0 else rank,
+                       None if decoded_tokens is None else decoded_tokens[i])
+
+    def __getitem__(self, token_id: int) -> Logprob:
+        return self._logprob(self._index(token_id))
+
+    def __contains__(self, token_id: object) -> bool:
+        return token_id in self._array.token_ids[self._start:self._end]
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._array.token_ids[self._start:self._end])
+
+    def __len__(self) -> int:
+        return self._end - self._start
+
+    def items(self) -> List[Tuple[int, Logprob]]:  # type: ignore[override]
+        token_ids = self._array.token_ids
+        return [(token_ids[i], self._logprob(i))
+                for i in range(self._start, self._end)]
+
+    def values(self) -> List[Logprob]:  # type: ignore[override]
+        return [self._logprob(i) for i in range(self._start, self._end)]
+
+    def set_decoded_token(self, token_id: int, decoded_token: str) -> None:
+        self._array.set_decoded_token(self._index(token_id), decoded_token)
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
+class LogprobsArray(GenericSequence[Optional[CompactLogprobs]]):
+    """The logprobs of consecutive token positions, in parallel arrays.
+
+    A dict of `Logprob` objects per position costs several hundred bytes per
+    entry and gives the garbage collector a lot to track, which adds up for
+    long outputs with top logprobs and for prompt logprobs. Instead, the
+    entries of position `i` are `offsets[i]:offsets[i + 1]` of `token_ids`,
+    `logprobs` and `ranks` (-1 for no rank). The decoded texts are only
+    allocated once the detokenizer sets one.
+
+    Indexing returns a `CompactLogprobs` view of a position, or None for a
+    position without entries, such as the first prompt token. It can be used
+    in place of a list of logprob dicts.
+    """
+    __slots__ = ("token_ids", "logprobs", "ranks", "offsets",
+                 "decoded_tokens")
+
+    def __init__(self) -> None:
+        self.token_ids = array("i")
+        self.logprobs = array("d")
+        self.ranks = array("i")
+        self.offsets = array("q", [0])
+        self.decoded_tokens: Optional[List[Optional[str]]] = None
+
+    def _position(self, idx: int) -> Optional[CompactLogprobs]:
+        start = self.offsets[idx]
+        end = self.offsets[idx + 1]
+        if start == end:
+            return None
+        return CompactLogprobs(self, start, end)
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @overload
+    def __getitem__(self, idx: int) -> Optional[CompactLogprobs]:
+        ...
+
+    @overload
+    def __getitem__(self, idx: slice) -> List[Optional[CompactLogprobs]]:
+        ...
+
+    def __getitem__(self, idx):
+        num_positions = len(self)
+        if isinstance(idx, slice):
+            return [
+                self._position(i) for i in range(*idx.indices(num_positions))
+            ]
+        if idx < 0:
+            idx += num_positions
+        if not 0 <= idx < num_positions:
+            raise IndexError("LogprobsArray index out of range")
+        return self._position(idx)
+
+    def __iter__(self) -> Iterator[Optional[CompactLogprobs]]:
+        for i in range(len(self)):
+            yield self._position(i)
+
+    def __add__(self, other: Iterable) -> list:
+        return list(self) + list(other)
+
+    def __radd__(self, other: Iterable) -> list:
+        return list(other) + list(self)
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, (list, LogprobsArray)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            a == b for a, b in zip(self, other))
+
+    def __repr__(self) -> str:
+        return repr(list(self))
+
+    def set_decoded_token(self, entry: int, decoded_token: str) -> None:
+        if self.decoded_tokens is None:
+            self.decoded_tokens = [None] * len(self.token_ids)
+        self.decoded_tokens[entry] = decoded_token
+
+    def append(self, logprobs: Optional[Mapping[int, Logprob]]) -> None:
+        """Append a position, copying its entries."""
+        decoded_tokens: Optional[List[Optional[str]]] = None
+        if isinstance(logprobs, CompactLogprobs):
+            source = logprobs._array
+            start, end = logprobs._start, logprobs._end
+            self.token_ids.extend(source.token_ids[start:end])
+            self.logprobs.extend(source.logprobs[start:end])
+            self.ranks.extend(source.ranks[start:end])
+            if source.decoded_tokens is not None:
+                decoded_tokens = source.decoded_tokens[start:end]
+        elif logprobs:
+            decoded_tokens = []
+            for token_id, logprob in logprobs.items():
+                self.token_ids.append(token_id)
+                self.logprobs.append(logprob.logprob)
+                self.ranks.append(-1 if logprob.rank is None else logprob.rank)
+                decoded_tokens.append(logprob.decoded_token)
+            if all(token is None for token in decoded_tokens):
+                decoded_tokens = None
+        num_entries = len(self.token_ids)
+        if self.decoded_tokens is not None:
+            self.decoded_tokens.extend(decoded_tokens or [None] *
+                                       (num_entries - self.offsets[-1]))
+        elif decoded_tokens is not None:
+            self.decoded_tokens = [None] * self.offsets[-1] + decoded_tokens
+        self.offsets.append(num_entries)
+
+    def extend(self,
+               positions: Iterable[Optional[Mapping[int, Logprob]]]) -> None:
+        for logprobs in positions:
+            self.append(logprobs)
+
+    def extend_rows(self, token_ids: np.ndarray, logprobs: np.ndarray,
+                    ranks: np.ndarray, counts: np.ndarray) -> None:
+        """Append `len(counts)` positions at once, where position `i` holds
+        the next `counts[i]` entries of the flat `token_ids`, `logprobs` and
+        `ranks`."""
+        self.token_ids.frombytes(token_ids.astype(np.int32).tobytes())
+        self.logprobs.frombytes(logprobs.astype(np.float64).tobytes())
+        self.ranks.frombytes(ranks.astype(np.int32).tobytes())
+        offsets = np.cumsum(counts, dtype=np.int64) + self.offsets[-1]
+        self.offsets.frombytes(offsets.tobytes())
+        if self.decoded_tokens is not None:
+            self.decoded_tokens.extend([None] * len(token_ids))
+
+
 # {token_id -> logprob} per each sequence group. None if the corresponding
-# sequence group doesn't require prompt logprob.
-PromptLogprobs = List[Optional[Dict[int, Logprob]]]
-# {token_id -> logprob} for each sequence group.
-SampleLogprobs = List[Dict[int, Logprob]]
+# sequence group doesn't require prompt logprob. Usually a `LogprobsArray`.
+PromptLogprobs = GenericSequence[Optional[Mapping[int, Logprob]]]
+# {token_id -> logprob} for each sequence group. Usually a `LogprobsArray`,
+# whose positions are never None.
+SampleLogprobs = GenericSequence[Optional[Mapping[int, Logprob]]]
 
 
 class SequenceStatus(enum.IntEnum):
@@ -255,7 +443,7 @@ class Sequence:
         self.lora_request = lora_request
 
         self.data = SequenceData(self.prompt_token_ids)
-        self.output_logprobs: SampleLogprobs = []
+        self.output_logprobs = LogprobsArray()
         self.output_text = ""
 
         self.status = SequenceStatus.WAITING
@@ -313,7 +501,7 @@ class Sequence:
     def append_token_id(
         self,
         token_id: int,
-        logprobs: Dict[int, Logprob],
+        logprobs: Mapping[int, Logprob],
     ) -> None:
         assert token_id in logprobs
         self.output_logprobs.append(logprobs)
@@ -437,7 +625,7 @@ class SequenceGroup:
                                       first_token_time=None,
                                       time_in_queue=None)
         self.lora_request = lora_request
-        self.prompt_logprobs: Optional[PromptLogprobs] = None
+        self.prompt_logprobs: Optional[LogprobsArray] = None
         self.state = SequenceGroupState()
         self.embeddings = embeddings
         self.pooling_params = pooling_params
@@ -609,7 +797,9 @@ class SequenceGroupMetadata:
             e.g., prefill is chunked, and the current iteration only computes
             query tokens for prefill, we don't need sampling.
         token_chunk_size: The number of tokens to be processed (per sequence).
-            None if chunking is not required.
+            None if chunking is not required. A decode with more than one
+            token scores the last `token_chunk_size` tokens of the sequence,
+            which are sampled at every position.
         lora_request: LoRA request.
         computed_block_nums: The block numbers that are already computed,
             used in prefix caching.
@@ -696,7 +886,7 @@ class SequenceOutput:
         self,
         parent_seq_id: int,
         output_token: int,
-        logprobs: Dict[int, Logprob],
+        logprobs: Mapping[int, Logprob],
     ) -> None:
         self.parent_seq_id = parent_seq_id
         self.output_token = output_token
@@ -770,6 +960,32 @@ class EmbeddingSequenceGroupOutput(SequenceGroupOutput):
         return self.embeddings == other.embeddings
 
 
+@dataclass
+class PipelineStageTimes:
+    """Timing of one pipeline parallel stage for one model step.
+
+    Attributes:
+        bubble_time: Time in seconds the stage sat idle between finishing its
+            previous step and having the inputs of this step available.
+        busy_time: Time in seconds the stage spent executing the step.
+    """
+    bubble_time: float
+    busy_time: float
+
+
+@dataclass
+class CUDAGraphUsage:
+    """Whether a decode step ran as a CUDA graph.
+
+    Attributes:
+        batch_size: The padded batch size of the step.
+        hit: Whether a graph of `batch_size` was captured, so the step ran
+            as a graph instead of eagerly.
+    """
+    batch_size: int
+    hit: bool
+
+
 @dataclass
 class IntermediateTensors:
     """For all pipeline stages except the last, we need to return the hidden
@@ -824,6 +1040,12 @@ class SamplerOutput:
     # Optional last hidden states from the model.
     hidden_states: Optional[torch.Tensor] = None
 
+    # Per-stage timing of this step, populated when pipeline parallel is used.
+    pipeline_stage_times: Optional[List[PipelineStageTimes]] = None
+
+    # Whether this step ran as a CUDA graph, for decode steps that can.
+    cuda_graph_usage: Optional[CUDAGraphUsage] = None
+
     def __getitem__(self, idx: int):
         return self.outputs[idx]
 
@@ -858,6 +1080,10 @@ class PoolerOutput:
 
     spec_decode_worker_metrics: Optional["SpecDecodeWorkerMetrics"] = None
 
+    pipeline_stage_times: Optional[List[PipelineStageTimes]] = None
+
+    cuda_graph_usage: Optional[CUDAGraphUsage] = None
+
     def __getitem__(self, idx: int):
         return self.outputs[idx]
 
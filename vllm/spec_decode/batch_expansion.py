@@ -1,5 +1,5 @@
 from itertools import chain, count
-from typing import Iterator, List, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 import torch
 
@@ -27,8 +27,8 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
 
     It is strictly less efficient than MQA scoring.
 
-    It only supports scoring the top1 proposal tokens of the proposer, instead
-    of topk/tree.
+    It only supports scoring the top1 proposal tokens of the proposer. See
+    BatchExpansionTreeScorer for proposals with several branches.
     """
 
     def __init__(self, scorer_worker: WorkerBase, device: str,
@@ -264,6 +264,7 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
         seq_id: SeqId,
         target_seq_id: TargetSeqId,
         token_ids: List[TokenId],
+        block_table: Optional[List[int]] = None,
     ) -> SequenceGroupMetadata:
         """Create a single target SequenceGroupMetadata.
 
@@ -273,6 +274,8 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
             target_seq_id: The corresponding target sequence ID.
             token_ids: The list of token ids that are to be appended to the
                 input sequence.
+            block_table: The block table of the target sequence, if not the
+                one of the input sequence.
         """
         seq_data = seq_group_metadata.seq_data[seq_id]
         prompt_token_ids = seq_data.get_prompt_token_ids()
@@ -298,7 +301,9 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
             seq_data=new_seq_data_dict,
             sampling_params=seq_group_metadata.sampling_params,
             block_tables={
-                target_seq_id: seq_group_metadata.block_tables[seq_id],
+                target_seq_id:
+                block_table if block_table is not None else
+                seq_group_metadata.block_tables[seq_id],
             },
             lora_request=None,
             token_chunk_size=1,
@@ -389,3 +394,208 @@ class BatchExpansionTop1Scorer(SpeculativeScorer):
             for i in range(len(full_spec_token_ids))
         ])
         return token_ids_to_score
+
+
+class BatchExpansionTreeScorer(BatchExpansionTop1Scorer):
+    """Scores proposals with several branches per sequence, i.e. a token tree
+    whose branches only share their root, the last token of the sequence.
+
+    Every branch is expanded like a top-1 proposal and all of them are scored
+    in one forward pass. The branches of a sequence put different tokens at
+    the same positions, so all but the first one write their KV to scratch
+    blocks that the scheduler never allocates: the block of the last token is
+    copied to the first scratch block of the branch before the forward pass,
+    and the block tables of the expanded sequences continue with the scratch
+    blocks from there on. Once a branch other than the first is accepted,
+    `get_blocks_to_copy_back` returns the copies that move its KV to the
+    blocks of the sequence.
+    """
+
+    def __init__(self, scorer_worker: WorkerBase, device: str,
+                 vocab_size: int, num_branches: int, block_size: int,
+                 max_num_seqs: int, max_proposal_len: int):
+        super().__init__(scorer_worker, device, vocab_size)
+        self._num_branches = num_branches
+        self._block_size = block_size
+        # The blocks spanned by the last token and the proposal tokens.
+        self._num_blocks_per_branch = (
+            (max_proposal_len + block_size - 1) // block_size + 1)
+        self.num_scratch_blocks = (max_num_seqs * (num_branches - 1) *
+                                   self._num_blocks_per_branch)
+        # Set once the KV cache is allocated.
+        self.scratch_block_ids: List[int] = []
+
+    @nvtx_range("BatchExpansionTreeScorer.score_proposals")
+    def score_proposals(
+        self,
+        execute_model_req: ExecuteModelRequest,
+        proposals: SpeculativeProposals,
+    ) -> SpeculativeScores:
+        """Score the branches of the proposed tokens via the scorer model.
+
+        Args:
+            execute_model_req: The execution request.
+            proposals: The speculative proposals to score.
+        Returns:
+            SpeculativeScores: The scores of each speculative token of each
+                branch, and those of the first branch.
+        """
+        if proposals.branch_token_ids is None:
+            return super().score_proposals(execute_model_req, proposals)
+
+        seq_group_metadata_list = execute_model_req.seq_group_metadata_list
+        proposal_lens_list = proposals.proposal_lens.tolist()
+        branch_token_ids_list = proposals.branch_token_ids.tolist()
+        spec_seqs, spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=False)
+        non_spec_seqs, non_spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=True)
+
+        target_seq_ids_iter = self._create_target_seq_id_iterator(
+            seq_ids=get_all_seq_ids(seq_group_metadata_list))
+        # The scratch blocks start as a copy of the block of the last token,
+        # which may itself be the destination of a copy-on-write.
+        blocks_to_copy = list(execute_model_req.blocks_to_copy)
+        copy_sources: Dict[int, int] = {
+            dst: src
+            for src, dst in execute_model_req.blocks_to_copy
+        }
+        target_seq_group_metadata_list: List[SequenceGroupMetadata] = []
+        for spec_index, (batch_index, seq_group_metadata) in enumerate(
+                zip(spec_indices, spec_seqs)):
+            assert len(seq_group_metadata.seq_data) == 1, (
+                "Beam search "
+                "not supported in speculative decoding")
+            seq_id = next(iter(seq_group_metadata.seq_data.keys()))
+            last_block_index = self._get_last_block_index(
+                seq_group_metadata, seq_id)
+            block_table = seq_group_metadata.block_tables[seq_id]
+            for branch, token_ids in enumerate(
+                    branch_token_ids_list[batch_index]):
+                branch_block_table = None
+                if branch > 0:
+                    scratch_block_ids = self._get_scratch_block_ids(
+                        spec_index, branch)
+                    last_block = block_table[last_block_index]
+                    blocks_to_copy.append((copy_sources.get(
+                        last_block, last_block), scratch_block_ids[0]))
+                    branch_block_table = (block_table[:last_block_index] +
+                                          scratch_block_ids)
+                for token_ids_to_score in self._get_token_ids_to_score(
+                        token_ids):
+                    target_seq_group_metadata_list.append(
+                        self._create_single_target_seq_group_metadata(
+                            seq_group_metadata,
+                            seq_id,
+                            next(target_seq_ids_iter),
+                            token_ids_to_score,
+                            block_table=branch_block_table,
+                        ))
+
+        num_scoring_tokens = len(target_seq_group_metadata_list)
+        target_seq_group_metadata_list.extend(non_spec_seqs)
+
+        target_execute_model_req = execute_model_req.clone(
+            seq_group_metadata_list=target_seq_group_metadata_list)
+        target_execute_model_req.blocks_to_copy = blocks_to_copy
+        target_sampler_output = self._scorer_worker.execute_model(
+            execute_model_req=target_execute_model_req)
+        assert len(target_sampler_output) == 1, "expected single-step output"
+        target_sampler_output = target_sampler_output[0]
+
+        (target_token_ids, target_probs, target_logprobs,
+         non_spec_target_token_ids, non_spec_target_probs,
+         non_spec_target_logprobs) = self._split_scoring_output(
+             target_sampler_output, num_scoring_tokens)
+
+        # Map the expanded sequences back to
+        # [batch_size, num_branches, k + 1].
+        batch_size, num_branches, k = proposals.branch_token_ids.shape
+        target_token_ids = target_token_ids.reshape(len(spec_indices),
+                                                    num_branches, k + 1)
+        target_probs = target_probs.reshape(*target_token_ids.shape,
+                                            self._vocab_size)
+        target_logprobs = target_logprobs.reshape(target_probs.shape)
+
+        all_tokens = target_token_ids.new_full(size=(batch_size,
+                                                     num_branches, k + 1),
+                                               fill_value=-1)
+        all_probs = target_probs.new_zeros(*all_tokens.shape, self._vocab_size)
+        all_logprobs = target_logprobs.new_full(size=all_probs.shape,
+                                                fill_value=-float("inf"))
+
+        if non_spec_indices:
+            all_tokens[non_spec_indices, :, :1] = (
+                non_spec_target_token_ids.unsqueeze(1))
+            all_probs[non_spec_indices, :, :1, :] = (
+                non_spec_target_probs.unsqueeze(1))
+            all_logprobs[non_spec_indices, :, :1, :] = (
+                non_spec_target_logprobs.unsqueeze(1))
+
+        if spec_indices:
+            all_tokens[spec_indices] = target_token_ids
+            all_probs[spec_indices] = target_probs
+            all_logprobs[spec_indices] = target_logprobs
+
+        return SpeculativeScores(
+            probs=all_probs[:, 0],
+            token_ids=all_tokens[:, 0],
+            logprobs=all_logprobs[:, 0],
+            hidden_states=target_sampler_output.hidden_states,
+            branch_probs=all_probs,
+            branch_logprobs=all_logprobs,
+            branch_token_ids=all_tokens,
+        )
+
+    def get_blocks_to_copy_back(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        proposal_lens_list: List[int],
+        selected_branches: List[int],
+        num_accepted_tokens: List[int],
+    ) -> List[Tuple[int, int]]:
+        """Return the (scratch block, sequence block) copies that move the
+        KV of the accepted proposal tokens of the selected branches to the
+        blocks of their sequences."""
+        blocks_to_copy: List[Tuple[int, int]] = []
+        spec_seqs, spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=False)
+        for spec_index, (batch_index, seq_group_metadata) in enumerate(
+                zip(spec_indices, spec_seqs)):
+            branch = selected_branches[batch_index]
+            num_accepted = num_accepted_tokens[batch_index]
+            if branch == 0 or num_accepted == 0:
+                continue
+            seq_id = next(iter(seq_group_metadata.seq_data.keys()))
+            last_block_index = self._get_last_block_index(
+                seq_group_metadata, seq_id)
+            # The block of the last accepted proposal token.
+            seq_len = seq_group_metadata.seq_data[seq_id].get_len()
+            end_block_index = (seq_len - 1 + num_accepted) // self._block_size
+            block_table = seq_group_metadata.block_tables[seq_id]
+            scratch_block_ids = self._get_scratch_block_ids(spec_index, branch)
+            blocks_to_copy.extend(
+                (scratch_block_ids[i - last_block_index], block_table[i])
+                for i in range(last_block_index, end_block_index + 1))
+        return blocks_to_copy
+
+    def _get_last_block_index(self, seq_group_metadata: SequenceGroupMetadata,
+                              seq_id: SeqId) -> int:
+        """The index in the block table of the block of the last token."""
+        seq_len = seq_group_metadata.seq_data[seq_id].get_len()
+        return (seq_len - 1) // self._block_size
+
+    def _get_scratch_block_ids(self, spec_index: int,
+                               branch: int) -> List[int]:
+        start = ((spec_index * (self._num_branches - 1) + branch - 1) *
+                 self._num_blocks_per_branch)
+        assert start + self._num_blocks_per_branch <= len(
+            self.scratch_block_ids), "not enough scratch blocks"
+        return self.scratch_block_ids[start:start +
+                                      self._num_blocks_per_branch]
@@ -130,6 +130,8 @@ class TP1DraftModelRunner(ModelRunner):
         if not self.is_driver_worker:
             raise ValueError("TP1DraftModelRunner only supports TP=1.")
 
+        self._record_cuda_graph_usage(model_input)
+
         if self.lora_config:
             assert model_input.lora_requests is not None
             assert model_input.lora_mapping is not None
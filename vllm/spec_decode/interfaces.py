@@ -22,6 +22,16 @@ class SpeculativeProposals:
     # The valid length of each proposal; can be zero.
     proposal_lens: torch.Tensor
 
+    # Alternative proposals of the same length that are verified together
+    # with the proposal above, which is the first branch. Sequences with
+    # fewer alternatives repeat their first branch.
+    # shape = [batch_size, num_branches, proposal_len]
+    branch_token_ids: Optional[torch.Tensor] = None
+
+    # Probabilities of the branch tokens according to the proposer.
+    # shape = [batch_size, num_branches, proposal_len, vocab_size]
+    branch_probs: Optional[torch.Tensor] = None
+
     def __repr__(self):
         return (f"SpeculativeProposals("
                 f"proposal_token_ids={self.proposal_token_ids}, "
@@ -50,6 +60,13 @@ class SpeculativeScores:
     # Optional last hidden states from the scoring model.
     hidden_states: Optional[torch.Tensor] = None
 
+    # The scores of every branch when the proposals have several. probs,
+    # logprobs and token_ids are those of the first branch.
+    # shape = [batch_size, num_branches, proposal_len + 1, ...]
+    branch_probs: Optional[torch.Tensor] = None
+    branch_logprobs: Optional[torch.Tensor] = None
+    branch_token_ids: Optional[torch.Tensor] = None
+
     def __repr__(self):
         return (f"SpeculativeScores("
                 f"probs={self.probs.shape}, "
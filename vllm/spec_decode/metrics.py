@@ -1,6 +1,7 @@
 import time
-from dataclasses import dataclass
-from typing import Callable, Optional
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Optional
 
 import torch
 
@@ -42,6 +43,15 @@ class SpecDecodeWorkerMetrics:
     # The number of speculative tokens per sequence.
     num_spec_tokens: int
 
+    # The number of steps that used each number of speculative tokens since
+    # the previous metrics. The number varies from step to step with the
+    # adaptive speculation length.
+    num_spec_tokens_counts: Dict[int, int] = field(default_factory=dict)
+
+    # The number of tokens emitted per second of speculative decoding steps
+    # since the previous metrics.
+    goodput: float = float("nan")
+
 
 Timer = Callable[[], float]
 
@@ -72,6 +82,13 @@ class AsyncMetricsCollector:
             0, dtype=torch.long, device="cpu", pin_memory=pin_memory)
         self._aggregate_num_draft_tokens = 0
 
+        # Recorded on the CPU by the worker after each step.
+        self._max_num_emitted_tokens = 0
+        self._aggregate_max_num_emitted_tokens = 0
+        self._num_spec_tokens_counts: Counter = Counter()
+        self._num_step_emitted_tokens = 0
+        self._step_time = 0.0
+
         self._rejsample_metrics_collect_interval_s = collect_interval_s
         self._last_metrics_collect_time = self._timer()
 
@@ -79,6 +96,16 @@ class AsyncMetricsCollector:
         self._rank = rank
         self._copy_stream = torch.cuda.Stream()
 
+    def record_step(self, k: int, num_spec_seqs: int,
+                    num_emitted_tokens: int, step_time: float) -> None:
+        """Record a step that speculated k tokens for `num_spec_seqs`
+        sequences, emitted `num_emitted_tokens` tokens and took `step_time`
+        seconds."""
+        self._max_num_emitted_tokens += num_spec_seqs * (k + 1)
+        self._num_spec_tokens_counts[k] += 1
+        self._num_step_emitted_tokens += num_emitted_tokens
+        self._step_time += step_time
+
     def maybe_collect_rejsample_metrics(
             self, k: int) -> Optional[SpecDecodeWorkerMetrics]:
 
@@ -126,6 +153,8 @@ class AsyncMetricsCollector:
             # required.
             self._aggregate_num_draft_tokens = (
                 self.spec_decode_sampler.num_draft_tokens)
+            self._aggregate_max_num_emitted_tokens = (
+                self._max_num_emitted_tokens)
 
         aggregate_metrics_ready = torch.cuda.Event()
         aggregate_metrics_ready.record(self._copy_stream)
@@ -149,8 +178,12 @@ class AsyncMetricsCollector:
         emitted_tokens = self._aggregate_num_emitted_tokens.item()
         draft_tokens = self._aggregate_num_draft_tokens
 
-        max_num_emitted_tokens = self.get_max_num_emitted_tokens(
-            draft_tokens, k)
+        if self._aggregate_max_num_emitted_tokens > 0:
+            # The number of speculative tokens varied between steps.
+            max_num_emitted_tokens = self._aggregate_max_num_emitted_tokens
+        else:
+            max_num_emitted_tokens = self.get_max_num_emitted_tokens(
+                draft_tokens, k)
 
         if draft_tokens > 0:
             draft_acceptance_rate = accepted_tokens / draft_tokens
@@ -162,6 +195,15 @@ class AsyncMetricsCollector:
         else:
             system_efficiency = float("nan")
 
+        if self._step_time > 0:
+            goodput = self._num_step_emitted_tokens / self._step_time
+        else:
+            goodput = float("nan")
+        num_spec_tokens_counts = dict(self._num_spec_tokens_counts)
+        self._num_spec_tokens_counts.clear()
+        self._num_step_emitted_tokens = 0
+        self._step_time = 0.0
+
         return SpecDecodeWorkerMetrics(
             num_spec_tokens=k,
             draft_acceptance_rate=draft_acceptance_rate,
@@ -169,6 +211,8 @@ class AsyncMetricsCollector:
             accepted_tokens=accepted_tokens,
             draft_tokens=draft_tokens,
             emitted_tokens=emitted_tokens,
+            num_spec_tokens_counts=num_spec_tokens_counts,
+            goodput=goodput,
         )
 
     @staticmethod
@@ -0,0 +1,96 @@
+from typing import List, Tuple
+
+from vllm.sequence import SequenceData, SequenceGroupMetadata
+from vllm.spec_decode.batch_expansion import BatchExpansionTop1Scorer
+from vllm.spec_decode.util import split_batch_by_proposal_len
+
+TokenId = int
+
+# The attention backends that run a decode of several tokens with the
+# chunked prefill kernels, against the context in the KV cache.
+MULTI_QUERY_ATTENTION_BACKENDS = ("flash-attn", "xformers")
+
+
+class MultiQueryTop1Scorer(BatchExpansionTop1Scorer):
+    """Implements a speculative scorer that feeds the last accepted token and
+    the k proposal tokens of each sequence to the scoring model as a single
+    decode of k+1 tokens.
+
+    The model runner lays out such a decode like a chunk of a prefill whose
+    context is in the KV cache, so the attention reads the context of each
+    sequence once instead of k+1 times, and the batch, the block tables and
+    the slot mapping keep their size. The sampler then samples every
+    position, so the scores have the same layout as with batch expansion.
+
+    Multi-token decodes run eagerly, as CUDA graphs are only captured for
+    decodes of a single token. It only supports scoring the top1 proposal
+    tokens of the proposer.
+    """
+
+    def _expand_batch(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        proposal_token_ids_list: List[List[TokenId]],
+        proposal_lens_list: List[int],
+    ) -> Tuple[List[int], List[int], List[SequenceGroupMetadata], int]:
+        """Given the input sequences and their proposal tokens, create a new
+        batch where each speculative sequence has a decode of k+1 tokens.
+        The speculative sequences come first, as they run like prefills.
+        """
+        spec_seqs, spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=False)
+        non_spec_seqs, non_spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=True)
+
+        target_seq_group_metadata_list = [
+            self._create_multi_query_seq_group_metadata(
+                seq_group_metadata, proposal_token_ids)
+            for seq_group_metadata, proposal_token_ids in zip(
+                spec_seqs, proposal_token_ids_list)
+        ]
+        num_scoring_tokens = sum(
+            seq_group_metadata.token_chunk_size
+            for seq_group_metadata in target_seq_group_metadata_list)
+        target_seq_group_metadata_list.extend(non_spec_seqs)
+
+        return (spec_indices, non_spec_indices, target_seq_group_metadata_list,
+                num_scoring_tokens)
+
+    def _create_multi_query_seq_group_metadata(
+        self,
+        seq_group_metadata: SequenceGroupMetadata,
+        proposal_token_ids: List[TokenId],
+    ) -> SequenceGroupMetadata:
+        """Create the SequenceGroupMetadata of a decode that scores the
+        proposal tokens appended to the input sequence, and the bonus token.
+        """
+        assert not seq_group_metadata.is_prompt, (
+            "Speculating on "
+            "prompts not yet supported")
+        assert len(seq_group_metadata.seq_data) == 1, (
+            "Beam search "
+            "not supported in speculative decoding")
+        seq_id, seq_data = next(iter(seq_group_metadata.seq_data.items()))
+
+        target_seq_data = SequenceData(
+            prompt_token_ids=seq_data.get_prompt_token_ids(),
+            output_token_ids=[
+                *seq_data.get_output_token_ids(), *proposal_token_ids
+            ],
+        )
+        # The KV of every token but the last accepted one is cached.
+        target_seq_data.update_num_computed_tokens(seq_data.get_len() - 1)
+
+        return SequenceGroupMetadata(
+            request_id=seq_group_metadata.request_id,
+            is_prompt=False,
+            seq_data={seq_id: target_seq_data},
+            sampling_params=seq_group_metadata.sampling_params,
+            block_tables={seq_id: seq_group_metadata.block_tables[seq_id]},
+            lora_request=None,
+            token_chunk_size=len(proposal_token_ids) + 1,
+        )
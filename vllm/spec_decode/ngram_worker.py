@@ -1,5 +1,5 @@
 import weakref
-from typing import List, Optional, Tuple
+from typing import Dict, List, Optional, Set, Tuple
 
 import torch
 
@@ -10,6 +10,102 @@ from vllm.spec_decode.top1_proposer import Top1Proposer
 from vllm.worker.worker_base import LoraNotSupportedWorkerBase
 
 
+class NGramIndex:
+    """Maps every n-gram of a sequence, for n in
+    [ngram_prompt_lookup_min, ngram_prompt_lookup_max], to the starts of its
+    first occurrences that are followed by different tokens, at most
+    `num_branches` of them.
+
+    The index is updated with the tokens appended since the previous step, so
+    a lookup costs O(ngram_prompt_lookup_max) per step instead of a scan of
+    the whole sequence. The n-grams ending at the last token are not indexed
+    yet, so the suffix that is looked up never matches itself.
+    """
+
+    def __init__(self,
+                 ngram_prompt_lookup_min: int,
+                 ngram_prompt_lookup_max: int,
+                 num_branches: int = 1):
+        self.ngram_prompt_lookup_min = ngram_prompt_lookup_min
+        self.ngram_prompt_lookup_max = ngram_prompt_lookup_max
+        self.num_branches = num_branches
+        self._reset()
+
+    def _reset(self) -> None:
+        self.tables: Dict[int, Dict[Tuple[int, ...], List[int]]] = {
+            ngram_size: {}
+            for ngram_size in range(self.ngram_prompt_lookup_min,
+                                    self.ngram_prompt_lookup_max + 1)
+        }
+        self.num_tokens = 0
+        self.last_token_id: Optional[int] = None
+
+    def update(self, token_ids: List[int]) -> None:
+        """Index the n-grams of the tokens appended to `token_ids` since the
+        previous call."""
+        num_indexed = self.num_tokens
+        if num_indexed > 0 and (
+                len(token_ids) < num_indexed
+                or token_ids[num_indexed - 1] != self.last_token_id):
+            # Not the sequence that was indexed, start over.
+            self._reset()
+            num_indexed = 0
+        # The n-grams ending before the previous last token are indexed.
+        for end in range(max(num_indexed - 1, 0), len(token_ids) - 1):
+            next_token_id = token_ids[end + 1]
+            for ngram_size, table in self.tables.items():
+                start = end - ngram_size + 1
+                if start < 0:
+                    continue
+                starts = table.setdefault(tuple(token_ids[start:end + 1]),
+                                          [])
+                if len(starts) < self.num_branches and all(
+                        token_ids[s + ngram_size] != next_token_id
+                        for s in starts):
+                    starts.append(start)
+        self.num_tokens = len(token_ids)
+        if token_ids:
+            self.last_token_id = token_ids[-1]
+
+    def propose(self, token_ids: List[int],
+                sample_len: int) -> Optional[List[int]]:
+        """Return the `sample_len` tokens following the first earlier
+        occurrence of the longest matching suffix of `token_ids`, or None if
+        no suffix matches. `token_ids` must be the indexed sequence."""
+        branches = self.propose_branches(token_ids, sample_len, 1)
+        return branches[0] if branches else None
+
+    def propose_branches(self, token_ids: List[int], sample_len: int,
+                         num_branches: int) -> List[List[int]]:
+        """Return up to `num_branches` proposals of `sample_len` tokens that
+        start with different tokens. The matches of longer suffixes come
+        first, the first one is the proposal of `propose`."""
+        last_idx = len(token_ids) - 1
+        branches: List[List[int]] = []
+        first_token_ids: Set[int] = set()
+        for ngram_size in range(
+                min(self.ngram_prompt_lookup_max, last_idx),
+                self.ngram_prompt_lookup_min - 1,
+                -1,
+        ):
+            starts = self.tables[ngram_size].get(
+                tuple(token_ids[-ngram_size:]))
+            if not starts:
+                continue
+            for start in starts:
+                proposal_start_idx = start + ngram_size
+                if token_ids[proposal_start_idx] in first_token_ids:
+                    continue
+                first_token_ids.add(token_ids[proposal_start_idx])
+                branches.append([
+                    token_ids[min(proposal_start_idx + i, last_idx)]
+                    for i in range(sample_len)
+                ])
+                if len(branches) == num_branches:
+                    return branches
+        return branches
+
+
 class NGramWorker(NonLLMProposerWorkerBase, LoraNotSupportedWorkerBase):
     """NGramWorker provides a light drafter without need for model.
 
@@ -26,12 +122,23 @@ class NGramWorker(NonLLMProposerWorkerBase, LoraNotSupportedWorkerBase):
         # Lazy initialization list.
         self._proposer: Top1Proposer
 
+        # The n-gram index of each running request.
+        self._ngram_indices: Dict[str, NGramIndex] = {}
+        self.num_branches = 1
+
     def set_ngram_window_size(self, ngram_prompt_lookup_min: int,
                               ngram_prompt_lookup_max: int):
         # Search valid candidate window between
         # ngram_prompt_lookup_min/ngram_prompt_lookup_max
         self.ngram_prompt_lookup_max = ngram_prompt_lookup_max
         self.ngram_prompt_lookup_min = ngram_prompt_lookup_min
+        self._ngram_indices.clear()
+
+    def set_num_branches(self, num_branches: int):
+        # Propose up to num_branches continuations starting with different
+        # tokens for each sequence.
+        self.num_branches = num_branches
+        self._ngram_indices.clear()
 
     def init_device(self):
         self.device = torch.device(f"cuda:{self.local_rank}")
@@ -57,79 +164,60 @@ class NGramWorker(NonLLMProposerWorkerBase, LoraNotSupportedWorkerBase):
         """
         self._raise_if_unsupported(execute_model_req)
 
-        has_spec_out = False
-        token_id_list: List[Optional[torch.Tensor]] = []
-        token_prob_list: List[Optional[torch.Tensor]] = []
-        for idx, seq_group_metadata in enumerate(
-                execute_model_req.seq_group_metadata_list):
+        proposals: List[Optional[List[int]]] = []
+        for seq_group_metadata in execute_model_req.seq_group_metadata_list:
             seq_data = next(iter(seq_group_metadata.seq_data.values()))
+            token_ids = seq_data.get_token_ids()
+            ngram_index = self._ngram_indices.get(
+                seq_group_metadata.request_id)
+            if ngram_index is None:
+                ngram_index = NGramIndex(self.ngram_prompt_lookup_min,
+                                         self.ngram_prompt_lookup_max,
+                                         self.num_branches)
+                self._ngram_indices[
+                    seq_group_metadata.request_id] = ngram_index
+            ngram_index.update(token_ids)
+            proposals.append(ngram_index.propose(token_ids, sample_len))
+
+        matched = [proposal for proposal in proposals if proposal is not None]
+        if not matched:
+            return None, False
 
-            input_ids = torch.as_tensor(seq_data.get_token_ids(),
+        # Copy the proposals of the whole batch to the device at once.
+        token_ids_tensor = torch.tensor(matched,
                                         dtype=torch.long,
                                         device=self.device)
-            input_length = seq_data.get_len()
-
-            for ngram_size in range(
-                    min(self.ngram_prompt_lookup_max, input_length - 1),
-                    self.ngram_prompt_lookup_min - 1,
-                    -1,
-            ):
-                ngram_tensor = input_ids[-ngram_size:]
-                if ngram_size == 1:
-                    # Do not match itself and do not use unfold and all
-                    matches = (input_ids[:-1] == ngram_tensor)
-                else:
-                    windows = input_ids.unfold(dimension=0,
-                                               size=ngram_size,
-                                               step=1)
-                    # Do not match itself
-                    matches = (windows[:-1] == ngram_tensor).all(dim=-1)
-
-                # first_match includes "values" (bool), indicating whether
-                # the match is found, and "indices", indicating the index
-                # of the first match.
-                # Note that "first_match.values.item()" triggers GPU-CPU
-                # sync so it is a bit inefficient, but we have not found
-                # a better way to do this.
-                first_match = matches.max(dim=-1)
-                if first_match.values.item():
-                    proposal_start_idx = first_match.indices.add_(ngram_size)
-                    spec_indices = (
-                        proposal_start_idx).repeat(sample_len) + torch.arange(
-                            sample_len, device=self.device)
-                    spec_indices.clamp_(max=input_ids.shape[-1] - 1)
-                    res = input_ids.gather(dim=-1, index=spec_indices)
-                    token_id_list.append(res)
-                    token_prob_list.append(
-                        torch.nn.functional.one_hot(
-                            res,
-                            num_classes=self.vocab_size).to(torch.float32))
-                    has_spec_out = True
-                    break
-            else:
-                token_id_list.append(None)
-                token_prob_list.append(None)
-
-        if not has_spec_out:
-            return None, False
+        token_probs = torch.nn.functional.one_hot(
+            token_ids_tensor, num_classes=self.vocab_size).to(torch.float32)
+        logprobs = torch.zeros((sample_len, self.vocab_size),
+                               dtype=torch.float32,
+                               device=self.device)
 
         outputs: List[Optional[SamplerOutput]] = []
-        for idx in range(len(execute_model_req.seq_group_metadata_list)):
-            if token_id_list[idx] is None:
+        matched_idx = 0
+        for proposal in proposals:
+            if proposal is None:
                 outputs.append(None)
-            else:
-                outputs.append(
-                    SamplerOutput(
-                        outputs=None,
-                        sampled_token_probs=token_prob_list[idx],
-                        logprobs=torch.zeros((sample_len, self.vocab_size),
-                                             dtype=torch.float32,
-                                             device=self.device),
-                        sampled_token_ids=token_id_list[idx],
-                    ))
+                continue
+            outputs.append(
+                SamplerOutput(
+                    outputs=None,
+                    sampled_token_probs=token_probs[matched_idx],
+                    logprobs=logprobs,
+                    sampled_token_ids=token_ids_tensor[matched_idx],
+                ))
+            matched_idx += 1
 
         return outputs, False
 
+    def execute_model(
+        self,
+        execute_model_req: Optional[ExecuteModelRequest] = None
+    ) -> List[SamplerOutput]:
+        if execute_model_req is not None:
+            self._free_finished_requests(execute_model_req)
+        return super().execute_model(execute_model_req)
+
     def get_spec_proposals(
         self,
         execute_model_req: ExecuteModelRequest,
@@ -137,8 +225,47 @@ class NGramWorker(NonLLMProposerWorkerBase, LoraNotSupportedWorkerBase):
         """Produce speculations given an input batch of sequences. The number of
         speculative tokens per sequence is determined by max_proposal_len.
         """
+        self._free_finished_requests(execute_model_req)
+        proposals = self._proposer.get_spec_proposals(execute_model_req)
+        if self.num_branches > 1:
+            self._add_branches(execute_model_req, proposals)
+        return proposals
+
+    def _add_branches(self, execute_model_req: ExecuteModelRequest,
+                      proposals: SpeculativeProposals) -> None:
+        """Add the alternative proposals of the speculative sequences to
+        `proposals`. The index of each sequence was updated when its first
+        branch was proposed."""
+        batch_size, proposal_len = proposals.proposal_token_ids.shape
+        no_branches = [[-1] * proposal_len] * self.num_branches
+        branches: List[List[List[int]]] = []
+        for seq_group_metadata, seq_proposal_len in zip(
+                execute_model_req.seq_group_metadata_list,
+                proposals.proposal_lens.tolist()):
+            if seq_proposal_len == 0:
+                branches.append(no_branches)
+                continue
+            token_ids = next(iter(
+                seq_group_metadata.seq_data.values())).get_token_ids()
+            seq_branches = self._ngram_indices[
+                seq_group_metadata.request_id].propose_branches(
+                    token_ids, proposal_len, self.num_branches)
+            seq_branches.extend([seq_branches[0]] *
+                                (self.num_branches - len(seq_branches)))
+            branches.append(seq_branches)
+
+        branch_token_ids = torch.tensor(branches,
+                                        dtype=torch.long,
+                                        device=self.device)
+        proposals.branch_token_ids = branch_token_ids
+        proposals.branch_probs = torch.nn.functional.one_hot(
+            branch_token_ids.clamp(min=0),
+            num_classes=self.vocab_size).to(torch.float32)
 
-        return self._proposer.get_spec_proposals(execute_model_req)
+    def _free_finished_requests(
+            self, execute_model_req: ExecuteModelRequest) -> None:
+        for request_id in execute_model_req.finished_requests_ids:
+            self._ngram_indices.pop(request_id, None)
 
     def _raise_if_unsupported(
         self,
@@ -1,3 +1,4 @@
+import time
 from functools import cached_property
 from typing import Any, Dict, List, Optional, Tuple
 
@@ -14,16 +15,21 @@ from vllm.model_executor.layers.typical_acceptance_sampler import (
 from vllm.sequence import (CompletionSequenceGroupOutput, ExecuteModelRequest,
                            HiddenStates, SamplerOutput, SequenceGroupMetadata,
                            get_all_seq_ids)
-from vllm.spec_decode.batch_expansion import BatchExpansionTop1Scorer
+from vllm.spec_decode.batch_expansion import (BatchExpansionTop1Scorer,
+                                              BatchExpansionTreeScorer)
 from vllm.spec_decode.draft_model_runner import TP1DraftModelRunner
 from vllm.spec_decode.interfaces import (SpeculativeProposals,
                                          SpeculativeScorer, SpeculativeScores)
 from vllm.spec_decode.metrics import AsyncMetricsCollector
 from vllm.spec_decode.mlp_speculator_worker import MLPSpeculatorWorker
+from vllm.spec_decode.multi_query_scorer import (
+    MULTI_QUERY_ATTENTION_BACKENDS, MultiQueryTop1Scorer)
 from vllm.spec_decode.multi_step_worker import MultiStepWorker
 from vllm.spec_decode.ngram_worker import NGramWorker
 from vllm.spec_decode.proposer_worker_base import ProposerWorkerBase
 from vllm.spec_decode.smaller_tp_proposer_worker import SmallerTpProposerWorker
+from vllm.spec_decode.spec_length_controller import (
+    SpeculationLengthController)
 from vllm.spec_decode.util import (create_sequence_group_output,
                                    get_all_num_logprobs,
                                    get_sampled_token_logprobs, nvtx_range,
@@ -65,7 +71,11 @@ def create_spec_worker(*args, **kwargs) -> "SpecDecodeWorker":
         typical_acceptance_sampler_posterior_threshold=speculative_config.
         typical_acceptance_sampler_posterior_threshold,
         typical_acceptance_sampler_posterior_alpha=speculative_config.
-        typical_acceptance_sampler_posterior_alpha)
+        typical_acceptance_sampler_posterior_alpha,
+        adaptive_num_speculative_tokens=speculative_config.
+        adaptive_num_speculative_tokens,
+        num_speculative_branches=speculative_config.num_speculative_branches,
+        multi_query_scoring=speculative_config.multi_query_scoring)
 
     return spec_decode_worker
 
@@ -85,8 +95,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
     The current implementation has the following limitations:
     * Only draft-model proposal is implemented (contributions for more forms are
         welcome!).
-    * Only top-1 proposal and scoring are implemented. Tree-attention is left as
-        future work.
+    * Only top-1 proposal and scoring are implemented, except for ngram
+        proposals with several branches that share their root. Tree-attention
+        is left as future work.
     * All sequences in a batch must have the same proposal length, or zero. This
         can be improved by having per-sequence speculation in the future.
     * The scoring forward pass is done without an MQA kernel, which is
@@ -105,6 +116,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         draft_token_acceptance_method: str,
         typical_acceptance_sampler_posterior_threshold: float,
         typical_acceptance_sampler_posterior_alpha: float,
+        adaptive_num_speculative_tokens: bool = False,
+        num_speculative_branches: int = 1,
+        multi_query_scoring: bool = False,
     ) -> "SpecDecodeWorker":
 
         ngram_prompt_lookup_max = (
@@ -119,6 +133,7 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             proposer_worker = NGramWorker(**draft_worker_kwargs)
             proposer_worker.set_ngram_window_size(ngram_prompt_lookup_min,
                                                   ngram_prompt_lookup_max)
+            proposer_worker.set_num_branches(num_speculative_branches)
         else:
             draft_parallel_config: ParallelConfig = draft_worker_kwargs[
                 'parallel_config']
@@ -155,10 +170,18 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         logger.info("Configuring SpecDecodeWorker with sampler=%s",
                     type(spec_decode_sampler))
 
-        return SpecDecodeWorker(proposer_worker,
-                                scorer_worker,
-                                disable_by_batch_size=disable_by_batch_size,
-                                spec_decode_sampler=spec_decode_sampler)
+        spec_length_controller = (SpeculationLengthController()
+                                  if adaptive_num_speculative_tokens else
+                                  None)
+
+        return SpecDecodeWorker(
+            proposer_worker,
+            scorer_worker,
+            disable_by_batch_size=disable_by_batch_size,
+            spec_decode_sampler=spec_decode_sampler,
+            spec_length_controller=spec_length_controller,
+            num_speculative_branches=num_speculative_branches,
+            multi_query_scoring=multi_query_scoring)
 
     def __init__(
         self,
@@ -167,6 +190,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         spec_decode_sampler: SpecDecodeBaseSampler,
         metrics_collector: Optional[AsyncMetricsCollector] = None,
         disable_by_batch_size: Optional[int] = None,
+        spec_length_controller: Optional[SpeculationLengthController] = None,
+        num_speculative_branches: int = 1,
+        multi_query_scoring: bool = False,
     ):
         """
         Create a SpecDecodeWorker.
@@ -187,11 +213,22 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
                 disable speculative decoding for new incoming requests.
             metrics_collector: Helper class for collecting metrics; can be set
                 for testing purposes.
+            spec_length_controller: If set, chooses the number of speculative
+                tokens of each step, up to the number of lookahead slots.
+            num_speculative_branches: The number of branches of the proposals
+                of the proposer worker. With more than one, the branches are
+                verified together and the longest accepted one is kept.
+            multi_query_scoring: Whether the proposal tokens of each sequence
+                are scored as a single decode of several tokens, if the
+                attention backend of the scorer worker supports it.
         """
         self.proposer_worker = proposer_worker
         self.scorer_worker = scorer_worker
         self.disable_by_batch_size = disable_by_batch_size or float("inf")
         self.spec_decode_sampler = spec_decode_sampler
+        self.spec_length_controller = spec_length_controller
+        self.num_speculative_branches = num_speculative_branches
+        self.multi_query_scoring = multi_query_scoring
         self._metrics = AsyncMetricsCollector(
             self.spec_decode_sampler
         ) if metrics_collector is None else metrics_collector
@@ -219,13 +256,40 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         self._metrics.init_gpu_tensors(self.rank)
         self.spec_decode_sampler.init_gpu_tensors(self.rank)
 
-        self.scorer = BatchExpansionTop1Scorer(
-            scorer_worker=self.scorer_worker,
-            device=self.device,
-            vocab_size=self._vocab_size)
+        if self.num_speculative_branches > 1:
+            self.scorer = BatchExpansionTreeScorer(
+                scorer_worker=self.scorer_worker,
+                device=self.device,
+                vocab_size=self._vocab_size,
+                num_branches=self.num_speculative_branches,
+                block_size=self.scorer_worker.cache_config.block_size,
+                max_num_seqs=self.scorer_worker.scheduler_config.max_num_seqs,
+                max_proposal_len=self.scorer_worker.scheduler_config.
+                num_lookahead_slots)
+        elif self.multi_query_scoring and self._supports_multi_query_scoring():
+            self.scorer = MultiQueryTop1Scorer(
+                scorer_worker=self.scorer_worker,
+                device=self.device,
+                vocab_size=self._vocab_size)
+        else:
+            if self.multi_query_scoring:
+                logger.warning(
+                    "Multi-query scoring requires one of the %s attention "
+                    "backends and no sliding window, falling back to batch "
+                    "expansion.", MULTI_QUERY_ATTENTION_BACKENDS)
+            self.scorer = BatchExpansionTop1Scorer(
+                scorer_worker=self.scorer_worker,
+                device=self.device,
+                vocab_size=self._vocab_size)
 
         self._configure_model_sampler_for_spec_decode()
 
+    def _supports_multi_query_scoring(self) -> bool:
+        model_runner = self.scorer_worker.model_runner
+        return (model_runner.attn_backend.get_name()
+                in MULTI_QUERY_ATTENTION_BACKENDS
+                and model_runner.sliding_window is None)
+
     def load_model(self, *args, **kwargs):
         pass
 
@@ -258,7 +322,9 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         This is done by profiling the scorer model (which is typically the
         larger of the two). Then the total memory which would be used by the
         scorer cache is divided evenly between the proposer and scorer model KV,
-        such that the number of blocks is equal in both KV caches.
+        such that the number of blocks is equal in both KV caches. The
+        scratch blocks of the branches of the proposals are taken from the
+        scorer's share.
         """
         num_gpu_blocks, num_cpu_blocks = (
             self.scorer_worker.determine_num_available_blocks())
@@ -271,16 +337,33 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         new_num_gpu_blocks = split_num_cache_blocks_evenly(
             scorer_cache_block_size_bytes, proposer_cache_block_size_bytes,
             num_gpu_blocks)
-        return new_num_gpu_blocks, num_cpu_blocks
+        return max(new_num_gpu_blocks - self._num_scratch_blocks,
+                   0), num_cpu_blocks
 
     def initialize_cache(self, num_gpu_blocks: int,
                          num_cpu_blocks: int) -> None:
         """Initialize the cache engine of the scorer and proposer workers.
         """
-        self.scorer_worker.initialize_cache(num_gpu_blocks=num_gpu_blocks,
+        num_scratch_blocks = self._num_scratch_blocks
+        self.scorer_worker.initialize_cache(num_gpu_blocks=num_gpu_blocks +
+                                            num_scratch_blocks,
                                             num_cpu_blocks=num_cpu_blocks)
-        self.proposer_worker.initialize_cache(num_gpu_blocks=num_gpu_blocks,
+        self.proposer_worker.initialize_cache(num_gpu_blocks=num_gpu_blocks +
+                                              num_scratch_blocks,
                                               num_cpu_blocks=num_cpu_blocks)
+        if num_scratch_blocks > 0:
+            assert isinstance(self.scorer, BatchExpansionTreeScorer)
+            # The scratch blocks follow the blocks of the scheduler, which
+            # may share the cache config with the scorer worker.
+            self.scorer_worker.cache_config.num_gpu_blocks = num_gpu_blocks
+            self.scorer.scratch_block_ids = list(
+                range(num_gpu_blocks, num_gpu_blocks + num_scratch_blocks))
+
+    @property
+    def _num_scratch_blocks(self) -> int:
+        if isinstance(self.scorer, BatchExpansionTreeScorer):
+            return self.scorer.num_scratch_blocks
+        return 0
 
     @torch.inference_mode()
     def execute_model(
@@ -302,12 +385,28 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             broadcast_tensor_dict({}, src=0)
             return []
 
+        step_start_time = time.perf_counter()
         disable_all_speculation = self._should_disable_all_speculation(
             execute_model_req)
         num_lookahead_slots = execute_model_req.num_lookahead_slots
-
-        # Broadcast how many lookahead slots are scheduled for this step, and
-        # whether all speculation is disabled, to all non-driver workers.
+        chooses_num_lookahead_slots = (
+            self.spec_length_controller is not None
+            and num_lookahead_slots > 0 and not disable_all_speculation
+            and len(execute_model_req.seq_group_metadata_list) > 0)
+        if chooses_num_lookahead_slots:
+            assert self.spec_length_controller is not None
+            num_lookahead_slots = self.spec_length_controller.choose(
+                batch_size=len(execute_model_req.seq_group_metadata_list),
+                max_k=num_lookahead_slots)
+            execute_model_req.num_lookahead_slots = num_lookahead_slots
+        speculates = (num_lookahead_slots > 0
+                      and len(execute_model_req.seq_group_metadata_list) > 0
+                      and not disable_all_speculation)
+
+        # Broadcast how many lookahead slots are scheduled for this step,
+        # whether all speculation is disabled, and whether the KV of accepted
+        # branches is copied back after the verification, to all non-driver
+        # workers.
 
         # This is required as if the number of draft model runs changes
         # dynamically, the non-driver workers won't know unless we perform a
@@ -315,6 +414,8 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         broadcast_dict = dict(
             num_lookahead_slots=num_lookahead_slots,
             disable_all_speculation=disable_all_speculation,
+            copies_blocks_back=speculates
+            and self.num_speculative_branches > 1,
         )
         broadcast_tensor_dict(broadcast_dict, src=self._driver_rank)
 
@@ -330,16 +431,25 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         # 2. Auto-disable enabled: The running queue size exceeds
         #    the specified threshold.
         # 3. No request: There are no requests in the batch.
+        # 4. Adaptive speculation length: speculating is not expected to pay
+        #    off in this step.
         # In any of these cases, the proposer and scorer workers
         # are called normally.
-        if num_lookahead_slots == 0 or len(
-                execute_model_req.seq_group_metadata_list
-        ) == 0 or disable_all_speculation:
-            return self._run_no_spec(execute_model_req,
-                                     skip_proposer=disable_all_speculation)
+        if not speculates:
+            outputs = self._run_no_spec(execute_model_req,
+                                        skip_proposer=disable_all_speculation)
+            if chooses_num_lookahead_slots:
+                assert self.spec_length_controller is not None
+                self.spec_length_controller.observe(
+                    batch_size=len(execute_model_req.seq_group_metadata_list),
+                    k=0,
+                    num_accepted=[],
+                    step_time=time.perf_counter() - step_start_time)
+            return outputs
 
         return self._run_speculative_decoding_step(execute_model_req,
-                                                   num_lookahead_slots)
+                                                   num_lookahead_slots,
+                                                   step_start_time)
 
     @torch.inference_mode()
     def start_worker_execution_loop(self) -> None:
@@ -427,12 +537,16 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             self.proposer_worker.execute_model()
 
         self.scorer_worker.execute_model()
+        if data.get("copies_blocks_back"):
+            self._copy_blocks_back()
         return True
 
     @nvtx_range("spec_decode_worker._run_speculative_decoding_step")
     def _run_speculative_decoding_step(
-            self, execute_model_req: ExecuteModelRequest,
-            num_lookahead_slots: int) -> List[SamplerOutput]:
+            self,
+            execute_model_req: ExecuteModelRequest,
+            num_lookahead_slots: int,
+            step_start_time: Optional[float] = None) -> List[SamplerOutput]:
         """Execute a single step of speculative decoding.
 
         This invokes the proposer worker to get k speculative tokens for each
@@ -442,6 +556,7 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         sequence.
         """
         assert num_lookahead_slots == execute_model_req.num_lookahead_slots
+        start_time = time.perf_counter()
 
         # Pass last hidden states from target model to proposer
         execute_model_req.previous_hidden_states = self.previous_hidden_states
@@ -455,16 +570,65 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
             proposals,
         )
 
-        accepted_token_ids, target_logprobs = self._verify_tokens(
-            execute_model_req.seq_group_metadata_list, proposal_scores,
-            proposals, execute_model_req.num_lookahead_slots)
+        if proposals.branch_token_ids is not None:
+            (accepted_token_ids, target_logprobs,
+             proposal_token_ids) = self._verify_branches(
+                 execute_model_req, proposal_scores, proposals)
+        else:
+            accepted_token_ids, target_logprobs = self._verify_tokens(
+                execute_model_req.seq_group_metadata_list, proposal_scores,
+                proposals, execute_model_req.num_lookahead_slots)
+            proposal_token_ids = proposals.proposal_token_ids
+
+        num_accepted = None
+        if self.spec_length_controller is not None:
+            num_accepted = _get_num_accepted_tokens(accepted_token_ids,
+                                                    proposal_token_ids)
 
-        return self._create_output_sampler_list(
+        sampler_output_list = self._create_output_sampler_list(
             execute_model_req.seq_group_metadata_list,
             accepted_token_ids,
             target_logprobs=target_logprobs,
             k=execute_model_req.num_lookahead_slots)
 
+        if step_start_time is None:
+            step_start_time = start_time
+        self._record_step(execute_model_req, proposals, sampler_output_list,
+                          num_accepted,
+                          time.perf_counter() - step_start_time)
+        return sampler_output_list
+
+    def _record_step(self, execute_model_req: ExecuteModelRequest,
+                     proposals: SpeculativeProposals,
+                     sampler_output_list: List[SamplerOutput],
+                     num_accepted: Optional[torch.Tensor],
+                     step_time: float) -> None:
+        """Record the emitted tokens and the duration of a speculative
+        decoding step for the metrics and the speculation length."""
+        k = execute_model_req.num_lookahead_slots
+        proposal_lens = proposals.proposal_lens.tolist()
+        num_emitted_tokens = sum(
+            1 for sampler_output in sampler_output_list
+            for output in sampler_output.outputs
+            if output.samples[0].output_token != -1)
+        self._metrics.record_step(
+            k,
+            num_spec_seqs=sum(1 for n in proposal_lens if n > 0),
+            num_emitted_tokens=num_emitted_tokens,
+            step_time=step_time)
+
+        if self.spec_length_controller is not None:
+            assert num_accepted is not None
+            self.spec_length_controller.observe(
+                batch_size=len(execute_model_req.seq_group_metadata_list),
+                k=k,
+                num_accepted=[
+                    n for n, proposal_len in zip(num_accepted.tolist(),
+                                                 proposal_lens)
+                    if proposal_len > 0
+                ],
+                step_time=step_time)
+
     @nvtx_range("spec_decode_worker._verify_tokens")
     def _verify_tokens(
         self,
@@ -545,6 +709,104 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
 
         return accepted_token_ids, logprobs
 
+    @nvtx_range("spec_decode_worker._verify_branches")
+    def _verify_branches(
+        self,
+        execute_model_req: ExecuteModelRequest,
+        proposal_scores: SpeculativeScores,
+        proposals: SpeculativeProposals,
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Determine which speculative tokens are accepted when the proposals
+        have several branches, keep the branch with the longest accepted
+        prefix, and copy its KV back from the scratch blocks of the scorer.
+
+        Returns a tuple of Tensors: the accepted token ids, the logprobs of
+        the kept branches according to the scoring model, and the proposal
+        token ids of the kept branches.
+        """
+        assert isinstance(self.scorer, BatchExpansionTreeScorer)
+        assert proposals.branch_token_ids is not None
+        assert proposals.branch_probs is not None
+        assert proposal_scores.branch_probs is not None
+        assert proposal_scores.branch_logprobs is not None
+        assert proposal_scores.branch_token_ids is not None
+        assert proposal_scores.hidden_states is None, (
+            "proposals with several branches do not support hidden states")
+
+        seq_group_metadata_list = execute_model_req.seq_group_metadata_list
+        max_proposal_len = execute_model_req.num_lookahead_slots
+        proposal_lens_list = proposals.proposal_lens.tolist()
+        _, spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=False)
+        _, non_spec_indices = split_batch_by_proposal_len(
+            seq_group_metadata_list,
+            proposal_lens_list,
+            select_proposal_len_zero=True)
+        original_indices = spec_indices + non_spec_indices
+
+        accepted_token_ids, spec_selected_branches = (
+            self.spec_decode_sampler.forward_branches(
+                target_probs=proposal_scores.branch_probs[spec_indices, :, :-1],
+                bonus_token_ids=proposal_scores.branch_token_ids[spec_indices,
+                                                                 :, -1:],
+                draft_probs=proposals.branch_probs[spec_indices],
+                draft_token_ids=proposals.branch_token_ids[spec_indices],
+            ))
+
+        # Append output tokens from non-speculative sequences to
+        # the accepted token ids tensor.
+        non_spec_token_ids = proposal_scores.token_ids[non_spec_indices]
+        non_spec_token_ids = non_spec_token_ids.expand(-1, max_proposal_len +
+                                                       1).clone()
+        non_spec_token_ids[:, 1:] = -1
+        accepted_token_ids = torch.cat(
+            [accepted_token_ids, non_spec_token_ids])
+        # Rearrange so that results are in the order of the original seq group
+        # metadata.
+        accepted_token_ids[original_indices] = accepted_token_ids.clone()
+
+        batch_size = len(seq_group_metadata_list)
+        selected_branches = torch.zeros(batch_size,
+                                        dtype=torch.long,
+                                        device=accepted_token_ids.device)
+        selected_branches[spec_indices] = spec_selected_branches
+        rows = torch.arange(batch_size, device=accepted_token_ids.device)
+        logprobs = proposal_scores.branch_logprobs[rows, selected_branches]
+        proposal_token_ids = proposals.branch_token_ids[rows,
+                                                        selected_branches]
+
+        num_accepted = _get_num_accepted_tokens(accepted_token_ids,
+                                                proposal_token_ids)
+        self._copy_blocks_back(
+            self.scorer.get_blocks_to_copy_back(seq_group_metadata_list,
+                                                proposal_lens_list,
+                                                selected_branches.tolist(),
+                                                num_accepted.tolist()))
+
+        return accepted_token_ids, logprobs, proposal_token_ids
+
+    def _copy_blocks_back(
+            self,
+            blocks_to_copy: Optional[List[Tuple[int, int]]] = None) -> None:
+        """Copy the KV of the accepted branches from the scratch blocks to
+        the blocks of their sequences in the scorer KV cache of every rank.
+        The driver passes the copies and broadcasts them."""
+        if self.rank == self._driver_rank:
+            blocks_to_copy_tensor = torch.tensor(blocks_to_copy,
+                                                 device=self.device,
+                                                 dtype=torch.int64).view(-1, 2)
+            broadcast_tensor_dict({"blocks_to_copy": blocks_to_copy_tensor},
+                                  src=self._driver_rank)
+        else:
+            blocks_to_copy_tensor = broadcast_tensor_dict(
+                src=self._driver_rank)["blocks_to_copy"]
+        if blocks_to_copy_tensor.numel() > 0:
+            # Speculative decoding does not support pipeline parallelism, so
+            # the scorer has a single cache engine.
+            self.scorer_worker.cache_engine[0].copy(blocks_to_copy_tensor)
+
     def _create_output_sampler_list(
         self,
         seq_group_metadata_list: List[SequenceGroupMetadata],
@@ -665,6 +927,14 @@ class SpecDecodeWorker(LoraNotSupportedWorkerBase):
         raise NotImplementedError
 
 
+def _get_num_accepted_tokens(accepted_token_ids: torch.Tensor,
+                             proposal_token_ids: torch.Tensor) -> torch.Tensor:
+    """The number of leading proposal tokens each sequence accepted. A
+    recovered token never equals the rejected proposal token."""
+    return (accepted_token_ids[:, :-1] == proposal_token_ids).cumprod(
+        dim=1).sum(dim=1)
+
+
 def split_num_cache_blocks_evenly(scorer_cache_block_size_bytes: int,
                                   proposer_cache_block_size_bytes: int,
                                   total_num_gpu_blocks: int) -> int:
@@ -0,0 +1,147 @@
+from typing import List, Optional
+
+# Keeps the expected number of tokens finite.
+_MAX_ACCEPTANCE_RATE = 0.999
+# Number of measured steps before the step time model is used.
+_MIN_OBSERVATIONS = 8
+_NUM_FEATURES = 3
+
+
+def _solve(matrix: List[List[float]], rhs: List[float]) -> List[float]:
+    """Solve a small linear system by Gaussian elimination with partial
+    pivoting."""
+    n = len(rhs)
+    rows = [row[:] + [value] for row, value in zip(matrix, rhs)]
+    for col in range(n):
+        pivot = max(range(col, n), key=lambda r: abs(rows[r][col]))
+        rows[col], rows[pivot] = rows[pivot], rows[col]
+        if rows[col][col] == 0:
+            continue
+        for r in range(n):
+            if r != col:
+                factor = rows[r][col] / rows[col][col]
+                rows[r] = [a - factor * b for a, b in zip(rows[r], rows[col])]
+    return [
+        rows[i][n] / rows[i][i] if rows[i][i] != 0 else 0.0 for i in range(n)
+    ]
+
+
+class SpeculationLengthController:
+    """Chooses the number of speculative tokens k of each step from the live
+    acceptance rate and the measured step times.
+
+    With a per-token acceptance rate `a`, a sequence emits
+    (1 - a^(k+1)) / (1 - a) tokens per step on average: the accepted prefix
+    of the k speculative tokens plus the bonus or recovered token. The time
+    of a step is modelled as
+
+        c_0 + c_1 * batch_size * (k + 1) + c_2 * k
+
+    i.e. the fixed cost of a forward pass, the tokens the target model
+    verifies and the proposal steps, fitted to the measured step times by
+    exponentially weighted, non-negative least squares. Each step uses the k
+    with the largest expected number of emitted tokens per second (the
+    goodput) for the current batch size.
+
+    Args:
+        decay: The weight of the previous observations at each step.
+        initial_acceptance_rate: The acceptance rate assumed before any
+            proposal has been verified.
+        probe_interval: Every `probe_interval` steps, a neighbouring k is
+            used instead of the best one, so that the step time model and
+            the acceptance rate keep being measured, even when speculation
+            does not pay off.
+    """
+
+    def __init__(self,
+                 decay: float = 0.99,
+                 initial_acceptance_rate: float = 0.7,
+                 probe_interval: int = 16):
+        self.decay = decay
+        self.probe_interval = probe_interval
+        # Weighted number of accepted tokens and of acceptance trials.
+        self._num_accepted = initial_acceptance_rate
+        self._num_trials = 1.0
+        # Weighted normal equations of the step time model.
+        self._xtx = [[0.0] * _NUM_FEATURES for _ in range(_NUM_FEATURES)]
+        self._xty = [0.0] * _NUM_FEATURES
+        self._num_observations = 0
+        self._num_steps = 0
+
+    @property
+    def acceptance_rate(self) -> float:
+        return self._num_accepted / self._num_trials
+
+    def expected_num_tokens(self, k: int) -> float:
+        """The expected number of tokens a sequence emits in a step with k
+        speculative tokens."""
+        rate = min(self.acceptance_rate, _MAX_ACCEPTANCE_RATE)
+        return (1 - rate**(k + 1)) / (1 - rate)
+
+    def _fit(self) -> Optional[List[float]]:
+        if self._num_observations < _MIN_OBSERVATIONS:
+            return None
+        # A small ridge term keeps the system solvable while the batch size
+        # or k have not varied yet.
+        ridge = 1e-9 * sum(self._xtx[i][i] for i in range(_NUM_FEATURES))
+        # None of the costs can be negative: drop the most negative
+        # coefficient and fit the others again.
+        active = list(range(_NUM_FEATURES))
+        while active:
+            active_coeffs = _solve(
+                [[
+                    self._xtx[i][j] + (ridge if i == j else 0.0)
+                    for j in active
+                ] for i in active], [self._xty[i] for i in active])
+            if min(active_coeffs) >= 0:
+                break
+            del active[active_coeffs.index(min(active_coeffs))]
+        else:
+            return None
+        coeffs = [0.0] * _NUM_FEATURES
+        for i, coeff in zip(active, active_coeffs):
+            coeffs[i] = coeff
+        if not any(coeffs):
+            return None
+        return coeffs
+
+    @staticmethod
+    def _features(batch_size: int, k: int) -> List[float]:
+        return [1.0, float(batch_size * (k + 1)), float(k)]
+
+    def choose(self, batch_size: int, max_k: int) -> int:
+        """Return the number of speculative tokens of the next step, at most
+        `max_k`, the number of lookahead slots the scheduler allocated."""
+        self._num_steps += 1
+        coeffs = self._fit()
+        if coeffs is None:
+            return max_k
+
+        def goodput(k: int) -> float:
+            step_time = sum(
+                x * c for x, c in zip(self._features(batch_size, k), coeffs))
+            return self.expected_num_tokens(k) / max(step_time, 1e-9)
+
+        best_k = max(range(max_k + 1), key=goodput)
+        if self._num_steps % self.probe_interval == 0:
+            best_k = best_k + 1 if best_k < max_k else max(best_k - 1, 0)
+        return best_k
+
+    def observe(self, batch_size: int, k: int, num_accepted: List[int],
+                step_time: float) -> None:
+        """Record a step that proposed k tokens for each of `batch_size`
+        sequences, of which the sequences that speculated accepted the first
+        `num_accepted` ones, and took `step_time` seconds."""
+        accepted = sum(num_accepted) if k > 0 else 0
+        # Every sequence that did not accept all k tokens rejected one.
+        rejected = sum(1 for n in num_accepted if n < k) if k > 0 else 0
+        self._num_accepted = self.decay * self._num_accepted + accepted
+        self._num_trials = self.decay * self._num_trials + accepted + rejected
+
+        features = self._features(batch_size, k)
+        for i, x_i in enumerate(features):
+            row = self._xtx[i]
+            for j, x_j in enumerate(features):
+                row[j] = self.decay * row[j] + x_i * x_j
+            self._xty[i] = self.decay * self._xty[i] + x_i * step_time
+        self._num_observations += 1
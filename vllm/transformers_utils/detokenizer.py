@@ -1,8 +1,9 @@
-from typing import Dict, List, Optional, Tuple, Union
+from typing import List, Mapping, Optional, Tuple, Union
 
 from transformers import PreTrainedTokenizer, PreTrainedTokenizerFast
 
-from vllm.sequence import Logprob, SamplingParams, Sequence, SequenceGroup
+from vllm.sequence import (CompactLogprobs, Logprob, PromptLogprobs,
+                           SamplingParams, Sequence, SequenceGroup)
 from vllm.transformers_utils.tokenizer_group.base_tokenizer_group import (
     BaseTokenizerGroup)
 
@@ -23,7 +24,7 @@ class Detokenizer:
 
     def decode_prompt_logprobs_inplace(
             self, seq_group: SequenceGroup,
-            prompt_logprobs: List[Optional[Dict[int, Logprob]]]) -> None:
+            prompt_logprobs: PromptLogprobs) -> None:
         """Decodes the logprobs for the prompt of a sequence group.
 
         Args:
@@ -68,7 +69,8 @@ class Detokenizer:
                          spaces_between_special_tokens,
                      )
 
-                    sample_logprob.decoded_token = new_text
+                    _set_decoded_token(prompt_logprobs_for_token, token_id,
+                                       sample_logprob, new_text)
 
                     # Use the offsets & prev tokens corresponding to
                     # real tokens to ensure detokenization is consistent
@@ -131,7 +133,8 @@ class Detokenizer:
                 # If the token was generated this iteration,
                 # use the provided text.
                 if token_id == token_id_generated_this_iteration:
-                    sample_logprob.decoded_token = new_decoded_token_text
+                    _set_decoded_token(logprobs, token_id, sample_logprob,
+                                       new_decoded_token_text)
                     continue
 
                 if (sample_logprob.decoded_token is None
@@ -147,7 +150,8 @@ class Detokenizer:
                         spaces_between_special_tokens=prms.
                         spaces_between_special_tokens,
                     )
-                    sample_logprob.decoded_token = new_text
+                    _set_decoded_token(logprobs, token_id, sample_logprob,
+                                       new_text)
 
         seq.tokens.extend(new_tokens)
         seq.prefix_offset = prefix_offset
@@ -157,6 +161,15 @@ class Detokenizer:
         return len(new_decoded_token_text)
 
 
+def _set_decoded_token(logprobs: Mapping[int, Logprob], token_id: int,
+                       logprob: Logprob, decoded_token: str) -> None:
+    # The Logprob objects of a CompactLogprobs are created on access, so the
+    # text has to be stored in the underlying array as well.
+    logprob.decoded_token = decoded_token
+    if isinstance(logprobs, CompactLogprobs):
+        logprobs.set_decoded_token(token_id, decoded_token)
+
+
 def _convert_tokens_to_string_with_added_encoders(
     tokenizer: Union[PreTrainedTokenizer, PreTrainedTokenizerFast],
     output_tokens: List[str],
@@ -1,4 +1,4 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from typing import (TYPE_CHECKING, Any, Dict, List, Mapping, Optional, Tuple,
                     Type, Union)
 
@@ -32,6 +32,21 @@ logger = init_logger(__name__)
 _PAD_SLOT_ID = -1
 
 
+@dataclass
+class _CPUInputs:
+    """The inputs of the prefills or of the decodes of a batch."""
+    input_tokens: List[int] = field(default_factory=list)
+    input_positions: List[int] = field(default_factory=list)
+    slot_mapping: List[int] = field(default_factory=list)
+    seq_lens: List[int] = field(default_factory=list)
+    query_lens: List[int] = field(default_factory=list)
+    # The number of tokens of each prefill that are already in the KV cache.
+    context_lens: List[int] = field(default_factory=list)
+    block_tables: List[List[int]] = field(default_factory=list)
+    multi_modal_inputs_list: List[MultiModalInputs] = field(
+        default_factory=list)
+
+
 @dataclass(frozen=True)
 class CPUModelInput(ModelRunnerInputBase):
     """
@@ -88,8 +103,6 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
         self.model_config = model_config
         self.parallel_config = parallel_config
         self.scheduler_config = scheduler_config
-        # Currently, CPU worker doesn't support chunked prefill.
-        assert self.scheduler_config.chunked_prefill_enabled is False
         self.device_config = device_config
         self.cache_config = cache_config
         self.lora_config = lora_config
@@ -132,14 +145,8 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
     def _prepare_prompt(
         self,
         seq_group_metadata_list: List[SequenceGroupMetadata],
-    ) -> Tuple[torch.Tensor, torch.Tensor, AttentionMetadata, List[int],
-               Mapping[str, BatchedTensors]]:
-        assert len(seq_group_metadata_list) > 0
-        input_tokens: List[int] = []
-        input_positions: List[int] = []
-        slot_mapping: List[int] = []
-        seq_lens: List[int] = []
-        multi_modal_inputs_list: List[MultiModalInputs] = []
+    ) -> _CPUInputs:
+        inputs = _CPUInputs()
 
         for seq_group_metadata in seq_group_metadata_list:
             assert seq_group_metadata.is_prompt
@@ -147,26 +154,40 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
             assert len(seq_ids) == 1
             seq_id = seq_ids[0]
 
-            seq_data = seq_group_metadata.seq_data[seq_id]
-            prompt_tokens = seq_data.get_token_ids()
-            computed_len = seq_data.get_num_computed_tokens()
-            seq_len = len(prompt_tokens)
+            computed_block_nums = seq_group_metadata.computed_block_nums
+            if (self.scheduler_config.chunked_prefill_enabled
+                    and computed_block_nums):
+                raise RuntimeError(
+                    "chunked prefill cannot be used with prefix caching "
+                    "now.")
 
-            seq_lens.append(seq_len)  # Prompt token num
-            input_tokens.extend(prompt_tokens)  # Token ids
+            seq_data = seq_group_metadata.seq_data[seq_id]
+            context_len = seq_data.get_num_computed_tokens()
+            seq_len = min(seq_data.get_len(),
+                          context_len + seq_group_metadata.token_chunk_size)
+            if computed_block_nums and self.sliding_window is None:
+                # Prefix cache was hit.
+                context_len = len(computed_block_nums) * self.block_size
+            prompt_tokens = seq_data.get_token_ids()[context_len:seq_len]
+
+            inputs.seq_lens.append(seq_len)
+            inputs.query_lens.append(seq_len - context_len)
+            inputs.context_lens.append(context_len)
+            inputs.input_tokens.extend(prompt_tokens)  # Token ids
 
             # Token position ids
             # NOTE(woosuk): Here we assume that the first token in the prompt
             # is always the first token in the sequence.
-            input_positions.extend(list(range(computed_len, seq_len)))
+            inputs.input_positions.extend(list(range(context_len, seq_len)))
 
             mm_data = seq_group_metadata.multi_modal_data
             if mm_data:
                 mm_kwargs = self.multi_modal_input_mapper(mm_data)
-                multi_modal_inputs_list.append(mm_kwargs)
+                inputs.multi_modal_inputs_list.append(mm_kwargs)
 
             # Compute the slot mapping.
             block_table = seq_group_metadata.block_tables[seq_id]
+            inputs.block_tables.append(block_table)
             # Mask the [0, start_idx) tokens of the prompt with _PAD_SLOT_ID,
             # where start_idx is max(0, seq_len - sliding_window).
             # For example, if the prompt len is 10, sliding window is 8, and
@@ -176,57 +197,24 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
             if self.sliding_window is not None:
                 start_idx = max(0, seq_len - self.sliding_window)
 
-            for i in range(computed_len, seq_len):
+            for i in range(context_len, seq_len):
                 if i < start_idx:
-                    slot_mapping.append(_PAD_SLOT_ID)
+                    inputs.slot_mapping.append(_PAD_SLOT_ID)
                     continue
 
                 block_number = block_table[i //
                                            self.block_size]  # type: ignore
                 block_offset = i % self.block_size  # type: ignore
                 slot = block_number * self.block_size + block_offset
-                slot_mapping.append(slot)
-
-        num_prompt_tokens = len(input_tokens)
-
-        input_tokens = torch.tensor(input_tokens,
-                                    dtype=torch.long,
-                                    device=self.device)  # type: ignore
-        input_positions = torch.tensor(input_positions,
-                                       dtype=torch.long,
-                                       device=self.device)  # type: ignore
-        slot_mapping = torch.tensor(slot_mapping,
-                                    dtype=torch.long,
-                                    device=self.device)  # type: ignore
-
-        attn_metadata = self.attn_backend.make_metadata(
-            is_prompt=True,
-            seq_lens=seq_lens,
-            seq_lens_tensor=None,
-            max_decode_seq_len=None,
-            num_prefills=len(seq_lens),
-            num_prefill_tokens=num_prompt_tokens,
-            num_decode_tokens=0,
-            block_tables=torch.tensor([]),
-            slot_mapping=slot_mapping,
-        )
-
-        multi_modal_kwargs = MultiModalInputs.batch(multi_modal_inputs_list,
-                                                    device=self.device)
+                inputs.slot_mapping.append(slot)
 
-        return (input_tokens, input_positions, attn_metadata, seq_lens,
-                multi_modal_kwargs)
+        return inputs
 
     def _prepare_decode(
         self,
         seq_group_metadata_list: List[SequenceGroupMetadata],
-    ) -> Tuple[torch.Tensor, torch.Tensor, AttentionMetadata]:
-        assert len(seq_group_metadata_list) > 0
-        input_tokens: List[int] = []
-        input_positions: List[int] = []
-        slot_mapping: List[int] = []
-        seq_lens: List[int] = []
-        block_tables: List[List[int]] = []
+    ) -> _CPUInputs:
+        inputs = _CPUInputs()
 
         for seq_group_metadata in seq_group_metadata_list:
             assert not seq_group_metadata.is_prompt
@@ -237,69 +225,30 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
             for seq_id in seq_ids:
                 seq_data = seq_group_metadata.seq_data[seq_id]
                 generation_token = seq_data.get_last_token_id()
-                input_tokens.append(generation_token)
+                inputs.input_tokens.append(generation_token)
 
                 seq_len = seq_data.get_len()
                 position = seq_len - 1
-                input_positions.append(position)
+                inputs.input_positions.append(position)
 
                 seq_len = seq_len if self.sliding_window is None else min(
                     seq_len, self.sliding_window)
-                seq_lens.append(seq_len)
+                inputs.seq_lens.append(seq_len)
+                inputs.query_lens.append(1)
 
                 block_table = seq_group_metadata.block_tables[seq_id]
                 block_number = block_table[position // self.block_size]
                 block_offset = position % self.block_size
                 slot = block_number * self.block_size + block_offset
-                slot_mapping.append(slot)
+                inputs.slot_mapping.append(slot)
 
                 if self.sliding_window is not None:
                     sliding_window_blocks = (self.sliding_window //
                                              self.block_size)
                     block_table = block_table[-sliding_window_blocks:]
-                block_tables.append(block_table)
+                inputs.block_tables.append(block_table)
 
-        max_decode_seq_len = max(seq_lens)
-
-        input_tokens = torch.tensor(input_tokens,
-                                    dtype=torch.long,
-                                    device=self.device)
-        input_positions = torch.tensor(input_positions,
-                                       dtype=torch.long,
-                                       device=self.device)
-        slot_mapping = torch.tensor(slot_mapping,
-                                    dtype=torch.long,
-                                    device=self.device)
-        seq_lens_tensor = torch.tensor(seq_lens,
-                                       dtype=torch.int,
-                                       device=self.device)
-
-        max_block_table_len = max(
-            len(block_table) for block_table in block_tables)
-        block_tables = make_tensor_with_pad(
-            block_tables,
-            max_len=max_block_table_len,
-            pad=0,
-            dtype=torch.int,
-            device=self.device,
-        )
-
-        attn_metadata = self.attn_backend.make_metadata(
-            is_prompt=False,
-            slot_mapping=slot_mapping,
-            seq_lens=seq_lens,
-            seq_lens_tensor=seq_lens_tensor,
-            max_decode_seq_len=max_decode_seq_len,
-            num_prefill_tokens=0,
-            num_decode_tokens=len(input_tokens),
-            num_prefills=0,
-            block_tables=block_tables,
-        )
-        return (
-            input_tokens,
-            input_positions,
-            attn_metadata,
-        )
+        return inputs
 
     def make_model_input_from_broadcasted_tensor_dict(
         self,
@@ -316,28 +265,79 @@ class CPUModelRunner(ModelRunnerBase[CPUModelInput]):
             virtual_engine: int = 0,
             finished_requests_ids: Optional[List[str]] = None
     ) -> CPUModelInput:
-        multi_modal_kwargs = None
-        # NOTE: We assume that all sequences in the group are all prompts or
-        # all decodes.
-        is_prompt = seq_group_metadata_list[0].is_prompt
-        # Prepare input tensors.
-        if is_prompt:
-            (input_tokens, input_positions, attn_metadata, seq_lens,
-             multi_modal_kwargs
-             ) = self._prepare_prompt(seq_group_metadata_list)
+        # The scheduler puts the prefills, which may be chunks of prompts,
+        # before the decodes. Both run in a single batch.
+        num_prefill_groups = sum(seq_group_metadata.is_prompt
+                                 for seq_group_metadata in
+                                 seq_group_metadata_list)
+        assert all(seq_group_metadata.is_prompt for seq_group_metadata in
+                   seq_group_metadata_list[:num_prefill_groups])
+        prefill_inputs = self._prepare_prompt(
+            seq_group_metadata_list[:num_prefill_groups])
+        decode_inputs = self._prepare_decode(
+            seq_group_metadata_list[num_prefill_groups:])
+
+        num_prefills = len(prefill_inputs.seq_lens)
+        num_prefill_tokens = len(prefill_inputs.input_tokens)
+        num_decode_tokens = len(decode_inputs.input_tokens)
+        seq_lens = prefill_inputs.seq_lens + decode_inputs.seq_lens
+        query_lens = prefill_inputs.query_lens + decode_inputs.query_lens
+
+        input_tokens = torch.tensor(prefill_inputs.input_tokens +
+                                    decode_inputs.input_tokens,
+                                    dtype=torch.long,
+                                    device=self.device)
+        input_positions = torch.tensor(prefill_inputs.input_positions +
+                                       decode_inputs.input_positions,
+                                       dtype=torch.long,
+                                       device=self.device)
+        slot_mapping = torch.tensor(prefill_inputs.slot_mapping +
+                                    decode_inputs.slot_mapping,
+                                    dtype=torch.long,
+                                    device=self.device)
+
+        # Whole prompts only attend to themselves and need no block tables.
+        has_context = any(prefill_inputs.context_lens)
+        if num_decode_tokens > 0 or has_context:
+            block_tables: List[List[int]] = [
+                block_table or [] for block_table in
+                prefill_inputs.block_tables + decode_inputs.block_tables
+            ]
+            block_tables_tensor = make_tensor_with_pad(
+                block_tables,
+                max_len=max(len(block_table) for block_table in block_tables),
+                pad=0,
+                dtype=torch.int,
+                device=self.device,
+            )
+            seq_lens_tensor = torch.tensor(seq_lens,
+                                           dtype=torch.int,
+                                           device=self.device)
         else:
-            (input_tokens, input_positions,
-             attn_metadata) = self._prepare_decode(seq_group_metadata_list)
-            seq_lens = []
-        sampling_metadata = SamplingMetadata.prepare(
-            seq_group_metadata_list,
-            seq_lens,
-            # query_lens is not needed if chunked prefill is not
-            # supported. Since CPU worker doesn't support chunked prefill
-            # just use seq_lens instead.
-            seq_lens,
-            self.device,
-            pin_memory=False)
+            block_tables_tensor = torch.tensor([])
+            seq_lens_tensor = None
+
+        attn_metadata = self.attn_backend.make_metadata(
+            is_prompt=num_decode_tokens == 0,
+            seq_lens=seq_lens,
+            seq_lens_tensor=seq_lens_tensor,
+            max_decode_seq_len=max(decode_inputs.seq_lens, default=0),
+            num_prefills=num_prefills,
+            num_prefill_tokens=num_prefill_tokens,
+            num_decode_tokens=num_decode_tokens,
+            block_tables=block_tables_tensor,
+            slot_mapping=slot_mapping,
+            context_lens=prefill_inputs.context_lens if has_context else None,
+        )
+
+        multi_modal_kwargs = MultiModalInputs.batch(
+            prefill_inputs.multi_modal_inputs_list, device=self.device)
+
+        sampling_metadata = SamplingMetadata.prepare(seq_group_metadata_list,
+                                                     seq_lens,
+                                                     query_lens,
+                                                     self.device,
+                                                     pin_memory=False)
         return CPUModelInput(
             input_tokens=input_tokens,
             input_positions=input_positions,
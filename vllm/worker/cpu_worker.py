@@ -5,6 +5,7 @@ import torch
 import torch.distributed
 
 from vllm.attention import get_attn_backend
+from vllm.attention.ops.int8_paged_attn import Int8PagedAttention
 from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
                          ModelConfig, MultiModalConfig, ParallelConfig,
                          SchedulerConfig)
@@ -71,9 +72,20 @@ class CPUCacheEngine:
         num_blocks: int,
     ) -> List[torch.Tensor]:
         """Allocates KV cache on CPU."""
+        kv_cache: List[torch.Tensor] = []
+        if self.cache_config.cache_dtype == "int8":
+            kv_cache_shape = Int8PagedAttention.get_kv_cache_shape(
+                num_blocks, self.block_size, self.num_heads, self.head_size)
+            # Zeroed, so that the scales of the empty slots of the last block
+            # of a sequence are finite in the attention kernel.
+            for _ in range(self.num_layers):
+                kv_cache.append(
+                    torch.zeros(kv_cache_shape, dtype=self.dtype,
+                                device="cpu"))
+            return kv_cache
+
         kv_cache_shape = self.attn_backend.get_kv_cache_shape(
             num_blocks, self.block_size, self.num_heads, self.head_size)
-        kv_cache: List[torch.Tensor] = []
         for _ in range(self.num_layers):
             kv_cache.append(
                 torch.empty(kv_cache_shape, dtype=self.dtype, device="cpu"))
@@ -100,6 +112,10 @@ class CPUCacheEngine:
         num_layers = model_config.get_num_layers(parallel_config)
 
         key_cache_block = block_size * num_heads * head_size
+        if cache_dtype == "int8":
+            # The keys and values of each block are followed by their scales.
+            key_cache_block = Int8PagedAttention.get_kv_cache_shape(
+                1, block_size, num_heads, head_size)[-1]
         value_cache_block = key_cache_block
         total = num_layers * (key_cache_block + value_cache_block)
         if cache_dtype == "auto":
@@ -0,0 +1,149 @@
+"""The set of decode batch sizes the model runner captures as CUDA graphs.
+
+By default, a CUDA graph is captured for every padded batch size up to
+`max_num_seqs` at startup. Most deployments only ever run a few of them, so
+the runner counts how often each padded batch size runs and, when
+`VLLM_CUDA_GRAPH_CAPTURE_SET_DIR` is set, stores the counts in a file named
+by a hash of the configuration. A later start only captures the most frequent
+batch sizes of the previous runs. With `VLLM_CUDA_GRAPH_LAZY_CAPTURE`, the
+other batch sizes run eagerly until they have been seen a few times, and are
+then captured between two steps.
+"""
+import hashlib
+import json
+import os
+from typing import Any, Dict, List, Optional
+
+from vllm.config import (LoRAConfig, ModelConfig, ParallelConfig,
+                         SchedulerConfig)
+from vllm.version import __version__ as VLLM_VERSION
+
+_FORMAT_VERSION = 1
+
+
+def get_capture_set_path(cache_dir: str, model_config: ModelConfig,
+                         parallel_config: ParallelConfig,
+                         scheduler_config: SchedulerConfig,
+                         lora_config: Optional[LoRAConfig],
+                         model_runner_name: str) -> str:
+    """Return the path of the batch size counts for a configuration."""
+    key: Dict[str, Any] = {
+        "format": _FORMAT_VERSION,
+        "vllm": VLLM_VERSION,
+        "model": model_config.model,
+        "revision": model_config.revision,
+        "max_model_len": model_config.max_model_len,
+        "max_seq_len_to_capture": model_config.max_seq_len_to_capture,
+        "tensor_parallel_size": parallel_config.tensor_parallel_size,
+        "pipeline_parallel_size": parallel_config.pipeline_parallel_size,
+        "max_num_seqs": scheduler_config.max_num_seqs,
+        "lora": lora_config is not None,
+        "model_runner": model_runner_name,
+    }
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True,
+                                       default=str).encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+class CUDAGraphCaptureSet:
+    """Chooses the padded batch sizes to capture and counts how often each
+    one runs.
+
+    Args:
+        batch_sizes: The padded batch sizes a graph can be captured for.
+        path: The file the counts are loaded from and saved to, if any.
+        lazy: Whether batch sizes that are not captured at startup are
+            captured once they have been seen `min_steps_to_capture` times.
+        coverage: The fraction of the decode steps of previous runs that the
+            batch sizes captured at startup must cover.
+        min_steps_to_capture: The number of eager steps of a batch size
+            after which it is captured, with `lazy`.
+        save_interval: The number of recorded steps between two saves.
+    """
+
+    def __init__(self,
+                 batch_sizes: List[int],
+                 path: Optional[str] = None,
+                 lazy: bool = False,
+                 coverage: float = 0.99,
+                 min_steps_to_capture: int = 4,
+                 save_interval: int = 1000):
+        self.batch_sizes = sorted(batch_sizes)
+        self.path = path
+        self.lazy = lazy
+        self.coverage = coverage
+        self.min_steps_to_capture = min_steps_to_capture
+        self.save_interval = save_interval
+        # Steps per padded batch size, including the previous runs.
+        self.counts: Dict[int, int] = {}
+        # Eager steps per padded batch size in this run.
+        self._misses: Dict[int, int] = {}
+        self._steps_since_save = 0
+
+    def load(self) -> None:
+        """Load the counts of the previous runs, if there are any."""
+        if self.path is None:
+            return
+        try:
+            with open(self.path) as f:
+                counts = json.load(f)["counts"]
+            self.counts = {
+                int(batch_size): int(count)
+                for batch_size, count in counts.items()
+                if int(batch_size) in self.batch_sizes
+            }
+        except (OSError, ValueError, TypeError, KeyError, AttributeError):
+            self.counts = {}
+
+    def save(self) -> None:
+        """Store the counts. The file is renamed into place, so another
+        engine never reads a partial file."""
+        self._steps_since_save = 0
+        if self.path is None:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp_path, "w") as f:
+                json.dump({"counts": self.counts}, f)
+            os.replace(tmp_path, self.path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def select(self) -> List[int]:
+        """Return the batch sizes to capture at startup, in ascending order.
+
+        Without counts of previous runs, that is every batch size, or none
+        with `lazy`. Otherwise it is the most frequent batch sizes that
+        together ran `coverage` of the recorded steps.
+        """
+        total = sum(self.counts.values())
+        if total == 0:
+            return [] if self.lazy else list(self.batch_sizes)
+        selected: List[int] = []
+        covered = 0
+        for batch_size in sorted(self.counts,
+                                 key=lambda bs: (-self.counts[bs], -bs)):
+            if covered >= self.coverage * total:
+                break
+            selected.append(batch_size)
+            covered += self.counts[batch_size]
+        return sorted(selected)
+
+    def record(self, batch_size: int, hit: bool) -> None:
+        """Count a decode step of the padded `batch_size`, which ran as a
+        CUDA graph if `hit`."""
+        self.counts[batch_size] = self.counts.get(batch_size, 0) + 1
+        if not hit:
+            self._misses[batch_size] = self._misses.get(batch_size, 0) + 1
+        self._steps_since_save += 1
+
+    def should_capture(self, batch_size: int) -> bool:
+        """Whether the graph of `batch_size` should be captured now."""
+        return (self.lazy and
+                self._misses.get(batch_size, 0) >= self.min_steps_to_capture)
+
+    def should_save(self) -> bool:
+        return (self.path is not None
+                and self._steps_since_save >= self.save_interval)
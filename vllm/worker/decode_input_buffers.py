@@ -0,0 +1,188 @@
+from typing import List, Optional, Tuple
+
+import numpy as np
+import torch
+
+from vllm.sequence import SequenceGroupMetadata
+
+_PAD_SLOT_ID = -1
+
+
+class DecodeInputBuffers:
+    """Persistent, slot-indexed host state for decode-only batches.
+
+    In steady-state decode every sequence contributes exactly one token, so
+    the model inputs are fully determined by its last token, its length and
+    its block table. Instead of rebuilding Python lists and converting them
+    with `torch.tensor` on every step, the per-slot values are written into
+    numpy views of preallocated (pinned) host tensors, the positions and the
+    slot mapping are derived with vectorized numpy ops, and each field is
+    uploaded with a single non-blocking copy into a persistent device mirror.
+
+    Slot `i` holds the `i`-th sequence of the current batch. Block tables are
+    rewritten from the scheduler's metadata on every step, because copy on
+    write, swapping and prefix caching can all change block numbers that
+    were already sent.
+    """
+
+    def __init__(self, max_batch_size: int, max_blocks_per_seq: int,
+                 block_size: int, device: torch.device, pin_memory: bool):
+        self.max_batch_size = max_batch_size
+        self.max_blocks_per_seq = max_blocks_per_seq
+        self.block_size = block_size
+        self.device = device
+
+        # Host tensors, in the order they are uploaded.
+        self._tokens_host = torch.zeros(max_batch_size,
+                                        dtype=torch.long,
+                                        pin_memory=pin_memory)
+        self._positions_host = torch.zeros(max_batch_size,
+                                           dtype=torch.long,
+                                           pin_memory=pin_memory)
+        self._slot_mapping_host = torch.zeros(max_batch_size,
+                                              dtype=torch.long,
+                                              pin_memory=pin_memory)
+        self._seq_lens_host = torch.zeros(max_batch_size,
+                                          dtype=torch.int,
+                                          pin_memory=pin_memory)
+        self._seq_start_loc_host = torch.zeros(max_batch_size + 1,
+                                               dtype=torch.int32,
+                                               pin_memory=pin_memory)
+        self._block_tables_host = torch.zeros(
+            (max_batch_size, max_blocks_per_seq),
+            dtype=torch.int,
+            pin_memory=pin_memory)
+
+        # Numpy views sharing memory with the host tensors.
+        self.tokens = self._tokens_host.numpy()
+        self.positions = self._positions_host.numpy()
+        self.slot_mapping = self._slot_mapping_host.numpy()
+        self.seq_lens = self._seq_lens_host.numpy()
+        self.seq_start_loc = self._seq_start_loc_host.numpy()
+        self.block_tables = self._block_tables_host.numpy()
+        self.lora_ids = np.zeros(max_batch_size, dtype=np.int64)
+
+        # Persistent device mirrors. On CPU they alias the host tensors.
+        self._tokens = self._mirror(self._tokens_host)
+        self._positions = self._mirror(self._positions_host)
+        self._slot_mapping = self._mirror(self._slot_mapping_host)
+        self._seq_lens = self._mirror(self._seq_lens_host)
+        self._seq_start_loc = self._mirror(self._seq_start_loc_host)
+        self._block_tables = self._mirror(self._block_tables_host)
+        self._query_start_loc = torch.arange(max_batch_size + 1,
+                                             dtype=torch.int32,
+                                             device=device)
+
+        # The host buffers are reused by the next step, so wait for the
+        # previous uploads before overwriting them.
+        self._upload_done: Optional[torch.cuda.Event] = None
+
+    def _mirror(self, host: torch.Tensor) -> torch.Tensor:
+        if self.device.type == "cpu":
+            return host
+        return torch.zeros_like(host, device=self.device)
+
+    def fill(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        max_seq_len: int,
+    ) -> Optional[int]:
+        """Write the decode sequences of `seq_group_metadata_list` into the
+        host slots and return how many were written.
+
+        Returns None, leaving the caller to build the inputs the regular way,
+        if the batch contains a prompt, a multi-token decode, multi-modal
+        data, a sequence longer than `max_seq_len`, a block table wider than
+        the slots or more sequences than there are slots.
+        """
+        if self._upload_done is not None:
+            self._upload_done.synchronize()
+            self._upload_done = None
+
+        tokens = self.tokens
+        seq_lens = self.seq_lens
+        block_tables = self.block_tables
+        max_blocks_per_seq = self.max_blocks_per_seq
+        lora_ids = self.lora_ids
+        max_batch_size = self.max_batch_size
+        slot = 0
+        for seq_group_metadata in seq_group_metadata_list:
+            if (seq_group_metadata.is_prompt
+                    or seq_group_metadata.token_chunk_size > 1
+                    or seq_group_metadata.multi_modal_data):
+                return None
+            group_block_tables = seq_group_metadata.block_tables
+            lora_id = seq_group_metadata.lora_int_id
+            for seq_id, seq_data in seq_group_metadata.seq_data.items():
+                seq_len = seq_data.get_len()
+                if slot == max_batch_size or seq_len > max_seq_len:
+                    return None
+                block_table = group_block_tables[seq_id]
+                if len(block_table) > max_blocks_per_seq:
+                    return None
+                tokens[slot] = seq_data.get_last_token_id()
+                seq_lens[slot] = seq_len
+                block_tables[slot, :len(block_table)] = block_table
+                lora_ids[slot] = lora_id
+                slot += 1
+        return slot
+
+    def prepare(
+        self, num_seqs: int, padded_batch_size: int
+    ) -> Tuple[torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor,
+               torch.Tensor, torch.Tensor, torch.Tensor, torch.Tensor]:
+        """Derive the remaining inputs of the `num_seqs` filled slots, pad the
+        batch to `padded_batch_size` and upload it.
+
+        Returns the device tensors (input_tokens, input_positions,
+        slot_mapping, seq_lens, context_lens, query_start_loc, seq_start_loc,
+        block_tables).
+        """
+        n = num_seqs
+        padded = padded_batch_size
+        block_size = self.block_size
+
+        positions = self.positions
+        np.subtract(self.seq_lens[:n], 1, out=positions[:n])
+        block_numbers = self.block_tables[np.arange(n),
+                                          positions[:n] // block_size]
+        np.add(block_numbers * block_size,
+               positions[:n] % block_size,
+               out=self.slot_mapping[:n])
+
+        # Padding slots follow the conventions of the CUDA graph inputs.
+        self.tokens[n:padded] = 0
+        positions[n:padded] = 0
+        self.slot_mapping[n:padded] = _PAD_SLOT_ID
+        self.seq_lens[n:padded] = 1
+        np.cumsum(self.seq_lens[:padded], out=self.seq_start_loc[1:padded + 1])
+
+        input_tokens = self._upload(self._tokens_host, self._tokens, padded)
+        input_positions = self._upload(self._positions_host, self._positions,
+                                       padded)
+        slot_mapping = self._upload(self._slot_mapping_host,
+                                    self._slot_mapping, padded)
+        seq_lens = self._upload(self._seq_lens_host, self._seq_lens, padded)
+        seq_start_loc = self._upload(self._seq_start_loc_host,
+                                     self._seq_start_loc, padded + 1)
+        block_tables = self._upload(self._block_tables_host,
+                                    self._block_tables, padded)
+        if self.device.type == "cuda":
+            self._upload_done = torch.cuda.Event()
+            self._upload_done.record()
+
+        # For decode, the context of every sequence is all but its last
+        # token, which is exactly its position.
+        context_lens = input_positions[:n].to(torch.int)
+        query_start_loc = self._query_start_loc[:n + 1]
+        return (input_tokens, input_positions, slot_mapping, seq_lens,
+                context_lens, query_start_loc, seq_start_loc, block_tables)
+
+    def _upload(self, host: torch.Tensor, device_mirror: torch.Tensor,
+                size: int) -> torch.Tensor:
+        if device_mirror is host:
+            # Hand out a copy, since the host buffer is reused by the next
+            # step while the model input may still be referenced.
+            return host[:size].clone()
+        device_mirror[:size].copy_(host[:size], non_blocking=True)
+        return device_mirror[:size]
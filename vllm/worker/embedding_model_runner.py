@@ -11,10 +11,15 @@ from vllm.model_executor.pooling_metadata import PoolingMetadata
 from vllm.pooling_params import PoolingParams
 from vllm.sequence import (IntermediateTensors, PoolerOutput, SequenceData,
                            SequenceGroupMetadata)
-from vllm.worker.model_runner import GPUModelRunnerBase, ModelInputForGPU
+from vllm.worker.model_runner import (_PAD_SLOT_ID, GPUModelRunnerBase,
+                                      ModelInputForGPU)
 
 logger = init_logger(__name__)
 
+# The attention backends whose prefill runs a variable-length attention over
+# the packed prompts when there is no KV cache to write to.
+PACKED_ATTENTION_BACKENDS = ("flash-attn", "rocm-flash-attn", "xformers")
+
 
 @dataclasses.dataclass(frozen=True)
 class ModelInputForGPUWithPoolingMetadata(ModelInputForGPU):
@@ -122,8 +127,11 @@ class EmbeddingModelRunner(
         finished_requests_ids: Optional[List[str]] = None
     ) -> ModelInputForGPUWithPoolingMetadata:
         assert seq_group_metadata_list is not None
-        model_input = self._prepare_model_input_tensors(
+        model_input = self._prepare_packed_model_input_tensors(
             seq_group_metadata_list, finished_requests_ids)
+        if model_input is None:
+            model_input = self._prepare_model_input_tensors(
+                seq_group_metadata_list, finished_requests_ids)
         # Prepare PoolingMetadata.
         assert model_input.seq_lens is not None
         pooling_metadata = self._prepare_pooling(seq_group_metadata_list,
@@ -132,6 +140,106 @@ class EmbeddingModelRunner(
         return dataclasses.replace(model_input,
                                    pooling_metadata=pooling_metadata)
 
+    def _prepare_packed_model_input_tensors(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        finished_requests_ids: Optional[List[str]] = None
+    ) -> Optional[ModelInputForGPUWithPoolingMetadata]:
+        """Prepare the model input of a batch of whole prompts.
+
+        Embedding models keep no KV cache, so the prompts are packed back to
+        back and only described by their lengths: there is no slot mapping
+        or block table to compute per token, and the attention runs over the
+        packed prompts with the variable-length prefill kernels.
+
+        Returns None when the batch needs the generic path, i.e. with LoRA,
+        multi-modal data, chunked prompts or an unsupported attention
+        backend.
+        """
+        if (not seq_group_metadata_list or self.lora_config is not None
+                or self.attn_backend.get_name()
+                not in PACKED_ATTENTION_BACKENDS):
+            return None
+
+        input_tokens: List[int] = []
+        seq_lens: List[int] = []
+        for seq_group_metadata in seq_group_metadata_list:
+            if (not seq_group_metadata.is_prompt
+                    or seq_group_metadata.multi_modal_data):
+                return None
+            for seq_data in seq_group_metadata.seq_data.values():
+                seq_len = seq_data.get_len()
+                if (seq_data.get_num_computed_tokens() != 0
+                        or seq_group_metadata.token_chunk_size != seq_len):
+                    return None
+                input_tokens.extend(seq_data.get_token_ids())
+                seq_lens.append(seq_len)
+
+        input_positions: List[int] = []
+        for seq_len in seq_lens:
+            input_positions.extend(range(seq_len))
+        num_seqs = len(seq_lens)
+        num_tokens = len(input_tokens)
+        max_seq_len = max(seq_lens)
+
+        seq_lens_tensor = torch.tensor(seq_lens,
+                                       dtype=torch.int,
+                                       device=self.device)
+        seq_start_loc = torch.zeros(num_seqs + 1,
+                                    dtype=torch.int32,
+                                    device=self.device)
+        torch.cumsum(seq_lens_tensor,
+                     dim=0,
+                     dtype=seq_start_loc.dtype,
+                     out=seq_start_loc[1:])
+
+        attn_metadata = self.attn_backend.make_metadata(
+            num_prefills=num_seqs,
+            slot_mapping=torch.full((num_tokens, ),
+                                    _PAD_SLOT_ID,
+                                    dtype=torch.long,
+                                    device=self.device),
+            num_prefill_tokens=num_tokens,
+            num_decode_tokens=0,
+            seq_lens=seq_lens,
+            seq_lens_tensor=seq_lens_tensor,
+            max_query_len=max_seq_len,
+            max_prefill_seq_len=max_seq_len,
+            max_decode_seq_len=0,
+            # The prompts have no cached context: the queries are the
+            # sequences.
+            query_start_loc=seq_start_loc,
+            seq_start_loc=seq_start_loc,
+            context_lens_tensor=torch.zeros(num_seqs,
+                                            dtype=torch.int,
+                                            device=self.device),
+            block_tables=torch.empty((num_seqs, 0),
+                                     dtype=torch.int,
+                                     device=self.device),
+            use_cuda_graph=False,
+        )
+
+        request_ids_to_seq_ids = {
+            seq_group_metadata.request_id:
+            list(seq_group_metadata.seq_data.keys())
+            for seq_group_metadata in seq_group_metadata_list
+        }
+        return self._model_input_cls(
+            input_tokens=torch.tensor(input_tokens,
+                                      dtype=torch.long,
+                                      device=self.device),
+            input_positions=torch.tensor(input_positions,
+                                         dtype=torch.long,
+                                         device=self.device),
+            attn_metadata=attn_metadata,
+            seq_lens=seq_lens,
+            query_lens=seq_lens,
+            lora_mapping=None,
+            lora_requests=set(),
+            multi_modal_kwargs={},
+            request_ids_to_seq_ids=request_ids_to_seq_ids,
+            finished_requests_ids=finished_requests_ids)
+
     def _prepare_pooling(
         self,
         seq_group_metadata_list: List[SequenceGroupMetadata],
@@ -0,0 +1,107 @@
+"""A persistent, on-disk cache of the results of the memory profiling run.
+
+The profiling run in `Worker.determine_num_available_blocks` does a forward
+pass at the maximum number of batched tokens to measure the peak memory of
+the model. The peak only depends on the configuration, so it is stored in a
+file named by a hash of everything that affects it. A later start with the
+same configuration reads the file instead of profiling again.
+"""
+import dataclasses
+import hashlib
+import json
+import os
+from typing import Any, Dict, Optional
+
+import torch
+
+from vllm.config import (LoRAConfig, ModelConfig, MultiModalConfig,
+                         ParallelConfig, SchedulerConfig, SpeculativeConfig)
+from vllm.version import __version__ as VLLM_VERSION
+
+_FORMAT_VERSION = 1
+
+
+@dataclasses.dataclass
+class MemoryProfile:
+    """The measurements of one profiling run, in bytes."""
+    # GPU memory in use at the peak of the run, excluding other processes.
+    peak_memory: int
+    # Memory allocated by torch for activations during the run, on top of
+    # the weights.
+    activation_memory: int
+
+
+def get_memory_profile_path(cache_dir: str, model_config: ModelConfig,
+                            parallel_config: ParallelConfig,
+                            scheduler_config: SchedulerConfig,
+                            lora_config: Optional[LoRAConfig],
+                            multimodal_config: Optional[MultiModalConfig],
+                            speculative_config: Optional[SpeculativeConfig],
+                            device: torch.device, rank: int,
+                            model_runner_name: str) -> str:
+    """Return the path of the cached profile for a worker's configuration.
+
+    With speculative decoding, the scorer is profiled once the draft model is
+    loaded, so its peak memory includes the weights of the draft model.
+    """
+    speculative: Optional[Dict[str, Any]] = None
+    if speculative_config is not None:
+        draft_model_config = speculative_config.draft_model_config
+        speculative = {
+            "model": draft_model_config.model,
+            "revision": draft_model_config.revision,
+            "dtype": str(draft_model_config.dtype),
+            "quantization": draft_model_config.quantization,
+            "num_speculative_tokens":
+            speculative_config.num_speculative_tokens,
+        }
+    properties = torch.cuda.get_device_properties(device)
+    key: Dict[str, Any] = {
+        "format": _FORMAT_VERSION,
+        "vllm": VLLM_VERSION,
+        "torch": torch.__version__,
+        "device": properties.name,
+        "device_memory": properties.total_memory,
+        "model": model_config.model,
+        "revision": model_config.revision,
+        "dtype": str(model_config.dtype),
+        "quantization": model_config.quantization,
+        "sparsity": model_config.sparsity,
+        "max_model_len": model_config.max_model_len,
+        "tensor_parallel_size": parallel_config.tensor_parallel_size,
+        "pipeline_parallel_size": parallel_config.pipeline_parallel_size,
+        "rank": rank,
+        "max_num_batched_tokens": scheduler_config.max_num_batched_tokens,
+        "max_num_seqs": scheduler_config.max_num_seqs,
+        "lora": None if lora_config is None else repr(lora_config),
+        "multimodal":
+        None if multimodal_config is None else repr(multimodal_config),
+        "speculative": speculative,
+        "model_runner": model_runner_name,
+    }
+    digest = hashlib.sha256(json.dumps(key, sort_keys=True,
+                                       default=str).encode()).hexdigest()[:32]
+    return os.path.join(cache_dir, f"{digest}.json")
+
+
+def load_memory_profile(path: str) -> Optional[MemoryProfile]:
+    """Return the profile stored at `path`, or None if there is none."""
+    try:
+        with open(path) as f:
+            return MemoryProfile(**json.load(f))
+    except (OSError, ValueError, TypeError):
+        return None
+
+
+def save_memory_profile(path: str, profile: MemoryProfile) -> None:
+    """Store `profile` at `path`. The file is renamed into place, so the
+    workers of another engine never read a partial file."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    try:
+        with open(tmp_path, "w") as f:
+            json.dump(dataclasses.asdict(profile), f)
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
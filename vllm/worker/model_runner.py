@@ -22,12 +22,13 @@ except ImportError:
     BatchPrefillWithPagedKVCacheWrapper = None
     FLASHINFER_WORKSPACE_BUFFER_SIZE = 0
 
+import vllm.envs as envs
 from vllm.attention import AttentionMetadata, get_attn_backend
-from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
-                         ModelConfig, MultiModalConfig, ParallelConfig,
-                         SchedulerConfig)
+from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoadFormat,
+                         LoRAConfig, ModelConfig, MultiModalConfig,
+                         ParallelConfig, SchedulerConfig)
 from vllm.distributed import get_pp_group
-from vllm.distributed.parallel_state import graph_capture
+from vllm.distributed.parallel_state import get_world_group, graph_capture
 from vllm.inputs import INPUT_REGISTRY
 from vllm.logger import init_logger
 from vllm.lora.layers import LoRAMapping
@@ -41,10 +42,13 @@ from vllm.model_executor.models.interfaces import (supports_lora,
 from vllm.multimodal import (MULTIMODAL_REGISTRY, BatchedTensors,
                              MultiModalInputs)
 from vllm.sampling_params import SamplingParams
-from vllm.sequence import (IntermediateTensors, SamplerOutput,
-                           SequenceGroupMetadata)
+from vllm.sequence import (CUDAGraphUsage, IntermediateTensors,
+                           SamplerOutput, SequenceGroupMetadata)
 from vllm.utils import (CudaMemoryProfiler, get_kv_cache_torch_dtype, is_hip,
                         is_pin_memory_available, make_tensor_with_pad)
+from vllm.worker.cuda_graph_capture_set import (CUDAGraphCaptureSet,
+                                                get_capture_set_path)
+from vllm.worker.decode_input_buffers import DecodeInputBuffers
 from vllm.worker.model_runner_base import (
     ModelRunnerBase, ModelRunnerInputBase,
     _add_attn_metadata_broadcastable_dict,
@@ -155,6 +159,24 @@ class ModelInputForGPUWithSamplingMetadata(ModelInputForGPU):
         return cls(**tensor_dict)
 
 
+@dataclasses.dataclass
+class _GraphCaptureInputs:
+    """The dummy inputs shared by the CUDA graphs of all batch sizes."""
+    input_tokens: torch.Tensor
+    input_positions: torch.Tensor
+    slot_mapping: torch.Tensor
+    seq_lens: torch.Tensor
+    block_tables: torch.Tensor
+    kv_caches: List[List[torch.Tensor]]
+    hidden_or_intermediate_states: List[Optional[torch.Tensor]]
+    intermediate_inputs: Optional[IntermediateTensors] = None
+    # FlashInfer only.
+    decode_workspace_buffer: Optional[torch.Tensor] = None
+    indices_buffer: Optional[torch.Tensor] = None
+    indptr_buffer: Optional[torch.Tensor] = None
+    last_page_len_buffer: Optional[torch.Tensor] = None
+
+
 class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
     """
     Helper class for shared methods between GPU model runners.
@@ -199,6 +221,28 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
         ]
         self.graph_memory_pool: Optional[Tuple[
             int, int]] = None  # Set during graph capture.
+        self._graph_capture_inputs: Optional[
+            _GraphCaptureInputs] = None  # Set during graph capture.
+
+        # Decode batches are only padded to the batch sizes in
+        # `cuda_graph_batch_sizes`, which `capture_model` narrows down to the
+        # batch sizes it captured. The other batch sizes run eagerly.
+        graph_batch_size = _get_graph_batch_size(
+            self.scheduler_config.max_num_seqs)
+        batch_size_capture_list = [
+            bs for bs in _BATCH_SIZES_TO_CAPTURE if bs <= graph_batch_size
+        ]
+        self.cuda_graph_batch_sizes: Set[int] = set(batch_size_capture_list)
+        capture_set_path = None
+        if envs.VLLM_CUDA_GRAPH_CAPTURE_SET_DIR is not None:
+            capture_set_path = get_capture_set_path(
+                envs.VLLM_CUDA_GRAPH_CAPTURE_SET_DIR, self.model_config,
+                self.parallel_config, self.scheduler_config,
+                self.lora_config, type(self).__name__)
+        self.graph_capture_set = CUDAGraphCaptureSet(
+            batch_size_capture_list,
+            path=capture_set_path,
+            lazy=envs.VLLM_CUDA_GRAPH_LAZY_CAPTURE)
 
         self.has_seqlen_agnostic = model_config.contains_seqlen_agnostic_layers(
             parallel_config)
@@ -224,6 +268,24 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
             self.block_size,
         ) if num_attn_heads else None
 
+        # Persistent host/device buffers for steady-state decode batches, see
+        # `_prepare_decode_model_input_tensors`. Sliding window, logits soft
+        # capping and FlashInfer need per-sequence handling that the buffers
+        # do not implement, so those configurations keep the generic path.
+        self.decode_input_buffers: Optional[DecodeInputBuffers] = None
+        if (self.attn_backend is not None
+                and self.attn_backend.get_name() != "flashinfer"
+                and self.sliding_window is None and getattr(
+                    self.model_config.hf_config, 'attn_logit_softcapping',
+                    None) is None):
+            self.decode_input_buffers = DecodeInputBuffers(
+                max_batch_size=max(self.scheduler_config.max_num_seqs,
+                                   _BATCH_SIZES_TO_CAPTURE[-1]),
+                max_blocks_per_seq=self.get_max_block_per_batch(),
+                block_size=self.block_size,
+                device=self.device,
+                pin_memory=self.pin_memory)
+
         # Multi-modal data support
         self.multi_modal_input_mapper = MULTIMODAL_REGISTRY \
             .create_input_mapper(self.model_config)
@@ -315,6 +377,15 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
             max_size=max_size,
         )
 
+    def save_fastload_state(
+        self,
+        path: str,
+        pattern: Optional[str] = None,
+    ) -> None:
+        from vllm.model_executor.model_loader.loader import (
+            FastLoadModelLoader)
+        FastLoadModelLoader.save_model(self.model, path, pattern=pattern)
+
     def save_tensorized_model(
         self,
         tensorizer_config: TensorizerConfig,
@@ -389,6 +460,12 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
         if len(seq_group_metadata_list) == 0:
             return self._model_input_cls()
 
+        if self.decode_input_buffers is not None:
+            model_input = self._prepare_decode_model_input_tensors(
+                seq_group_metadata_list, finished_requests_ids)
+            if model_input is not None:
+                return model_input
+
         if self.sliding_window is not None:
             sliding_window_blocks = (self.sliding_window + self.block_size -
                                      1) // self.block_size
@@ -416,12 +493,15 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
                     # get_num_computed_tokens is incorrect for spec decoding.
                     # So, we should have a special logic here.
                     # TODO(sang): Fix it.
-                    context_len = seq_data.get_len() - 1
+                    # A decode processes more than the last token when the
+                    # speculative tokens are scored as one multi-token chunk.
+                    context_len = (seq_data.get_len() -
+                                   seq_group_metadata.token_chunk_size)
 
                 seq_len = min(
                     seq_data.get_len(),
                     context_len + seq_group_metadata.token_chunk_size)
-                if is_prompt:
+                if is_prompt or seq_len - context_len > 1:
                     tokens = seq_data.get_token_ids()[context_len:seq_len]
                 else:
                     # Optimization. get_token_ids requires the entire copy of
@@ -457,7 +537,8 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
                             curr_sliding_window_blocks += 1
                     else:
                         sliding_seq_len = min(seq_len, self.sliding_window)
-                    sliding_context_len = sliding_seq_len - 1
+                    sliding_context_len = sliding_seq_len - (seq_len -
+                                                             context_len)
 
                 # TODO(sang): Combine chunked prefill and prefix caching by
                 # only allowing multiple of block_size chunk size.
@@ -505,16 +586,18 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
                 input_positions.extend(list(range(context_len, seq_len)))
                 lora_id = seq_group_metadata.lora_int_id
 
-                if is_prompt:
+                if is_prompt or query_len > 1:
+                    # A multi-token decode runs like a chunk of a prefill
+                    # whose context is in the KV cache, so it must come
+                    # before the single-token decodes too.
                     assert len(seq_ids) == 1
+                    assert num_decode_tokens == 0, (
+                        "multi-token decodes must precede the decodes")
                     num_prefills += 1
                     num_prefill_tokens += len(tokens)
                     decode_only = False
                     prefill_seq_lens.append(seq_len)
                 else:
-                    assert query_len == 1, (
-                        "seq_len: {}, context_len: {}, query_len: {}".format(
-                            seq_len, context_len, query_len))
                     num_decode_tokens += query_len
                     decode_seq_lens.append(sliding_seq_len)
 
@@ -522,11 +605,13 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
                     lora_requests.add(seq_group_metadata.lora_request)
 
                 lora_index_mapping += [lora_id] * query_len
+                # Every token of a decode is sampled.
                 lora_prompt_mapping.extend(
                     [lora_id] *
-                    (query_len if seq_group_metadata.sampling_params
-                     and seq_group_metadata.sampling_params.prompt_logprobs
-                     is not None else 1))
+                    (query_len if not is_prompt or
+                     (seq_group_metadata.sampling_params
+                      and seq_group_metadata.sampling_params.prompt_logprobs
+                      is not None) else 1))
 
                 mm_data = seq_group_metadata.multi_modal_data
                 if mm_data:
@@ -606,7 +691,8 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
         # vLLM uses cuda graph only for decoding requests.
         use_captured_graph = (
             decode_only and not self.model_config.enforce_eager
-            and batch_size <= _BATCH_SIZES_TO_CAPTURE[-1]
+            and _get_graph_batch_size(batch_size)
+            in self.cuda_graph_batch_sizes
             and max_decode_seq_len <= self.max_seq_len_to_capture)
         if use_captured_graph:
             graph_batch_size = _get_graph_batch_size(batch_size)
@@ -778,6 +864,85 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
             request_ids_to_seq_ids=request_ids_to_seq_ids,
             finished_requests_ids=finished_requests_ids)
 
+    def _prepare_decode_model_input_tensors(
+        self,
+        seq_group_metadata_list: List[SequenceGroupMetadata],
+        finished_requests_ids: Optional[List[str]] = None
+    ) -> Optional[TModelInputForGPU]:
+        """Prepare the model input of a decode-only batch from the persistent
+        `decode_input_buffers`, without building per-token Python lists.
+
+        Returns None if the batch is not eligible, in which case the caller
+        falls back to the generic path. The result matches what the generic
+        path produces for the same batch.
+        """
+        buffers = self.decode_input_buffers
+        assert buffers is not None
+        num_seqs = buffers.fill(seq_group_metadata_list,
+                                self.max_seq_len_to_capture)
+        if not num_seqs:
+            return None
+
+        max_decode_seq_len = int(buffers.seq_lens[:num_seqs].max())
+        use_captured_graph = (not self.model_config.enforce_eager
+                              and _get_graph_batch_size(num_seqs)
+                              in self.cuda_graph_batch_sizes)
+        batch_size = (_get_graph_batch_size(num_seqs)
+                      if use_captured_graph else num_seqs)
+        (input_tokens, input_positions, slot_mapping, seq_lens_tensor,
+         context_lens_tensor, query_start_loc, seq_start_loc,
+         block_tables) = buffers.prepare(num_seqs, batch_size)
+
+        seq_lens = buffers.seq_lens[:batch_size].tolist()
+        query_lens = [1] * num_seqs
+        attn_metadata = self.attn_backend.make_metadata(
+            num_prefills=0,
+            slot_mapping=slot_mapping,
+            num_prefill_tokens=0,
+            num_decode_tokens=batch_size,
+            seq_lens=seq_lens,
+            seq_lens_tensor=seq_lens_tensor,
+            max_query_len=1,
+            max_prefill_seq_len=0,
+            max_decode_seq_len=max_decode_seq_len,
+            query_start_loc=query_start_loc,
+            seq_start_loc=seq_start_loc,
+            context_lens_tensor=context_lens_tensor,
+            block_tables=block_tables,
+            use_cuda_graph=use_captured_graph,
+        )
+
+        lora_requests: Set[LoRARequest] = set()
+        lora_mapping = None
+        if self.lora_config:
+            lora_requests = {
+                seq_group_metadata.lora_request
+                for seq_group_metadata in seq_group_metadata_list
+                if seq_group_metadata.lora_int_id > 0
+            }
+            lora_prompt_mapping = buffers.lora_ids[:num_seqs].tolist()
+            lora_index_mapping = (lora_prompt_mapping + [0] *
+                                  (batch_size - num_seqs))
+            lora_mapping = LoRAMapping(lora_index_mapping,
+                                       lora_prompt_mapping)
+
+        request_ids_to_seq_ids = {
+            seq_group_metadata.request_id:
+            list(seq_group_metadata.seq_data.keys())
+            for seq_group_metadata in seq_group_metadata_list
+        }
+        return self._model_input_cls(
+            input_tokens=input_tokens,
+            input_positions=input_positions,
+            attn_metadata=attn_metadata,
+            seq_lens=seq_lens,
+            query_lens=query_lens,
+            lora_mapping=lora_mapping,
+            lora_requests=lora_requests,
+            multi_modal_kwargs={},
+            request_ids_to_seq_ids=request_ids_to_seq_ids,
+            finished_requests_ids=finished_requests_ids)
+
     @torch.inference_mode()
     def profile_run(self) -> None:
         # Enable top-k sampling to reflect the accurate memory usage.
@@ -906,6 +1071,16 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
             raise RuntimeError("LoRA is not enabled.")
         return self.lora_manager.list_loras()
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> Optional[bool]:
+        if not self.lora_manager:
+            raise RuntimeError("LoRA is not enabled.")
+        return self.lora_manager.prefetch_lora(lora_request)
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        if not self.lora_manager:
+            raise RuntimeError("LoRA is not enabled.")
+        return self.lora_manager.is_lora_ready(lora_id)
+
     @torch.inference_mode()
     def capture_model(self, kv_caches: List[List[torch.Tensor]]) -> None:
         """Cuda graph capture a model.
@@ -919,6 +1094,10 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
 
         Since it is used for decoding-only, it assumes there's only 1 token
         per sequence in the batch.
+
+        The batch sizes are chosen by `graph_capture_set`, see
+        `vllm.worker.cuda_graph_capture_set`. Decode steps of the other batch
+        sizes run eagerly.
         """
         assert not self.model_config.enforce_eager
         logger.info("Capturing the model for CUDA graphs. This may lead to "
@@ -934,192 +1113,263 @@ class GPUModelRunnerBase(ModelRunnerBase[TModelInputForGPU]):
 
         # Prepare dummy inputs. These will be reused for all batch sizes.
         max_batch_size = max(_BATCH_SIZES_TO_CAPTURE)
-        input_tokens = torch.zeros(max_batch_size, dtype=torch.long).cuda()
-        input_positions = torch.zeros(max_batch_size, dtype=torch.long).cuda()
-        slot_mapping = torch.empty(max_batch_size, dtype=torch.long).cuda()
-        slot_mapping.fill_(_PAD_SLOT_ID)
-        seq_lens = torch.ones(max_batch_size, dtype=torch.int32).cuda()
-        block_tables = torch.from_numpy(self.graph_block_tables).cuda()
-        intermediate_inputs = None
+        inputs = _GraphCaptureInputs(
+            input_tokens=torch.zeros(max_batch_size, dtype=torch.long).cuda(),
+            input_positions=torch.zeros(max_batch_size,
+                                        dtype=torch.long).cuda(),
+            slot_mapping=torch.empty(max_batch_size,
+                                     dtype=torch.long).cuda().fill_(
+                                         _PAD_SLOT_ID),
+            seq_lens=torch.ones(max_batch_size, dtype=torch.int32).cuda(),
+            block_tables=torch.from_numpy(self.graph_block_tables).cuda(),
+            kv_caches=kv_caches,
+            # Prepare buffer for outputs. These will be reused for all batch
+            # sizes. It will be filled after the first graph capture.
+            hidden_or_intermediate_states=[None] *
+            self.parallel_config.pipeline_parallel_size)
         if not get_pp_group().is_first_rank:
-            intermediate_inputs = self.model.make_empty_intermediate_tensors(
-                batch_size=max_batch_size,
-                dtype=self.model_config.dtype,
-                device=self.device)
-
-        # Prepare buffer for outputs. These will be reused for all batch sizes.
-        # It will be filled after the first graph capture.
-        hidden_or_intermediate_states: List[Optional[torch.Tensor]] = [
-            None
-        ] * self.parallel_config.pipeline_parallel_size
-
-        graph_batch_size = _get_graph_batch_size(
-            self.scheduler_config.max_num_seqs)
-        batch_size_capture_list = [
-            bs for bs in _BATCH_SIZES_TO_CAPTURE if bs <= graph_batch_size
-        ]
+            inputs.intermediate_inputs = (
+                self.model.make_empty_intermediate_tensors(
+                    batch_size=max_batch_size,
+                    dtype=self.model_config.dtype,
+                    device=self.device))
 
         if self.attn_backend.get_name() == "flashinfer":
             # For flashinfer, different batch sizes will share the
             # same workspace buffer.
-            decode_workspace_buffer = \
-            torch.empty(FLASHINFER_WORKSPACE_BUFFER_SIZE,
-                                                dtype=torch.uint8,
-                                              device=self.device)
-            indices_buffer = torch.empty(max_batch_size *
-                                         self.cache_config.num_gpu_blocks,
-                                         dtype=torch.int32,
-                                         device=self.device)
-            indptr_buffer = torch.empty(max_batch_size + 1,
-                                        dtype=torch.int32,
-                                        device=self.device)
-            last_page_len_buffer = torch.empty(max_batch_size,
+            inputs.decode_workspace_buffer = torch.empty(
+                FLASHINFER_WORKSPACE_BUFFER_SIZE,
+                dtype=torch.uint8,
+                device=self.device)
+            inputs.indices_buffer = torch.empty(
+                max_batch_size * self.cache_config.num_gpu_blocks,
+                dtype=torch.int32,
+                device=self.device)
+            inputs.indptr_buffer = torch.empty(max_batch_size + 1,
                                                dtype=torch.int32,
                                                device=self.device)
+            inputs.last_page_len_buffer = torch.empty(max_batch_size,
+                                                      dtype=torch.int32,
+                                                      device=self.device)
+        self._graph_capture_inputs = inputs
+
+        # All workers must capture the same batch sizes, so the first one
+        # decides, even if another engine updates the file meanwhile.
+        capture_set = self.graph_capture_set
+        capture_set.load()
+        capture_set.counts = get_world_group().broadcast_object(
+            capture_set.counts)
+        batch_size_capture_list = capture_set.select()
+        if capture_set.lazy and self._lazy_fastload:
+            # Capturing would wait until every layer is loaded, so all graphs
+            # are captured between steps instead.
+            batch_size_capture_list = []
+        self.cuda_graph_batch_sizes = set()
+        self._capture_graphs(batch_size_capture_list)
+
+        end_time = time.perf_counter()
+        elapsed_time = end_time - start_time
+        # This usually takes < 10 seconds.
+        logger.info(
+            "Graph capturing finished in %.0f secs, captured %d of %d "
+            "batch sizes.", elapsed_time, len(batch_size_capture_list),
+            len(capture_set.batch_sizes))
 
+    def _capture_graphs(self, batch_sizes: List[int]) -> None:
         with graph_capture() as graph_capture_context:
             # NOTE: Capturing the largest batch size first may help reduce the
             # memory usage of CUDA graph.
             for virtual_engine in range(
                     self.parallel_config.pipeline_parallel_size):
-                for batch_size in reversed(batch_size_capture_list):
-                    if self.attn_backend.get_name() == "flashinfer":
-                        indptr_buffer = indptr_buffer[:batch_size + 1]
-                        last_page_len_buffer = last_page_len_buffer[:
-                                                                    batch_size]
-
-                        num_qo_heads = (
-                            self.model_config.get_num_attention_heads(
-                                self.parallel_config))
-                        num_kv_heads = self.model_config.get_num_kv_heads(
-                            self.parallel_config)
-                        if num_qo_heads // num_kv_heads >= 4:
-                            use_tensor_cores = True
-                        else:
-                            use_tensor_cores = False
-                        decode_wrapper = \
-                            CUDAGraphBatchDecodeWithPagedKVCacheWrapper(
-                            decode_workspace_buffer, indptr_buffer,
-                            indices_buffer, last_page_len_buffer, "NHD",
-                            use_tensor_cores)
-                        kv_cache_dtype = get_kv_cache_torch_dtype(
-                            self.kv_cache_dtype, self.model_config.dtype)
-
-                        paged_kv_indptr_tensor_host = torch.arange(
-                            0, batch_size + 1, dtype=torch.int32)
-                        paged_kv_indices_tensor_host = torch.arange(
-                            0, batch_size, dtype=torch.int32)
-                        paged_kv_last_page_len_tensor_host = torch.full(
-                            (batch_size, ), self.block_size, dtype=torch.int32)
-                        query_start_loc_host = torch.arange(0,
-                                                            batch_size + 1,
-                                                            dtype=torch.int32)
-
-                        attn_metadata = self.attn_backend.make_metadata(
-                            num_prefills=0,
-                            slot_mapping=slot_mapping[:batch_size],
-                            num_prefill_tokens=0,
-                            num_decode_tokens=batch_size,
-                            max_prefill_seq_len=0,
-                            block_tables=block_tables,
-                            paged_kv_indptr=paged_kv_indptr_tensor_host,
-                            paged_kv_indices=paged_kv_indices_tensor_host,
-                            paged_kv_last_page_len=
-                            paged_kv_last_page_len_tensor_host,
-                            num_qo_heads=num_qo_heads,
-                            num_kv_heads=num_kv_heads,
-                            head_dim=self.model_config.get_head_size(),
-                            page_size=self.block_size,
-                            seq_start_loc=None,
-                            query_start_loc=query_start_loc_host,
-                            device=self.device,
-                            data_type=kv_cache_dtype,
-                            use_cuda_graph=True,
-                            decode_wrapper=decode_wrapper,
-                            prefill_wrapper=None)
-                        attn_metadata.begin_forward()
-                    else:
-                        attn_metadata = self.attn_backend.make_metadata(
-                            num_prefills=0,
-                            num_prefill_tokens=0,
-                            num_decode_tokens=batch_size,
-                            slot_mapping=slot_mapping[:batch_size],
-                            seq_lens=None,
-                            seq_lens_tensor=seq_lens[:batch_size],
-                            max_query_len=None,
-                            max_prefill_seq_len=0,
-                            max_decode_seq_len=self.max_seq_len_to_capture,
-                            query_start_loc=None,
-                            seq_start_loc=None,
-                            context_lens_tensor=None,
-                            block_tables=block_tables[:batch_size],
-                            use_cuda_graph=True,
-                        )
-
-                    if self.lora_config:
-                        lora_mapping = LoRAMapping(
-                            [0] * batch_size,
-                            [0] * batch_size,
-                        )
-                        self.set_active_loras(set(), lora_mapping)
-
-                    graph_runner = CUDAGraphRunner(
-                        self.model, self.attn_backend.get_name())
-
-                    if self.attn_backend.get_name() == "flashinfer":
-                        graph_runner.flashinfer_indptr_buffer = indptr_buffer
-                        graph_runner.flashinfer_indices_buffer = indices_buffer
-                        graph_runner.flashinfer_last_page_len_buffer = \
-                            last_page_len_buffer
-                        graph_runner.flashinfer_decode_workspace_buffer = \
-                                decode_workspace_buffer
-                        graph_runner.flashinfer_decode_wrapper = \
-                            decode_wrapper
-
-                    capture_inputs = {
-                        "input_ids":
-                        input_tokens[:batch_size],
-                        "positions":
-                        input_positions[:batch_size],
-                        "hidden_or_intermediate_states":
-                        hidden_or_intermediate_states[
-                            virtual_engine]  # type: ignore
-                        [:batch_size]
-                        if hidden_or_intermediate_states[virtual_engine]
-                        is not None else None,
-                        "intermediate_inputs":
-                        intermediate_inputs[:batch_size]
-                        if intermediate_inputs is not None else None,
-                        "kv_caches":
-                        kv_caches[virtual_engine],
-                        "attn_metadata":
-                        attn_metadata,
-                        "memory_pool":
-                        self.graph_memory_pool,
-                        "stream":
-                        graph_capture_context.stream
-                    }
-                    if self.has_seqlen_agnostic:
-                        # Only used by Mamba-based models CUDA graph atm (Jamba)
-                        capture_inputs.update({
-                            "seqlen_agnostic_capture_inputs":
-                            self.model.get_seqlen_agnostic_capture_inputs(
-                                batch_size)
-                        })
-                    graph_runner.capture(**capture_inputs)
-                    self.graph_memory_pool = graph_runner.graph.pool()
-                    self.graph_runners[virtual_engine][batch_size] = (
-                        graph_runner)
+                for batch_size in sorted(batch_sizes, reverse=True):
+                    self._capture_graph(virtual_engine, batch_size,
+                                        graph_capture_context.stream)
+        self.cuda_graph_batch_sizes.update(batch_sizes)
+
+    def _capture_graph(self, virtual_engine: int, batch_size: int,
+                       stream: torch.cuda.Stream) -> None:
+        inputs = self._graph_capture_inputs
+        assert inputs is not None
+        slot_mapping = inputs.slot_mapping
+        block_tables = inputs.block_tables
+        if self.attn_backend.get_name() == "flashinfer":
+            assert inputs.indptr_buffer is not None
+            assert inputs.last_page_len_buffer is not None
+            indptr_buffer = inputs.indptr_buffer[:batch_size + 1]
+            last_page_len_buffer = inputs.last_page_len_buffer[:batch_size]
+            indices_buffer = inputs.indices_buffer
+            decode_workspace_buffer = inputs.decode_workspace_buffer
+
+            num_qo_heads = self.model_config.get_num_attention_heads(
+                self.parallel_config)
+            num_kv_heads = self.model_config.get_num_kv_heads(
+                self.parallel_config)
+            if num_qo_heads // num_kv_heads >= 4:
+                use_tensor_cores = True
+            else:
+                use_tensor_cores = False
+            decode_wrapper = \
+                CUDAGraphBatchDecodeWithPagedKVCacheWrapper(
+                decode_workspace_buffer, indptr_buffer,
+                indices_buffer, last_page_len_buffer, "NHD",
+                use_tensor_cores)
+            kv_cache_dtype = get_kv_cache_torch_dtype(self.kv_cache_dtype,
+                                                      self.model_config.dtype)
 
-        end_time = time.perf_counter()
-        elapsed_time = end_time - start_time
-        # This usually takes < 10 seconds.
-        logger.info("Graph capturing finished in %.0f secs.", elapsed_time)
+            paged_kv_indptr_tensor_host = torch.arange(0,
+                                                       batch_size + 1,
+                                                       dtype=torch.int32)
+            paged_kv_indices_tensor_host = torch.arange(0,
+                                                        batch_size,
+                                                        dtype=torch.int32)
+            paged_kv_last_page_len_tensor_host = torch.full(
+                (batch_size, ), self.block_size, dtype=torch.int32)
+            query_start_loc_host = torch.arange(0,
+                                                batch_size + 1,
+                                                dtype=torch.int32)
+
+            attn_metadata = self.attn_backend.make_metadata(
+                num_prefills=0,
+                slot_mapping=slot_mapping[:batch_size],
+                num_prefill_tokens=0,
+                num_decode_tokens=batch_size,
+                max_prefill_seq_len=0,
+                block_tables=block_tables,
+                paged_kv_indptr=paged_kv_indptr_tensor_host,
+                paged_kv_indices=paged_kv_indices_tensor_host,
+                paged_kv_last_page_len=paged_kv_last_page_len_tensor_host,
+                num_qo_heads=num_qo_heads,
+                num_kv_heads=num_kv_heads,
+                head_dim=self.model_config.get_head_size(),
+                page_size=self.block_size,
+                seq_start_loc=None,
+                query_start_loc=query_start_loc_host,
+                device=self.device,
+                data_type=kv_cache_dtype,
+                use_cuda_graph=True,
+                decode_wrapper=decode_wrapper,
+                prefill_wrapper=None)
+            attn_metadata.begin_forward()
+        else:
+            attn_metadata = self.attn_backend.make_metadata(
+                num_prefills=0,
+                num_prefill_tokens=0,
+                num_decode_tokens=batch_size,
+                slot_mapping=slot_mapping[:batch_size],
+                seq_lens=None,
+                seq_lens_tensor=inputs.seq_lens[:batch_size],
+                max_query_len=None,
+                max_prefill_seq_len=0,
+                max_decode_seq_len=self.max_seq_len_to_capture,
+                query_start_loc=None,
+                seq_start_loc=None,
+                context_lens_tensor=None,
+                block_tables=block_tables[:batch_size],
+                use_cuda_graph=True,
+            )
+
+        if self.lora_config:
+            lora_mapping = LoRAMapping(
+                [0] * batch_size,
+                [0] * batch_size,
+            )
+            self.set_active_loras(set(), lora_mapping)
+
+        graph_runner = CUDAGraphRunner(self.model,
+                                       self.attn_backend.get_name())
+
+        if self.attn_backend.get_name() == "flashinfer":
+            graph_runner.flashinfer_indptr_buffer = indptr_buffer
+            graph_runner.flashinfer_indices_buffer = indices_buffer
+            graph_runner.flashinfer_last_page_len_buffer = \
+                last_page_len_buffer
+            graph_runner.flashinfer_decode_workspace_buffer = \
+                    decode_workspace_buffer
+            graph_runner.flashinfer_decode_wrapper = \
+                decode_wrapper
+
+        hidden_or_intermediate_states = inputs.hidden_or_intermediate_states[
+            virtual_engine]
+        capture_inputs = {
+            "input_ids":
+            inputs.input_tokens[:batch_size],
+            "positions":
+            inputs.input_positions[:batch_size],
+            "hidden_or_intermediate_states":
+            hidden_or_intermediate_states[:batch_size]
+            if hidden_or_intermediate_states is not None else None,
+            "intermediate_inputs":
+            inputs.intermediate_inputs[:batch_size]
+            if inputs.intermediate_inputs is not None else None,
+            "kv_caches":
+            inputs.kv_caches[virtual_engine],
+            "attn_metadata":
+            attn_metadata,
+            "memory_pool":
+            self.graph_memory_pool,
+            "stream":
+            stream
+        }
+        if self.has_seqlen_agnostic:
+            # Only used by Mamba-based models CUDA graph atm (Jamba)
+            capture_inputs.update({
+                "seqlen_agnostic_capture_inputs":
+                self.model.get_seqlen_agnostic_capture_inputs(batch_size)
+            })
+        graph_runner.capture(**capture_inputs)
+        self.graph_memory_pool = graph_runner.graph.pool()
+        self.graph_runners[virtual_engine][batch_size] = graph_runner
+
+    def _record_cuda_graph_usage(
+            self, model_input: ModelInputForGPU) -> Optional[CUDAGraphUsage]:
+        """Count a decode step that can run as a CUDA graph, and capture the
+        graph of its padded batch size if `graph_capture_set` asks for it.
+
+        Every worker runs this on the same broadcast inputs, so they capture
+        the same graphs at the same step. It must run before the LoRA
+        mapping of the step is set, as capturing resets it. Returns None for
+        the steps that cannot run as a CUDA graph.
+        """
+        attn_metadata = model_input.attn_metadata
+        if (self._graph_capture_inputs is None or attn_metadata is None
+                or attn_metadata.prefill_metadata is not None):
+            return None
+        decode_meta = attn_metadata.decode_metadata
+        if decode_meta is None or model_input.input_tokens is None:
+            return None
+        hit = decode_meta.use_cuda_graph
+        batch_size = model_input.input_tokens.shape[0]
+        if not hit:
+            if (getattr(attn_metadata, "max_decode_seq_len", 0) >
+                    self.max_seq_len_to_capture):
+                return None
+            batch_size = _get_graph_batch_size(batch_size)
+            if batch_size not in self.graph_capture_set.batch_sizes:
+                return None
+
+        capture_set = self.graph_capture_set
+        capture_set.record(batch_size, hit)
+        if not hit and capture_set.should_capture(batch_size):
+            start_time = time.perf_counter()
+            self._capture_graphs([batch_size])
+            logger.info("Captured the CUDA graph of batch size %d in %.2f "
+                        "secs.", batch_size, time.perf_counter() - start_time)
+        if self.is_driver_worker and capture_set.should_save():
+            capture_set.save()
+        return CUDAGraphUsage(batch_size=batch_size, hit=hit)
 
     @property
     def vocab_size(self) -> int:
         return self.model_config.get_vocab_size()
 
+    @property
+    def _lazy_fastload(self) -> bool:
+        """Whether the layers are loaded in the background by the lazy
+        fast-load loader, the same way on every worker."""
+        extra_config = self.load_config.model_loader_extra_config or {}
+        return (self.load_config.load_format == LoadFormat.FASTLOAD
+                and bool(extra_config.get("lazy", False)))
+
 
 class ModelRunner(GPUModelRunnerBase[ModelInputForGPUWithSamplingMetadata]):
     """
@@ -1183,6 +1433,8 @@ class ModelRunner(GPUModelRunnerBase[ModelInputForGPUWithSamplingMetadata]):
         if num_steps > 1:
             raise ValueError("num_steps > 1 is not supported in ModelRunner")
 
+        cuda_graph_usage = self._record_cuda_graph_usage(model_input)
+
         if self.lora_config:
             assert model_input.lora_requests is not None
             assert model_input.lora_mapping is not None
@@ -1269,7 +1521,7 @@ class ModelRunner(GPUModelRunnerBase[ModelInputForGPUWithSamplingMetadata]):
             # we only need to pass hidden states of most recent token
             assert model_input.sampling_metadata is not None
             indices = model_input.sampling_metadata.selected_token_indices
-            if model_input.is_prompt:
+            if prefill_meta is not None:
                 hidden_states = hidden_or_intermediate_states.index_select(
                     0, indices)
             elif decode_meta.use_cuda_graph:
@@ -1279,6 +1531,7 @@ class ModelRunner(GPUModelRunnerBase[ModelInputForGPUWithSamplingMetadata]):
 
             output.hidden_states = hidden_states
 
+        output.cuda_graph_usage = cuda_graph_usage
         return [output]
 
 
@@ -6,22 +6,34 @@ from typing import List, Optional, Set, Tuple, Type
 import torch
 import torch.distributed
 
+import vllm.envs as envs
 from vllm.config import (CacheConfig, DeviceConfig, LoadConfig, LoRAConfig,
                          ModelConfig, MultiModalConfig, ParallelConfig,
                          SchedulerConfig, SpeculativeConfig)
 from vllm.distributed import (ensure_model_parallel_initialized,
                               init_distributed_environment,
                               set_custom_all_reduce)
+from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
 from vllm.model_executor import set_random_seed
 from vllm.model_executor.model_loader.tensorizer import TensorizerConfig
 from vllm.platforms import current_platform
-from vllm.sequence import ExecuteModelRequest
+from vllm.sequence import ExecuteModelRequest, SamplerOutput
 from vllm.worker.cache_engine import CacheEngine
 from vllm.worker.embedding_model_runner import EmbeddingModelRunner
+from vllm.worker.memory_profile_cache import (MemoryProfile,
+                                              get_memory_profile_path,
+                                              load_memory_profile,
+                                              save_memory_profile)
 from vllm.worker.model_runner import GPUModelRunnerBase, ModelRunner
 from vllm.worker.worker_base import LocalOrDistributedWorkerBase, WorkerInput
 
+logger = init_logger(__name__)
+
+# Served batches may use this much more activation memory than a cached
+# profile before the profile is considered stale.
+_MEMORY_PROFILE_TOLERANCE = 0.1
+
 
 class Worker(LocalOrDistributedWorkerBase):
     """A worker class that executes (a partition of) the model on a GPU.
@@ -68,6 +80,7 @@ class Worker(LocalOrDistributedWorkerBase):
             from vllm.utils import init_cached_hf_modules
             init_cached_hf_modules()
         self.multimodal_config = multimodal_config
+        self.speculative_config = speculative_config
 
         # Return hidden states from target model if the draft model is an
         # mlp_speculator
@@ -101,6 +114,12 @@ class Worker(LocalOrDistributedWorkerBase):
         # Initialize gpu_cache as embedding models don't initialize kv_caches
         self.gpu_cache: Optional[List[List[torch.tensor]]] = None
 
+        # A cached memory profile that was used instead of profiling, with
+        # its path, while it is compared against the served batches.
+        self._memory_profile_to_verify: Optional[Tuple[str,
+                                                       MemoryProfile]] = None
+        self._memory_allocated_after_init = 0
+
     def init_device(self) -> None:
         if self.device_config.device.type == "cuda":
             # torch.distributed.all_reduce does not free the input tensor until
@@ -144,6 +163,13 @@ class Worker(LocalOrDistributedWorkerBase):
             max_size=max_size,
         )
 
+    def save_fastload_state(
+        self,
+        path: str,
+        pattern: Optional[str] = None,
+    ) -> None:
+        self.model_runner.save_fastload_state(path, pattern=pattern)
+
     def save_tensorized_model(
         self,
         tensorizer_config: TensorizerConfig,
@@ -163,10 +189,59 @@ class Worker(LocalOrDistributedWorkerBase):
         .. tip::
             You may limit the usage of GPU memory
             by adjusting the `gpu_memory_utilization` parameter.
+
+        With `VLLM_MEMORY_PROFILE_CACHE_DIR` set, the profile is stored there
+        and reused by later starts with the same configuration.
         """
+        profile_path = self._get_memory_profile_path()
+        profile = (load_memory_profile(profile_path)
+                   if profile_path is not None else None)
+        if profile is not None:
+            logger.info("Using the cached memory profile %s.", profile_path)
+            if envs.VLLM_MEMORY_PROFILE_VERIFY:
+                self._memory_profile_to_verify = (profile_path, profile)
+        else:
+            profile = self._profile_memory()
+            if profile_path is not None:
+                try:
+                    save_memory_profile(profile_path, profile)
+                except OSError as e:
+                    logger.warning("Failed to cache the memory profile: %s",
+                                   e)
+        peak_memory = profile.peak_memory
+        total_gpu_memory = torch.cuda.mem_get_info()[1]
+
+        cache_block_size = self.get_cache_block_size_bytes()
+        num_gpu_blocks = int(
+            (total_gpu_memory * self.cache_config.gpu_memory_utilization -
+             peak_memory) // cache_block_size)
+        num_cpu_blocks = int(self.cache_config.swap_space_bytes //
+                             cache_block_size)
+        num_gpu_blocks = max(num_gpu_blocks, 0)
+        num_cpu_blocks = max(num_cpu_blocks, 0)
+        if self.model_runner.lora_manager:
+            self.model_runner.remove_all_loras()
+        gc.collect()
+        torch.cuda.empty_cache()
+        return num_gpu_blocks, num_cpu_blocks
+
+    def _get_memory_profile_path(self) -> Optional[str]:
+        if envs.VLLM_MEMORY_PROFILE_CACHE_DIR is None:
+            return None
+        return get_memory_profile_path(envs.VLLM_MEMORY_PROFILE_CACHE_DIR,
+                                       self.model_config, self.parallel_config,
+                                       self.scheduler_config, self.lora_config,
+                                       self.multimodal_config,
+                                       self.speculative_config, self.device,
+                                       self.rank,
+                                       type(self.model_runner).__name__)
+
+    def _profile_memory(self) -> MemoryProfile:
         # Profile the memory usage of the model and get the maximum number of
         # cache blocks that can be allocated with the remaining free memory.
         torch.cuda.empty_cache()
+        torch.cuda.reset_peak_memory_stats()
+        allocated = torch.cuda.memory_allocated()
 
         # Execute a forward pass with dummy inputs to profile the memory usage
         # of the model.
@@ -175,27 +250,38 @@ class Worker(LocalOrDistributedWorkerBase):
         # Calculate the number of blocks that can be allocated with the
         # profiled peak memory.
         torch.cuda.synchronize()
-        free_gpu_memory, total_gpu_memory = torch.cuda.mem_get_info()
+        free_gpu_memory, _ = torch.cuda.mem_get_info()
         # NOTE(woosuk): Here we assume that the other processes using the same
         # GPU did not change their memory usage during the profiling.
         peak_memory = self.init_gpu_memory - free_gpu_memory
         assert peak_memory > 0, (
             "Error in memory profiling. This happens when the GPU memory was "
             "not properly cleaned up before initializing the vLLM instance.")
-
-        cache_block_size = self.get_cache_block_size_bytes()
-        num_gpu_blocks = int(
-            (total_gpu_memory * self.cache_config.gpu_memory_utilization -
-             peak_memory) // cache_block_size)
-        num_cpu_blocks = int(self.cache_config.swap_space_bytes //
-                             cache_block_size)
-        num_gpu_blocks = max(num_gpu_blocks, 0)
-        num_cpu_blocks = max(num_cpu_blocks, 0)
-        if self.model_runner.lora_manager:
-            self.model_runner.remove_all_loras()
-        gc.collect()
-        torch.cuda.empty_cache()
-        return num_gpu_blocks, num_cpu_blocks
+        activation_memory = torch.cuda.max_memory_allocated() - allocated
+        return MemoryProfile(peak_memory=peak_memory,
+                             activation_memory=activation_memory)
+
+    def _verify_memory_profile(self) -> None:
+        """Remove the cached memory profile that was used at startup if the
+        served batches need more activation memory than it recorded, so the
+        next start profiles again."""
+        assert self._memory_profile_to_verify is not None
+        path, profile = self._memory_profile_to_verify
+        activation_memory = (torch.cuda.max_memory_allocated() -
+                             self._memory_allocated_after_init)
+        if activation_memory <= profile.activation_memory * (
+                1 + _MEMORY_PROFILE_TOLERANCE):
+            return
+        logger.warning(
+            "The activation memory of the served batches (%.2f GiB) exceeds "
+            "the cached memory profile (%.2f GiB). Removing %s, the next "
+            "start will profile again.", activation_memory / 2**30,
+            profile.activation_memory / 2**30, path)
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self._memory_profile_to_verify = None
 
     def initialize_cache(self, num_gpu_blocks: int,
                          num_cpu_blocks: int) -> None:
@@ -212,6 +298,10 @@ class Worker(LocalOrDistributedWorkerBase):
 
         self._init_cache_engine()
         self._warm_up_model()
+        if self._memory_profile_to_verify is not None:
+            # Everything allocated from here on is activation memory.
+            torch.cuda.reset_peak_memory_stats()
+            self._memory_allocated_after_init = torch.cuda.memory_allocated()
 
     def _init_cache_engine(self):
         assert self.cache_config.num_gpu_blocks is not None
@@ -232,6 +322,15 @@ class Worker(LocalOrDistributedWorkerBase):
         # the model initialization and profiling.
         set_random_seed(self.model_config.seed)
 
+    def execute_model(
+        self,
+        execute_model_req: Optional[ExecuteModelRequest] = None
+    ) -> Optional[List[SamplerOutput]]:
+        output = super().execute_model(execute_model_req)
+        if self._memory_profile_to_verify is not None:
+            self._verify_memory_profile()
+        return output
+
     @property
     def do_metadata_broadcast(self) -> bool:
         return self.parallel_config.tensor_parallel_size > 1
@@ -296,6 +395,12 @@ class Worker(LocalOrDistributedWorkerBase):
     def list_loras(self) -> Set[int]:
         return self.model_runner.list_loras()
 
+    def prefetch_lora(self, lora_request: LoRARequest) -> Optional[bool]:
+        return self.model_runner.prefetch_lora(lora_request)
+
+    def is_lora_ready(self, lora_id: int) -> bool:
+        return self.model_runner.is_lora_ready(lora_id)
+
     @property
     def max_model_len(self) -> int:
         return self.model_config.max_model_len
@@ -1,8 +1,10 @@
 import dataclasses
 import importlib
 import os
+import time
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List, Optional, Set, Tuple, Type, Union
+from typing import (Any, Callable, Dict, List, Optional, Set, Tuple, Type,
+                    Union)
 
 import torch
 
@@ -10,13 +12,17 @@ from vllm.distributed import broadcast_tensor_dict, get_pp_group
 from vllm.logger import init_logger
 from vllm.lora.request import LoRARequest
 from vllm.sequence import (ExecuteModelRequest, IntermediateTensors,
-                           SamplerOutput)
+                           PipelineStageTimes, SamplerOutput)
 from vllm.utils import (enable_trace_function_call_for_thread, is_hip,
                         update_environment_variables)
 from vllm.worker.model_runner_base import ModelRunnerBase, ModelRunnerInputBase
 
 logger = init_logger(__name__)
 
+# Key under which the timings of the previous pipeline stages are sent along
+# with the intermediate tensors.
+PIPELINE_STAGE_TIMES_KEY = "pipeline_stage_times"
+
 
 class WorkerBase(ABC):
     """Worker interface that allows vLLM to cleanly separate implementations for
@@ -160,6 +166,41 @@ class WorkerInput:
         return tensor_dict
 
 
+class PipelineStageTimer:
+    """Measures the bubble and busy time of a pipeline parallel stage.
+
+    The bubble time of a step is the time between the end of the stage's
+    previous step and the moment the inputs of the current step (including
+    the intermediate tensors of the previous stage) are available. Calling
+    `reset` when the execution loop stops keeps periods without any
+    in-flight requests from being counted as bubbles.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.perf_counter):
+        self._clock = clock
+        self._step_start: Optional[float] = None
+        self._last_step_end: Optional[float] = None
+
+    def reset(self) -> None:
+        self._step_start = None
+        self._last_step_end = None
+
+    def start_step(self) -> None:
+        self._step_start = self._clock()
+
+    def end_step(self) -> PipelineStageTimes:
+        assert self._step_start is not None, "start_step() was not called"
+        now = self._clock()
+        bubble_time = 0.0
+        if self._last_step_end is not None:
+            bubble_time = max(0.0, self._step_start - self._last_step_end)
+        times = PipelineStageTimes(bubble_time=bubble_time,
+                                   busy_time=now - self._step_start)
+        self._step_start = None
+        self._last_step_end = now
+        return times
+
+
 class LocalOrDistributedWorkerBase(WorkerBase):
     """
     Partial implementation of WorkerBase that has a default `execute_model`
@@ -171,6 +212,7 @@ class LocalOrDistributedWorkerBase(WorkerBase):
     """
     is_driver_worker: bool
     model_runner: ModelRunnerBase
+    pipeline_stage_timer: Optional[PipelineStageTimer] = None
 
     @property
     @abstractmethod
@@ -227,6 +269,8 @@ class LocalOrDistributedWorkerBase(WorkerBase):
                     # driver broadcasts an empty input. Send an empty input to
                     # notify all other workers to stop their execution loop.
                     broadcast_tensor_dict({}, src=0)
+                if self.pipeline_stage_timer is not None:
+                    self.pipeline_stage_timer.reset()
                 return None
 
             worker_input: WorkerInput = self.prepare_worker_input(
@@ -248,6 +292,8 @@ class LocalOrDistributedWorkerBase(WorkerBase):
             assert self.do_metadata_broadcast
             broadcast_data = broadcast_tensor_dict(src=0)
             if not broadcast_data:
+                if self.pipeline_stage_timer is not None:
+                    self.pipeline_stage_timer.reset()
                 return None
 
             num_steps = broadcast_data.pop("num_steps")
@@ -263,20 +309,40 @@ class LocalOrDistributedWorkerBase(WorkerBase):
         if worker_input.num_seq_groups == 0:
             return []
 
+        pp_group = get_pp_group()
+        stage_times: Optional[List[PipelineStageTimes]] = None
+        if pp_group.world_size > 1 and self.pipeline_stage_timer is None:
+            self.pipeline_stage_timer = PipelineStageTimer()
+
         intermediate_tensors = None
-        if not get_pp_group().is_first_rank:
-            intermediate_tensors = IntermediateTensors(
-                get_pp_group().recv_tensor_dict())
+        if not pp_group.is_first_rank:
+            tensor_dict = pp_group.recv_tensor_dict()
+            stage_times = tensor_dict.pop(PIPELINE_STAGE_TIMES_KEY, None)
+            intermediate_tensors = IntermediateTensors(tensor_dict)
+
+        if self.pipeline_stage_timer is not None:
+            self.pipeline_stage_timer.start_step()
 
         output = self.model_runner.execute_model(
             model_input, self.kv_cache[worker_input.virtual_engine]
             if self.kv_cache is not None else None, intermediate_tensors,
             num_steps)
 
-        if not get_pp_group().is_last_rank:
-            get_pp_group().send_tensor_dict(output.tensors)
+        if self.pipeline_stage_timer is not None:
+            stage_times = (stage_times or []) + [
+                self.pipeline_stage_timer.end_step()
+            ]
+
+        if not pp_group.is_last_rank:
+            pp_group.send_tensor_dict({
+                **output.tensors, PIPELINE_STAGE_TIMES_KEY:
+                stage_times
+            })
             return [None]
 
+        if stage_times is not None and output:
+            output[0].pipeline_stage_times = stage_times
+
         # Worker only supports single-step execution. Wrap the output in a
         # list to conform to interface.
         return output